@@ -1,12 +1,17 @@
 import sys
 import os
-from flask import Flask
+from flask import Flask, request
 
 # Dodaj ścieżkę do projektu
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from config import DEBUG, SECRET_KEY
-from blueprints.scraping import scraping_bp
+from config import (
+    DEBUG, SECRET_KEY, EMBEDDED_WORKERS, CHART_ASSET_MAX_AGE,
+    WORKERS_SCRAPING, WORKERS_CLASSIFICATION, WORKERS_REPORT
+)
+from blueprints.scraping import scraping_bp, recover_interrupted_classifications
+from services.job_queue import QUEUE_SCRAPING, QUEUE_CLASSIFICATION, QUEUE_REPORT
+from services.queue_worker import WorkerPool
 
 # Prawidłowa konfiguracja Flask z ścieżkami do folderu static i templates
 app = Flask(
@@ -22,6 +27,21 @@ app.config['DEBUG'] = DEBUG
 # Rejestracja blueprintów
 app.register_blueprint(scraping_bp)
 
+# Wznów klasyfikacje przerwane restartem i uruchom workery kolejki
+# (w trybie debug tylko w procesie reloadera; nie w procesach potomnych spawn, np. puli
+# renderowania wykresów, które importują app.py jako __mp_main__)
+if __name__ != '__mp_main__' and (not DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'):
+    recover_interrupted_classifications()
+    
+    # EMBEDDED_WORKERS=False: zadania wykonuje osobny proces (scripts/run_worker.py)
+    if EMBEDDED_WORKERS:
+        worker_pool = WorkerPool({
+            QUEUE_SCRAPING: WORKERS_SCRAPING,
+            QUEUE_CLASSIFICATION: WORKERS_CLASSIFICATION,
+            QUEUE_REPORT: WORKERS_REPORT
+        })
+        worker_pool.start()
+
 # Debug route do sprawdzenia static files
 @app.route('/debug')
 def debug():
@@ -37,6 +57,16 @@ def debug():
     CSS size: {os.path.getsize(css_path) if os.path.exists(css_path) else 'N/A'} bytes<br>
     """
 
+@app.after_request
+def cache_chart_assets(response):
+    """Wykresy mają w nazwie hash danych - ta sama nazwa to zawsze ta sama treść"""
+    if request.path.startswith('/static/charts/') and response.status_code == 200:
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = CHART_ASSET_MAX_AGE
+        response.cache_control.immutable = True
+    return response
+
 @app.errorhandler(404)
 def not_found(error):
     return "Strona nie znaleziona", 404
@@ -0,0 +1,198 @@
+"""
+Przypadki benchmarku - uruchamiane w osobnym procesie (run_benchmarks.py --case ... --child)
+
+Każdy przypadek przygotowuje dane (poza pomiarem), mierzy ścieżkę krytyczną i zwraca:
+{"items": liczba przetworzonych postów, "seconds": czas całkowity, "latencies": {operacja: [s, ...]}}
+Backendy Apify/Gemini to atrapy (services/fake_backends.py), baza to tymczasowy plik
+(DATABASE_PATH) - środowisko ustawia proces nadrzędny przed importem config.
+"""
+import sys
+import os
+import time
+import tempfile
+import subprocess
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BRAND = "Marka Benchmark"
+
+def timed(func, samples: list):
+    """Opakowanie mierzące czas każdego wywołania funkcji"""
+    def wrapper(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            samples.append(time.perf_counter() - started)
+    return wrapper
+
+def build_job(job_id: str, size: int, classified: bool = False):
+    """Zadanie z `size` postami z atrapy Apify (opcjonalnie z kluczem i klasyfikacją)"""
+    from models.scraping_job import ScrapingJob
+    from models.scraping_result import ScrapingResult
+    from models.category_key import CategoryKey
+    from services.fake_backends import FakeApifyClient, FAKE_ASPECTS
+    
+    client = FakeApifyClient()
+    urls = [f"https://www.facebook.com/groups/benchmark-grupa{i}" for i in range(size // 500 + 1)]
+    items = []
+    for url in urls:
+        items += client.generate_posts(url, size - len(items))
+    results = [ScrapingResult.from_apify_item(item) for item in items[:size]]
+    for result in results:
+        result.source_type = "group"
+    
+    job = ScrapingJob(
+        job_id=job_id, brand_name=BRAND,
+        start_date=min(r.date for r in results).date().isoformat(),
+        end_date=max(r.date for r in results).date().isoformat(),
+        status="completed", scraping_results=results,
+        category_key=CategoryKey(job_id=job_id, categories=[
+            {"aspekt": aspect, "definicja": f"Opinie dotyczące: {aspect.lower()}"} for aspect in FAKE_ASPECTS
+        ])
+    )
+    if classified:
+        # Dane wejściowe bez wywołań atrapy (opóźnienia i błędy nie obciążają przygotowania)
+        sentiments = ("pozytywny", "neutralny", "negatywny")
+        for idx in range(len(results)):
+            job.classification_results[idx] = {
+                "category": FAKE_ASPECTS[idx % len(FAKE_ASPECTS)], "sentiment": sentiments[idx % 7 % 3]
+            }
+    return job
+
+def bench_scraping(size: int) -> dict:
+    """Agent 1: zapytania, wyszukiwanie, stronicowanie per URL, filtr dat i weryfikacja Gemini"""
+    from services.scraping_orchestrator import ScrapingOrchestrator
+    from services.apify_service import ApifyService
+    
+    apify = ApifyService()
+    actor_calls, verifications = [], []
+    apify.run_actor = timed(apify.run_actor, actor_calls)
+    
+    orchestrator = ScrapingOrchestrator()
+    orchestrator.target_posts = size
+    orchestrator.max_limit = size
+    orchestrator.gemini_service.verify_post = timed(orchestrator.gemini_service.verify_post, verifications)
+    
+    started = time.perf_counter()
+    results = orchestrator.execute_scraping_job(BRAND, job_id="bench-scraping")
+    seconds = time.perf_counter() - started
+    return {
+        "items": len(results),
+        "seconds": seconds,
+        "latencies": {"actor_call": actor_calls, "verify_post": verifications}
+    }
+
+def bench_classification(size: int) -> dict:
+    """Agent 3: klasyfikacja z checkpointami (wywołanie Gemini + zapis wyniku i postępu per komentarz)"""
+    from services.classification_orchestrator import ClassificationOrchestrator
+    from services.job_storage import JobStorageService
+    
+    job = build_job("bench-classification", size)
+    storage = JobStorageService()
+    storage.save(job)
+    storage.clear_cache()
+    
+    orchestrator = ClassificationOrchestrator()
+    per_comment = []
+    last = [None]
+    save_result = orchestrator.db.save_classification_result
+    
+    def save_and_mark(*args, **kwargs):
+        save_result(*args, **kwargs)
+        now = time.perf_counter()
+        per_comment.append(now - last[0])
+        last[0] = now
+    orchestrator.db.save_classification_result = save_and_mark
+    
+    started = last[0] = time.perf_counter()
+    orchestrator.run_classification(job.job_id)
+    seconds = time.perf_counter() - started
+    return {"items": len(per_comment), "seconds": seconds, "latencies": {"comment": per_comment}}
+
+def bench_database(size: int) -> dict:
+    """Warstwa SQLite: zapis/odczyt zadania, stronicowanie, wyszukiwanie FTS, agregaty"""
+    from services.database_service import DatabaseService
+    
+    db = DatabaseService()
+    job = build_job("bench-database", size, classified=True)
+    ops = {name: [] for name in ("save_job", "load_job", "results_page", "search_posts", "aggregates")}
+    
+    started = time.perf_counter()
+    timed(db.save_job, ops["save_job"])(job)
+    timed(db.load_job, ops["load_job"])(job.job_id)
+    
+    page = {"next_cursor": None}
+    while True:
+        page = timed(db.get_results_page, ops["results_page"])(
+            job.job_id, after=page.get("next_cursor"), limit=50, include_classification=True
+        )
+        if not page.get("next_cursor"):
+            break
+    
+    for query in ("obsługa", "cena jakość", "dostawa kurier", "reklamacja", "aplikacja"):
+        timed(db.search_posts, ops["search_posts"])(query, job_id=job.job_id)
+        timed(db.search_posts, ops["search_posts"])(query, brand=BRAND)
+    timed(db.get_classification_aggregates, ops["aggregates"])(job.job_id)
+    
+    seconds = time.perf_counter() - started
+    return {"items": size, "seconds": seconds, "latencies": ops}
+
+def bench_report(size: int, repeats: int = 3) -> dict:
+    """Raport: agregaty z bazy, wykresy, treść Gemini, HTML/Markdown"""
+    from services.database_service import DatabaseService
+    from services.report_service import ReportService
+    
+    db = DatabaseService()
+    job = build_job("bench-report", size, classified=True)
+    db.save_job(job)
+    
+    report_service = ReportService()
+    output_dir = tempfile.mkdtemp(prefix="socialpure-bench-report-")
+    report_service.reports_dir = output_dir
+    report_service.visualization_service.charts_dir = output_dir
+    
+    ops = {name: [] for name in ("aggregates", "charts", "narrative", "finalize")}
+    started = time.perf_counter()
+    for _ in range(repeats):
+        stats = timed(db.get_classification_aggregates, ops["aggregates"])(job.job_id)
+        chart_paths = timed(report_service.visualization_service.generate_all_charts, ops["charts"])(stats, job.job_id)
+        markdown = timed(report_service.generate_narrative, ops["narrative"])(
+            stats, job.category_key, BRAND, job.start_date, job.end_date
+        )
+        timed(report_service.finalize_report, ops["finalize"])(markdown, chart_paths, job.job_id)
+    seconds = time.perf_counter() - started
+    return {"items": size * repeats, "seconds": seconds, "latencies": ops}
+
+# Punkty wejścia mierzone przy zimnym starcie: serwer WWW, worker kolejki, proces renderujący wykresy
+STARTUP_MODULES = {
+    "web": "app",
+    "worker": "services.pipeline_tasks",
+    "charts": "services.visualization_service",
+}
+
+def bench_startup(size: int, repeats: int = 5) -> dict:
+    """Czas importu punktów wejścia w nowym interpreterze (rozmiar nie ma znaczenia)"""
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, EMBEDDED_WORKERS="False")  # Import app.py bez uruchamiania workerów
+    ops = {name: [] for name in STARTUP_MODULES}
+    started = time.perf_counter()
+    for _ in range(repeats):
+        for name, module in STARTUP_MODULES.items():
+            completed = subprocess.run(
+                [sys.executable, "-c",
+                 f"import time; t = time.perf_counter(); import {module}; print(time.perf_counter() - t)"],
+                cwd=project_dir, env=env, capture_output=True, text=True, check=True
+            )
+            ops[name].append(float(completed.stdout.strip().splitlines()[-1]))
+    seconds = time.perf_counter() - started
+    return {"items": repeats * len(STARTUP_MODULES), "seconds": seconds, "latencies": ops}
+
+CASES = {
+    "scraping": bench_scraping,
+    "classification": bench_classification,
+    "database": bench_database,
+    "report": bench_report,
+    "startup": bench_startup,
+}
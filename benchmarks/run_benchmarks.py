@@ -0,0 +1,174 @@
+"""
+Benchmark potoku na atrapach Apify i Gemini (bez kont API i sieci)
+Uruchom: python benchmarks/run_benchmarks.py [--cases scraping,classification,database,report,startup]
+         [--sizes 100,1000,10000] [--latency-ms 0] [--error-rate 0] [--payload-size 2000]
+         [--output wyniki.json] [--baseline poprzednie.json --threshold 0.2]
+
+Każda para (przypadek, rozmiar) działa w osobnym procesie z własną tymczasową bazą
+(DATABASE_PATH), backendami fake i wyłączonym cache Apify - pomiary się nie przenikają,
+a peak RSS dotyczy jednego przypadku. Raport: przepustowość (posty/s), p50/p95 czasu
+operacji i peak RSS. Z --baseline skrypt kończy się kodem 1, gdy przepustowość spadła
+lub p95 wzrosło o więcej niż --threshold względem zapisanego przebiegu.
+
+Przypadek startup mierzy czas importu punktów wejścia (serwer, worker, proces wykresów)
+w nowym interpreterze - pilnuje, by ciężkie biblioteki nie wróciły do importu modułów.
+"""
+import sys
+import os
+import json
+import shutil
+import argparse
+import resource
+import tempfile
+import subprocess
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+CASE_NAMES = ["scraping", "classification", "database", "report", "startup"]
+
+def percentile(samples: list, fraction: float) -> float:
+    """Percentyl metodą najbliższej pozycji (bez numpy)"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))]
+
+def peak_rss_mb() -> float:
+    """Peak RSS bieżącego procesu (ru_maxrss: KB na Linuksie, bajty na macOS)"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+def run_child(case: str, size: int) -> dict:
+    """Jeden przypadek w bieżącym procesie (środowisko ustawione przez proces nadrzędny)"""
+    from benchmarks.cases import CASES
+    
+    measured = CASES[case](size)
+    seconds = measured["seconds"]
+    return {
+        "case": case,
+        "size": size,
+        "items": measured["items"],
+        "seconds": round(seconds, 4),
+        "throughput": round(measured["items"] / seconds, 2) if seconds else 0.0,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "ops": {
+            name: {
+                "count": len(samples),
+                "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+                "p95_ms": round(percentile(samples, 0.95) * 1000, 3)
+            }
+            for name, samples in measured["latencies"].items()
+        }
+    }
+
+def run_case(case: str, size: int, args) -> dict:
+    """Uruchamia przypadek w osobnym procesie z izolowanym środowiskiem"""
+    work_dir = tempfile.mkdtemp(prefix=f"socialpure-bench-{case}-")
+    env = dict(os.environ)
+    env.update({
+        "APIFY_BACKEND": "fake",
+        "GEMINI_BACKEND": "fake",
+        "APIFY_CACHE_ENABLED": "False",
+        "DATABASE_PATH": os.path.join(work_dir, "bench.db"),
+        "FAKE_LATENCY_MS": str(args.latency_ms),
+        "FAKE_ERROR_RATE": str(args.error_rate),
+        "FAKE_PAYLOAD_SIZE": str(args.payload_size),
+        "FAKE_POSTS_PER_URL": str(max(500, size)),
+        "FAKE_SEED": str(args.seed),
+        "FAKE_ANCHOR_DATE": "2024-12-31",
+    })
+    try:
+        completed = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--child", "--cases", case, "--sizes", str(size)],
+            env=env, capture_output=True, text=True
+        )
+        if completed.returncode != 0:
+            return {"case": case, "size": size, "error": completed.stderr.strip().splitlines()[-1:]}
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+def print_table(results: list):
+    print(f"{'przypadek':<15}{'rozmiar':>8}{'posty/s':>11}{'czas [s]':>10}{'RSS [MB]':>10}  "
+          f"{'operacja':<14}{'n':>7}{'p50 [ms]':>11}{'p95 [ms]':>11}")
+    for result in results:
+        head = f"{result['case']:<15}{result['size']:>8}"
+        if "error" in result:
+            print(f"{head}  BŁĄD: {' '.join(result['error'])}")
+            continue
+        head += f"{result['throughput']:>11.1f}{result['seconds']:>10.2f}{result['peak_rss_mb']:>10.1f}  "
+        for i, (name, op) in enumerate(result["ops"].items()):
+            prefix = head if i == 0 else " " * len(head)
+            print(f"{prefix}{name:<14}{op['count']:>7}{op['p50_ms']:>11.2f}{op['p95_ms']:>11.2f}")
+
+def compare_with_baseline(results: list, baseline_path: str, threshold: float) -> list:
+    """Regresje względem zapisanego przebiegu: spadek przepustowości lub wzrost p95 ponad próg"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {(r["case"], r["size"]): r for r in json.load(f)["results"] if "error" not in r}
+    
+    regressions = []
+    for result in results:
+        before = baseline.get((result["case"], result["size"]))
+        if not before or "error" in result:
+            continue
+        label = f"{result['case']}/{result['size']}"
+        if result["throughput"] < before["throughput"] * (1 - threshold):
+            regressions.append(f"{label}: przepustowość {before['throughput']} -> {result['throughput']} posty/s")
+        for name, op in result["ops"].items():
+            old_p95 = before["ops"].get(name, {}).get("p95_ms")
+            # Operacje poniżej 1 ms pomijane - szum pomiaru większy niż próg
+            if old_p95 and old_p95 >= 1 and op["p95_ms"] > old_p95 * (1 + threshold):
+                regressions.append(f"{label} {name}: p95 {old_p95} -> {op['p95_ms']} ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark potoku SocialPure na atrapach Apify/Gemini")
+    parser.add_argument("--cases", default=",".join(CASE_NAMES), help="Przypadki (po przecinku)")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Liczby postów (po przecinku)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Średnie opóźnienie wywołania atrapy")
+    parser.add_argument("--error-rate", type=float, default=0, help="Odsetek wywołań atrapy kończących się błędem")
+    parser.add_argument("--payload-size", type=int, default=2000, help="Rozmiar elementu Apify (bajty)")
+    parser.add_argument("--seed", type=int, default=42, help="Ziarno danych i opóźnień atrap")
+    parser.add_argument("--output", help="Zapis wyników do pliku JSON (np. jako baseline)")
+    parser.add_argument("--baseline", help="Plik JSON poprzedniego przebiegu do porównania")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Dopuszczalne pogorszenie (0.2 = 20%%)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    
+    cases = [case.strip() for case in args.cases.split(",") if case.strip()]
+    sizes = [int(size) for size in args.sizes.split(",") if size.strip()]
+    unknown = [case for case in cases if case not in CASE_NAMES]
+    if unknown:
+        parser.error(f"Nieznane przypadki: {', '.join(unknown)} (dostępne: {', '.join(CASE_NAMES)})")
+    
+    if args.child:
+        print(json.dumps(run_child(cases[0], sizes[0]), ensure_ascii=False))
+        return 0
+    
+    results = []
+    for case in cases:
+        for size in sizes:
+            print(f"→ {case} ({size} postów)...", file=sys.stderr)
+            results.append(run_case(case, size, args))
+    print_table(results)
+    
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"settings": {k: v for k, v in vars(args).items() if k not in ("child", "output", "baseline")},
+                       "results": results}, f, ensure_ascii=False, indent=2)
+        print(f"\nZapisano wyniki: {args.output}")
+    
+    failed = any("error" in result for result in results)
+    if args.baseline:
+        regressions = compare_with_baseline(results, args.baseline, args.threshold)
+        if regressions:
+            print(f"\nRegresje względem {args.baseline}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"\nBrak regresji względem {args.baseline} (próg {args.threshold:.0%})")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
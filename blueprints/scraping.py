@@ -1,20 +1,35 @@
-from flask import Blueprint, render_template, request, redirect, url_for, jsonify, send_file
-from concurrent.futures import ThreadPoolExecutor
+from flask import (
+    Blueprint, Response, make_response, render_template, request, redirect, url_for, jsonify, send_file,
+    stream_with_context
+)
 import sys
 import os
 import json
+import time
+import zlib
 
 # Dodaj ścieżkę do projektu
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from config import STREAMING_CLASSIFICATION, REPORT_STREAMING, REPORT_STREAM_TIMEOUT
 from models.scraping_job import ScrapingJob
-from models.category_key import CategoryKey
-from models.classification_result import ClassificationResult
 from services.job_storage import JobStorageService
 from services.storage_service import StorageService
-from services.scraping_orchestrator import ScrapingOrchestrator
 from services.gemini_service import GeminiService
-from services.report_service import ReportService
+from services.report_service import ReportService, DOCX_AVAILABLE
+from services.report_stream import (
+    ReportStreamService, EVENT_STATISTICS, EVENT_NARRATIVE, EVENT_DONE, EVENT_ERROR, FINAL_EVENTS
+)
+from services.classification_orchestrator import ClassificationOrchestrator
+from services.workflow_orchestrator import WorkflowOrchestrator
+from services.brand_analytics import BrandAnalyticsService
+from services.brand_sources import BrandSourcesService
+from services.metrics import MetricsService
+from services.job_queue import (
+    JobQueueService, QUEUE_SCRAPING, QUEUE_CLASSIFICATION, QUEUE_REPORT,
+    PRIORITY_LOW, PRIORITY_NORMAL, PRIORITY_HIGH
+)
+from services.pipeline_tasks import TASK_SCRAPE_AND_KEY, TASK_CLASSIFY, TASK_REPORT, TASK_EXPORT_DOCX
 from services.logger import LoggerService
 from utils.helpers import generate_job_id
 from utils.validators import validate_scraping_request
@@ -22,13 +37,20 @@ from utils.validators import validate_scraping_request
 scraping_bp = Blueprint('scraping', __name__)
 job_storage = JobStorageService()
 storage_service = StorageService()
-scraping_orchestrator = ScrapingOrchestrator()
 gemini_service = GeminiService()
 report_service = ReportService()
+report_stream = ReportStreamService()
+classification_orchestrator = ClassificationOrchestrator()
+workflow_orchestrator = WorkflowOrchestrator()
+brand_analytics = BrandAnalyticsService()
+brand_sources = BrandSourcesService()
+metrics = MetricsService()
+job_queue = JobQueueService()
 logger = LoggerService()
 
-# Thread pool dla długotrwałych zadań
-executor = ThreadPoolExecutor(max_workers=2)
+# SSE raportu: odpytywanie report_events co 0.4 s, bez nowych zdarzeń coraz rzadziej (do 2 s)
+STREAM_POLL_MIN_SECONDS = 0.4
+STREAM_POLL_MAX_SECONDS = 2.0
 
 def load_job_from_anywhere(job_id: str):
     """Próbuje wczytać zadanie z pamięci, SQLite lub JSON (fallback)"""
@@ -59,189 +81,22 @@ def load_job_from_anywhere(job_id: str):
     
     return None
 
-def run_classification_all(job_id: str):
-    """Funkcja uruchamiana w tle: klasyfikuje wszystkie komentarze"""
-    job = job_storage.get(job_id)
-    if not job or not job.scraping_results or not job.category_key:
-        return
-    
-    try:
-        job.status = "classifying"
-        job.update_progress("Klasyfikowanie komentarzy...", 0.5)
-        job_storage.update(job)
-        
-        categories = job.category_key.categories
-        category_key_text = json.dumps(categories, ensure_ascii=False, indent=2)
-        
-        total = len(job.scraping_results)
-        classification_results = {}
-        
-        for idx, result in enumerate(job.scraping_results):
-            try:
-                comment_text = result.text
-                if not comment_text or len(comment_text.strip()) < 5:
-                    continue
-                
-                # Prompt dla klasyfikacji
-                prompt = f"""Jesteś ekspertem w klasyfikacji tekstu i analizie sentymentu. Otrzymujesz klucz kategoryzacyjny oraz jeden komentarz do oceny.
-
-<klucz_kategorii>
-{category_key_text}
-</klucz_kategorii>
-
-<komentarz_do_oceny>
-{comment_text}
-</komentarz_do_oceny>
-
-Wykonaj DWA zadania:
-1. Przypisz komentarz do DOKŁADNIE JEDNEJ kategorii z klucza (użyj pola "aspekt").
-2. Oceń sentiment (tonację emocjonalną) komentarza jako: "pozytywny", "negatywny" lub "neutralny".
-
-Zwróć wynik w formacie JSON:
-{{
-  "kategoria": "nazwa_aspektu",
-  "sentiment": "pozytywny/negatywny/neutralny"
-}}
-
-Nie dodawaj żadnych innych wyjaśnień, tylko czysty JSON."""
-                
-                # Wywołaj Gemini Flash Lite
-                response = gemini_service.flash_lite_model.generate_content(prompt)
-                response_text = response.text.strip()
-                
-                # Parsuj odpowiedź
-                parsed = gemini_service.parse_json_response(response_text)
-                
-                if isinstance(parsed, list):
-                    result_data = parsed[0] if len(parsed) > 0 else {}
-                else:
-                    result_data = parsed if isinstance(parsed, dict) else {}
-                
-                category = result_data.get('kategoria', result_data.get('aspekt', 'Nieznana'))
-                sentiment = result_data.get('sentiment', 'neutralny').lower()
-                
-                if sentiment not in ['pozytywny', 'negatywny', 'neutralny']:
-                    sentiment = 'neutralny'
-                
-                classification_results[idx] = {
-                    'category': category,
-                    'sentiment': sentiment
-                }
-                
-                # Aktualizuj progress
-                progress = 0.5 + (idx + 1) / total * 0.4
-                job.update_progress(f"Klasyfikowanie {idx+1}/{total}...", progress)
-                job.classification_results = classification_results
-                job_storage.update(job)
-                
-                # Zapisz do JSON co 5 komentarzy
-                if (idx + 1) % 5 == 0:
-                    try:
-                        storage_service.save_job_to_json(job)
-                    except:
-                        pass
-                
-            except Exception as e:
-                logger.add_log(f"Błąd klasyfikacji komentarza {idx}: {str(e)}", "WARNING")
-                continue
-        
-        # Finalizacja
-        job.status = "completed"
-        job.update_progress("Klasyfikacja zakończona", 1.0)
-        job.classification_results = classification_results
-        job_storage.update(job)
-        
-        # Zapisz do JSON
-        try:
-            storage_service.save_job_to_json(job)
-            logger.add_log(f"Zapisano klasyfikację zadania {job_id} do JSON")
-        except Exception as e:
-            logger.add_log(f"Błąd zapisywania klasyfikacji: {str(e)}", "WARNING")
-        
-    except Exception as e:
-        job.status = "failed"
-        job.error_message = f"Błąd klasyfikacji: {str(e)}"
-        job_storage.update(job)
-        logger.add_log(f"Błąd klasyfikacji zadania {job_id}: {str(e)}", "ERROR")
-
-def run_scraping_and_generate_key(job_id: str, brand_name: str):
-    """Funkcja uruchamiana w tle: scraping + generowanie klucza"""
-    job = job_storage.get(job_id)
-    if not job:
-        return
-    
+def recover_interrupted_classifications():
+    """Sweep startowy: ponownie kolejkuje klasyfikacje przerwane restartem procesu"""
     try:
-        # Krok 1: Scraping
-        job.status = "scraping"
-        job.update_progress("Scraping Facebook...", 0.1)
-        job_storage.update(job)
-        
-        def progress_callback(step: str, progress: float):
-            job.update_progress(step, progress)
-            job_storage.update(job)
-        
-        scraping_results = scraping_orchestrator.execute_scraping_job(
-            brand_name, 
-            start_date=job.start_date,
-            end_date=job.end_date,
-            progress_callback=progress_callback
-        )
-        job.scraping_results = scraping_results
-        job.update_progress("Scraping zakończony", 0.3)
-        job_storage.update(job)
-        
-        if not scraping_results:
-            job.status = "failed"
-            job.error_message = "Nie znaleziono żadnych wyników"
-            job_storage.update(job)
-            return
-        
-        # Krok 2: Generowanie klucza kategorii
-        job.status = "classifying"
-        job.update_progress("Generowanie klucza kategorii...", 0.5)
-        job_storage.update(job)
-        
-        comments = [r.text for r in scraping_results if r.text.strip()]
-        if not comments:
-            job.status = "failed"
-            job.error_message = "Brak komentarzy do analizy"
-            job_storage.update(job)
-            return
-        
-        category_data = gemini_service.generate_category_key(comments, brand_name)
-        category_key = CategoryKey(
-            job_id=job_id,
-            categories=category_data if isinstance(category_data, list) else [],
-            prompt_type="ABSA"
-        )
-        job.category_key = category_key
-        job.update_progress("Klucz kategorii wygenerowany", 0.8)
-        job_storage.update(job)
-        
-        # Zakończenie
-        job.status = "completed"
-        job.update_progress("Zakończono", 1.0)
-        job_storage.update(job)
-        
-        # Automatyczne zapisanie do JSON
-        try:
-            storage_service.save_job_to_json(job)
-            logger.add_log(f"Zapisano zadanie {job_id} do JSON")
-        except Exception as e:
-            logger.add_log(f"Błąd zapisywania do JSON: {str(e)}", "WARNING")
-        
+        for job_id in classification_orchestrator.find_interrupted_jobs():
+            logger.add_log(f"Wznawiam klasyfikację zadania {job_id} po restarcie")
+            job_queue.enqueue(QUEUE_CLASSIFICATION, TASK_CLASSIFY, job_id, priority=PRIORITY_LOW)
     except Exception as e:
-        job.status = "failed"
-        job.error_message = str(e)
-        job_storage.update(job)
-        logger.add_log(f"Błąd w zadaniu {job_id}: {str(e)}", "ERROR")
+        logger.add_log(f"Błąd wznawiania przerwanych klasyfikacji: {str(e)}", "ERROR")
 
 @scraping_bp.route('/')
 def index():
     """Strona główna - formularz scrapingu"""
     # Pobierz listę zapisanych zadań
     saved_jobs = storage_service.list_saved_jobs()
-    return render_template('scraping/index.html', saved_jobs=saved_jobs)
+    return render_template('scraping/index.html', saved_jobs=saved_jobs,
+                           streaming_default=STREAMING_CLASSIFICATION)
 
 @scraping_bp.route('/scrape', methods=['POST'])
 def start_scraping():
@@ -249,6 +104,8 @@ def start_scraping():
     brand_name = request.form.get('brand_name', '').strip()
     start_date = request.form.get('start_date', '')
     end_date = request.form.get('end_date', '')
+    streaming = request.form.get('streaming') == 'on'  # Klasyfikacja w trakcie scrapingu
+    incremental = request.form.get('incremental') == 'on'  # Tylko posty nowsze niż poprzednie zadanie marki
     
     # Walidacja
     is_valid, error_msg = validate_scraping_request({
@@ -258,7 +115,15 @@ def start_scraping():
     })
     
     if not is_valid:
-        return render_template('scraping/index.html', error=error_msg), 400
+        return render_template('scraping/index.html', error=error_msg,
+                               streaming_default=streaming), 400
+    
+    # Tryb przyrostowy wymaga wcześniejszego zakończonego zadania marki (URL-e + klucz kategorii)
+    base_job_id = brand_sources.find_base_job(brand_name) if incremental else None
+    if incremental and not base_job_id:
+        return render_template('scraping/index.html',
+                               error="Brak wcześniejszej pełnej analizy tej marki - uruchom najpierw pełną analizę",
+                               streaming_default=streaming), 400
     
     # Utwórz zadanie
     job_id = generate_job_id()
@@ -267,13 +132,17 @@ def start_scraping():
         brand_name=brand_name,
         start_date=start_date,
         end_date=end_date,
-        status="pending"
+        status="pending",
+        mode="incremental" if base_job_id else "full",
+        base_job_id=base_job_id
     )
     
     job_storage.save(job)
     
-    # Uruchom w tle
-    executor.submit(run_scraping_and_generate_key, job_id, brand_name)
+    # Uruchom w tle (trwała kolejka - przetrwa restart)
+    job_queue.enqueue(QUEUE_SCRAPING, TASK_SCRAPE_AND_KEY, job_id,
+                      payload={"brand_name": brand_name, "streaming": streaming},
+                      priority=PRIORITY_NORMAL, max_attempts=1)
     
     return redirect(url_for('scraping.view_results', job_id=job_id))
 
@@ -285,7 +154,8 @@ def view_results(job_id: str):
     if not job:
         return render_template('scraping/error.html', message="Zadanie nie znalezione"), 404
     
-    return render_template('scraping/results.html', job=job)
+    return render_template('scraping/results.html', job=job,
+                           source_types=sorted({r.source_type or 'post' for r in job.scraping_results}))
 
 @scraping_bp.route('/classification')
 def classification():
@@ -326,42 +196,19 @@ def classification_results(job_id: str):
     
     # Jeśli klasyfikacja nie była jeszcze wykonana, uruchom automatycznie
     if not job.has_classification():
-        # Uruchom klasyfikację w tle
-        executor.submit(run_classification_all, job_id)
-    
-    # Przygotuj dane komentarzy dla JavaScript
-    comments_data = []
-    if job.scraping_results:
-        for result in job.scraping_results:
-            comments_data.append({
-                'text': result.text or '',
-                'author': result.author or 'Nieznany',
-                'url': result.url or '',
-                'source_type': result.source_type or 'post'
-            })
-    
-    # Przygotuj dane kategorii
+        # Uruchom klasyfikację w tle (użytkownik czeka na stronie - wysoki priorytet)
+        job_queue.enqueue(QUEUE_CLASSIFICATION, TASK_CLASSIFY, job_id, priority=PRIORITY_HIGH)
+    
+    # Komentarze i wyniki są doładowywane stronami (/api/classifications) - strona ma stały rozmiar
     categories_data = []
     if job.category_key and job.category_key.categories:
         categories_data = job.category_key.categories
     
-    # Przygotuj istniejące wyniki klasyfikacji
-    # Upewnij się, że klucze są intami dla łatwiejszego użycia w template
-    existing_classifications = {}
-    if job.classification_results:
-        for key, value in job.classification_results.items():
-            # Konwertuj klucz na int jeśli to możliwe
-            try:
-                int_key = int(key)
-                existing_classifications[int_key] = value
-            except (ValueError, TypeError):
-                existing_classifications[key] = value
-    
     return render_template('scraping/classification_results.html', 
                          job=job, 
-                         comments_data=comments_data or [],
                          categories_data=categories_data or [],
-                         existing_classifications=existing_classifications)
+                         classification_stats=storage_service.db.get_classification_stats(job_id),
+                         source_types=sorted({r.source_type or 'post' for r in job.scraping_results}))
 
 @scraping_bp.route('/api/classify', methods=['POST'])
 def classify_comment_api():
@@ -384,71 +231,23 @@ def classify_comment_api():
         if not job:
             return jsonify({"error": "Zadanie nie znalezione"}), 404
         
-        # Przygotuj klucz kategorii
-        category_key_text = json.dumps(categories, ensure_ascii=False, indent=2)
-        
-        # Prompt dla klasyfikacji
-        prompt = f"""Jesteś ekspertem w klasyfikacji tekstu i analizie sentymentu. Otrzymujesz klucz kategoryzacyjny oraz jeden komentarz do oceny.
-
-<klucz_kategorii>
-{category_key_text}
-</klucz_kategorii>
-
-<komentarz_do_oceny>
-{comment_text}
-</komentarz_do_oceny>
-
-Wykonaj DWA zadania:
-1. Przypisz komentarz do DOKŁADNIE JEDNEJ kategorii z klucza (użyj pola "aspekt").
-2. Oceń sentiment (tonację emocjonalną) komentarza jako: "pozytywny", "negatywny" lub "neutralny".
-
-Zwróć wynik w formacie JSON:
-{{
-  "kategoria": "nazwa_aspektu",
-  "sentiment": "pozytywny/negatywny/neutralny"
-}}
-
-Nie dodawaj żadnych innych wyjaśnień, tylko czysty JSON."""
-        
-        # Wywołaj Gemini Flash Lite
-        response = gemini_service.flash_lite_model.generate_content(prompt)
-        response_text = response.text.strip()
+        result = gemini_service.classify_comment(comment_text, categories)
+        category = result['category']
+        sentiment = result['sentiment']
         
-        # Parsuj odpowiedź
-        parsed = gemini_service.parse_json_response(response_text)
-        
-        if isinstance(parsed, list):
-            result = parsed[0] if len(parsed) > 0 else {}
-        else:
-            result = parsed if isinstance(parsed, dict) else {}
-        
-        category = result.get('kategoria', result.get('aspekt', 'Nieznana'))
-        sentiment = result.get('sentiment', 'neutralny').lower()
-        
-        if sentiment not in ['pozytywny', 'negatywny', 'neutralny']:
-            sentiment = 'neutralny'
-        
-        # Zapisz wynik do zadania
+        # Zapisz wynik do zadania (pojedynczy wiersz + checkpoint)
         if not job.classification_results:
             job.classification_results = {}
         
-        job.classification_results[int(comment_index)] = {
-            'category': category,
-            'sentiment': sentiment
-        }
-        job_storage.update(job)
-        
-        # Zapisz do JSON
-        try:
-            storage_service.save_job_to_json(job)
-        except:
-            pass
+        job.classification_results[int(comment_index)] = result
+        storage_service.db.save_classification_result(job_id, int(comment_index), category, sentiment)
+        job_storage.update_state(job)  # Zmiana updated_at - inne procesy odświeżą cache
         
         return jsonify({
             "category": category,
             "sentiment": sentiment
         })
-        
+    
     except Exception as e:
         logger.add_log(f"Błąd klasyfikacji: {str(e)}", "ERROR")
         return jsonify({"error": str(e)}), 500
@@ -479,14 +278,21 @@ def get_classification_status(job_id: str):
     if not job:
         return jsonify({"error": "Job not found"}), 404
     
-    return jsonify({
+    response = {
         "job_id": job.job_id,
         "status": job.status,
         "has_classification": job.has_classification(),
         "classification_count": len(job.classification_results),
         "total_comments": len(job.scraping_results),
-        "classification_results": job.classification_results
-    })
+        "tasks": storage_service.db.get_classification_task_counts(job_id)
+    }
+    
+    # ?results=0 - tylko liczniki i rozkłady (strona klasyfikacji doładowuje wyniki stronami)
+    if request.args.get('results', '1') == '0':
+        response["stats"] = storage_service.db.get_classification_stats(job_id)
+    else:
+        response["classification_results"] = job.classification_results
+    return jsonify(response)
 
 @scraping_bp.route('/load-from-json', methods=['POST'])
 def load_from_json():
@@ -531,14 +337,20 @@ def classify_all_api(job_id: str):
     if not job.category_key:
         return jsonify({"error": "Brak klucza kategorii"}), 400
     
-    # Resetuj istniejące wyniki jeśli są
-    job.classification_results = {}
-    job_storage.update(job)
+    # Domyślnie wznawia (tylko niedokończone komentarze); ?reset=true klasyfikuje od zera
+    data = request.get_json(silent=True) or {}
+    reset = str(data.get('reset', request.args.get('reset', 'false'))).lower() in ('1', 'true', 'yes')
+    
+    # Reset usuwa wyniki, które trwająca klasyfikacja (także w innym procesie) nadal zapisuje
+    if reset and job_queue.has_active_tasks(job_id, [QUEUE_SCRAPING, QUEUE_CLASSIFICATION]):
+        return jsonify({"error": "Klasyfikacja zadania jest w toku - zresetuj ją po zakończeniu"}), 409
     
     # Uruchom klasyfikację w tle
-    executor.submit(run_classification_all, job_id)
+    job_queue.enqueue(QUEUE_CLASSIFICATION, TASK_CLASSIFY, job_id,
+                      payload={"reset": reset}, priority=PRIORITY_HIGH, dedupe=not reset)
     
-    return jsonify({"success": True, "message": "Klasyfikacja uruchomiona"})
+    message = "Klasyfikacja uruchomiona od nowa" if reset else "Klasyfikacja wznowiona"
+    return jsonify({"success": True, "message": message})
 
 @scraping_bp.route('/api/reset-classification/<job_id>', methods=['POST'])
 def reset_classification_api(job_id: str):
@@ -548,75 +360,15 @@ def reset_classification_api(job_id: str):
     if not job:
         return jsonify({"error": "Job not found"}), 404
     
+    if job_queue.has_active_tasks(job_id, [QUEUE_SCRAPING, QUEUE_CLASSIFICATION]):
+        return jsonify({"error": "Klasyfikacja zadania jest w toku - zresetuj ją po zakończeniu"}), 409
+    
     job.classification_results = {}
+    storage_service.db.reset_classification(job_id)
     job_storage.update(job)
     
-    # Zapisz do JSON
-    try:
-        storage_service.save_job_to_json(job)
-    except:
-        pass
-    
     return jsonify({"success": True, "message": "Klasyfikacja zresetowana"})
 
-def convert_classification_results_to_list(job: ScrapingJob) -> list[ClassificationResult]:
-    """Konwertuje classification_results z dict do list[ClassificationResult]"""
-    results = []
-    if not job.classification_results or not job.scraping_results:
-        return results
-    
-    for idx, result in enumerate(job.scraping_results):
-        if idx in job.classification_results:
-            class_data = job.classification_results[idx]
-            results.append(ClassificationResult(
-                comment_text=result.text or "",
-                category=class_data.get('category', 'Nieznana'),
-                sentiment=class_data.get('sentiment', 'neutralny'),
-                comment_index=idx
-            ))
-    
-    return results
-
-def generate_report_background(job_id: str):
-    """Funkcja uruchamiana w tle: generuje raport"""
-    try:
-        job = load_job_from_anywhere(job_id)
-        
-        if not job:
-            logger.add_log(f"Nie można wygenerować raportu - zadanie {job_id} nie znalezione", "ERROR")
-            return
-        
-        if not job.has_classification():
-            logger.add_log(f"Nie można wygenerować raportu - brak klasyfikacji dla {job_id}", "WARNING")
-            return
-        
-        if not job.category_key:
-            logger.add_log(f"Nie można wygenerować raportu - brak klucza kategorii dla {job_id}", "WARNING")
-            return
-        
-        # Konwertuj classification_results
-        classification_results = convert_classification_results_to_list(job)
-        
-        if not classification_results:
-            logger.add_log(f"Brak wyników klasyfikacji do raportu dla {job_id}", "WARNING")
-            return
-        
-        # Generuj raport
-        logger.add_log(f"Rozpoczęto generowanie raportu dla {job_id}")
-        report_data = report_service.generate_report(
-            classification_results=classification_results,
-            category_key=job.category_key,
-            brand_name=job.brand_name,
-            job_id=job_id,
-            start_date=job.start_date,
-            end_date=job.end_date
-        )
-        
-        logger.add_log(f"Raport wygenerowany dla {job_id}: {report_data['html']}")
-        
-    except Exception as e:
-        logger.add_log(f"Błąd generowania raportu dla {job_id}: {str(e)}", "ERROR")
-
 @scraping_bp.route('/api/generate-report/<job_id>', methods=['POST'])
 def generate_report_api(job_id: str):
     """API: Uruchamia generowanie raportu"""
@@ -631,9 +383,11 @@ def generate_report_api(job_id: str):
     if not job.category_key:
         return jsonify({"error": "Brak klucza kategorii"}), 400
     
-    # Sprawdź czy raport już istnieje
-    report_path = os.path.join(report_service.reports_dir, f'report_{job_id}.html')
-    if os.path.exists(report_path):
+    # ?refresh=1 (lub {"refresh": true}): nowa treść z Gemini mimo niezmienionych danych
+    refresh = request.args.get('refresh') in ('1', 'true') or bool((request.get_json(silent=True) or {}).get('refresh'))
+    
+    # Sprawdź czy raport już istnieje i odpowiada aktualnej klasyfikacji
+    if not refresh and workflow_orchestrator.is_report_current(job):
         return jsonify({
             "success": True,
             "message": "Raport już istnieje",
@@ -641,7 +395,8 @@ def generate_report_api(job_id: str):
         })
     
     # Uruchom generowanie w tle
-    executor.submit(generate_report_background, job_id)
+    job_queue.enqueue(QUEUE_REPORT, TASK_REPORT, job_id, payload={"force": refresh},
+                      priority=PRIORITY_NORMAL, max_attempts=2)
     
     return jsonify({
         "success": True,
@@ -664,8 +419,19 @@ def view_report(job_id: str):
             return render_template('scraping/error.html', 
                                 message="Brak klasyfikacji. Najpierw wykonaj klasyfikację komentarzy."), 400
         
-        # Raport jeszcze nie wygenerowany
-        return render_template('scraping/report_generating.html', job_id=job_id, job=job)
+        # Raport jeszcze nie wygenerowany - podgląd na żywo (SSE) albo odświeżanie strony
+        return render_template('scraping/report_generating.html', job_id=job_id, job=job,
+                               streaming=REPORT_STREAMING)
+    
+    # ETag z metadanych pliku raportu i updated_at zadania (strona pokazuje też status i postęp zadania) -
+    # przy zgodnym If-None-Match odpowiedź 304 bez czytania raportu i renderowania strony
+    stat = os.stat(report_path)
+    job_updated_at = job_storage.db.get_job_updated_at(job_id) or ''
+    etag = f'{stat.st_mtime_ns:x}-{stat.st_size:x}-{zlib.crc32(job_updated_at.encode()):x}'
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
     
     # Wczytaj i wyświetl raport
     with open(report_path, 'r', encoding='utf-8') as f:
@@ -674,18 +440,110 @@ def view_report(job_id: str):
     # Pobierz dane zadania dla kontekstu
     job = load_job_from_anywhere(job_id)
     
-    return render_template('scraping/report.html', 
-                         report_html=html_content, 
-                         job_id=job_id,
-                         job=job)
+    response = make_response(render_template('scraping/report.html', 
+                                             report_html=html_content, 
+                                             job_id=job_id,
+                                             job=job))
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'  # Zawsze walidacja ETag (raport może zostać wygenerowany ponownie)
+    return response
+
+@scraping_bp.route('/api/report-stream/<job_id>')
+def report_stream_api(job_id: str):
+    """
+    API (SSE): postęp generowania raportu - zdarzenia statistics i charts (fragmenty HTML),
+    narrative (dotychczasowa treść Gemini jako HTML) i na końcu done/error.
+    Last-Event-ID (wznowienie po zerwaniu połączenia) pomija już wysłane zdarzenia.
+    Strumień kończy się, gdy zadanie nie ma już aktywnych zadań kolejki i wszystkie zdarzenia
+    zostały wysłane (done przy gotowym raporcie, inaczej error z przyczyną).
+    """
+    report_path = os.path.join(report_service.reports_dir, f'report_{job_id}.html')
+    try:
+        after = int(request.headers.get('Last-Event-ID') or request.args.get('after', 0))
+    except ValueError:
+        after = 0
+    
+    def sse(event: str, data: dict, event_id: int = None) -> str:
+        head = f"id: {event_id}\n" if event_id else ""
+        return f"{head}event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    
+    def generate():
+        cursor = after
+        # Wznowienie: treść narastająca od początku, żeby wysłać pełny stan akapitów
+        narrative = "".join(event['data']['delta'] for event in report_stream.read(job_id)
+                            if event['event'] == EVENT_NARRATIVE and event['id'] <= cursor)
+        deadline = time.monotonic() + REPORT_STREAM_TIMEOUT
+        last_sent = time.monotonic()
+        interval = STREAM_POLL_MIN_SECONDS
+        yield "retry: 3000\n\n"
+        
+        while time.monotonic() < deadline:
+            events = report_stream.read(job_id, cursor)
+            narrative_changed = False
+            for event in events:
+                cursor = event['id']
+                if event['event'] == EVENT_NARRATIVE:
+                    narrative += event['data']['delta']
+                    narrative_changed = True
+                    continue
+                if event['event'] == EVENT_STATISTICS:
+                    narrative = ""  # Nowe generowanie (np. ponowna próba zadania)
+                if narrative_changed:
+                    yield sse(EVENT_NARRATIVE, {"html": report_service.render_narrative_html(narrative)}, cursor)
+                    narrative_changed = False
+                yield sse(event['event'], event['data'], event['id'])
+                if event['event'] in FINAL_EVENTS:
+                    return
+            if narrative_changed:
+                yield sse(EVENT_NARRATIVE, {"html": report_service.render_narrative_html(narrative)}, cursor)
+            
+            if events:
+                last_sent = time.monotonic()
+                interval = STREAM_POLL_MIN_SECONDS
+            elif not job_queue.has_active_tasks(job_id):
+                # Nic już nie wygeneruje zdarzeń - jeszcze jeden odczyt (zdarzenia zapisane tuż przed
+                # zakończeniem zadania kolejki), potem zamknięcie strumienia zamiast czekania do limitu
+                if report_stream.read(job_id, cursor):
+                    continue
+                if os.path.exists(report_path):
+                    # Raport gotowy bez zdarzeń (np. wynik z cache etapu)
+                    yield sse(EVENT_DONE, {"report_url": url_for('scraping.view_report', job_id=job_id)})
+                else:
+                    yield sse(EVENT_ERROR, {"message": report_stopped_reason(job_id)})
+                return
+            else:
+                if time.monotonic() - last_sent >= 15:
+                    yield ": keep-alive\n\n"  # Komentarz SSE - połączenie nie jest zamykane przez proxy
+                    last_sent = time.monotonic()
+                interval = min(interval * 1.5, STREAM_POLL_MAX_SECONDS)
+            time.sleep(interval)
+    
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: bez buforowania strumienia
+    return response
+
+def report_stopped_reason(job_id: str) -> str:
+    """Przyczyna braku raportu, gdy żadne zadanie kolejki go już nie generuje"""
+    report_tasks = [task for task in job_queue.get_tasks_for_job(job_id) if task['task_type'] == TASK_REPORT]
+    if report_tasks and report_tasks[-1]['status'] == 'failed' and report_tasks[-1]['last_error']:
+        return report_tasks[-1]['last_error'].splitlines()[0]
+    job = load_job_from_anywhere(job_id)
+    if job and job.status == "failed":
+        return job.error_message or "Zadanie zakończone błędem"
+    return "Raport nie jest generowany - uruchom generowanie ponownie"
 
 @scraping_bp.route('/report/<job_id>/download')
 def download_report(job_id: str):
-    """Pobiera raport w formacie DOCX"""
+    """
+    Pobiera raport w formacie DOCX lub samowystarczalnego HTML (wykresy wbudowane).
+    Pliki są trzymane do ponownego wygenerowania raportu i wysyłane z ETag (304 przy powtórnym pobraniu);
+    brakujący DOCX powstaje w workerze kolejki raportów, a strona oczekiwania pobiera go, gdy będzie gotowy.
+    """
     format_type = request.args.get('format', 'docx').lower()
     
-    if format_type != 'docx':
-        return jsonify({"error": "Nieprawidłowy format. Użyj: docx"}), 400
+    if format_type not in ('docx', 'html'):
+        return jsonify({"error": "Nieprawidłowy format. Użyj: docx lub html"}), 400
     
     # Sprawdź czy raport HTML istnieje
     html_path = os.path.join(report_service.reports_dir, f'report_{job_id}.html')
@@ -693,28 +551,271 @@ def download_report(job_id: str):
         return jsonify({"error": "Raport nie został jeszcze wygenerowany"}), 404
     
     try:
-        if format_type == 'docx':
-            # Wczytaj markdown
-            markdown_path = os.path.join(report_service.reports_dir, f'report_{job_id}.md')
-            if not os.path.exists(markdown_path):
+        if format_type == 'html':
+            standalone_path = report_service.export_to_html(job_id)
+            if not standalone_path:
                 return jsonify({"error": "Plik markdown nie znaleziony"}), 404
+            response = send_file(standalone_path, as_attachment=True, download_name=f'report_{job_id}.html',
+                                 mimetype='text/html', conditional=True, etag=True, max_age=0)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        
+        if format_type == 'docx':
+            docx_path = report_service.get_cached_docx(job_id)
+            if not docx_path:
+                if not DOCX_AVAILABLE:
+                    raise ImportError("python-docx")
+                # Eksport w tle - wątek żądania nie buduje dokumentu
+                job_queue.enqueue(QUEUE_REPORT, TASK_EXPORT_DOCX, job_id, priority=PRIORITY_HIGH, max_attempts=2)
+                return render_template('scraping/docx_pending.html', job_id=job_id), 202
             
-            with open(markdown_path, 'r', encoding='utf-8') as f:
-                markdown_content = f.read()
-            
-            # Pobierz ścieżki wykresów
-            chart_paths = {
-                'bar': os.path.join(report_service.visualization_service.charts_dir, f'bar_chart_{job_id}.png'),
-                'sentiment_pie': os.path.join(report_service.visualization_service.charts_dir, f'sentiment_pie_{job_id}.png'),
-                'categories_pie': os.path.join(report_service.visualization_service.charts_dir, f'categories_pie_{job_id}.png')
-            }
-            
-            docx_path = report_service.export_to_docx(markdown_content, chart_paths, job_id)
-            return send_file(docx_path, as_attachment=True,
-                           download_name=f'report_{job_id}.docx',
-                           mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+            response = send_file(docx_path, as_attachment=True,
+                                 download_name=f'report_{job_id}.docx',
+                                 mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+                                 conditional=True, etag=True, max_age=0)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
     
     except ImportError as e:
         return jsonify({"error": f"Biblioteka nie zainstalowana: {str(e)}"}), 500
     except Exception as e:
         return jsonify({"error": f"Błąd eksportu: {str(e)}"}), 500
+
+def _page_args() -> dict:
+    """Parametry stronicowania z query string (after/before = position, limit 1-200)"""
+    def optional_int(name):
+        value = request.args.get(name, '')
+        return int(value) if value.lstrip('-').isdigit() else None
+    
+    limit = optional_int('limit') or 50
+    return {
+        "after": optional_int('after'),
+        "before": optional_int('before'),
+        "limit": max(1, min(limit, 200)),
+        "source_type": request.args.get('source_type') or None
+    }
+
+def _results_page_response(job_id: str, page_args: dict, filters: dict, include_classification: bool):
+    """Strona wyników + liczba wszystkich pasujących (tylko dla pierwszej strony)"""
+    page = storage_service.db.get_results_page(
+        job_id, include_classification=include_classification, **page_args, **filters
+    )
+    if page_args['after'] is None and page_args['before'] is None:
+        page["total"] = storage_service.db.count_results(
+            job_id, source_type=page_args['source_type'], **filters
+        )
+    return jsonify(page)
+
+@scraping_bp.route('/api/report-docx/<job_id>')
+def report_docx_status_api(job_id: str):
+    """API: Stan eksportu DOCX raportu (strona oczekiwania odpytuje do ready=true lub błędu)"""
+    if report_service.get_cached_docx(job_id):
+        return jsonify({"ready": True, "download_url": url_for('scraping.download_report', job_id=job_id, format='docx')})
+    
+    exports = [task for task in job_queue.get_tasks_for_job(job_id) if task['task_type'] == TASK_EXPORT_DOCX]
+    last = exports[-1] if exports else None
+    return jsonify({
+        "ready": False,
+        "status": last['status'] if last else None,
+        "error": last['last_error'] if last and last['status'] == 'failed' else None
+    })
+
+@scraping_bp.route('/api/results/<job_id>')
+def results_page_api(job_id: str):
+    """API: Strona wyników scrapingu (?after=&before=&limit=&source_type=)"""
+    if not storage_service.db.get_job_updated_at(job_id):
+        return jsonify({"error": "Job not found"}), 404
+    
+    return _results_page_response(job_id, _page_args(), {}, include_classification=False)
+
+@scraping_bp.route('/api/classifications/<job_id>')
+def classifications_page_api(job_id: str):
+    """API: Strona komentarzy z klasyfikacją (?after=&before=&limit=&source_type=&sentiment=&category=&status=)"""
+    if not storage_service.db.get_job_updated_at(job_id):
+        return jsonify({"error": "Job not found"}), 404
+    
+    status = request.args.get('status', '')
+    filters = {
+        "sentiment": request.args.get('sentiment') or None,
+        "category": request.args.get('category') or None,
+        "classified": {"classified": True, "pending": False}.get(status)
+    }
+    return _results_page_response(job_id, _page_args(), filters, include_classification=True)
+
+@scraping_bp.route('/api/search')
+def search_api():
+    """API: Wyszukiwanie pełnotekstowe postów (?q=&job_id=&brand=&date_from=&date_to=&category=&sentiment=&limit=&offset=)"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({"error": "Brak parametru q"}), 400
+    
+    limit = request.args.get('limit', '20')
+    offset = request.args.get('offset', '0')
+    limit = max(1, min(int(limit), 100)) if limit.isdigit() else 20
+    offset = int(offset) if offset.isdigit() else 0
+    
+    result = storage_service.db.search_posts(
+        query,
+        job_id=request.args.get('job_id') or None,
+        brand=request.args.get('brand') or None,
+        date_from=request.args.get('date_from') or None,
+        date_to=request.args.get('date_to') or None,
+        category=request.args.get('category') or None,
+        sentiment=request.args.get('sentiment') or None,
+        limit=limit,
+        offset=offset
+    )
+    result.update({"query": query, "limit": limit, "offset": offset})
+    return jsonify(result)
+
+@scraping_bp.route('/api/brands')
+def brands_api():
+    """API: Marki z dziennymi rollupami (liczba zadań, zakres dat, liczba postów)"""
+    return jsonify(brand_analytics.list_brands())
+
+@scraping_bp.route('/api/brands/<brand>/trends')
+def brand_trends_api(brand: str):
+    """API: Wolumen i sentyment marki w czasie (?granularity=day|week&date_from=&date_to=)"""
+    try:
+        trends = brand_analytics.get_trends(
+            brand,
+            granularity=request.args.get('granularity', 'day'),
+            date_from=request.args.get('date_from') or None,
+            date_to=request.args.get('date_to') or None
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    return jsonify({"brand": brand, "trends": trends})
+
+@scraping_bp.route('/api/brands/<brand>/aspects')
+def brand_aspects_api(brand: str):
+    """API: Aspekty marki w czasie (?granularity=day|week&date_from=&date_to=&top=10)"""
+    top = request.args.get('top', '10')
+    try:
+        aspects = brand_analytics.get_aspect_trends(
+            brand,
+            granularity=request.args.get('granularity', 'day'),
+            date_from=request.args.get('date_from') or None,
+            date_to=request.args.get('date_to') or None,
+            top=max(1, min(int(top), 50)) if top.isdigit() else 10
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    aspects["brand"] = brand
+    return jsonify(aspects)
+
+@scraping_bp.route('/api/brands/<brand>/sources')
+def brand_sources_api(brand: str):
+    """API: Rejestr URL-i marki ze statystykami uzysku (kolejność jak przy wyborze do scrapingu)"""
+    return jsonify({"brand": brand, "sources": brand_sources.list_sources(brand)})
+
+@scraping_bp.route('/api/raw-item/<job_id>')
+def raw_item_api(job_id: str):
+    """API: Surowy element Apify dla posta (?url=...) - wczytywany tylko na żądanie"""
+    url = request.args.get('url', '')
+    if not url:
+        return jsonify({"error": "Brak parametru url"}), 400
+    
+    items = storage_service.db.get_raw_items(job_id, url=url)
+    if url not in items:
+        return jsonify({"error": "Brak surowych danych dla tego posta"}), 404
+    
+    return jsonify(items[url])
+
+@scraping_bp.route('/api/queue/stats')
+def queue_stats_api():
+    """API: Liczba zadań w kolejkach (per kolejka i status)"""
+    return jsonify(job_queue.get_stats())
+
+@scraping_bp.route('/api/queue/job/<job_id>')
+def queue_job_tasks_api(job_id: str):
+    """API: Zadania kolejki powiązane z zadaniem"""
+    tasks = job_queue.get_tasks_for_job(job_id)
+    return jsonify([
+        {
+            "id": task['id'],
+            "queue": task['queue'],
+            "task_type": task['task_type'],
+            "status": task['status'],
+            "priority": task['priority'],
+            "attempts": task['attempts'],
+            "last_error": (task['last_error'] or '').split('\n')[0] or None,
+            "created_at": task['created_at'],
+            "finished_at": task['finished_at']
+        }
+        for task in tasks
+    ])
+
+@scraping_bp.route('/api/workflow/<job_id>')
+def workflow_status_api(job_id: str):
+    """API: Etapy workflow zadania (status, czasy trwania, wyniki)"""
+    stages = workflow_orchestrator.get_stages(job_id)
+    return jsonify({
+        "job_id": job_id,
+        "stages": [
+            {
+                "stage": stage['stage'],
+                "status": stage['status'],
+                "started_at": stage['started_at'],
+                "finished_at": stage['finished_at'],
+                "duration_seconds": stage['duration_seconds'],
+                "output": stage['output'],
+                "error": stage['error']
+            }
+            for stage in stages
+        ],
+        "total_seconds": round(sum(stage['duration_seconds'] or 0 for stage in stages), 3)
+    })
+
+@scraping_bp.route('/api/metrics/<job_id>')
+def job_metrics_api(job_id: str):
+    """API: Metryki zadania - spany etapów i kroków, wywołania Gemini/Apify, liczniki i histogramy"""
+    if not job_storage.get(job_id):
+        return jsonify({"error": "Zadanie nie znalezione"}), 404
+    return jsonify(metrics.get_job_metrics(job_id))
+
+@scraping_bp.route('/metrics')
+def prometheus_metrics():
+    """Metryki w formacie tekstowym Prometheus (sumy ze wszystkich zadań)"""
+    return Response(metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
+@scraping_bp.route('/logs')
+def logs_page():
+    """Strona logów (śledzenie na bieżąco, filtr zadania i poziomu)"""
+    return render_template('scraping/logs.html', job_id=request.args.get('job_id', ''),
+                           level=request.args.get('level', ''))
+
+@scraping_bp.route('/api/logs')
+def logs_api():
+    """API: Logi nowsze niż kursor ?after=<seq> (opcjonalnie ?job_id=, ?level=, ?limit=)"""
+    try:
+        after = int(request.args.get('after', 0))
+        limit = min(max(int(request.args.get('limit', 200)), 1), 1000)
+    except ValueError:
+        return jsonify({"error": "Nieprawidłowy kursor lub limit"}), 400
+    return jsonify(logger.read(
+        after=after,
+        job_id=request.args.get('job_id') or None,
+        level=(request.args.get('level') or '').upper() or None,
+        limit=limit
+    ))
+
+@scraping_bp.route('/api/workflow/<job_id>/run', methods=['POST'])
+def workflow_run_api(job_id: str):
+    """API: Uruchamia pełny workflow (etapy z niezmienionym wejściem są pomijane)"""
+    job = load_job_from_anywhere(job_id)
+    
+    if not job:
+        return jsonify({"error": "Zadanie nie znalezione"}), 404
+    
+    data = request.get_json(silent=True) or {}
+    force = str(data.get('force', request.args.get('force', 'false'))).lower() in ('1', 'true', 'yes')
+    
+    # Etapy przechodzą kolejno przez kolejki scraping -> classification -> report
+    task_id = job_queue.enqueue(QUEUE_SCRAPING, TASK_SCRAPE_AND_KEY, job_id,
+                                payload={"workflow": True, "force": force},
+                                priority=PRIORITY_NORMAL, max_attempts=1)
+    
+    return jsonify({"success": True, "task_id": task_id, "message": "Workflow uruchomiony"})
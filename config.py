@@ -16,9 +16,69 @@ DEBUG = os.getenv("DEBUG", "False").lower() == "true"
 MAX_RESULTS = int(os.getenv("MAX_RESULTS", "20"))
 MAX_ACTOR_RESULTS = int(os.getenv("MAX_ACTOR_RESULTS", "100"))
 SCRAPING_TIMEOUT = int(os.getenv("SCRAPING_TIMEOUT", "300"))
+CLASSIFICATION_MAX_ATTEMPTS = int(os.getenv("CLASSIFICATION_MAX_ATTEMPTS", "3"))
 
-# Validate required variables
-if not APIFY_API_TOKEN:
-    raise ValueError("APIFY_API_TOKEN nie jest ustawiony w zmiennych środowiskowych")
-if not GEMINI_API_KEY:
-    raise ValueError("GEMINI_API_KEY nie jest ustawiony w zmiennych środowiskowych")
+# Klasyfikacja strumieniowa (klucz z próbki postów, klasyfikacja w trakcie scrapingu)
+STREAMING_CLASSIFICATION = os.getenv("STREAMING_CLASSIFICATION", "False").lower() == "true"
+STREAMING_KEY_SAMPLE_SIZE = int(os.getenv("STREAMING_KEY_SAMPLE_SIZE", "8"))
+STREAMING_REFINE_KEY = os.getenv("STREAMING_REFINE_KEY", "True").lower() == "true"  # Klucz z pełnych danych na końcu
+
+# Magazyn surowych danych Apify: "auto" (zstd jeśli zainstalowany, inaczej zlib), "zstd" lub "zlib"
+PAYLOAD_CODEC = os.getenv("PAYLOAD_CODEC", "auto").lower()
+
+# Rejestr źródeł marki: URL bez zaakceptowanych postów po tylu uruchomieniach aktora jest pomijany
+SOURCE_DEAD_AFTER_RUNS = int(os.getenv("SOURCE_DEAD_AFTER_RUNS", "3"))
+
+# Cache wyników aktorów Apify na dysku (powtórne analizy bez zużycia jednostek Apify)
+APIFY_CACHE_ENABLED = os.getenv("APIFY_CACHE_ENABLED", "True").lower() == "true"
+APIFY_CACHE_DIR = os.getenv("APIFY_CACHE_DIR", "")  # Domyślnie data/apify_cache
+APIFY_CACHE_TTL_HOURS = float(os.getenv("APIFY_CACHE_TTL_HOURS", "6"))  # Okno dat obejmujące dziś / wyszukiwanie
+APIFY_CACHE_CLOSED_TTL_HOURS = float(os.getenv("APIFY_CACHE_CLOSED_TTL_HOURS", "168"))  # Okno zakończone w przeszłości
+
+# Metryki zadań (czasy etapów, wywołania Gemini/Apify) - tabele job_metrics/job_spans, /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True").lower() == "true"
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", "5"))  # Co ile zapisywać agregaty do bazy
+
+# Logi aplikacji - bufor cykliczny w pamięci (+ opcjonalny zapis w tle: file=JSONL, sqlite=tabela app_logs)
+LOG_BUFFER_SIZE = int(os.getenv("LOG_BUFFER_SIZE", "2000"))
+LOG_JOB_BUFFER_SIZE = int(os.getenv("LOG_JOB_BUFFER_SIZE", "500"))  # Ostatnie wpisy per zadanie
+LOG_SINK = os.getenv("LOG_SINK", "").lower()  # "", "file" lub "sqlite"
+LOG_SINK_PATH = os.getenv("LOG_SINK_PATH", "")  # Domyślnie data/logs/socialpure.jsonl
+
+# Wykresy raportów - procesy renderujące matplotlib (0 = rysowanie w bieżącym procesie) i format
+CHART_RENDER_WORKERS = int(os.getenv("CHART_RENDER_WORKERS", "3"))
+CHART_FORMAT = os.getenv("CHART_FORMAT", "png").lower()  # png, svg lub client (Chart.js w przeglądarce)
+CHART_ASSET_MAX_AGE = int(os.getenv("CHART_ASSET_MAX_AGE", str(365 * 24 * 3600)))  # Cache przeglądarki dla /static/charts
+
+# Strumieniowanie raportu (SSE) - statystyki i wykresy od razu, treść Gemini fragmentami
+REPORT_STREAMING = os.getenv("REPORT_STREAMING", "True").lower() == "true"
+REPORT_STREAM_TIMEOUT = int(os.getenv("REPORT_STREAM_TIMEOUT", "900"))  # Maksymalny czas jednego połączenia (s)
+
+# Kolejka zadań i workery
+EMBEDDED_WORKERS = os.getenv("EMBEDDED_WORKERS", "True").lower() == "true"  # Workery w procesie Flask
+WORKERS_SCRAPING = int(os.getenv("WORKERS_SCRAPING", "1"))
+WORKERS_CLASSIFICATION = int(os.getenv("WORKERS_CLASSIFICATION", "2"))
+WORKERS_REPORT = int(os.getenv("WORKERS_REPORT", "1"))
+# Tryb wieloprocesowy (scripts/run_worker.py --processes) - liczba procesów per etap
+PROCESSES_SCRAPING = int(os.getenv("PROCESSES_SCRAPING", "1"))
+PROCESSES_CLASSIFICATION = int(os.getenv("PROCESSES_CLASSIFICATION", "2"))
+PROCESSES_REPORT = int(os.getenv("PROCESSES_REPORT", "1"))
+QUEUE_LEASE_SECONDS = int(os.getenv("QUEUE_LEASE_SECONDS", "120"))
+QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", "2"))
+
+# Baza SQLite (pusta wartość = data/socialpure.db)
+DATABASE_PATH = os.getenv("DATABASE_PATH", "")
+
+# Backendy zewnętrznych API: "live" (prawdziwe Apify/Gemini) lub "fake" (atrapy offline, benchmarks/)
+APIFY_BACKEND = os.getenv("APIFY_BACKEND", "live").lower()
+GEMINI_BACKEND = os.getenv("GEMINI_BACKEND", "live").lower()
+# Parametry atrap (services/fake_backends.py)
+FAKE_LATENCY_MS = float(os.getenv("FAKE_LATENCY_MS", "0"))  # Średnie opóźnienie wywołania
+FAKE_ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))  # Odsetek wywołań kończących się błędem (0-1)
+FAKE_PAYLOAD_SIZE = int(os.getenv("FAKE_PAYLOAD_SIZE", "2000"))  # Przybliżony rozmiar elementu Apify (bajty)
+FAKE_POSTS_PER_URL = int(os.getenv("FAKE_POSTS_PER_URL", "500"))
+FAKE_SEED = int(os.getenv("FAKE_SEED", "42"))
+FAKE_ANCHOR_DATE = os.getenv("FAKE_ANCHOR_DATE", "")  # Data najnowszego posta (pusta = dziś)
+
+# Klucze API są sprawdzane przy pierwszym użyciu klienta (ApifyService.client, create_model) -
+# import config nie wymaga kluczy, więc skrypty i workery bez wywołań API startują bez nich
@@ -0,0 +1,57 @@
+from dataclasses import dataclass, field
+from typing import List, Dict
+
+SENTIMENTS = ['pozytywny', 'neutralny', 'negatywny']
+
+@dataclass
+class ClassificationStats:
+    """Model danych: zagregowane wyniki klasyfikacji zadania (wejście wykresów i raportu)"""
+    total: int = 0
+    sentiment_counts: Dict[str, int] = field(default_factory=lambda: {s: 0 for s in SENTIMENTS})
+    category_counts: Dict[str, int] = field(default_factory=dict)  # W kolejności pierwszego wystąpienia
+    category_sentiment: Dict[str, Dict[str, int]] = field(default_factory=dict)  # kategoria -> sentyment -> liczba
+    examples: Dict[str, List[str]] = field(default_factory=dict)  # kategoria -> przykładowe komentarze
+    
+    @classmethod
+    def from_matrix(cls, rows: List[tuple], examples: Dict[str, List[str]] = None):
+        """Tworzenie z wierszy (kategoria, sentyment, liczba) w kolejności kategorii"""
+        stats = cls(examples=examples or {})
+        for category, sentiment, count in rows:
+            if sentiment not in SENTIMENTS:
+                sentiment = 'neutralny'
+            row = stats.category_sentiment.setdefault(category, {s: 0 for s in SENTIMENTS})
+            row[sentiment] += count
+            stats.category_counts[category] = stats.category_counts.get(category, 0) + count
+            stats.sentiment_counts[sentiment] += count
+            stats.total += count
+        return stats
+    
+    @classmethod
+    def from_results(cls, classification_results: list, examples_per_category: int = 3):
+        """Tworzenie z listy ClassificationResult (np. zadania spoza bazy)"""
+        counts: Dict[tuple, int] = {}
+        examples: Dict[str, List[str]] = {}
+        for result in classification_results:
+            key = (result.category, result.sentiment)
+            counts[key] = counts.get(key, 0) + 1
+            category_examples = examples.setdefault(result.category, [])
+            if len(category_examples) < examples_per_category:
+                category_examples.append(result.comment_text[:200])
+        return cls.from_matrix([(cat, sent, count) for (cat, sent), count in counts.items()], examples)
+    
+    @classmethod
+    def coerce(cls, value):
+        """ClassificationStats bez zmian, lista ClassificationResult -> agregaty"""
+        if isinstance(value, cls):
+            return value
+        return cls.from_results(value)
+    
+    def to_dict(self):
+        """Konwersja do słownika (m.in. hash wejścia etapów workflow)"""
+        return {
+            "total": self.total,
+            "sentiment_counts": self.sentiment_counts,
+            "category_counts": self.category_counts,
+            "category_sentiment": self.category_sentiment,
+            "examples": self.examples
+        }
@@ -0,0 +1,26 @@
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+
+@dataclass
+class LogEntry:
+    """Model danych: wpis logu (numer kolejny w procesie = kursor odczytu)"""
+    seq: int
+    timestamp: datetime
+    level: str
+    message: str
+    job_id: Optional[str] = None
+    
+    def format(self) -> str:
+        """Tekst w dotychczasowym formacie: [czas] [POZIOM] treść"""
+        return f"[{self.timestamp.strftime('%Y-%m-%d %H:%M:%S')}] [{self.level}] {self.message}"
+    
+    def to_dict(self):
+        """Konwersja do słownika"""
+        return {
+            "seq": self.seq,
+            "timestamp": self.timestamp.isoformat(),
+            "level": self.level,
+            "message": self.message,
+            "job_id": self.job_id
+        }
@@ -18,6 +18,8 @@ class ScrapingJob:
     category_key: Optional[CategoryKey] = None
     classification_results: Dict[int, dict] = field(default_factory=dict)  # {index: {category, sentiment}}
     error_message: Optional[str] = None
+    mode: str = "full"  # "full"/"incremental" (tylko posty nowsze niż poprzednie zadanie marki)
+    base_job_id: Optional[str] = None  # Zadanie marki, którego URL-e, posty i klasyfikacje są użyte ponownie
     created_at: datetime = field(default_factory=datetime.now)
     updated_at: datetime = field(default_factory=datetime.now)
     
@@ -36,6 +38,8 @@ class ScrapingJob:
             "classification_results": self.classification_results,
             "classification_count": len(self.classification_results),
             "error_message": self.error_message,
+            "mode": self.mode,
+            "base_job_id": self.base_job_id,
             "created_at": self.created_at.isoformat(),
             "updated_at": self.updated_at.isoformat()
         }
@@ -44,6 +48,10 @@ class ScrapingJob:
         """Sprawdza czy klasyfikacja została wykonana"""
         return len(self.classification_results) > 0
     
+    def is_incremental(self) -> bool:
+        """Sprawdza czy zadanie jest przyrostowe (z zadaniem bazowym)"""
+        return self.mode == "incremental" and bool(self.base_job_id)
+    
     def update_progress(self, step: str, progress: float):
         """Aktualizacja postępu"""
         self.current_step = step
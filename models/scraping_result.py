@@ -2,6 +2,18 @@ from dataclasses import dataclass
 from datetime import datetime
 from typing import Optional
 
+def _first_int(item: dict, *keys) -> Optional[int]:
+    """Pierwsza wartość liczbowa spośród podanych kluczy (Apify zmienia nazwy pól)"""
+    for key in keys:
+        value = item.get(key)
+        if isinstance(value, bool):
+            continue
+        if isinstance(value, (int, float)):
+            return int(value)
+        if isinstance(value, str) and value.strip().isdigit():
+            return int(value.strip())
+    return None
+
 @dataclass
 class ScrapingResult:
     """Model danych: wynik scrapingu z Facebook"""
@@ -11,11 +23,23 @@ class ScrapingResult:
     date: Optional[datetime] = None
     source_type: str = "post"  # "post"/"comment"/"group"/"event"
     platform: str = "facebook"
-    metadata: dict = None
+    metadata: dict = None  # Surowy element Apify - z bazy wczytywany tylko na żądanie
+    likes: Optional[int] = None
+    comments_count: Optional[int] = None
+    shares: Optional[int] = None
     
     def __post_init__(self):
         if self.metadata is None:
             self.metadata = {}
+        
+        # Najczęściej używane pola z surowych danych -> typowane kolumny
+        if self.metadata:
+            if self.likes is None:
+                self.likes = _first_int(self.metadata, "likes", "reactionsCount", "reactions")
+            if self.comments_count is None:
+                self.comments_count = _first_int(self.metadata, "comments", "commentsCount")
+            if self.shares is None:
+                self.shares = _first_int(self.metadata, "shares", "sharesCount")
     
     def to_dict(self):
         """Konwersja do słownika"""
@@ -26,6 +50,9 @@ class ScrapingResult:
             "date": self.date.isoformat() if self.date else None,
             "source_type": self.source_type,
             "platform": self.platform,
+            "likes": self.likes,
+            "comments_count": self.comments_count,
+            "shares": self.shares,
             "metadata": self.metadata
         }
     
@@ -0,0 +1,45 @@
+"""
+Zarządzanie lokalnym cache wyników Apify
+Uruchom: python scripts/apify_cache.py [--purge-expired | --clear]
+
+Bez argumentów wypisuje liczbę wpisów i rozmiar cache. --purge-expired usuwa wygasłe
+wpisy (wygasłe są też pomijane i usuwane przy odczycie), --clear usuwa wszystkie.
+"""
+import sys
+import os
+import argparse
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.apify_cache import ApifyCacheService
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def print_stats(stats: dict):
+    print(f"Cache Apify ({'włączony' if stats['enabled'] else 'wyłączony'}): {stats['dir']}")
+    print(f"  Wpisy: {stats['entries']}, rozmiar: {format_size(stats['bytes'])}")
+
+def manage_cache():
+    """Statystyki / czyszczenie cache"""
+    parser = argparse.ArgumentParser(description="Zarządzanie cache wyników Apify")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--purge-expired", action="store_true", help="Usuń wygasłe wpisy")
+    group.add_argument("--clear", action="store_true", help="Usuń wszystkie wpisy")
+    args = parser.parse_args()
+    
+    cache = ApifyCacheService()
+    if args.purge_expired:
+        print(f"Usunięto wygasłych wpisów: {cache.purge_expired()}")
+    elif args.clear:
+        print(f"Usunięto wpisów: {cache.clear()}")
+    
+    print_stats(cache.get_stats())
+
+if __name__ == "__main__":
+    manage_cache()
@@ -0,0 +1,54 @@
+"""
+Kompaktowanie magazynu surowych danych Apify (raw_payloads)
+Uruchom: python scripts/compact_payload_store.py [--no-retrain]
+
+Trenuje słownik kompresji na zapisanych elementach, przepisuje payloady aktywnym
+kodekiem (PAYLOAD_CODEC) i słownikiem, usuwa osierocone payloady i wykonuje VACUUM.
+Przy pierwszym uruchomieniu aplikacji stara tabela scraping_raw_items (zlib w wierszu)
+jest migrowana automatycznie - ten skrypt dodatkowo poprawia współczynnik kompresji.
+"""
+import sys
+import os
+import argparse
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database_service import DatabaseService
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KB", "MB"):
+        if size < 1024:
+            return f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GB"
+
+def print_stats(label: str, stats: dict, db_size: int):
+    print(f"{label}:")
+    print(f"  Payloady: {stats['payloads']} (odwołania: {stats['references']}, kodek: {stats['codec']})")
+    print(f"  Rozmiar surowy: {format_size(stats['raw_bytes'])}, zapisany: {format_size(stats['stored_bytes'])}"
+          f" (x{stats['ratio'] or '-'})")
+    print(f"  Plik bazy: {format_size(db_size)}")
+
+def compact_payload_store():
+    """Kompaktuje magazyn i wypisuje rozmiary przed/po"""
+    parser = argparse.ArgumentParser(description="Kompaktowanie magazynu surowych danych Apify")
+    parser.add_argument("--no-retrain", action="store_true", help="Nie trenuj nowego słownika kompresji")
+    args = parser.parse_args()
+    
+    db = DatabaseService()
+    print_stats("Przed", db.get_payload_store_stats(), os.path.getsize(db.db_path))
+    print("-" * 50)
+    
+    result = db.compact_payload_store(retrain=not args.no_retrain)
+    if result['dictionary_id'] is not None:
+        print(f"Nowy słownik kompresji: #{result['dictionary_id']}")
+    elif not args.no_retrain:
+        print("Za mało danych do wytrenowania słownika")
+    print(f"Przepisane payloady: {result['recompressed']}, usunięte osierocone: {result['purged']}")
+    print("-" * 50)
+    
+    print_stats("Po", db.get_payload_store_stats(), os.path.getsize(db.db_path))
+
+if __name__ == "__main__":
+    compact_payload_store()
@@ -0,0 +1,100 @@
+"""
+Samodzielny worker kolejki zadań (bez serwera Flask)
+Uruchom: python scripts/run_worker.py [--scraping N] [--classification N] [--report N]
+         python scripts/run_worker.py --processes [--threads N]  (osobny proces per worker)
+
+Workery koordynują się przez tabelę task_queue w SQLite, więc można uruchomić
+kilka procesów na jednym hoście (np. osobno dla klasyfikacji). Aby zadania nie były
+wykonywane w procesie Flask, ustaw EMBEDDED_WORKERS=False.
+
+W trybie --processes liczby N oznaczają liczbę procesów na etap (domyślnie PROCESSES_*
+z config), a każdy proces uruchamia --threads wątków dla swojej kolejki.
+"""
+import sys
+import os
+import time
+import argparse
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import (
+    WORKERS_SCRAPING, WORKERS_CLASSIFICATION, WORKERS_REPORT,
+    PROCESSES_SCRAPING, PROCESSES_CLASSIFICATION, PROCESSES_REPORT
+)
+from services.job_queue import JobQueueService, QUEUE_SCRAPING, QUEUE_CLASSIFICATION, QUEUE_REPORT
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Worker kolejki zadań SocialPure")
+    parser.add_argument("--scraping", type=int, default=None,
+                        help="Liczba workerów (lub procesów) scrapingu")
+    parser.add_argument("--classification", type=int, default=None,
+                        help="Liczba workerów (lub procesów) klasyfikacji")
+    parser.add_argument("--report", type=int, default=None,
+                        help="Liczba workerów (lub procesów) raportów")
+    parser.add_argument("--processes", action="store_true",
+                        help="Uruchom każdy worker w osobnym procesie")
+    parser.add_argument("--threads", type=int, default=1,
+                        help="Liczba wątków w każdym procesie (tylko z --processes)")
+    return parser.parse_args()
+
+def get_pool_sizes(args) -> dict:
+    """Liczby workerów per kolejka (argumenty CLI albo wartości domyślne z config)"""
+    if args.processes:
+        defaults = (PROCESSES_SCRAPING, PROCESSES_CLASSIFICATION, PROCESSES_REPORT)
+    else:
+        defaults = (WORKERS_SCRAPING, WORKERS_CLASSIFICATION, WORKERS_REPORT)
+    
+    pool_sizes = {
+        QUEUE_SCRAPING: args.scraping if args.scraping is not None else defaults[0],
+        QUEUE_CLASSIFICATION: args.classification if args.classification is not None else defaults[1],
+        QUEUE_REPORT: args.report if args.report is not None else defaults[2]
+    }
+    return {queue: size for queue, size in pool_sizes.items() if size > 0}
+
+def print_stats(job_queue: JobQueueService):
+    stats = job_queue.get_stats()
+    print(" | ".join(
+        f"{queue}: {counts.get('queued', 0)} w kolejce, {counts.get('running', 0)} w toku"
+        for queue, counts in stats.items()
+    ))
+
+def run_worker():
+    """Uruchamia pule workerów (wątki lub procesy) i czeka na Ctrl+C"""
+    args = parse_args()
+    pool_sizes = get_pool_sizes(args)
+    
+    if not pool_sizes:
+        print("Brak workerów do uruchomienia.")
+        return
+    
+    if args.processes:
+        from services.worker_supervisor import WorkerSupervisor
+        pool = WorkerSupervisor(pool_sizes, threads_per_process=args.threads)
+        mode = f"procesy (po {max(1, args.threads)} wątków)"
+    else:
+        from services.queue_worker import WorkerPool
+        pool = WorkerPool(pool_sizes)
+        mode = "wątki"
+    pool.start()
+    
+    print(f"Workery uruchomione [{mode}]: " + ", ".join(f"{q}={n}" for q, n in pool_sizes.items()))
+    print("Zatrzymaj: Ctrl+C (bieżące zadania zostaną dokończone)")
+    
+    job_queue = JobQueueService()
+    last_stats = time.monotonic()
+    try:
+        while True:
+            time.sleep(5)
+            if args.processes:
+                pool.restart_dead()
+            if time.monotonic() - last_stats >= 60:
+                print_stats(job_queue)
+                last_stats = time.monotonic()
+    except KeyboardInterrupt:
+        print("\nZatrzymywanie workerów...")
+        pool.stop()
+        print("Workery zatrzymane.")
+
+if __name__ == "__main__":
+    run_worker()
@@ -1,21 +1,29 @@
-from .logger import LoggerService
-from .gemini_service import GeminiService
-from .apify_service import ApifyService
-from .query_generator import QueryGeneratorService
-from .facebook_search import FacebookSearchService
-from .facebook_scraper import FacebookScraperService
-from .scraping_orchestrator import ScrapingOrchestrator
-from .job_storage import JobStorageService
-from .storage_service import StorageService
+"""
+Serwisy aplikacji - importowane leniwie (PEP 562)
 
-__all__ = [
-    'LoggerService',
-    'GeminiService',
-    'ApifyService',
-    'QueryGeneratorService',
-    'FacebookSearchService',
-    'FacebookScraperService',
-    'ScrapingOrchestrator',
-    'JobStorageService',
-    'StorageService'
-]
+`import services.<moduł>` nie ładuje już wszystkich serwisów (i ich bibliotek: Gemini, Apify)
+naraz; `from services import GeminiService` importuje tylko potrzebny moduł.
+"""
+import importlib
+
+_EXPORTS = {
+    'LoggerService': 'logger',
+    'GeminiService': 'gemini_service',
+    'ApifyService': 'apify_service',
+    'QueryGeneratorService': 'query_generator',
+    'FacebookSearchService': 'facebook_search',
+    'FacebookScraperService': 'facebook_scraper',
+    'ScrapingOrchestrator': 'scraping_orchestrator',
+    'JobStorageService': 'job_storage',
+    'StorageService': 'storage_service'
+}
+
+__all__ = list(_EXPORTS)
+
+def __getattr__(name: str):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
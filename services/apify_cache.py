@@ -0,0 +1,142 @@
+"""
+Lokalny cache wyników aktorów Apify (na dysku, z terminem ważności)
+
+Klucz wpisu to sha256 z (backend, actor, run_input) - dla scrapera postów obejmuje URL, maxPosts
+i okno dat (onlyPostsNewerThan/onlyPostsOlderThan), dla wyszukiwania zapytanie i limit.
+Backend (APIFY_BACKEND) jest częścią klucza, więc wyniki atrap nigdy nie trafiają do uruchomień live.
+Każdy wpis to plik JSON skompresowany gzip w data/apify_cache/<2 znaki>/<klucz>.json.gz,
+zapisywany atomowo (plik tymczasowy + os.replace), więc cache może być współdzielony
+przez Flask i procesy workerów. Zapisywane są tylko udane uruchomienia aktora.
+"""
+import sys
+import os
+import json
+import gzip
+import time
+import hashlib
+from typing import Dict, List, Optional
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import APIFY_CACHE_ENABLED, APIFY_CACHE_DIR, APIFY_BACKEND
+
+class ApifyCacheService:
+    """Serwis cache wyników Apify - pliki gzip JSON z czasem wygaśnięcia"""
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        self.enabled = APIFY_CACHE_ENABLED
+        self.cache_dir = APIFY_CACHE_DIR or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'apify_cache'
+        )
+        if self.enabled:
+            os.makedirs(self.cache_dir, exist_ok=True)
+        
+        self._initialized = True
+    
+    @staticmethod
+    def make_key(actor_id: str, run_input: dict, backend: str = APIFY_BACKEND) -> str:
+        """Klucz wpisu: hash backendu, aktora i pełnego wejścia (kolejność kluczy bez znaczenia)"""
+        payload = json.dumps([backend, actor_id, run_input], ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get(self, key: str) -> Optional[List[dict]]:
+        """Elementy z cache albo None (brak wpisu, wpis wygasły lub uszkodzony)"""
+        if not self.enabled:
+            return None
+        
+        path = self._path(key)
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            self._remove(path)
+            return None
+        
+        if entry.get('expires_at', 0) < time.time():
+            self._remove(path)
+            return None
+        return entry.get('items', [])
+    
+    def put(self, key: str, items: List[dict], ttl_seconds: int, actor_id: str = "", run_input: dict = None,
+            backend: str = APIFY_BACKEND) -> None:
+        """Zapisuje wynik uruchomienia aktora (atomowo)"""
+        if not self.enabled or ttl_seconds <= 0:
+            return
+        
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        now = time.time()
+        entry = {
+            "backend": backend,
+            "actor": actor_id,
+            "run_input": run_input or {},
+            "created_at": now,
+            "expires_at": now + ttl_seconds,
+            "items": items
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, 'wt', encoding='utf-8', compresslevel=6) as f:
+            json.dump(entry, f, ensure_ascii=False, default=str)
+        os.replace(tmp_path, path)
+    
+    def purge_expired(self) -> int:
+        """Usuwa wygasłe i uszkodzone wpisy; zwraca liczbę usuniętych plików"""
+        removed = 0
+        now = time.time()
+        for path in self._entry_paths():
+            try:
+                with gzip.open(path, 'rt', encoding='utf-8') as f:
+                    expired = json.load(f).get('expires_at', 0) < now
+            except (OSError, ValueError):
+                expired = True
+            if expired:
+                self._remove(path)
+                removed += 1
+        return removed
+    
+    def clear(self) -> int:
+        """Usuwa wszystkie wpisy"""
+        paths = list(self._entry_paths())
+        for path in paths:
+            self._remove(path)
+        return len(paths)
+    
+    def get_stats(self) -> Dict:
+        """Liczba wpisów i rozmiar cache na dysku"""
+        paths = list(self._entry_paths())
+        return {
+            "enabled": self.enabled,
+            "dir": self.cache_dir,
+            "entries": len(paths),
+            "bytes": sum(os.path.getsize(path) for path in paths if os.path.exists(path))
+        }
+    
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json.gz")
+    
+    def _entry_paths(self):
+        if not os.path.isdir(self.cache_dir):
+            return
+        for root, _, files in os.walk(self.cache_dir):
+            for name in files:
+                if name.endswith('.json.gz'):
+                    yield os.path.join(root, name)
+    
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
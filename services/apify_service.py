@@ -1,11 +1,14 @@
 import time
 import sys
 import os
-from apify_client import ApifyClient
+import threading
+from datetime import date
 
 # Dodaj ścieżkę do projektu
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import APIFY_API_TOKEN, SCRAPING_TIMEOUT
+from config import APIFY_API_TOKEN, APIFY_BACKEND, SCRAPING_TIMEOUT, APIFY_CACHE_TTL_HOURS, APIFY_CACHE_CLOSED_TTL_HOURS
+from services.apify_cache import ApifyCacheService
+from services.metrics import MetricsService
 from services.logger import LoggerService
 
 class ApifyService:
@@ -22,7 +25,10 @@ class ApifyService:
         if self._initialized:
             return
         
-        self.client = ApifyClient(APIFY_API_TOKEN)
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.cache = ApifyCacheService()
+        self.metrics = MetricsService()
         self.logger = LoggerService()
         
         # Actor IDs
@@ -31,6 +37,22 @@ class ApifyService:
         
         self._initialized = True
     
+    @property
+    def client(self):
+        """Klient Apify tworzony przy pierwszym użyciu (import apify_client trwa ok. 0,5 s)"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    if APIFY_BACKEND == "fake":
+                        from services.fake_backends import FakeApifyClient
+                        self._client = FakeApifyClient()
+                    else:
+                        if not APIFY_API_TOKEN:
+                            raise ValueError("APIFY_API_TOKEN nie jest ustawiony w zmiennych środowiskowych")
+                        from apify_client import ApifyClient
+                        self._client = ApifyClient(APIFY_API_TOKEN)
+        return self._client
+    
     def run_actor(self, actor_id: str, run_input: dict, timeout: int = None) -> dict:
         """Uruchamia actora Apify"""
         timeout = timeout or SCRAPING_TIMEOUT
@@ -62,8 +84,12 @@ class ApifyService:
     
     def get_dataset_items(self, dataset_id: str) -> list:
         """Pobiera wszystkie itemy z dataset"""
+        return self._get_dataset_items(dataset_id)[0]
+    
+    def _get_dataset_items(self, dataset_id: str) -> tuple:
+        """Itemy datasetu + czy pobrano komplet (przerwane pobieranie nie trafia do cache)"""
         if not dataset_id:
-            return []
+            return [], False
         
         items = []
         try:
@@ -71,8 +97,9 @@ class ApifyService:
                 items.append(item)
         except Exception as e:
             self.logger.add_log(f"Błąd pobierania dataset {dataset_id}: {str(e)}", "ERROR")
+            return items, False
         
-        return items
+        return items, True
     
     def run_google_search(self, query: str, max_results: int = 20) -> list:
         """Wrapper dla Google Search Actor"""
@@ -81,29 +108,47 @@ class ApifyService:
             "maxResults": max_results,
         }
         
-        run_data = self.run_actor(self.GOOGLE_SEARCH_ACTOR, run_input)
-        run_id = run_data["run_id"]
-        
-        status = self.wait_for_completion(run_id)
-        if status != "SUCCEEDED":
-            return []
-        
-        dataset_id = run_data.get("defaultDatasetId")
-        return self.get_dataset_items(dataset_id)
+        return self.run_actor_cached(self.GOOGLE_SEARCH_ACTOR, run_input, APIFY_CACHE_TTL_HOURS)
     
-    def run_facebook_scraper(self, urls: list[str], max_posts: int = 20) -> list:
-        """Wrapper dla Facebook Posts Scraper"""
+    def run_facebook_scraper(self, urls: list[str], max_posts: int = 20,
+                             newer_than: str = None, older_than: str = None) -> list:
+        """Wrapper dla Facebook Posts Scraper (opcjonalnie tylko posty z zakresu dat YYYY-MM-DD)"""
         run_input = {
             "startUrls": [{"url": url} for url in urls],
             "maxPosts": max_posts,
         }
+        if newer_than:
+            run_input["onlyPostsNewerThan"] = newer_than
+        if older_than:
+            run_input["onlyPostsOlderThan"] = older_than
         
-        run_data = self.run_actor(self.FACEBOOK_POSTS_ACTOR, run_input)
-        run_id = run_data["run_id"]
-        
-        status = self.wait_for_completion(run_id)
-        if status != "SUCCEEDED":
-            return []
+        # Okno zakończone przed dziś się nie zmienia (poza licznikami reakcji) - dłuższa ważność
+        closed = bool(older_than) and older_than[:10] <= date.today().isoformat()
+        ttl_hours = APIFY_CACHE_CLOSED_TTL_HOURS if closed else APIFY_CACHE_TTL_HOURS
+        return self.run_actor_cached(self.FACEBOOK_POSTS_ACTOR, run_input, ttl_hours)
+    
+    def run_actor_cached(self, actor_id: str, run_input: dict, ttl_hours: float) -> list:
+        """Uruchamia actora i zwraca elementy datasetu - z lokalnego cache, jeśli wpis jest aktualny"""
+        cache_key = self.cache.make_key(actor_id, run_input, APIFY_BACKEND)
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            self.metrics.inc("apify_cache_requests", result="hit", actor=actor_id)
+            self.logger.add_log(f"Cache Apify: {actor_id} ({len(cached)} elementów, bez uruchamiania aktora)")
+            return cached
+        self.metrics.inc("apify_cache_requests", result="miss", actor=actor_id)
         
-        dataset_id = run_data.get("defaultDatasetId")
-        return self.get_dataset_items(dataset_id)
+        # Pełne uruchomienie (start, oczekiwanie, pobranie datasetu) jako jedno wywołanie zewnętrzne
+        with self.metrics.external_call("apify", actor_id) as call:
+            run_data = self.run_actor(actor_id, run_input)
+            run_id = run_data["run_id"]
+            
+            status = self.wait_for_completion(run_id)
+            if status != "SUCCEEDED":
+                call["status"] = str(status).lower()
+                return []
+            
+            items, complete = self._get_dataset_items(run_data.get("defaultDatasetId"))
+        self.metrics.inc("apify_items", len(items), actor=actor_id)
+        if complete:
+            self.cache.put(cache_key, items, int(ttl_hours * 3600), actor_id, run_input, APIFY_BACKEND)
+        return items
@@ -0,0 +1,257 @@
+"""
+Analityka marek ponad pojedynczymi zadaniami - dzienne agregaty (rollupy)
+
+Po zakończeniu klasyfikacji zadania jego posty są agregowane per dzień (liczba postów,
+rozkład sentymentu, liczba komentarzy per aspekt) i zapisywane w tabelach rollupów
+z kluczem marki (jobs.brand_key). Dashboardy czytają gotowe wiersze zamiast
+przeliczać wszystkie historyczne zadania.
+
+Gdy kilka zadań tej samej marki obejmuje ten sam dzień, liczy się najnowsze
+(ostatnio przeliczone) - nakładające się przebiegi nie są sumowane podwójnie.
+"""
+import sys
+import os
+from datetime import datetime
+from typing import Optional, List, Dict
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.database_service import DatabaseService
+from utils.helpers import normalize_brand_key
+
+# Agregacja okresów przy odczycie (wiersze zawsze dzienne)
+GRANULARITY_DAY = "day"
+GRANULARITY_WEEK = "week"
+_PERIOD_SQL = {
+    GRANULARITY_DAY: "{0}",
+    GRANULARITY_WEEK: "date({0}, '-' || ((CAST(strftime('%w', {0}) AS INTEGER) + 6) % 7) || ' days')",  # poniedziałek
+}
+
+class BrandAnalyticsService:
+    """Serwis dziennych rollupów marek (tabele brand_daily_rollups + brand_daily_aspects)"""
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        self.db = DatabaseService()
+        self._init_schema()
+        
+        self._initialized = True
+    
+    def _init_schema(self):
+        """Inicjalizuje tabele rollupów (przy pierwszym utworzeniu przelicza istniejące zadania)"""
+        with self.db.get_connection() as conn:
+            exists = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'brand_daily_rollups'"
+            ).fetchone()
+            
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS brand_daily_rollups (
+                    brand_key TEXT NOT NULL,
+                    day TEXT NOT NULL,  -- YYYY-MM-DD (data posta)
+                    job_id TEXT NOT NULL,
+                    posts INTEGER NOT NULL,
+                    classified INTEGER NOT NULL,
+                    pozytywny INTEGER NOT NULL,
+                    neutralny INTEGER NOT NULL,
+                    negatywny INTEGER NOT NULL,
+                    computed_at TEXT NOT NULL,
+                    PRIMARY KEY (brand_key, day, job_id)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS brand_daily_aspects (
+                    brand_key TEXT NOT NULL,
+                    day TEXT NOT NULL,
+                    job_id TEXT NOT NULL,
+                    category TEXT NOT NULL,
+                    count INTEGER NOT NULL,
+                    pozytywny INTEGER NOT NULL,
+                    neutralny INTEGER NOT NULL,
+                    negatywny INTEGER NOT NULL,
+                    PRIMARY KEY (brand_key, day, job_id, category)
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_brand_daily_rollups_job ON brand_daily_rollups(job_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_brand_daily_aspects_job ON brand_daily_aspects(job_id)")
+        
+        if not exists:
+            for job_id in self._jobs_with_classification():
+                self.refresh_job(job_id)
+    
+    def _jobs_with_classification(self) -> List[str]:
+        rows = self.db.execute_query("""
+            SELECT job_id FROM jobs
+            WHERE job_id IN (SELECT DISTINCT job_id FROM classification_results)
+            ORDER BY updated_at
+        """)
+        return [row['job_id'] for row in rows]
+    
+    # ========== Zapis (przyrostowo, per zadanie) ==========
+    
+    def refresh_job(self, job_id: str) -> int:
+        """
+        Przelicza dzienne rollupy jednego zadania (wywoływane po zakończeniu klasyfikacji).
+        Posty bez daty są pomijane. Zwraca liczbę zapisanych dni.
+        """
+        now = datetime.now().isoformat()
+        with self.db.get_connection() as conn:
+            conn.execute("DELETE FROM brand_daily_rollups WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM brand_daily_aspects WHERE job_id = ?", (job_id,))
+            
+            cursor = conn.execute("""
+                INSERT INTO brand_daily_rollups
+                (brand_key, day, job_id, posts, classified, pozytywny, neutralny, negatywny, computed_at)
+                SELECT j.brand_key, substr(r.date, 1, 10), r.job_id, COUNT(*), COUNT(c.comment_index),
+                       COALESCE(SUM(c.sentiment = 'pozytywny'), 0),
+                       COALESCE(SUM(c.sentiment = 'neutralny'), 0),
+                       COALESCE(SUM(c.sentiment = 'negatywny'), 0),
+                       ?
+                FROM scraping_results r
+                JOIN jobs j ON j.job_id = r.job_id
+                LEFT JOIN classification_results c ON c.job_id = r.job_id AND c.comment_index = r.position
+                WHERE r.job_id = ? AND r.date IS NOT NULL AND j.brand_key IS NOT NULL
+                GROUP BY substr(r.date, 1, 10)
+            """, (now, job_id))
+            days = cursor.rowcount
+            
+            conn.execute("""
+                INSERT INTO brand_daily_aspects
+                (brand_key, day, job_id, category, count, pozytywny, neutralny, negatywny)
+                SELECT j.brand_key, substr(r.date, 1, 10), r.job_id, c.category, COUNT(*),
+                       SUM(c.sentiment = 'pozytywny'), SUM(c.sentiment = 'neutralny'), SUM(c.sentiment = 'negatywny')
+                FROM scraping_results r
+                JOIN jobs j ON j.job_id = r.job_id
+                JOIN classification_results c ON c.job_id = r.job_id AND c.comment_index = r.position
+                WHERE r.job_id = ? AND r.date IS NOT NULL AND j.brand_key IS NOT NULL
+                GROUP BY substr(r.date, 1, 10), c.category
+            """, (job_id,))
+        return days
+    
+    # ========== Odczyt (dashboardy) ==========
+    
+    def list_brands(self) -> List[Dict]:
+        """Marki z rollupami: nazwa (z najnowszego zadania), liczba zadań, zakres dat, liczba postów"""
+        rows = self.db.execute_query(f"""
+            WITH latest AS ({self._latest_rollups_sql()})
+            SELECT l.brand_key,
+                   (SELECT brand_name FROM jobs WHERE brand_key = l.brand_key
+                    ORDER BY created_at DESC LIMIT 1) as brand_name,
+                   (SELECT COUNT(*) FROM jobs WHERE brand_key = l.brand_key) as jobs,
+                   MIN(l.day) as first_day, MAX(l.day) as last_day, SUM(l.posts) as posts
+            FROM latest l
+            GROUP BY l.brand_key
+            ORDER BY last_day DESC
+        """)
+        return [dict(row) for row in rows]
+    
+    def get_trends(self, brand_name: str, granularity: str = GRANULARITY_DAY,
+                   date_from: Optional[str] = None, date_to: Optional[str] = None) -> List[Dict]:
+        """Wolumen i rozkład sentymentu marki w czasie (okresy dzienne lub tygodniowe)"""
+        period = self._period_sql(granularity, "day")
+        where, params = self._range_filter(brand_name, date_from, date_to)
+        rows = self.db.execute_query(f"""
+            WITH latest AS ({self._latest_rollups_sql()})
+            SELECT {period} as period, SUM(posts) as posts, SUM(classified) as classified,
+                   SUM(pozytywny) as pozytywny, SUM(neutralny) as neutralny, SUM(negatywny) as negatywny,
+                   COUNT(DISTINCT job_id) as jobs
+            FROM latest
+            WHERE {where}
+            GROUP BY period
+            ORDER BY period
+        """, tuple(params))
+        
+        trends = []
+        for row in rows:
+            sentiment = {key: row[key] for key in ('pozytywny', 'neutralny', 'negatywny')}
+            trends.append({
+                "period": row['period'],
+                "posts": row['posts'],
+                "classified": row['classified'],
+                "jobs": row['jobs'],
+                "sentiment": sentiment,
+                "sentiment_share": {
+                    key: round(value / row['classified'] * 100, 1) if row['classified'] else 0
+                    for key, value in sentiment.items()
+                }
+            })
+        return trends
+    
+    def get_aspect_trends(self, brand_name: str, granularity: str = GRANULARITY_DAY,
+                          date_from: Optional[str] = None, date_to: Optional[str] = None,
+                          top: int = 10) -> Dict:
+        """Liczba komentarzy per aspekt w czasie (top aspektów w wybranym zakresie)"""
+        period = self._period_sql(granularity, "a.day")
+        where, params = self._range_filter(brand_name, date_from, date_to, alias="a")
+        
+        # Aspekty tylko z dni wybranych do rollupów (najnowsze zadanie per dzień)
+        rows = self.db.execute_query(f"""
+            WITH latest AS ({self._latest_rollups_sql()})
+            SELECT {period} as period, a.category,
+                   SUM(a.count) as count, SUM(a.pozytywny) as pozytywny,
+                   SUM(a.neutralny) as neutralny, SUM(a.negatywny) as negatywny
+            FROM brand_daily_aspects a
+            JOIN latest l ON l.brand_key = a.brand_key AND l.day = a.day AND l.job_id = a.job_id
+            WHERE {where}
+            GROUP BY period, a.category
+            ORDER BY period
+        """, tuple(params))
+        
+        totals: Dict[str, int] = {}
+        for row in rows:
+            totals[row['category']] = totals.get(row['category'], 0) + row['count']
+        top_categories = [cat for cat, _ in sorted(totals.items(), key=lambda x: x[1], reverse=True)[:top]]
+        
+        series: Dict[str, List[Dict]] = {cat: [] for cat in top_categories}
+        for row in rows:
+            if row['category'] in series:
+                series[row['category']].append({
+                    "period": row['period'],
+                    "count": row['count'],
+                    "sentiment": {key: row[key] for key in ('pozytywny', 'neutralny', 'negatywny')}
+                })
+        return {"aspects": top_categories, "totals": {cat: totals[cat] for cat in top_categories}, "series": series}
+    
+    # ========== Implementacja ==========
+    
+    @staticmethod
+    def _latest_rollups_sql() -> str:
+        """Rollupy z najnowszego zadania dla każdej pary (marka, dzień); usunięte zadania pomijane"""
+        return """
+            SELECT * FROM (
+                SELECT b.*, ROW_NUMBER() OVER (
+                    PARTITION BY b.brand_key, b.day ORDER BY b.computed_at DESC, b.job_id
+                ) as rn
+                FROM brand_daily_rollups b
+                JOIN jobs j ON j.job_id = b.job_id
+            )
+            WHERE rn = 1
+        """
+    
+    @staticmethod
+    def _period_sql(granularity: str, column: str) -> str:
+        """Wyrażenie okresu: dzień lub poniedziałek tygodnia"""
+        if granularity not in _PERIOD_SQL:
+            raise ValueError(f"Nieznana granulacja: {granularity} (dostępne: {', '.join(_PERIOD_SQL)})")
+        return _PERIOD_SQL[granularity].format(column)
+    
+    @staticmethod
+    def _range_filter(brand_name: str, date_from: Optional[str], date_to: Optional[str], alias: str = ""):
+        prefix = f"{alias}." if alias else ""
+        conditions = [f"{prefix}brand_key = ?"]
+        params = [normalize_brand_key(brand_name)]
+        if date_from:
+            conditions.append(f"{prefix}day >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append(f"{prefix}day <= ?")
+            params.append(date_to)
+        return " AND ".join(conditions), params
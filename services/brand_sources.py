@@ -0,0 +1,199 @@
+"""
+Rejestr źródeł marki - URL-e znalezione przez wyszukiwanie i znaczniki "najnowszego posta"
+
+Pełne zadanie zapisuje odkryte URL-e (strony/grupy/wydarzenia/wzmianki) z kluczem marki
+(jobs.brand_key). Zadanie przyrostowe używa ich ponownie zamiast generować zapytania
+i wyszukiwać w Google, a dla każdego URL-a pobiera tylko posty nowsze niż high-water mark
+(data najnowszego posta pobranego z tego URL-a w poprzednich przebiegach).
+
+Dla każdego URL-a zbierane są statystyki uzysku (uruchomienia aktora, zwrócone posty,
+posty zaakceptowane po filtrze dat i weryfikacji, puste/zablokowane uruchomienia).
+Wybór URL-i do scrapingu preferuje źródła o wysokim uzysku i pomija martwe.
+"""
+import sys
+import os
+from datetime import datetime
+from typing import Optional, List, Dict
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import SOURCE_DEAD_AFTER_RUNS
+from services.database_service import DatabaseService
+from utils.helpers import normalize_brand_key
+
+# Rodzaje źródeł (klucze słownika z FacebookSearchService.find_facebook_mentions)
+SOURCE_KINDS = ["mentions", "groups", "events", "pages"]
+
+class BrandSourcesService:
+    """Serwis rejestru URL-i marki (tabela brand_urls)"""
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        self.db = DatabaseService()
+        self._init_schema()
+        
+        self._initialized = True
+    
+    def _init_schema(self):
+        """Inicjalizuje tabelę rejestru URL-i"""
+        with self.db.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS brand_urls (
+                    brand_key TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    kind TEXT NOT NULL,  -- mentions/groups/events/pages
+                    first_job_id TEXT NOT NULL,
+                    last_job_id TEXT NOT NULL,
+                    high_water TEXT,  -- data najnowszego pobranego posta (ISO)
+                    updated_at TEXT NOT NULL,
+                    scrape_runs INTEGER NOT NULL DEFAULT 0,  -- uruchomienia aktora dla URL-a
+                    posts_returned INTEGER NOT NULL DEFAULT 0,  -- posty zwrócone (po odrzuceniu błędów/blokad)
+                    posts_accepted INTEGER NOT NULL DEFAULT 0,  -- posty po filtrze dat i weryfikacji
+                    empty_runs INTEGER NOT NULL DEFAULT 0,  -- uruchomienia bez żadnego posta (puste lub zablokowane)
+                    last_scraped_at TEXT,
+                    PRIMARY KEY (brand_key, url)
+                )
+            """)
+            self.db._ensure_columns(conn.cursor(), 'brand_urls', {
+                'scrape_runs': 'INTEGER NOT NULL DEFAULT 0',
+                'posts_returned': 'INTEGER NOT NULL DEFAULT 0',
+                'posts_accepted': 'INTEGER NOT NULL DEFAULT 0',
+                'empty_runs': 'INTEGER NOT NULL DEFAULT 0',
+                'last_scraped_at': 'TEXT'
+            })
+    
+    def register_urls(self, brand_name: str, urls_dict: Dict[str, List[str]], job_id: str) -> int:
+        """Zapisuje URL-e odkryte przez zadanie (istniejące high-water marki są zachowane)"""
+        brand_key = normalize_brand_key(brand_name)
+        now = datetime.now().isoformat()
+        rows = [
+            (brand_key, url, kind, job_id, job_id, now)
+            for kind in SOURCE_KINDS
+            for url in urls_dict.get(kind, [])
+            if url
+        ]
+        with self.db.get_connection() as conn:
+            conn.executemany("""
+                INSERT INTO brand_urls (brand_key, url, kind, first_job_id, last_job_id, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT(brand_key, url) DO UPDATE SET
+                    last_job_id = excluded.last_job_id, updated_at = excluded.updated_at
+            """, rows)
+        return len(rows)
+    
+    def update_high_water(self, brand_name: str, marks: Dict[str, str], job_id: str) -> None:
+        """Przesuwa high-water marki URL-i (nigdy wstecz)"""
+        brand_key = normalize_brand_key(brand_name)
+        now = datetime.now().isoformat()
+        with self.db.get_connection() as conn:
+            conn.executemany("""
+                UPDATE brand_urls
+                SET high_water = CASE WHEN high_water IS NULL OR high_water < ? THEN ? ELSE high_water END,
+                    last_job_id = ?, updated_at = ?
+                WHERE brand_key = ? AND url = ?
+            """, [(mark, mark, job_id, now, brand_key, url) for url, mark in marks.items() if mark])
+    
+    def record_runs(self, brand_name: str, stats: Dict[str, Dict[str, int]]) -> None:
+        """
+        Dolicza statystyki uruchomień aktora per URL.
+        stats: {url: {"runs", "returned", "accepted", "empty"}}
+        """
+        brand_key = normalize_brand_key(brand_name)
+        now = datetime.now().isoformat()
+        with self.db.get_connection() as conn:
+            conn.executemany("""
+                UPDATE brand_urls
+                SET scrape_runs = scrape_runs + ?, posts_returned = posts_returned + ?,
+                    posts_accepted = posts_accepted + ?, empty_runs = empty_runs + ?,
+                    last_scraped_at = ?
+                WHERE brand_key = ? AND url = ?
+            """, [
+                (s.get("runs", 0), s.get("returned", 0), s.get("accepted", 0), s.get("empty", 0), now, brand_key, url)
+                for url, s in stats.items()
+            ])
+    
+    def prioritize(self, brand_name: str, urls_dict: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """
+        Kolejność URL-i do scrapingu per rodzaj: znane źródła marki nieznalezione tym razem
+        są dołączane, martwe pomijane, reszta sortowana po uzysku (nowe URL-e pośrodku).
+        """
+        registry = self._load(brand_name)
+        prioritized = {}
+        for kind in set(urls_dict) | set(SOURCE_KINDS):
+            candidates = list(dict.fromkeys(urls_dict.get(kind, [])))
+            candidates += [url for url, row in registry.items() if row['kind'] == kind and url not in candidates]
+            alive = [url for url in candidates if not (url in registry and self._is_dead(registry[url]))]
+            # Sortowanie stabilne - przy równym wyniku zostaje kolejność wyszukiwania
+            prioritized[kind] = sorted(alive, key=lambda url: -self._score(registry.get(url)))
+        return prioritized
+    
+    def get_sources(self, brand_name: str) -> Dict[str, List[Dict]]:
+        """Żywe URL-e marki pogrupowane po rodzaju: {kind: [{url, high_water}]} (najwyższy uzysk najpierw)"""
+        registry = self._load(brand_name)
+        sources = {kind: [] for kind in SOURCE_KINDS}
+        for url, row in sorted(registry.items(), key=lambda item: -self._score(item[1])):
+            if not self._is_dead(row):
+                sources.setdefault(row['kind'], []).append({"url": url, "high_water": row['high_water']})
+        return sources
+    
+    def list_sources(self, brand_name: str) -> List[Dict]:
+        """Rejestr URL-i marki ze statystykami uzysku (do podglądu w API)"""
+        sources = []
+        for url, row in self._load(brand_name).items():
+            runs = row['scrape_runs']
+            sources.append({
+                "url": url,
+                "kind": row['kind'],
+                "scrape_runs": runs,
+                "posts_returned": row['posts_returned'],
+                "posts_accepted": row['posts_accepted'],
+                "accepted_per_run": round(row['posts_accepted'] / runs, 2) if runs else None,
+                "empty_rate": round(row['empty_runs'] / runs, 2) if runs else None,
+                "high_water": row['high_water'],
+                "last_scraped_at": row['last_scraped_at'],
+                "dead": self._is_dead(row),
+                "score": round(self._score(row), 3)
+            })
+        return sorted(sources, key=lambda source: -source['score'])
+    
+    def find_base_job(self, brand_name: str, exclude_job_id: Optional[str] = None) -> Optional[str]:
+        """
+        Najnowsze zakończone zadanie marki z kluczem kategorii i zarejestrowanymi URL-ami -
+        baza zadania przyrostowego (jego posty i klasyfikacje są przejmowane).
+        """
+        rows = self.db.execute_query("""
+            SELECT j.job_id FROM jobs j
+            WHERE j.brand_key = ? AND j.job_id != ? AND j.status = 'completed'
+              AND EXISTS (SELECT 1 FROM category_keys k WHERE k.job_id = j.job_id)
+              AND EXISTS (SELECT 1 FROM brand_urls u WHERE u.brand_key = j.brand_key)
+            ORDER BY j.created_at DESC
+            LIMIT 1
+        """, (normalize_brand_key(brand_name), exclude_job_id or ""))
+        return rows[0]['job_id'] if rows else None
+    
+    def _load(self, brand_name: str) -> Dict[str, Dict]:
+        rows = self.db.execute_query(
+            "SELECT * FROM brand_urls WHERE brand_key = ? ORDER BY rowid", (normalize_brand_key(brand_name),)
+        )
+        return {row['url']: dict(row) for row in rows}
+    
+    @staticmethod
+    def _score(row: Optional[Dict]) -> float:
+        """Zaakceptowane posty na uruchomienie z wygładzeniem - nowy URL ma wynik 0.5"""
+        if not row:
+            return 0.5
+        return (row['posts_accepted'] + 1) / (row['scrape_runs'] + 2)
+    
+    @staticmethod
+    def _is_dead(row: Dict) -> bool:
+        """Martwe źródło: wiele uruchomień aktora i żadnego zaakceptowanego posta"""
+        return row['scrape_runs'] >= SOURCE_DEAD_AFTER_RUNS and row['posts_accepted'] == 0
@@ -1,41 +1,312 @@
 """
 Orchestrator klasyfikacji - koordynuje proces klasyfikacji komentarzy
 
-TODO:
-- [ ] Utwórz klasę ClassificationOrchestrator
-- [ ] W __init__:
-    - GeminiService
-    - LoggerService
-- [ ] Metoda execute_classification_pipeline(
-        job: ScrapingJob,
-        scraping_results: list[ScrapingResult]
-    ) -> tuple[CategoryKey, list[ClassificationResult], str]:
-    - Pełny pipeline klasyfikacji
-    - Krok 1: Wyciągnij teksty z ScrapingResult
-    - Krok 2: Generuj klucz kategorii (Agent 2 - Gemini Flash)
-        - Użyj GeminiService.generate_category_key()
-        - Utwórz CategoryKey object
-    - Krok 3: Klasyfikuj komentarze (Agent 3 - Gemini Flash Lite)
-        - Dla każdego ScrapingResult:
-            - Wywołaj GeminiService.classify_comment()
-            - Utwórz ClassificationResult
-        - Optymalizacja: użyj classify_batch() jeśli możliwe
-    - Krok 4: Generuj raport (Agent 4 - Gemini Flash)
-        - Użyj GeminiService.generate_report()
-        - Zwróć Markdown raportu
-    - Zwraca: (CategoryKey, list[ClassificationResult], str report)
-    - Aktualizuj job.progress na każdym kroku
-- [ ] Metoda _extract_comments(scraping_results: list[ScrapingResult]) -> list[str]:
-    - Wyciąga teksty komentarzy z ScrapingResult
-    - Filtruje puste teksty
-    - Zwraca listę stringów
-- [ ] Metoda _classify_all_comments(
-        comments: list[str],
-        category_key: CategoryKey
-    ) -> list[ClassificationResult]:
-    - Klasyfikuje wszystkie komentarze
-    - Używa GeminiService.classify_batch() lub pętli classify_comment()
-    - Zwraca listę ClassificationResult
-- [ ] Dodaj logowanie przez LoggerService
+Klasyfikacja jest wznawialna: status każdego komentarza (pending/in_flight/done/failed
++ liczba prób) jest zapisywany w tabeli classification_tasks, więc restart procesu
+lub ponowne uruchomienie klasyfikuje tylko niedokończone komentarze.
 """
+import sys
+import os
+import queue
+import threading
+from typing import Dict, List, Optional
 
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import CLASSIFICATION_MAX_ATTEMPTS, STREAMING_KEY_SAMPLE_SIZE, QUEUE_LEASE_SECONDS
+from models.scraping_result import ScrapingResult
+from services.gemini_service import GeminiService
+from services.job_storage import JobStorageService
+from services.database_service import DatabaseService
+from services.job_queue import JobQueueService, LeaseLostError, check_lease
+from services.metrics import MetricsService, bind_context
+from services.logger import LoggerService
+
+class ClassificationOrchestrator:
+    """Orchestrator klasyfikacji - wznawialna klasyfikacja komentarzy (Agent 3)"""
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        self.gemini_service = GeminiService()
+        self.job_storage = JobStorageService()
+        self.db = DatabaseService()
+        self.job_queue = JobQueueService()
+        self.metrics = MetricsService()
+        self.logger = LoggerService()
+        
+        self.max_attempts = CLASSIFICATION_MAX_ATTEMPTS
+        self.min_comment_length = 5  # Krótsze komentarze są pomijane
+        
+        # Zadania klasyfikowane aktualnie w tym procesie (ochrona przed podwójnym uruchomieniem)
+        self._active_jobs = set()
+        self._active_lock = threading.Lock()
+        self._active_changed = threading.Condition(self._active_lock)
+        
+        self._initialized = True
+    
+    def run_classification(self, job_id: str, reset: bool = False) -> bool:
+        """
+        Klasyfikuje wszystkie niedokończone komentarze zadania.
+        reset=True usuwa wcześniejsze wyniki i checkpointy (pełna reklasyfikacja) - czeka na
+        zakończenie klasyfikacji tego zadania trwającej w tym procesie, zamiast ją pominąć.
+        Zwraca False, jeśli wznowienie pominięto, bo zadanie klasyfikuje już inny wątek.
+        """
+        with self._active_changed:
+            if job_id in self._active_jobs and not reset:
+                self.logger.add_log(f"Klasyfikacja zadania {job_id} już trwa - pomijam", "INFO")
+                return False
+            if job_id in self._active_jobs:
+                self.logger.add_log(f"Reset klasyfikacji zadania {job_id} czeka na zakończenie trwającej", "INFO")
+            while job_id in self._active_jobs:
+                self._active_changed.wait(timeout=1)
+                check_lease()
+            self._active_jobs.add(job_id)
+        
+        try:
+            self._run_classification(job_id, reset)
+        finally:
+            with self._active_changed:
+                self._active_jobs.discard(job_id)
+                self._active_changed.notify_all()
+        return True
+    
+    def _run_classification(self, job_id: str, reset: bool) -> None:
+        job = self.job_storage.get(job_id)
+        if not job or not job.scraping_results or not job.category_key:
+            return
+        
+        try:
+            if reset:
+                self.db.reset_classification(job_id)
+                job.classification_results = {}
+            
+            job.status = "classifying"
+            job.update_progress("Klasyfikowanie komentarzy...", 0.5)
+            self.job_storage.update_state(job)
+            
+            # Checkpointy: utwórz brakujące zadania i wznów przerwane
+            indices = self._get_classifiable_indices(job)
+            done_indices = [int(idx) for idx in job.classification_results.keys()]
+            self.db.init_classification_tasks(job_id, indices, done_indices)
+            # Tylko "in_flight" starsze niż dzierżawa kolejki - świeże klasyfikuje właśnie inny proces
+            requeued = self.db.requeue_in_flight_classification_tasks(job_id, QUEUE_LEASE_SECONDS)
+            if requeued:
+                self.logger.add_log(f"Wznowiono {requeued} przerwanych klasyfikacji zadania {job_id}")
+            
+            pending = self.db.get_unfinished_classification_indices(job_id, self.max_attempts)
+            total = len(indices)
+            self.logger.add_log(
+                f"Klasyfikacja zadania {job_id}: {len(pending)} do wykonania, "
+                f"{total - len(pending)}/{total} już gotowych"
+            )
+            
+            categories = job.category_key.categories
+            
+            for position, idx in enumerate(pending):
+                check_lease()
+                if not self.db.mark_classification_task_in_flight(job_id, idx):
+                    continue  # Komentarz przejął inny proces
+                try:
+                    result = self.gemini_service.classify_comment(job.scraping_results[idx].text, categories)
+                except Exception as e:
+                    self.db.mark_classification_task_failed(job_id, idx, str(e))
+                    self.metrics.inc("classified_comments", result="failed")
+                    self.logger.add_log(f"Błąd klasyfikacji komentarza {idx}: {str(e)}", "WARNING")
+                    continue
+                
+                self.db.save_classification_result(job_id, idx, result['category'], result['sentiment'])
+                self.metrics.inc("classified_comments", result="done")
+                job.classification_results[idx] = result
+                
+                # Aktualizuj progress (tylko wiersz jobs - wyniki zapisane wyżej)
+                done_count = total - len(pending) + position + 1
+                progress = 0.5 + done_count / max(total, 1) * 0.4
+                job.update_progress(f"Klasyfikowanie {done_count}/{total}...", progress)
+                self.job_storage.update_state(job)
+            
+            # Finalizacja
+            counts = self.db.get_classification_task_counts(job_id)
+            if counts['in_flight']:
+                # Część komentarzy klasyfikuje inny proces - on zamknie zadanie
+                self.logger.add_log(
+                    f"Klasyfikacja zadania {job_id}: {counts['in_flight']} komentarzy w toku w innym procesie"
+                )
+                return
+            job.status = "completed"
+            if counts['failed']:
+                job.update_progress(f"Klasyfikacja zakończona ({counts['failed']} komentarzy z błędem)", 1.0)
+            else:
+                job.update_progress("Klasyfikacja zakończona", 1.0)
+            # Tylko wiersz jobs - wyniki są już zapisane per komentarz (update() nadpisałby wszystkie wiersze)
+            self.job_storage.update_state(job)
+            self.logger.add_log(f"Zapisano klasyfikację zadania {job_id}")
+        
+        except LeaseLostError:
+            raise  # Zadanie przejął inny worker - nie zmieniamy statusu
+        except Exception as e:
+            job.status = "failed"
+            job.error_message = f"Błąd klasyfikacji: {str(e)}"
+            self.job_storage.update_state(job)
+            self.logger.add_log(f"Błąd klasyfikacji zadania {job_id}: {str(e)}", "ERROR")
+    
+    def find_interrupted_jobs(self) -> list[str]:
+        """
+        Sweep startowy: zwraca zadania pozostawione w statusie "classifying".
+        Zadania bez klucza kategorii (przerwane generowanie klucza) oznacza jako nieudane.
+        Pomija zadania z aktywnym zadaniem kolejki - wykonuje je właśnie (lub wykona) worker,
+        także samodzielny proces, który restart serwera WWW nie przerywa.
+        """
+        resumable = []
+        for job_id in self.db.get_job_ids_by_status("classifying"):
+            if self.job_queue.has_active_tasks(job_id):
+                continue
+            job = self.job_storage.get(job_id)
+            if not job:
+                continue
+            
+            if job.category_key and job.category_key.categories and job.scraping_results:
+                resumable.append(job_id)
+            else:
+                job.status = "failed"
+                job.error_message = "Generowanie klucza kategorii zostało przerwane (restart procesu)"
+                self.job_storage.update_state(job)
+        
+        if resumable:
+            self.logger.add_log(f"Znaleziono {len(resumable)} przerwanych klasyfikacji do wznowienia")
+        return resumable
+    
+    def create_streaming_classifier(self, brand_name: str, sample_size: int = None) -> "StreamingClassifier":
+        """Tworzy klasyfikator strumieniowy (klucz z próbki, klasyfikacja partii w tle)"""
+        return StreamingClassifier(
+            brand_name,
+            sample_size or STREAMING_KEY_SAMPLE_SIZE,
+            self.gemini_service,
+            self.logger,
+            self.min_comment_length
+        )
+    
+    def _get_classifiable_indices(self, job) -> list[int]:
+        """Indeksy komentarzy nadających się do klasyfikacji"""
+        return [
+            idx for idx, result in enumerate(job.scraping_results)
+            if result.text and len(result.text.strip()) >= self.min_comment_length
+        ]
+
+class StreamingClassifier:
+    """
+    Klasyfikacja strumieniowa: klucz kategorii powstaje z pierwszych `sample_size` postów,
+    a kolejne partie ze scrapingu są klasyfikowane w wątku w tle, gdy scraping trwa dalej.
+    
+    Indeksy postów są znane dopiero po zakończeniu scrapingu (deduplikacja, limit), więc wyniki
+    są trzymane po URL i mapowane na indeksy w reconcile().
+    """
+    
+    def __init__(self, brand_name: str, sample_size: int, gemini_service, logger, min_comment_length: int = 5):
+        self.brand_name = brand_name
+        self.sample_size = max(1, sample_size)
+        self.gemini_service = gemini_service
+        self.logger = logger
+        self.min_comment_length = min_comment_length
+        self.metrics = MetricsService()
+        
+        self.categories: Optional[List[dict]] = None  # Klucz z próbki
+        self.sample_count = 0
+        self.results_by_url: Dict[str, dict] = {}
+        
+        self._pending: List[ScrapingResult] = []
+        self._seen_urls = set()
+        self._key_failed = False
+        self._batches: "queue.Queue[Optional[List[ScrapingResult]]]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self) -> None:
+        # Wątek w kopii kontekstu metryk - wywołania Gemini liczą się do zadania i etapu scrapingu
+        self._thread = threading.Thread(target=bind_context(self._run), name="streaming-classifier", daemon=True)
+        self._thread.start()
+    
+    def add_batch(self, batch: List[ScrapingResult]) -> None:
+        """Przyjmuje partię postów (wywoływane z wątku scrapingu - nie blokuje)"""
+        self._batches.put(list(batch))
+    
+    def finish(self) -> None:
+        """Czeka na sklasyfikowanie wszystkich przekazanych partii"""
+        self._batches.put(None)
+        if self._thread:
+            self._thread.join()
+    
+    def reconcile(self, final_results: List[ScrapingResult], categories: List[dict]) -> Dict[int, dict]:
+        """
+        Mapuje wyniki na indeksy ostatecznej listy postów.
+        Pomija posty odrzucone przez scraping oraz wyniki z kategorią spoza (doprecyzowanego) klucza -
+        te komentarze zostaną sklasyfikowane ponownie w zwykłym etapie klasyfikacji.
+        """
+        valid_categories = {cat.get('aspekt', '') for cat in categories}
+        reconciled = {}
+        for idx, result in enumerate(final_results):
+            streamed = self.results_by_url.get(result.url)
+            if streamed and streamed['category'] in valid_categories:
+                reconciled[idx] = streamed
+        return reconciled
+    
+    def _run(self):
+        with self.metrics.span("streaming_classification"):
+            self._consume()
+    
+    def _consume(self):
+        while True:
+            batch = self._batches.get()
+            if batch is None:
+                return
+            
+            for result in batch:
+                if result.url and result.url not in self._seen_urls:
+                    self._seen_urls.add(result.url)
+                    self._pending.append(result)
+            
+            if self.categories is None:
+                if self._key_failed or len(self._pending) < self.sample_size:
+                    continue
+                self._generate_sample_key()
+                if self.categories is None:
+                    continue
+            
+            self._classify_pending()
+    
+    def _generate_sample_key(self):
+        comments = [r.text for r in self._pending if r.text and r.text.strip()]
+        try:
+            category_data = self.gemini_service.generate_category_key(comments, self.brand_name)
+        except Exception as e:
+            self._key_failed = True
+            self.logger.add_log(f"Klasyfikacja strumieniowa: błąd klucza z próbki: {str(e)}", "WARNING")
+            return
+        
+        if isinstance(category_data, list) and category_data:
+            self.categories = category_data
+            self.sample_count = len(comments)
+            self.logger.add_log(
+                f"Klasyfikacja strumieniowa: klucz z próbki {len(comments)} postów "
+                f"({len(category_data)} kategorii)"
+            )
+        else:
+            self._key_failed = True
+    
+    def _classify_pending(self):
+        pending, self._pending = self._pending, []
+        for result in pending:
+            if not result.text or len(result.text.strip()) < self.min_comment_length:
+                continue
+            try:
+                self.results_by_url[result.url] = self.gemini_service.classify_comment(result.text, self.categories)
+            except Exception as e:
+                # Komentarz zostanie sklasyfikowany w zwykłym etapie klasyfikacji
+                self.logger.add_log(f"Klasyfikacja strumieniowa: błąd komentarza: {str(e)}", "WARNING")
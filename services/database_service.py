@@ -3,14 +3,33 @@ Serwis bazy danych SQLite - zarządzanie połączeniem i schematem
 """
 import sqlite3
 import json
+import zlib
+import html
+import re
 import os
 import sys
-from datetime import datetime
+from datetime import datetime, timedelta
 from typing import Optional, List, Dict
 from contextlib import contextmanager
 
 # Dodaj ścieżkę do projektu
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import DATABASE_PATH
+from services.payload_store import PayloadStore
+from utils.helpers import normalize_brand_key
+
+# Znaczniki dopasowań w snippetach FTS (zamieniane na <mark> po escapowaniu HTML)
+_SNIPPET_START = "\x02"
+_SNIPPET_END = "\x03"
+
+# "ł" nie ma rozkładu Unicode, więc remove_diacritics go nie usuwa - zwijamy ręcznie
+_FOLD_SQL = "replace(replace({0}, 'ł', 'l'), 'Ł', 'L')"
+
+# Tabele z wierszami per zadanie usuwane razem z nim (część tworzą inne serwisy przy pierwszym użyciu)
+_JOB_TABLES = (
+    'classification_results', 'classification_tasks', 'categories', 'category_keys', 'workflow_stages',
+    'task_queue', 'report_events', 'job_metrics', 'job_spans', 'brand_daily_rollups', 'brand_daily_aspects'
+)
 
 class DatabaseService:
     """Serwis zarządzania bazą danych SQLite"""
@@ -29,7 +48,9 @@ class DatabaseService:
         # Ścieżka do bazy danych
         data_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
         os.makedirs(data_dir, exist_ok=True)
-        self.db_path = os.path.join(data_dir, 'socialpure.db')
+        self.db_path = DATABASE_PATH or os.path.join(data_dir, 'socialpure.db')
+        self.payload_store = PayloadStore()
+        self.fts_available = False  # Ustawiane w _init_search_index (SQLite bez FTS5 - wyszukiwanie LIKE)
         
         # Inicjalizuj schemat
         self._init_schema()
@@ -39,7 +60,8 @@ class DatabaseService:
     @contextmanager
     def get_connection(self):
         """Context manager dla połączenia z bazą danych"""
-        conn = sqlite3.connect(self.db_path)
+        # timeout: czekaj na blokadę zamiast od razu zgłaszać "database is locked" (wiele workerów)
+        conn = sqlite3.connect(self.db_path, timeout=30)
         conn.row_factory = sqlite3.Row  # Umożliwia dostęp przez nazwy kolumn
         try:
             yield conn
@@ -55,6 +77,9 @@ class DatabaseService:
         with self.get_connection() as conn:
             cursor = conn.cursor()
             
+            # WAL: równoczesne odczyty podczas zapisu (Flask + workery w osobnych procesach)
+            cursor.execute("PRAGMA journal_mode=WAL")
+            
             # Tabela jobs - główne dane zadania
             cursor.execute("""
                 CREATE TABLE IF NOT EXISTS jobs (
@@ -67,9 +92,17 @@ class DatabaseService:
                     progress REAL DEFAULT 0.0,
                     error_message TEXT,
                     created_at TEXT NOT NULL,
-                    updated_at TEXT NOT NULL
+                    updated_at TEXT NOT NULL,
+                    brand_key TEXT,  -- znormalizowana marka (łączy kolejne zadania tej samej marki)
+                    mode TEXT DEFAULT 'full',  -- full/incremental
+                    base_job_id TEXT  -- zadanie bazowe trybu przyrostowego
                 )
             """)
+            self._ensure_columns(cursor, 'jobs', {
+                'brand_key': 'TEXT',
+                'mode': "TEXT DEFAULT 'full'",
+                'base_job_id': 'TEXT'
+            })
             
             # Tabela scraping_results - wyniki scrapingu
             cursor.execute("""
@@ -82,7 +115,32 @@ class DatabaseService:
                     date TEXT,
                     source_type TEXT DEFAULT 'post',
                     platform TEXT DEFAULT 'facebook',
-                    metadata TEXT,  -- JSON string
+                    metadata TEXT,  -- (przestarzałe) surowe dane przeniesione do scraping_raw_items
+                    likes INTEGER,
+                    comments_count INTEGER,
+                    shares INTEGER,
+                    position INTEGER,  -- indeks komentarza w zadaniu (= comment_index klasyfikacji)
+                    FOREIGN KEY (job_id) REFERENCES jobs(job_id) ON DELETE CASCADE
+                )
+            """)
+            self._ensure_columns(cursor, 'scraping_results', {
+                'likes': 'INTEGER',
+                'comments_count': 'INTEGER',
+                'shares': 'INTEGER',
+                'position': 'INTEGER'
+            })
+            
+            # Magazyn surowych payloadów (kompresja + deduplikacja po hashu)
+            self.payload_store.init_schema(cursor)
+            legacy_raw_items = self._rename_legacy_raw_items(cursor)
+            
+            # Tabela scraping_raw_items - odwołania post -> payload (surowe elementy Apify, wczytywane na żądanie)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS scraping_raw_items (
+                    job_id TEXT NOT NULL,
+                    url TEXT NOT NULL,
+                    payload_hash TEXT NOT NULL,  -- raw_payloads.hash
+                    PRIMARY KEY (job_id, url),
                     FOREIGN KEY (job_id) REFERENCES jobs(job_id) ON DELETE CASCADE
                 )
             """)
@@ -122,15 +180,194 @@ class DatabaseService:
                 )
             """)
             
+            # Tabela classification_tasks - status klasyfikacji per komentarz (wznawianie)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS classification_tasks (
+                    job_id TEXT NOT NULL,
+                    comment_index INTEGER NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',  -- pending/in_flight/done/failed
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (job_id, comment_index),
+                    FOREIGN KEY (job_id) REFERENCES jobs(job_id) ON DELETE CASCADE
+                )
+            """)
+            
+            # Tabela workflow_stages - wyniki i czasy etapów pipeline'u (WorkflowOrchestrator)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS workflow_stages (
+                    job_id TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    status TEXT NOT NULL,  -- running/done/failed
+                    input_hash TEXT,
+                    output TEXT,  -- JSON string
+                    error TEXT,
+                    started_at TEXT,
+                    finished_at TEXT,
+                    duration_seconds REAL,
+                    PRIMARY KEY (job_id, stage),
+                    FOREIGN KEY (job_id) REFERENCES jobs(job_id) ON DELETE CASCADE
+                )
+            """)
+            
             # Indeksy dla lepszej wydajności
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_scraping_results_job_id ON scraping_results(job_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_categories_job_id ON categories(job_id)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_classification_results_job_id ON classification_results(job_id)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_classification_tasks_status ON classification_tasks(job_id, status)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs(status)")
             cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_created_at ON jobs(created_at)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_jobs_brand_key ON jobs(brand_key)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_scraping_raw_items_hash ON scraping_raw_items(payload_hash)")
+            cursor.execute("CREATE INDEX IF NOT EXISTS idx_scraping_results_position ON scraping_results(job_id, position)")
+            
+            self._migrate_result_positions(cursor)
+            self._migrate_brand_keys(cursor)
+            self._init_search_index(cursor)
+            if legacy_raw_items:
+                self._migrate_legacy_raw_items(cursor)
+            self._migrate_scraping_metadata(cursor)
             
             conn.commit()
     
+    def _ensure_columns(self, cursor, table: str, columns: Dict[str, str]) -> None:
+        """Dodaje brakujące kolumny do istniejącej tabeli (migracja starszych baz)"""
+        existing = {row['name'] for row in cursor.execute(f"PRAGMA table_info({table})").fetchall()}
+        for name, column_type in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+    
+    def _migrate_scraping_metadata(self, cursor) -> None:
+        """Przenosi surowe metadata ze scraping_results do scraping_raw_items (jednorazowo)"""
+        from models.scraping_result import ScrapingResult
+        
+        rows = cursor.execute(
+            "SELECT id, job_id, url, text, metadata FROM scraping_results WHERE metadata IS NOT NULL"
+        ).fetchall()
+        
+        for row in rows:
+            try:
+                metadata = json.loads(row['metadata'])
+            except (TypeError, ValueError):
+                metadata = {}
+            
+            projected = ScrapingResult(text=row['text'], url=row['url'] or '', metadata=metadata)
+            if row['url'] and metadata:
+                cursor.execute(
+                    "INSERT OR IGNORE INTO scraping_raw_items (job_id, url, payload_hash) VALUES (?, ?, ?)",
+                    (row['job_id'], row['url'], self.payload_store.put(cursor, metadata))
+                )
+            cursor.execute("""
+                UPDATE scraping_results SET likes = ?, comments_count = ?, shares = ?, metadata = NULL
+                WHERE id = ?
+            """, (projected.likes, projected.comments_count, projected.shares, row['id']))
+    
+    def compact_payload_store(self, retrain: bool = True) -> Dict:
+        """
+        Trenuje nowy słownik (opcjonalnie), przepisuje payloady aktywnym kodekiem/słownikiem,
+        usuwa osierocone payloady i odzyskuje miejsce (VACUUM). Zwraca liczby zmian.
+        """
+        with self.get_connection() as conn:
+            cursor = conn.cursor()
+            dictionary_id = self.payload_store.train_dictionary(cursor) if retrain else None
+            recompressed = self.payload_store.recompress(cursor)
+            purged = self.payload_store.purge_orphans(cursor, 'scraping_raw_items', 'payload_hash')
+        
+        with self.get_connection() as conn:
+            conn.execute("VACUUM")
+        
+        return {"dictionary_id": dictionary_id, "recompressed": recompressed, "purged": purged}
+    
+    def _init_search_index(self, cursor) -> None:
+        """
+        Indeks pełnotekstowy FTS5 postów (scraping_fts), synchronizowany triggerami ze scraping_results.
+        Kolumna folded zawiera tekst z ł -> l (tylko dla postów z "ł"), aby "lodz" znajdowało "Łódź".
+        """
+        exists = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scraping_fts'"
+        ).fetchone()
+        
+        try:
+            cursor.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS scraping_fts USING fts5(
+                    text, folded,
+                    tokenize = 'unicode61 remove_diacritics 2'
+                )
+            """)
+        except sqlite3.OperationalError:
+            self.fts_available = False
+            return
+        self.fts_available = True
+        
+        def folded(column: str) -> str:
+            return f"CASE WHEN {column} GLOB '*[łŁ]*' THEN {_FOLD_SQL.format(column)} ELSE '' END"
+        
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS scraping_fts_insert AFTER INSERT ON scraping_results BEGIN
+                INSERT INTO scraping_fts (rowid, text, folded) VALUES (new.id, new.text, {folded('new.text')});
+            END
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS scraping_fts_delete AFTER DELETE ON scraping_results BEGIN
+                DELETE FROM scraping_fts WHERE rowid = old.id;
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS scraping_fts_update AFTER UPDATE OF text ON scraping_results BEGIN
+                UPDATE scraping_fts SET text = new.text, folded = {folded('new.text')} WHERE rowid = old.id;
+            END
+        """)
+        
+        # Pierwsze utworzenie indeksu - zaindeksuj istniejące posty
+        if not exists:
+            cursor.execute(f"""
+                INSERT INTO scraping_fts (rowid, text, folded)
+                SELECT id, text, {folded('text')} FROM scraping_results
+            """)
+    
+    def _migrate_brand_keys(self, cursor) -> None:
+        """Uzupełnia brand_key zadań zapisanych przed dodaniem kolumny"""
+        rows = cursor.execute("SELECT job_id, brand_name FROM jobs WHERE brand_key IS NULL").fetchall()
+        cursor.executemany(
+            "UPDATE jobs SET brand_key = ? WHERE job_id = ?",
+            [(normalize_brand_key(row['brand_name']), row['job_id']) for row in rows]
+        )
+    
+    def _migrate_result_positions(self, cursor) -> None:
+        """Uzupełnia position dla wyników zapisanych przed dodaniem kolumny (kolejność wg id)"""
+        cursor.execute("""
+            WITH ranked AS (
+                SELECT id, ROW_NUMBER() OVER (PARTITION BY job_id ORDER BY id) - 1 AS pos
+                FROM scraping_results
+                WHERE job_id IN (SELECT DISTINCT job_id FROM scraping_results WHERE position IS NULL)
+            )
+            UPDATE scraping_results
+            SET position = (SELECT pos FROM ranked WHERE ranked.id = scraping_results.id)
+            WHERE position IS NULL
+        """)
+    
+    def _rename_legacy_raw_items(self, cursor) -> bool:
+        """Stara scraping_raw_items (payload zlib w wierszu) -> scraping_raw_items_legacy do migracji"""
+        columns = {row['name'] for row in cursor.execute("PRAGMA table_info(scraping_raw_items)").fetchall()}
+        if 'payload' not in columns:
+            return False
+        cursor.execute("ALTER TABLE scraping_raw_items RENAME TO scraping_raw_items_legacy")
+        return True
+    
+    def _migrate_legacy_raw_items(self, cursor) -> None:
+        """Przenosi payloady ze starej tabeli do magazynu (deduplikacja) i usuwa starą tabelę"""
+        rows = cursor.execute("SELECT job_id, url, payload FROM scraping_raw_items_legacy").fetchall()
+        for start in range(0, len(rows), 500):
+            chunk = rows[start:start + 500]
+            items = [json.loads(zlib.decompress(row['payload']).decode('utf-8')) for row in chunk]
+            hashes = self.payload_store.put_many(cursor, items)
+            cursor.executemany(
+                "INSERT OR IGNORE INTO scraping_raw_items (job_id, url, payload_hash) VALUES (?, ?, ?)",
+                [(row['job_id'], row['url'], content_hash) for row, content_hash in zip(chunk, hashes)]
+            )
+        cursor.execute("DROP TABLE scraping_raw_items_legacy")
+    
     def execute_query(self, query: str, params: tuple = ()):
         """Wykonuje zapytanie i zwraca wyniki"""
         with self.get_connection() as conn:
@@ -160,8 +397,8 @@ class DatabaseService:
             cursor.execute("""
                 INSERT OR REPLACE INTO jobs 
                 (job_id, brand_name, start_date, end_date, status, current_step, 
-                 progress, error_message, created_at, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                 progress, error_message, created_at, updated_at, brand_key, mode, base_job_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             """, (
                 job.job_id,
                 job.brand_name,
@@ -172,19 +409,22 @@ class DatabaseService:
                 job.progress,
                 job.error_message,
                 job.created_at.isoformat(),
-                job.updated_at.isoformat()
+                job.updated_at.isoformat(),
+                normalize_brand_key(job.brand_name),
+                job.mode,
+                job.base_job_id
             ))
             
             # Usuń stare wyniki scrapingu
             cursor.execute("DELETE FROM scraping_results WHERE job_id = ?", (job.job_id,))
             
-            # Zapisz wyniki scrapingu
-            for idx, result in enumerate(job.scraping_results):
-                cursor.execute("""
-                    INSERT INTO scraping_results 
-                    (job_id, text, url, author, date, source_type, platform, metadata)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
+            # Zapisz wyniki scrapingu (tylko typowane kolumny - surowe dane w scraping_raw_items)
+            cursor.executemany("""
+                INSERT INTO scraping_results 
+                (job_id, text, url, author, date, source_type, platform, likes, comments_count, shares, position)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, [
+                (
                     job.job_id,
                     result.text,
                     result.url,
@@ -192,8 +432,15 @@ class DatabaseService:
                     result.date.isoformat() if result.date else None,
                     result.source_type,
                     result.platform,
-                    json.dumps(result.metadata) if result.metadata else None
-                ))
+                    result.likes,
+                    result.comments_count,
+                    result.shares,
+                    position
+                )
+                for position, result in enumerate(job.scraping_results)
+            ])
+            
+            self._save_raw_items(cursor, job)
             
             # Zapisz category_key jeśli istnieje
             if job.category_key:
@@ -238,8 +485,29 @@ class DatabaseService:
             
             conn.commit()
     
-    def load_job(self, job_id: str):
-        """Wczytuje zadanie z bazy danych"""
+    def update_job_state(self, job) -> None:
+        """Aktualizuje tylko wiersz jobs (status/postęp) bez przepisywania wyników"""
+        with self.get_connection() as conn:
+            conn.execute("""
+                UPDATE jobs 
+                SET status = ?, current_step = ?, progress = ?, error_message = ?, updated_at = ?
+                WHERE job_id = ?
+            """, (
+                job.status,
+                job.current_step,
+                job.progress,
+                job.error_message,
+                job.updated_at.isoformat(),
+                job.job_id
+            ))
+    
+    def get_job_updated_at(self, job_id: str) -> Optional[str]:
+        """Zwraca updated_at zadania (ISO) - tani test aktualności cache"""
+        rows = self.execute_query("SELECT updated_at FROM jobs WHERE job_id = ?", (job_id,))
+        return rows[0]['updated_at'] if rows else None
+    
+    def load_job(self, job_id: str, include_metadata: bool = False):
+        """Wczytuje zadanie z bazy danych (include_metadata=True dołącza surowe dane Apify)"""
         from models.scraping_job import ScrapingJob
         from models.scraping_result import ScrapingResult
         from models.category_key import CategoryKey
@@ -263,13 +531,18 @@ class DatabaseService:
                 status=job_row['status'],
                 current_step=job_row['current_step'] or '',
                 progress=job_row['progress'] or 0.0,
-                error_message=job_row['error_message']
+                error_message=job_row['error_message'],
+                mode=job_row['mode'] or 'full',
+                base_job_id=job_row['base_job_id']
             )
             job.created_at = datetime.fromisoformat(job_row['created_at'])
             job.updated_at = datetime.fromisoformat(job_row['updated_at'])
             
-            # Wczytaj scraping_results
-            cursor.execute("SELECT * FROM scraping_results WHERE job_id = ? ORDER BY id", (job_id,))
+            # Wczytaj scraping_results (bez surowych danych - patrz get_raw_items)
+            cursor.execute("""
+                SELECT text, url, author, date, source_type, platform, likes, comments_count, shares
+                FROM scraping_results WHERE job_id = ? ORDER BY position, id
+            """, (job_id,))
             for row in cursor.fetchall():
                 result = ScrapingResult(
                     text=row['text'],
@@ -278,10 +551,17 @@ class DatabaseService:
                     date=datetime.fromisoformat(row['date']) if row['date'] else None,
                     source_type=row['source_type'] or 'post',
                     platform=row['platform'] or 'facebook',
-                    metadata=json.loads(row['metadata']) if row['metadata'] else {}
+                    likes=row['likes'],
+                    comments_count=row['comments_count'],
+                    shares=row['shares']
                 )
                 job.scraping_results.append(result)
             
+            if include_metadata:
+                raw_items = self.get_raw_items(job_id)
+                for result in job.scraping_results:
+                    result.metadata = raw_items.get(result.url, {})
+            
             # Wczytaj category_key
             cursor.execute("SELECT * FROM category_keys WHERE job_id = ?", (job_id,))
             category_key_row = cursor.fetchone()
@@ -329,12 +609,378 @@ class DatabaseService:
             return [self.load_job(job_id) for job_id in job_ids]
     
     def delete_job(self, job_id: str) -> bool:
-        """Usuwa zadanie z bazy danych (CASCADE usunie powiązane rekordy)"""
+        """Usuwa zadanie i wszystkie powiązane rekordy w jednej transakcji"""
         with self.get_connection() as conn:
             cursor = conn.cursor()
+            # PRAGMA foreign_keys nie jest włączone (ON DELETE CASCADE nie działa) - usuwamy jawnie
+            cursor.execute("DELETE FROM scraping_raw_items WHERE job_id = ?", (job_id,))
+            self.payload_store.purge_orphans(cursor, 'scraping_raw_items', 'payload_hash')
+            # Posty usuwane jawnie - triggery usuwają je też z indeksu wyszukiwania
+            cursor.execute("DELETE FROM scraping_results WHERE job_id = ?", (job_id,))
+            existing = {row['name'] for row in cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+            for table in _JOB_TABLES:
+                if table in existing:
+                    cursor.execute(f"DELETE FROM {table} WHERE job_id = ?", (job_id,))
             cursor.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
             return cursor.rowcount > 0
     
+    # ========== Stronicowanie wyników (keyset po position) ==========
+    
+    def get_results_page(self, job_id: str, after: Optional[int] = None, before: Optional[int] = None,
+                         limit: int = 50, source_type: Optional[str] = None, sentiment: Optional[str] = None,
+                         category: Optional[str] = None, classified: Optional[bool] = None,
+                         include_classification: bool = False) -> Dict:
+        """
+        Zwraca stronę wyników zadania (keyset: position > after lub position < before).
+        Filtry sentiment/category/classified dotyczą wyników klasyfikacji (LEFT JOIN).
+        Zwraca {"items", "next_cursor", "prev_cursor"} - kursor None oznacza brak kolejnej strony.
+        """
+        include_classification = include_classification or sentiment or category or classified is not None
+        
+        select = """
+            SELECT r.position, r.text, r.url, r.author, r.date, r.source_type, r.platform,
+                   r.likes, r.comments_count, r.shares
+        """
+        joins = ""
+        if include_classification:
+            select += ", c.category, c.sentiment"
+            joins = """
+                LEFT JOIN classification_results c
+                    ON c.job_id = r.job_id AND c.comment_index = r.position
+            """
+        
+        conditions, params = self._results_filter(job_id, source_type, sentiment, category, classified)
+        
+        backwards = before is not None
+        if backwards:
+            conditions.append("r.position < ?")
+            params.append(before)
+        elif after is not None:
+            conditions.append("r.position > ?")
+            params.append(after)
+        
+        # limit + 1: tani test, czy istnieje kolejna strona
+        query = f"""
+            {select}
+            FROM scraping_results r
+            {joins}
+            WHERE {" AND ".join(conditions)}
+            ORDER BY r.position {"DESC" if backwards else "ASC"}
+            LIMIT ?
+        """
+        params.append(limit + 1)
+        
+        with self.get_connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+        
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backwards:
+            rows.reverse()
+        items = [dict(row) for row in rows]
+        
+        if not items:
+            return {"items": [], "next_cursor": None, "prev_cursor": None}
+        
+        first, last = items[0]['position'], items[-1]['position']
+        if backwards:
+            next_cursor, prev_cursor = last, (first if has_more else None)
+        else:
+            next_cursor = last if has_more else None
+            prev_cursor = first if after is not None else None
+        return {"items": items, "next_cursor": next_cursor, "prev_cursor": prev_cursor}
+    
+    def get_classification_aggregates(self, job_id: str, examples_per_category: int = 3,
+                                      example_length: int = 200):
+        """
+        Agregaty klasyfikacji zadania liczone w SQL (bez wczytywania postów do Pythona):
+        macierz kategoria × sentyment (z niej liczniki sentymentu i kategorii) oraz
+        przykładowe komentarze per kategoria. Zwraca ClassificationStats.
+        """
+        from models.classification_stats import ClassificationStats
+        
+        with self.get_connection() as conn:
+            # Tylko wyniki istniejących postów; kategorie w kolejności pierwszego wystąpienia
+            matrix_rows = conn.execute("""
+                SELECT c.category, c.sentiment, COUNT(*) as cnt,
+                       MIN(MIN(c.comment_index)) OVER (PARTITION BY c.category) as first_index
+                FROM classification_results c
+                JOIN scraping_results r ON r.job_id = c.job_id AND r.position = c.comment_index
+                WHERE c.job_id = ?
+                GROUP BY c.category, c.sentiment
+                ORDER BY first_index, c.sentiment
+            """, (job_id,)).fetchall()
+            
+            example_rows = conn.execute("""
+                SELECT category, text FROM (
+                    SELECT c.category, substr(r.text, 1, ?) as text, c.comment_index,
+                           ROW_NUMBER() OVER (PARTITION BY c.category ORDER BY c.comment_index) as rn
+                    FROM classification_results c
+                    JOIN scraping_results r ON r.job_id = c.job_id AND r.position = c.comment_index
+                    WHERE c.job_id = ?
+                )
+                WHERE rn <= ?
+                ORDER BY comment_index
+            """, (example_length, job_id, examples_per_category)).fetchall()
+        
+        examples: Dict[str, List[str]] = {}
+        for row in example_rows:
+            examples.setdefault(row['category'], []).append(row['text'] or '')
+        
+        return ClassificationStats.from_matrix(
+            [(row['category'], row['sentiment'], row['cnt']) for row in matrix_rows], examples
+        )
+    
+    @staticmethod
+    def _results_filter(job_id: str, source_type: Optional[str], sentiment: Optional[str],
+                        category: Optional[str], classified: Optional[bool]):
+        """Warunki WHERE (alias r = scraping_results, c = classification_results) i parametry"""
+        conditions = ["r.job_id = ?"]
+        params: list = [job_id]
+        if source_type:
+            conditions.append("r.source_type = ?")
+            params.append(source_type)
+        if sentiment:
+            conditions.append("c.sentiment = ?")
+            params.append(sentiment)
+        if category:
+            conditions.append("c.category = ?")
+            params.append(category)
+        if classified is True:
+            conditions.append("c.comment_index IS NOT NULL")
+        elif classified is False:
+            conditions.append("c.comment_index IS NULL")
+        return conditions, params
+    
+    def count_results(self, job_id: str, source_type: Optional[str] = None, sentiment: Optional[str] = None,
+                      category: Optional[str] = None, classified: Optional[bool] = None) -> int:
+        """Liczba wyników zadania spełniających filtry (te same co get_results_page)"""
+        conditions, params = self._results_filter(job_id, source_type, sentiment, category, classified)
+        
+        with self.get_connection() as conn:
+            return conn.execute(f"""
+                SELECT COUNT(*) as cnt
+                FROM scraping_results r
+                LEFT JOIN classification_results c
+                    ON c.job_id = r.job_id AND c.comment_index = r.position
+                WHERE {" AND ".join(conditions)}
+            """, params).fetchone()['cnt']
+    
+    def get_classification_stats(self, job_id: str) -> Dict:
+        """Rozkład sentymentu i kategorii klasyfikacji zadania (GROUP BY, bez wczytywania wyników)"""
+        with self.get_connection() as conn:
+            sentiment_rows = conn.execute("""
+                SELECT sentiment, COUNT(*) as cnt FROM classification_results
+                WHERE job_id = ? GROUP BY sentiment
+            """, (job_id,)).fetchall()
+            category_rows = conn.execute("""
+                SELECT category, COUNT(*) as cnt FROM classification_results
+                WHERE job_id = ? GROUP BY category ORDER BY cnt DESC
+            """, (job_id,)).fetchall()
+            source_rows = conn.execute("""
+                SELECT source_type, COUNT(*) as cnt FROM scraping_results
+                WHERE job_id = ? GROUP BY source_type
+            """, (job_id,)).fetchall()
+        
+        sentiment = {"pozytywny": 0, "neutralny": 0, "negatywny": 0}
+        sentiment.update({row['sentiment']: row['cnt'] for row in sentiment_rows})
+        return {
+            "sentiment": sentiment,
+            "categories": {row['category']: row['cnt'] for row in category_rows},
+            "source_types": {row['source_type']: row['cnt'] for row in source_rows}
+        }
+    
+    # ========== Wyszukiwanie pełnotekstowe (scraping_fts) ==========
+    
+    @staticmethod
+    def _build_fts_query(query: str) -> Optional[str]:
+        """Zapytanie użytkownika -> bezpieczne zapytanie FTS5 (wszystkie słowa, dopasowanie prefiksowe)"""
+        words = re.findall(r"\w+", query.replace('ł', 'l').replace('Ł', 'L'))
+        if not words:
+            return None
+        return " AND ".join(f'"{word}"*' for word in words)
+    
+    @staticmethod
+    def _format_snippet(snippet: str) -> str:
+        """Escapuje HTML snippetu i zamienia znaczniki dopasowań na <mark>"""
+        return html.escape(snippet or '').replace(_SNIPPET_START, '<mark>').replace(_SNIPPET_END, '</mark>')
+    
+    @staticmethod
+    def _unfold_snippet(marked_folded: str, original: str, context: int = 80) -> str:
+        """
+        Podświetlenie z kolumny folded -> oryginalny tekst (ł -> l zachowuje długość, więc znaki
+        odpowiadają sobie 1:1) przycięty do fragmentu wokół pierwszego dopasowania.
+        """
+        chars = []
+        index = 0
+        for char in marked_folded:
+            if char in (_SNIPPET_START, _SNIPPET_END) or index >= len(original):
+                chars.append(char)
+            else:
+                chars.append(original[index])
+                index += 1
+        text = "".join(chars)
+        
+        first = text.find(_SNIPPET_START)
+        start = max(0, first - context) if first >= 0 else 0
+        end = min(len(text), (first if first >= 0 else 0) + context * 2)
+        return ("…" if start > 0 else "") + text[start:end] + ("…" if end < len(text) else "")
+    
+    def search_posts(self, query: str, job_id: Optional[str] = None, brand: Optional[str] = None,
+                     date_from: Optional[str] = None, date_to: Optional[str] = None,
+                     category: Optional[str] = None, sentiment: Optional[str] = None,
+                     limit: int = 20, offset: int = 0) -> Dict:
+        """
+        Wyszukuje posty we wszystkich zadaniach (ranking bm25, snippety z <mark>).
+        Zwraca {"results": [...], "total": int}.
+        """
+        conditions = []
+        params: list = []
+        if job_id:
+            conditions.append("r.job_id = ?")
+            params.append(job_id)
+        if brand:
+            # Klucz marki - ta sama normalizacja co przy zapisie zadania (wielkość liter, spacje)
+            conditions.append("j.brand_key = ?")
+            params.append(normalize_brand_key(brand))
+        if date_from:
+            conditions.append("r.date >= ?")
+            params.append(date_from)
+        if date_to:
+            conditions.append("r.date < date(?, '+1 day')")
+            params.append(date_to)
+        if category:
+            conditions.append("c.category = ?")
+            params.append(category)
+        if sentiment:
+            conditions.append("c.sentiment = ?")
+            params.append(sentiment)
+        
+        joins = """
+            JOIN jobs j ON j.job_id = r.job_id
+            LEFT JOIN classification_results c ON c.job_id = r.job_id AND c.comment_index = r.position
+        """
+        columns = """
+            r.job_id, j.brand_name, r.position, r.url, r.author, r.date, r.source_type,
+            c.category, c.sentiment
+        """
+        
+        if self.fts_available:
+            fts_query = self._build_fts_query(query)
+            if not fts_query:
+                return {"results": [], "total": 0}
+            source = f"FROM scraping_fts JOIN scraping_results r ON r.id = scraping_fts.rowid {joins}"
+            conditions.insert(0, "scraping_fts MATCH ?")
+            params.insert(0, fts_query)
+            # Posty z "ł": podświetlenie z kolumny folded (pełny tekst) przenoszone na oryginał
+            select = f"""
+                SELECT {columns},
+                       snippet(scraping_fts, 0, '{_SNIPPET_START}', '{_SNIPPET_END}', '…', 16) AS snippet,
+                       CASE WHEN scraping_fts.folded != ''
+                            THEN highlight(scraping_fts, 1, '{_SNIPPET_START}', '{_SNIPPET_END}') END AS folded_marked,
+                       r.text AS original_text,
+                       bm25(scraping_fts) AS score
+            """
+            order = "ORDER BY score"
+        else:
+            # Fallback bez FTS5: LIKE (bez rankingu, pełne skanowanie)
+            source = f"FROM scraping_results r {joins}"
+            conditions.insert(0, "r.text LIKE ?")
+            params.insert(0, f"%{query.strip()}%")
+            select = f"""
+                SELECT {columns}, substr(r.text, 1, 200) AS snippet,
+                       NULL AS folded_marked, NULL AS original_text, NULL AS score
+            """
+            order = "ORDER BY r.job_id, r.position"
+        
+        where = "WHERE " + " AND ".join(conditions)
+        with self.get_connection() as conn:
+            total = conn.execute(f"SELECT COUNT(*) as cnt {source} {where}", params).fetchone()['cnt']
+            rows = conn.execute(
+                f"{select} {source} {where} {order} LIMIT ? OFFSET ?", params + [limit, offset]
+            ).fetchall()
+        
+        results = []
+        for row in rows:
+            result = dict(row)
+            folded_marked = result.pop('folded_marked')
+            original_text = result.pop('original_text')
+            if folded_marked:
+                result['snippet'] = self._unfold_snippet(folded_marked, original_text)
+            result['snippet'] = self._format_snippet(result['snippet'])
+            result['score'] = round(-result['score'], 4) if result['score'] is not None else None
+            results.append(result)
+        return {"results": results, "total": total}
+    
+    # ========== Surowe dane Apify (scraping_raw_items) ==========
+    
+    def _save_raw_items(self, cursor, job) -> None:
+        """
+        Zapisuje surowe elementy Apify nowych postów i usuwa odwołania postów, które zniknęły.
+        Istniejące wpisy nie są przepisywane (wczytane zadanie nie ma metadata w pamięci).
+        """
+        existing = {
+            row['url'] for row in cursor.execute(
+                "SELECT url FROM scraping_raw_items WHERE job_id = ?", (job.job_id,)
+            ).fetchall()
+        }
+        current = {result.url for result in job.scraping_results if result.url}
+        
+        new_results = []
+        for result in job.scraping_results:
+            if result.url and result.metadata and result.url not in existing:
+                existing.add(result.url)
+                new_results.append(result)
+        
+        if new_results:
+            hashes = self.payload_store.put_many(cursor, [result.metadata for result in new_results])
+            cursor.executemany(
+                "INSERT OR IGNORE INTO scraping_raw_items (job_id, url, payload_hash) VALUES (?, ?, ?)",
+                [(job.job_id, result.url, content_hash) for result, content_hash in zip(new_results, hashes)]
+            )
+        
+        stale = existing - current
+        if stale:
+            cursor.executemany(
+                "DELETE FROM scraping_raw_items WHERE job_id = ? AND url = ?",
+                [(job.job_id, url) for url in stale]
+            )
+    
+    def copy_raw_items(self, source_job_id: str, target_job_id: str) -> int:
+        """
+        Dołącza do zadania surowe dane postów przejętych z innego zadania (tryb przyrostowy).
+        Kopiowane są tylko odwołania - treść w raw_payloads jest współdzielona (hash).
+        """
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                INSERT OR IGNORE INTO scraping_raw_items (job_id, url, payload_hash)
+                SELECT ?, r.url, r.payload_hash FROM scraping_raw_items r
+                WHERE r.job_id = ? AND r.url IN (SELECT url FROM scraping_results WHERE job_id = ?)
+            """, (target_job_id, source_job_id, target_job_id))
+            return cursor.rowcount
+    
+    def get_raw_items(self, job_id: str, url: Optional[str] = None) -> Dict[str, dict]:
+        """Zwraca surowe elementy Apify zadania: {url: item} (opcjonalnie tylko jeden URL)"""
+        with self.get_connection() as conn:
+            if url is not None:
+                refs = conn.execute(
+                    "SELECT url, payload_hash FROM scraping_raw_items WHERE job_id = ? AND url = ?", (job_id, url)
+                ).fetchall()
+            else:
+                refs = conn.execute(
+                    "SELECT url, payload_hash FROM scraping_raw_items WHERE job_id = ?", (job_id,)
+                ).fetchall()
+            
+            payloads = self.payload_store.get_many(conn, [ref['payload_hash'] for ref in refs])
+            return {ref['url']: payloads[ref['payload_hash']] for ref in refs if ref['payload_hash'] in payloads}
+    
+    def get_payload_store_stats(self) -> Dict:
+        """Statystyki magazynu surowych danych (liczba, rozmiary, współczynnik kompresji)"""
+        with self.get_connection() as conn:
+            stats = self.payload_store.get_stats(conn)
+            stats['references'] = conn.execute("SELECT COUNT(*) as cnt FROM scraping_raw_items").fetchone()['cnt']
+            return stats
+    
     def list_jobs_summary(self) -> List[Dict]:
         """Zwraca podsumowanie wszystkich zadań"""
         with self.get_connection() as conn:
@@ -365,4 +1011,152 @@ class DatabaseService:
                 }
                 for row in cursor.fetchall()
             ]
-
+    
+    # ========== Zadania klasyfikacji (checkpointy per komentarz) ==========
+    
+    def init_classification_tasks(self, job_id: str, comment_indices: List[int], done_indices: List[int] = ()) -> None:
+        """Tworzy brakujące zadania klasyfikacji; istniejące zachowują swój status"""
+        now = datetime.now().isoformat()
+        with self.get_connection() as conn:
+            conn.executemany("""
+                INSERT OR IGNORE INTO classification_tasks (job_id, comment_index, status, attempts, updated_at)
+                VALUES (?, ?, 'pending', 0, ?)
+            """, [(job_id, int(idx), now) for idx in comment_indices])
+            
+            # Komentarze sklasyfikowane wcześniej (np. ręcznie) oznacz jako gotowe
+            conn.executemany("""
+                UPDATE classification_tasks SET status = 'done', updated_at = ?
+                WHERE job_id = ? AND comment_index = ? AND status != 'done'
+            """, [(now, job_id, int(idx)) for idx in done_indices])
+    
+    def requeue_in_flight_classification_tasks(self, job_id: str, stale_seconds: float) -> int:
+        """
+        Przywraca do kolejki zadania przerwane w trakcie (np. restart procesu).
+        Tylko wiersze nieodświeżane od stale_seconds - świeże "in_flight" przetwarza inny proces.
+        """
+        now = datetime.now()
+        stale_before = (now - timedelta(seconds=stale_seconds)).isoformat()
+        with self.get_connection() as conn:
+            cursor = conn.execute("""
+                UPDATE classification_tasks SET status = 'pending', updated_at = ?
+                WHERE job_id = ? AND status = 'in_flight' AND updated_at < ?
+            """, (now.isoformat(), job_id, stale_before))
+            return cursor.rowcount
+    
+    def get_unfinished_classification_indices(self, job_id: str, max_attempts: int) -> List[int]:
+        """Zwraca indeksy komentarzy do (ponownej) klasyfikacji"""
+        rows = self.execute_query("""
+            SELECT comment_index FROM classification_tasks
+            WHERE job_id = ?
+              AND (status = 'pending' OR (status = 'failed' AND attempts < ?))
+            ORDER BY comment_index
+        """, (job_id, max_attempts))
+        return [row['comment_index'] for row in rows]
+    
+    def mark_classification_task_in_flight(self, job_id: str, comment_index: int) -> bool:
+        """
+        Oznacza zadanie jako przetwarzane i zwiększa licznik prób.
+        False, jeśli komentarz przejął w międzyczasie inny proces (lub jest już gotowy).
+        """
+        return self.execute_update("""
+            UPDATE classification_tasks 
+            SET status = 'in_flight', attempts = attempts + 1, updated_at = ?
+            WHERE job_id = ? AND comment_index = ? AND status IN ('pending', 'failed')
+        """, (datetime.now().isoformat(), job_id, int(comment_index))) > 0
+    
+    def mark_classification_task_failed(self, job_id: str, comment_index: int, error: str) -> None:
+        """Oznacza zadanie jako nieudane (z komunikatem błędu)"""
+        self.execute_update("""
+            UPDATE classification_tasks 
+            SET status = 'failed', last_error = ?, updated_at = ?
+            WHERE job_id = ? AND comment_index = ?
+        """, (error, datetime.now().isoformat(), job_id, int(comment_index)))
+    
+    def save_classification_result(self, job_id: str, comment_index: int, category: str, sentiment: str) -> None:
+        """Zapisuje wynik pojedynczego komentarza i zamyka jego zadanie (jedna transakcja)"""
+        now = datetime.now().isoformat()
+        with self.get_connection() as conn:
+            conn.execute("""
+                INSERT OR REPLACE INTO classification_results 
+                (job_id, comment_index, category, sentiment, classified_at)
+                VALUES (?, ?, ?, ?, ?)
+            """, (job_id, int(comment_index), category, sentiment, now))
+            conn.execute("""
+                INSERT INTO classification_tasks (job_id, comment_index, status, attempts, updated_at)
+                VALUES (?, ?, 'done', 1, ?)
+                ON CONFLICT(job_id, comment_index) DO UPDATE SET
+                    status = 'done', last_error = NULL, updated_at = excluded.updated_at
+            """, (job_id, int(comment_index), now))
+    
+    def reset_classification(self, job_id: str) -> None:
+        """Usuwa wyniki i checkpointy klasyfikacji zadania"""
+        with self.get_connection() as conn:
+            conn.execute("DELETE FROM classification_results WHERE job_id = ?", (job_id,))
+            conn.execute("DELETE FROM classification_tasks WHERE job_id = ?", (job_id,))
+    
+    def get_classification_task_counts(self, job_id: str) -> Dict[str, int]:
+        """Zwraca liczbę zadań klasyfikacji w każdym statusie"""
+        counts = {'pending': 0, 'in_flight': 0, 'done': 0, 'failed': 0}
+        rows = self.execute_query("""
+            SELECT status, COUNT(*) as cnt FROM classification_tasks
+            WHERE job_id = ? GROUP BY status
+        """, (job_id,))
+        for row in rows:
+            counts[row['status']] = row['cnt']
+        return counts
+    
+    def get_job_ids_by_status(self, status: str) -> List[str]:
+        """Zwraca identyfikatory zadań w danym statusie (bez wczytywania wyników)"""
+        rows = self.execute_query("SELECT job_id FROM jobs WHERE status = ? ORDER BY created_at", (status,))
+        return [row['job_id'] for row in rows]
+    
+    # ========== Etapy workflow (wyniki + czasy) ==========
+    
+    def get_workflow_stage(self, job_id: str, stage: str) -> Optional[Dict]:
+        """Zwraca zapis etapu (output jako dict) lub None"""
+        rows = self.execute_query(
+            "SELECT * FROM workflow_stages WHERE job_id = ? AND stage = ?", (job_id, stage)
+        )
+        return self._workflow_stage_to_dict(rows[0]) if rows else None
+    
+    def get_workflow_stages(self, job_id: str) -> List[Dict]:
+        """Zwraca wszystkie etapy zadania (w kolejności uruchomienia)"""
+        rows = self.execute_query(
+            "SELECT * FROM workflow_stages WHERE job_id = ? ORDER BY started_at", (job_id,)
+        )
+        return [self._workflow_stage_to_dict(row) for row in rows]
+    
+    def start_workflow_stage(self, job_id: str, stage: str, input_hash: str) -> None:
+        """Oznacza etap jako rozpoczęty (nadpisuje poprzedni przebieg)"""
+        self.execute_update("""
+            INSERT OR REPLACE INTO workflow_stages
+            (job_id, stage, status, input_hash, output, error, started_at, finished_at, duration_seconds)
+            VALUES (?, ?, 'running', ?, NULL, NULL, ?, NULL, NULL)
+        """, (job_id, stage, input_hash, datetime.now().isoformat()))
+    
+    def finish_workflow_stage(self, job_id: str, stage: str, output: Dict, duration_seconds: float) -> None:
+        """Zapisuje wynik i czas trwania zakończonego etapu"""
+        self.execute_update("""
+            UPDATE workflow_stages
+            SET status = 'done', output = ?, finished_at = ?, duration_seconds = ?
+            WHERE job_id = ? AND stage = ?
+        """, (
+            json.dumps(output, ensure_ascii=False),
+            datetime.now().isoformat(),
+            duration_seconds,
+            job_id,
+            stage
+        ))
+    
+    def fail_workflow_stage(self, job_id: str, stage: str, error: str, duration_seconds: float) -> None:
+        """Zapisuje błąd etapu"""
+        self.execute_update("""
+            UPDATE workflow_stages
+            SET status = 'failed', error = ?, finished_at = ?, duration_seconds = ?
+            WHERE job_id = ? AND stage = ?
+        """, (error, datetime.now().isoformat(), duration_seconds, job_id, stage))
+    
+    def _workflow_stage_to_dict(self, row) -> Dict:
+        stage = dict(row)
+        stage['output'] = json.loads(stage['output']) if stage.get('output') else None
+        return stage
@@ -5,6 +5,7 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 # Dodaj ścieżkę do projektu
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from services.apify_service import ApifyService
+from services.metrics import bind_context
 from services.logger import LoggerService
 from models.scraping_result import ScrapingResult
 
@@ -15,44 +16,71 @@ class FacebookScraperService:
         self.apify_service = ApifyService()
         self.logger = LoggerService()
     
-    def scrape_single_url(self, url: str, url_type: str, max_posts: int = 20) -> list[dict]:
-        """Scrapuje posty z pojedynczego URL"""
-        self.logger.add_log(f"Scrapuję {url_type}: {url}")
+    def scrape_single_url(self, url: str, url_type: str, max_posts: int = 20,
+                          newer_than: str = None, older_than: str = None) -> list[dict]:
+        """Scrapuje posty z pojedynczego URL (opcjonalnie tylko z zakresu dat)"""
+        return self._scrape_single_url(url, url_type, max_posts, newer_than, older_than)[0]
+    
+    def _scrape_single_url(self, url: str, url_type: str, max_posts: int,
+                           newer_than: str = None, older_than: str = None) -> tuple[list[dict], int]:
+        """Jak scrape_single_url; dodatkowo liczba elementów zwróconych przez aktora (przed filter_results)"""
+        self.logger.add_log(f"Scrapuję {url_type}: {url}" + (f" (nowsze niż {newer_than})" if newer_than else ""))
         
         try:
-            results = self.apify_service.run_facebook_scraper([url], max_posts)
+            results = self.apify_service.run_facebook_scraper(
+                [url], max_posts, newer_than=newer_than, older_than=older_than
+            )
             filtered = self.filter_results(results)
-            return filtered
+            return filtered, len(results)
         except Exception as e:
             self.logger.add_log(f"Błąd scrapingu {url}: {str(e)}", "ERROR")
-            return []
+            return [], 0
     
     def scrape_urls_parallel(self, urls: list[str], url_type: str, max_posts_per_url: int = 20) -> list[dict]:
         """Scrapuje wiele URL-i równolegle"""
-        if not urls:
-            return []
+        results_by_url = self.scrape_sources([{"url": url} for url in urls], url_type, max_posts_per_url)
         
-        self.logger.add_log(f"Scrapuję {len(urls)} {url_type}(ów) równolegle")
+        # Usuń duplikaty
+        return self.remove_duplicates([item for items in results_by_url.values() for item in items])
+    
+    def scrape_sources(self, sources: list[dict], url_type: str, max_posts_per_url: int = 20,
+                       older_than: str = None, raw_counts: dict = None) -> dict:
+        """
+        Scrapuje URL-e równolegle (sources: [{url, newer_than?, older_than?, max_posts?}] - opcjonalnie
+        zakres dat i limit per URL).
+        Zwraca wyniki per URL: {url: [item]} - statystyki uzysku źródeł i high-water marki.
+        raw_counts (opcjonalnie) dostaje liczbę elementów aktora per URL przed filtrowaniem -
+        pełna strona z odrzuconymi elementami nie oznacza wyczerpania źródła.
+        """
+        if not sources:
+            return {}
         
-        all_results = []
-        max_workers = min(2, len(urls))  # Max 2 równoległe (limit pamięci Apify)
+        self.logger.add_log(f"Scrapuję {len(sources)} {url_type}(ów) równolegle")
         
+        results_by_url = {}
+        max_workers = min(2, len(sources))  # Max 2 równoległe (limit pamięci Apify)
+        
+        # Wątki puli dostają kopię kontekstu metryk (etykiety zadania i etapu)
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = {
-                executor.submit(self.scrape_single_url, url, url_type, max_posts_per_url): url
-                for url in urls
+                executor.submit(
+                    bind_context(self._scrape_single_url), source["url"], url_type, source.get("max_posts") or max_posts_per_url,
+                    source.get("newer_than"), source.get("older_than") or older_than
+                ): source["url"]
+                for source in sources
             }
             
             for future in as_completed(futures):
+                url = futures[future]
                 try:
-                    results = future.result()
-                    all_results.extend(results)
+                    results_by_url[url], raw_count = future.result()
                 except Exception as e:
-                    url = futures[future]
                     self.logger.add_log(f"Błąd dla {url}: {str(e)}", "WARNING")
+                    results_by_url[url], raw_count = [], 0
+                if raw_counts is not None:
+                    raw_counts[url] = raw_count
         
-        # Usuń duplikaty
-        return self.remove_duplicates(all_results)
+        return results_by_url
     
     def filter_results(self, items: list[dict]) -> list[dict]:
         """Filtruje wyniki scrapingu"""
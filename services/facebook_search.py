@@ -5,6 +5,7 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 # Dodaj ścieżkę do projektu
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from services.apify_service import ApifyService
+from services.metrics import bind_context
 from services.logger import LoggerService
 
 class FacebookSearchService:
@@ -56,7 +57,7 @@ class FacebookSearchService:
         max_workers = min(3, len(search_queries))
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
             futures = {
-                executor.submit(self.search_facebook_urls, query, brand_name): query
+                executor.submit(bind_context(self.search_facebook_urls), query, brand_name): query
                 for query in search_queries[:10]  # Max 10 zapytań
             }
             
@@ -0,0 +1,240 @@
+"""
+Atrapy Apify i Gemini (offline) - deterministyczne dane do benchmarków i pracy bez kont API
+
+Wybór przez konfigurację: APIFY_BACKEND=fake / GEMINI_BACKEND=fake. Atrapy mają ten sam
+interfejs co używane fragmenty klientów (ApifyClient: actor().call(), run().get(),
+dataset().iterate_items(); GenerativeModel.generate_content().text, także stream=True), więc cała logika
+serwisów (cache, parsowanie odpowiedzi, filtrowanie) działa bez zmian.
+
+Parametry (config): FAKE_LATENCY_MS (średnie opóźnienie wywołania), FAKE_ERROR_RATE
+(odsetek wywołań kończących się wyjątkiem), FAKE_PAYLOAD_SIZE (przybliżony rozmiar
+elementu Apify w bajtach), FAKE_POSTS_PER_URL, FAKE_SEED. Te same wejścia dają zawsze
+te same dane; losowe są tylko opóźnienia i błędy (ze stałym ziarnem).
+"""
+import sys
+import os
+import re
+import json
+import time
+import random
+import hashlib
+import threading
+import itertools
+from datetime import date, datetime, timedelta
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import (
+    FAKE_LATENCY_MS, FAKE_ERROR_RATE, FAKE_PAYLOAD_SIZE, FAKE_POSTS_PER_URL, FAKE_SEED, FAKE_ANCHOR_DATE
+)
+
+_WORDS = (
+    "obsługa cena jakość dostawa aplikacja kontakt zamówienie reklamacja personel lokalizacja "
+    "szybko wolno polecam nie polecam super fatalnie ok zwrot produkt sklep kurier czas oczekiwania "
+    "infrastruktura zajęcia wykładowcy dziekanat parking stołówka akademik rekrutacja opinie"
+).split()
+_POSITIVE = ("polecam", "super", "szybko")
+_NEGATIVE = ("fatalnie", "wolno", "reklamacja", "nie polecam")
+# Aspekty klucza kategorii zwracanego przez atrapę (benchmarki budują z nich dane bez wywołań)
+FAKE_ASPECTS = ["Cena", "Obsługa klienta", "Jakość", "Dostawa", "Aplikacja mobilna", "Lokalizacja"]
+
+def _stable_int(*parts) -> int:
+    """Deterministyczna liczba z dowolnych wartości (niezależna od PYTHONHASHSEED)"""
+    digest = hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).digest()
+    return int.from_bytes(digest[:8], "big")
+
+class _FaultInjector:
+    """Opóźnienie i losowe błędy wywołań (wspólne dla atrap, bezpieczne wątkowo)"""
+    
+    def __init__(self, name: str):
+        self.name = name
+        self._random = random.Random(f"{FAKE_SEED}:{name}")
+        self._lock = threading.Lock()
+    
+    def __call__(self) -> None:
+        with self._lock:
+            latency = self._random.expovariate(1000.0 / FAKE_LATENCY_MS) if FAKE_LATENCY_MS > 0 else 0.0
+            failed = self._random.random() < FAKE_ERROR_RATE
+        if latency:
+            time.sleep(latency)
+        if failed:
+            raise RuntimeError(f"Symulowany błąd backendu {self.name}")
+
+# ========== Apify ==========
+
+class _Obj:
+    """Prosty obiekt z atrybutami (zastępuje klientów podrzędnych ApifyClient)"""
+    def __init__(self, **attrs):
+        self.__dict__.update(attrs)
+
+class FakeApifyClient:
+    """Atrapa ApifyClient - Google Search i Facebook Posts Scraper na deterministycznych danych"""
+    
+    def __init__(self):
+        self._datasets = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._fault = _FaultInjector("apify")
+        self.anchor = (
+            datetime.fromisoformat(FAKE_ANCHOR_DATE) if FAKE_ANCHOR_DATE
+            else datetime.combine(date.today(), datetime.min.time())
+        )
+    
+    def actor(self, actor_id: str):
+        return _Obj(call=lambda run_input=None, timeout_secs=None: self._call(actor_id, run_input or {}))
+    
+    def run(self, run_id: str):
+        return _Obj(get=lambda: {"id": run_id, "status": "SUCCEEDED"})
+    
+    def dataset(self, dataset_id: str):
+        def iterate_items():
+            with self._lock:
+                items = self._datasets.pop(dataset_id, [])
+            return iter(items)
+        return _Obj(iterate_items=iterate_items)
+    
+    def _call(self, actor_id: str, run_input: dict) -> dict:
+        self._fault()
+        if "google-search" in actor_id:
+            items = self._google_search(run_input.get("queries", ""), run_input.get("maxResults", 20))
+        else:
+            items = self._facebook_posts(run_input)
+        
+        with self._lock:
+            run_number = next(self._ids)
+            dataset_id = f"fake-dataset-{run_number}"
+            self._datasets[dataset_id] = items
+        return {"id": f"fake-run-{run_number}", "defaultDatasetId": dataset_id}
+    
+    def _google_search(self, query: str, max_results: int) -> list:
+        """Wyniki organiczne: strony, grupy, wydarzenia i pojedyncze posty z puli zależnej od zapytania"""
+        brand = re.sub(r"[^a-z0-9]+", "", query.split(" site:")[0].lower())[:20] or "marka"
+        seed = _stable_int(FAKE_SEED, query)
+        pool = (
+            [f"https://www.facebook.com/{brand}{i}" for i in range(8)]
+            + [f"https://www.facebook.com/groups/{brand}-grupa{i}" for i in range(8)]
+            + [f"https://www.facebook.com/events/{100000 + i}" for i in range(4)]
+            + [f"https://www.facebook.com/{brand}/posts/{200000 + i}" for i in range(40)]
+        )
+        offset = seed % len(pool)
+        urls = [pool[(offset + i * 7) % len(pool)] for i in range(min(max_results, len(pool)))]
+        return [{"searchQuery": {"term": query}, "organicResults": [{"url": url, "title": url} for url in urls]}]
+    
+    def _facebook_posts(self, run_input: dict) -> list:
+        """Posty URL-i od najnowszego (co ~6 h wstecz od FAKE_ANCHOR_DATE) z filtrem dat i limitem per URL"""
+        items = []
+        for start_url in run_input.get("startUrls") or []:
+            items += self.generate_posts(
+                start_url.get("url", ""), run_input.get("maxPosts", 20),
+                run_input.get("onlyPostsNewerThan"), run_input.get("onlyPostsOlderThan")
+            )
+        return items
+    
+    def generate_posts(self, url: str, max_posts: int, newer_than: str = None, older_than: str = None) -> list:
+        """Posty jednego URL-a (też do budowania danych benchmarków bez wywołania aktora)"""
+        total = 1 if "/posts/" in url else FAKE_POSTS_PER_URL  # Wzmianka to pojedynczy post
+        items = []
+        for index in range(total):
+            posted = self.anchor - timedelta(hours=6 * index + _stable_int(url, index) % 6)
+            day = posted.date().isoformat()
+            if older_than and day >= older_than[:10]:
+                continue
+            if newer_than and day < newer_than[:10]:
+                break
+            items.append(self._post(url, index, posted))
+            if len(items) >= max_posts:
+                break
+        return items
+    
+    def _post(self, url: str, index: int, posted: datetime) -> dict:
+        seed = _stable_int(FAKE_SEED, url, index)
+        rng = random.Random(seed)
+        words = [rng.choice(_WORDS) for _ in range(8 + seed % 30)]
+        post_url = url if "/posts/" in url else f"{url}/posts/{seed % 10 ** 12}"
+        item = {
+            "url": post_url,
+            "facebookUrl": url,
+            "text": " ".join(words).capitalize() + ".",
+            "time": posted.isoformat(),
+            "user": {"name": f"Użytkownik {seed % 997}"},
+            "likes": seed % 500,
+            "comments": seed % 40,
+            "shares": seed % 25,
+        }
+        # Dopełnienie do FAKE_PAYLOAD_SIZE (surowe elementy Apify są duże - zdjęcia, reakcje, linki)
+        padding = FAKE_PAYLOAD_SIZE - len(json.dumps(item, ensure_ascii=False))
+        if padding > 0:
+            item["media"] = [{"thumbnail": f"https://scontent.example/{seed}/{i}.jpg"} for i in range(padding // 48 + 1)]
+        return item
+
+# ========== Gemini ==========
+
+class FakeGenerativeModel:
+    """Atrapa genai.GenerativeModel - odpowiedź dobierana po rodzaju promptu"""
+    
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._fault = _FaultInjector(f"gemini:{model_name}")
+    
+    def generate_content(self, prompt: str, stream: bool = False):
+        self._fault()
+        text = self._respond(prompt)
+        if stream:
+            return self._chunks(text)
+        return _Obj(text=text)
+    
+    def _chunks(self, text: str, size: int = 200):
+        """Odpowiedź strumieniowa (stream=True): fragmenty tekstu jak kolejne GenerateContentResponse"""
+        for start in range(0, len(text), size):
+            if FAKE_LATENCY_MS > 0:
+                time.sleep(FAKE_LATENCY_MS / 1000.0 / 10)
+            yield _Obj(text=text[start:start + size])
+    
+    def _respond(self, prompt: str) -> str:
+        if "<komentarz_do_oceny>" in prompt:
+            return self._classify(prompt)
+        if "Analizy Aspektowej" in prompt:
+            return json.dumps(
+                [{"aspekt": aspect, "definicja": f"Opinie dotyczące: {aspect.lower()}"} for aspect in FAKE_ASPECTS],
+                ensure_ascii=False
+            )
+        if "Weryfikacja relevancy" in prompt:
+            post = prompt.split("<post>", 1)[-1].split("</post>", 1)[0]
+            valid = _stable_int(FAKE_SEED, post) % 10 != 0  # ~90% postów na temat marki
+            return json.dumps({"valid": valid, "relevant_to_brand": valid, "reason": "Atrapa weryfikacji"})
+        if '"queries"' in prompt:
+            brand = re.search(r'marki/organizacji "([^"]+)"', prompt)
+            name = brand.group(1) if brand else "marka"
+            return json.dumps({"queries": [f"{name} {suffix}" for suffix in ("opinie", "grupa", "wydarzenie", "forum")]},
+                              ensure_ascii=False)
+        if "# Raport Analizy Komentarzy" in prompt:
+            return self._report(prompt)
+        return "{}"
+    
+    def _classify(self, prompt: str) -> str:
+        key = prompt.split("<klucz_kategorii>", 1)[-1].split("</klucz_kategorii>", 1)[0]
+        comment = prompt.split("<komentarz_do_oceny>", 1)[-1].split("</komentarz_do_oceny>", 1)[0].lower()
+        aspects = re.findall(r'"aspekt"\s*:\s*"([^"]+)"', key) or ["Inne"]
+        seed = _stable_int(FAKE_SEED, comment)
+        if any(word in comment for word in _NEGATIVE):
+            sentiment = "negatywny"
+        elif any(word in comment for word in _POSITIVE):
+            sentiment = "pozytywny"
+        else:
+            sentiment = ("pozytywny", "neutralny", "negatywny")[seed % 3]
+        return json.dumps({"kategoria": aspects[seed % len(aspects)], "sentiment": sentiment}, ensure_ascii=False)
+    
+    def _report(self, prompt: str) -> str:
+        title = re.search(r"# Raport Analizy Komentarzy - .*", prompt)
+        sections = [
+            title.group(0) if title else "# Raport Analizy Komentarzy",
+            "## Podsumowanie wykonawcze",
+            "Raport wygenerowany przez atrapę Gemini (tryb offline).",
+            "## Analiza statystyczna",
+            "[WYKRES_SENTIMENT]",
+            "[WYKRES_KATEGORIE]",
+            "## Analiza kategorii",
+        ]
+        sections += [line for line in prompt.splitlines() if line.startswith("- ") and "komentarzy" in line][:10]
+        sections += ["## Wnioski i rekomendacje", "- Kontynuować monitoring marki."]
+        return "\n\n".join(sections)
@@ -1,11 +1,12 @@
 import json
 import sys
 import os
-import google.generativeai as genai
+import threading
 
 # Dodaj ścieżkę do projektu
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import GEMINI_API_KEY
+from config import GEMINI_API_KEY, GEMINI_BACKEND
+from services.metrics import MetricsService
 
 # Prompt dla ABSA (analityk marketingowy)
 PROMPT_ABSA = """Jesteś analitykiem marketingowym (Customer Experience analyst) badającym opinie klientów na temat "{brand_name}".
@@ -33,6 +34,78 @@ Zwróć wynik wyłącznie jako listę JSON, według schematu:
 
 Wygeneruj 5-7 aspektów na podstawie analizy wszystkich opinii."""
 
+# Prompt dla klasyfikacji pojedynczego komentarza (Agent 3)
+PROMPT_CLASSIFICATION = """Jesteś ekspertem w klasyfikacji tekstu i analizie sentymentu. Otrzymujesz klucz kategoryzacyjny oraz jeden komentarz do oceny.
+
+<klucz_kategorii>
+{category_key}
+</klucz_kategorii>
+
+<komentarz_do_oceny>
+{comment}
+</komentarz_do_oceny>
+
+Wykonaj DWA zadania:
+1. Przypisz komentarz do DOKŁADNIE JEDNEJ kategorii z klucza (użyj pola "aspekt").
+2. Oceń sentiment (tonację emocjonalną) komentarza jako: "pozytywny", "negatywny" lub "neutralny".
+
+Zwróć wynik w formacie JSON:
+{{
+  "kategoria": "nazwa_aspektu",
+  "sentiment": "pozytywny/negatywny/neutralny"
+}}
+
+Nie dodawaj żadnych innych wyjaśnień, tylko czysty JSON."""
+
+class InstrumentedModel:
+    """
+    Model Gemini z pomiarem każdego generate_content (metryki external_call_seconds).
+    Klient (google.generativeai lub atrapa) powstaje przy pierwszym wywołaniu - sam import
+    biblioteki Gemini trwa ok. 1 s, a start aplikacji i workerów nie musi na niego czekać.
+    """
+    
+    def __init__(self, factory, model_name: str):
+        self._factory = factory
+        self._model = None
+        self._lock = threading.Lock()
+        self.model_name = model_name
+        self.metrics = MetricsService()
+    
+    @property
+    def model(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._model = self._factory(self.model_name)
+        return self._model
+    
+    def generate_content(self, *args, **kwargs):
+        if kwargs.get("stream"):
+            return self._stream(*args, **kwargs)
+        with self.metrics.external_call("gemini", self.model_name):
+            return self.model.generate_content(*args, **kwargs)
+    
+    def _stream(self, *args, **kwargs):
+        """stream=True: fragmenty odpowiedzi; pomiar obejmuje całe odczytanie strumienia"""
+        with self.metrics.external_call("gemini", self.model_name):
+            yield from self.model.generate_content(*args, **kwargs)
+
+def _live_model(model_name: str):
+    """genai.GenerativeModel - biblioteka importowana dopiero przy pierwszym wywołaniu Gemini"""
+    if not GEMINI_API_KEY:
+        raise ValueError("GEMINI_API_KEY nie jest ustawiony w zmiennych środowiskowych")
+    import google.generativeai as genai
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai.GenerativeModel(model_name)
+
+def _fake_model(model_name: str):
+    from services.fake_backends import FakeGenerativeModel
+    return FakeGenerativeModel(model_name)
+
+def create_model(model_name: str):
+    """Model Gemini według konfiguracji: prawdziwe API albo atrapa offline (GEMINI_BACKEND=fake)"""
+    return InstrumentedModel(_fake_model if GEMINI_BACKEND == "fake" else _live_model, model_name)
+
 class GeminiService:
     """Serwis Gemini - integracja z Google Gemini API"""
     _instance = None
@@ -47,9 +120,8 @@ class GeminiService:
         if self._initialized:
             return
         
-        genai.configure(api_key=GEMINI_API_KEY)
-        self.flash_model = genai.GenerativeModel('gemini-2.5-flash')
-        self.flash_lite_model = genai.GenerativeModel('gemini-2.5-flash-lite')
+        self.flash_model = create_model('gemini-2.5-flash')
+        self.flash_lite_model = create_model('gemini-2.5-flash-lite')
         self._initialized = True
     
     def generate_category_key(self, comments: list[str], brand_name: str) -> dict:
@@ -71,6 +143,35 @@ class GeminiService:
         # Parsuj JSON
         return self.parse_json_response(response_text)
     
+    def classify_comment(self, comment_text: str, categories: list[dict]) -> dict:
+        """
+        Agent 3: Klasyfikuje pojedynczy komentarz (kategoria + sentiment)
+        Używa: gemini-2.5-flash-lite
+        
+        Zwraca: {"category": str, "sentiment": str}
+        """
+        category_key_text = json.dumps(categories, ensure_ascii=False, indent=2)
+        prompt = PROMPT_CLASSIFICATION.format(category_key=category_key_text, comment=comment_text)
+        
+        response = self.flash_lite_model.generate_content(prompt)
+        parsed = self.parse_json_response(response.text.strip())
+        
+        if isinstance(parsed, list):
+            result = parsed[0] if len(parsed) > 0 else {}
+        else:
+            result = parsed if isinstance(parsed, dict) else {}
+        
+        category = result.get('kategoria', result.get('aspekt', 'Nieznana'))
+        sentiment = result.get('sentiment', 'neutralny').lower()
+        
+        if sentiment not in ['pozytywny', 'negatywny', 'neutralny']:
+            sentiment = 'neutralny'
+        
+        return {
+            'category': category,
+            'sentiment': sentiment
+        }
+    
     def parse_json_response(self, response_text: str):
         """Parsuje JSON z odpowiedzi Gemini - ulepszona wersja (może zwrócić list lub dict)"""
         original_text = response_text
@@ -198,7 +299,7 @@ Post jest WAŻNY jeśli:
 - Post dotyczy marki "{brand_name}"
 
 Jeśli warunek nie jest spełniony, ustaw "valid": false."""
-
+        
         try:
             response = self.flash_lite_model.generate_content(prompt)
             response_text = response.text.strip()
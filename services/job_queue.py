@@ -0,0 +1,306 @@
+"""
+Trwała kolejka zadań w SQLite - zastępuje ThreadPoolExecutor w procesie Flask
+
+Każde zadanie trafia do jednej z kolejek (scraping/classification/report), ma priorytet
+i jest pobierane przez workera na zasadzie dzierżawy (lease) odnawianej heartbeatem.
+Zadania z wygasłą dzierżawą (np. po restarcie procesu) są automatycznie przejmowane
+przez innego workera, więc nic nie ginie przy restarcie.
+
+Utrata dzierżawy nie przerywa wątku handlera - worker ustawia flagę w kontekście zadania,
+a długie pętle (klasyfikacja, scraping, etapy workflow) wywołują check_lease() i kończą się
+wyjątkiem LeaseLostError, zanim zadanie wykona się drugi raz równolegle z nowym właścicielem.
+"""
+import sys
+import os
+import json
+import socket
+import threading
+import contextvars
+from datetime import datetime, timedelta
+from typing import Optional, List, Dict
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from services.database_service import DatabaseService
+
+# Kolejki (osobne pule workerów)
+QUEUE_SCRAPING = "scraping"
+QUEUE_CLASSIFICATION = "classification"
+QUEUE_REPORT = "report"
+QUEUES = [QUEUE_SCRAPING, QUEUE_CLASSIFICATION, QUEUE_REPORT]
+
+# Priorytety (wyższy = wcześniej)
+PRIORITY_LOW = 0
+PRIORITY_NORMAL = 5
+PRIORITY_HIGH = 10
+
+# Statusy zadań scrapingu w toku - nieudane zadanie kolejki przestawia je na "failed"
+ACTIVE_JOB_STATUSES = ("pending", "scraping", "classifying")
+
+_lease_lost = contextvars.ContextVar("task_lease_lost", default=None)
+
+class LeaseLostError(RuntimeError):
+    """Dzierżawa zadania przeszła na innego workera (lub wygasła) - wykonanie przerwane"""
+
+def bind_lease(lost: threading.Event) -> contextvars.Token:
+    """Ustawia flagę utraty dzierżawy dla bieżącego kontekstu (worker przed wywołaniem handlera)"""
+    return _lease_lost.set(lost)
+
+def reset_lease(token: contextvars.Token) -> None:
+    _lease_lost.reset(token)
+
+def check_lease() -> None:
+    """Przerywa handler (LeaseLostError), jeśli worker utracił dzierżawę; poza workerem nic nie robi"""
+    lost = _lease_lost.get()
+    if lost is not None and lost.is_set():
+        raise LeaseLostError("Utracono dzierżawę zadania - przejął je inny worker")
+
+class JobQueueService:
+    """Serwis trwałej kolejki zadań (SQLite) z priorytetami i dzierżawami"""
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        self.db = DatabaseService()
+        self.retry_delay_seconds = 30  # Bazowe opóźnienie ponowienia (rośnie z liczbą prób)
+        self._init_schema()
+        
+        self._initialized = True
+    
+    def _init_schema(self):
+        """Inicjalizuje tabelę kolejki"""
+        with self.db.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS task_queue (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    queue TEXT NOT NULL,
+                    task_type TEXT NOT NULL,
+                    job_id TEXT,
+                    payload TEXT,  -- JSON string
+                    priority INTEGER NOT NULL DEFAULT 0,
+                    status TEXT NOT NULL DEFAULT 'queued',  -- queued/running/done/failed
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    max_attempts INTEGER NOT NULL DEFAULT 3,
+                    lease_owner TEXT,
+                    lease_expires_at TEXT,
+                    heartbeat_at TEXT,
+                    available_at TEXT NOT NULL,
+                    last_error TEXT,
+                    created_at TEXT NOT NULL,
+                    started_at TEXT,
+                    finished_at TEXT
+                )
+            """)
+            conn.execute("""
+                CREATE INDEX IF NOT EXISTS idx_task_queue_claim
+                ON task_queue(queue, status, priority DESC, id)
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_task_queue_job_id ON task_queue(job_id)")
+    
+    def enqueue(
+        self,
+        queue: str,
+        task_type: str,
+        job_id: Optional[str] = None,
+        payload: Optional[dict] = None,
+        priority: int = PRIORITY_NORMAL,
+        max_attempts: int = 3,
+        dedupe: bool = True
+    ) -> int:
+        """
+        Dodaje zadanie do kolejki i zwraca jego id.
+        dedupe=True: jeśli to samo zadanie (typ + job_id) czeka lub trwa, zwraca istniejące id.
+        """
+        if queue not in QUEUES:
+            raise ValueError(f"Nieznana kolejka: {queue}")
+        
+        now = datetime.now().isoformat()
+        with self.db.get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            
+            if dedupe and job_id:
+                row = conn.execute("""
+                    SELECT id FROM task_queue
+                    WHERE task_type = ? AND job_id = ? AND status IN ('queued', 'running')
+                    ORDER BY id LIMIT 1
+                """, (task_type, job_id)).fetchone()
+                if row:
+                    return row['id']
+            
+            cursor = conn.execute("""
+                INSERT INTO task_queue
+                (queue, task_type, job_id, payload, priority, max_attempts, available_at, created_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (
+                queue,
+                task_type,
+                job_id,
+                json.dumps(payload or {}, ensure_ascii=False),
+                priority,
+                max_attempts,
+                now,
+                now
+            ))
+            return cursor.lastrowid
+    
+    def claim(self, queue: str, worker_id: str, lease_seconds: int) -> Optional[Dict]:
+        """
+        Atomowo pobiera następne zadanie z kolejki (najwyższy priorytet, potem FIFO).
+        Przejmuje również zadania, których dzierżawa wygasła (martwy worker).
+        """
+        now = datetime.now()
+        now_iso = now.isoformat()
+        lease_expires = (now + timedelta(seconds=lease_seconds)).isoformat()
+        
+        with self.db.get_connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            
+            # Zadania z wygasłą dzierżawą i wyczerpanym limitem prób - oznacz jako nieudane (razem z zadaniem scrapingu)
+            expired = conn.execute("""
+                SELECT id, job_id, last_error FROM task_queue
+                WHERE queue = ? AND status = 'running' AND lease_expires_at < ? AND attempts >= max_attempts
+            """, (queue, now_iso)).fetchall()
+            for row in expired:
+                error = row['last_error'] or 'Dzierżawa wygasła (worker przerwany)'
+                conn.execute("""
+                    UPDATE task_queue SET status = 'failed', finished_at = ?, last_error = ?, lease_expires_at = NULL
+                    WHERE id = ?
+                """, (now_iso, error, row['id']))
+                self._fail_job(conn, row['job_id'], error, now_iso)
+            
+            row = conn.execute("""
+                SELECT * FROM task_queue
+                WHERE queue = ?
+                  AND ((status = 'queued' AND available_at <= ?)
+                       OR (status = 'running' AND lease_expires_at < ?))
+                ORDER BY priority DESC, id
+                LIMIT 1
+            """, (queue, now_iso, now_iso)).fetchone()
+            
+            if not row:
+                return None
+            
+            conn.execute("""
+                UPDATE task_queue
+                SET status = 'running', lease_owner = ?, lease_expires_at = ?, heartbeat_at = ?,
+                    attempts = attempts + 1, started_at = ?
+                WHERE id = ?
+            """, (worker_id, lease_expires, now_iso, now_iso, row['id']))
+            
+            task = self._row_to_dict(row)
+            task['attempts'] += 1
+            task['lease_owner'] = worker_id
+            return task
+    
+    def heartbeat(self, task_id: int, worker_id: str, lease_seconds: int) -> bool:
+        """Przedłuża dzierżawę; False jeśli zadanie przejął inny worker lub zostało już zamknięte"""
+        now = datetime.now()
+        updated = self.db.execute_update("""
+            UPDATE task_queue SET lease_expires_at = ?, heartbeat_at = ?
+            WHERE id = ? AND lease_owner = ? AND status = 'running'
+        """, ((now + timedelta(seconds=lease_seconds)).isoformat(), now.isoformat(), task_id, worker_id))
+        return updated > 0
+    
+    def complete(self, task_id: int, worker_id: str) -> None:
+        """Oznacza zadanie jako wykonane"""
+        self.db.execute_update("""
+            UPDATE task_queue SET status = 'done', finished_at = ?, lease_expires_at = NULL
+            WHERE id = ? AND lease_owner = ?
+        """, (datetime.now().isoformat(), task_id, worker_id))
+    
+    def fail(self, task_id: int, worker_id: str, error: str) -> None:
+        """Zapisuje błąd; zadanie wraca do kolejki z opóźnieniem, dopóki nie wyczerpie prób"""
+        now = datetime.now()
+        with self.db.get_connection() as conn:
+            row = conn.execute(
+                "SELECT attempts, max_attempts FROM task_queue WHERE id = ? AND lease_owner = ?",
+                (task_id, worker_id)
+            ).fetchone()
+            if not row:
+                return
+            
+            if row['attempts'] < row['max_attempts']:
+                retry_at = now + timedelta(seconds=self.retry_delay_seconds * row['attempts'])
+                conn.execute("""
+                    UPDATE task_queue
+                    SET status = 'queued', last_error = ?, available_at = ?,
+                        lease_owner = NULL, lease_expires_at = NULL
+                    WHERE id = ?
+                """, (error, retry_at.isoformat(), task_id))
+            else:
+                conn.execute("""
+                    UPDATE task_queue
+                    SET status = 'failed', last_error = ?, finished_at = ?, lease_expires_at = NULL
+                    WHERE id = ?
+                """, (error, now.isoformat(), task_id))
+                job_row = conn.execute("SELECT job_id FROM task_queue WHERE id = ?", (task_id,)).fetchone()
+                self._fail_job(conn, job_row['job_id'] if job_row else None, error, now.isoformat())
+    
+    @staticmethod
+    def _fail_job(conn, job_id: Optional[str], error: str, now_iso: str) -> None:
+        """Zadanie scrapingu w toku -> failed (inaczej UI czeka w nieskończoność na martwe zadanie)"""
+        if not job_id:
+            return
+        placeholders = ", ".join("?" * len(ACTIVE_JOB_STATUSES))
+        conn.execute(f"""
+            UPDATE jobs SET status = 'failed', error_message = ?, updated_at = ?
+            WHERE job_id = ? AND status IN ({placeholders})
+        """, (f"Zadanie w tle nie powiodło się: {error.splitlines()[0] if error else ''}", now_iso, job_id,
+              *ACTIVE_JOB_STATUSES))
+    
+    def get_task(self, task_id: int) -> Optional[Dict]:
+        """Zwraca zadanie po id"""
+        rows = self.db.execute_query("SELECT * FROM task_queue WHERE id = ?", (task_id,))
+        return self._row_to_dict(rows[0]) if rows else None
+    
+    def has_active_tasks(self, job_id: str, queues: Optional[List[str]] = None) -> bool:
+        """
+        Czy zadanie scrapingu ma zadanie kolejki oczekujące lub wykonywane (z dzierżawą) - także w innym procesie.
+        queues zawęża sprawdzenie do wybranych kolejek.
+        """
+        query = "SELECT 1 FROM task_queue WHERE job_id = ? AND status IN ('queued', 'running')"
+        params = [job_id]
+        if queues:
+            query += f" AND queue IN ({', '.join('?' for _ in queues)})"
+            params.extend(queues)
+        return bool(self.db.execute_query(query + " LIMIT 1", tuple(params)))
+    
+    def get_tasks_for_job(self, job_id: str) -> List[Dict]:
+        """Zwraca zadania powiązane z zadaniem scrapingu"""
+        rows = self.db.execute_query("SELECT * FROM task_queue WHERE job_id = ? ORDER BY id", (job_id,))
+        return [self._row_to_dict(row) for row in rows]
+    
+    def get_stats(self) -> Dict[str, Dict[str, int]]:
+        """Liczba zadań per kolejka i status"""
+        stats = {queue: {'queued': 0, 'running': 0, 'done': 0, 'failed': 0} for queue in QUEUES}
+        rows = self.db.execute_query("""
+            SELECT queue, status, COUNT(*) as cnt FROM task_queue GROUP BY queue, status
+        """)
+        for row in rows:
+            stats.setdefault(row['queue'], {})[row['status']] = row['cnt']
+        return stats
+    
+    def purge_finished(self, older_than_days: int = 7) -> int:
+        """Usuwa zakończone zadania starsze niż podana liczba dni"""
+        cutoff = (datetime.now() - timedelta(days=older_than_days)).isoformat()
+        return self.db.execute_update("""
+            DELETE FROM task_queue WHERE status IN ('done', 'failed') AND finished_at < ?
+        """, (cutoff,))
+    
+    @staticmethod
+    def make_worker_id(queue: str, index: int) -> str:
+        """Identyfikator workera unikalny w obrębie hosta"""
+        return f"{socket.gethostname()}:{os.getpid()}:{queue}-{index}"
+    
+    def _row_to_dict(self, row) -> Dict:
+        task = dict(row)
+        task['payload'] = json.loads(task['payload']) if task.get('payload') else {}
+        return task
@@ -1,4 +1,5 @@
 import threading
+from datetime import datetime
 from typing import Dict, Optional
 from models.scraping_job import ScrapingJob
 from services.database_service import DatabaseService
@@ -25,15 +26,26 @@ class JobStorageService:
     def save(self, job: ScrapingJob) -> None:
         """Zapisuje zadanie do bazy danych i cache"""
         with self._lock:
+            job.updated_at = datetime.now()
             self.db.save_job(job)
             self._cache[job.job_id] = job
     
     def get(self, job_id: str) -> Optional[ScrapingJob]:
-        """Pobiera zadanie po ID (najpierw z cache, potem z bazy)"""
+        """
+        Pobiera zadanie po ID (najpierw z cache, potem z bazy).
+        Wpis w cache jest aktualny tylko, jeśli updated_at w bazie się nie zmienił -
+        zadanie mógł zmodyfikować worker w innym procesie.
+        """
         with self._lock:
             # Sprawdź cache
-            if job_id in self._cache:
-                return self._cache[job_id]
+            cached = self._cache.get(job_id)
+            if cached is not None:
+                db_updated_at = self.db.get_job_updated_at(job_id)
+                if db_updated_at is None:
+                    del self._cache[job_id]
+                    return None
+                if db_updated_at == cached.updated_at.isoformat():
+                    return cached
             
             # Wczytaj z bazy
             job = self.db.load_job(job_id)
@@ -44,9 +56,17 @@ class JobStorageService:
     def update(self, job: ScrapingJob) -> None:
         """Aktualizuje istniejące zadanie"""
         with self._lock:
+            job.updated_at = datetime.now()
             self.db.save_job(job)  # INSERT OR REPLACE
             self._cache[job.job_id] = job
     
+    def update_state(self, job: ScrapingJob) -> None:
+        """Zapisuje tylko status i postęp zadania (tani zapis w pętlach)"""
+        with self._lock:
+            job.updated_at = datetime.now()
+            self.db.update_job_state(job)
+            self._cache[job.job_id] = job
+    
     def get_all(self) -> list[ScrapingJob]:
         """Zwraca wszystkie zadania z bazy danych"""
         with self._lock:
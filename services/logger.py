@@ -1,6 +1,33 @@
+"""
+Logger systemu - strukturalne wpisy w buforze cyklicznym
+
+Wpisy (LogEntry) trafiają do deque o stałej długości (dopisanie O(1), najstarsze wpisy
+wypadają same) oraz do indeksów per poziom i per zadanie - odczyt logów jednego zadania
+lub poziomu nie przegląda całego bufora. Zadanie jest przypisywane z kontekstu metryk
+(etap workflow), więc wywołania add_log nie muszą przekazywać job_id.
+
+Odczyt kursorem (read(after=seq)) zwraca tylko wpisy nowsze niż ostatnio widziany.
+Opcjonalny sink (LOG_SINK=file|sqlite) zapisuje wpisy w osobnym wątku - add_log
+tylko wrzuca wpis do kolejki.
+"""
+import sys
+import os
+import json
+import queue
+import atexit
 import threading
+from collections import deque, OrderedDict
 from datetime import datetime
-from typing import List
+from typing import List, Dict, Optional
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import LOG_BUFFER_SIZE, LOG_JOB_BUFFER_SIZE, LOG_SINK, LOG_SINK_PATH
+from models.log_entry import LogEntry
+from services.metrics import MetricsService
+
+MAX_JOB_STREAMS = 200  # Strumienie najdawniej aktywnych zadań są usuwane z pamięci
+SINK_BATCH_SIZE = 500
 
 class LoggerService:
     """Thread-safe system logowania"""
@@ -18,35 +45,180 @@ class LoggerService:
     def __init__(self):
         if self._initialized:
             return
-        self._logs: List[str] = []
+        self._max_logs = LOG_BUFFER_SIZE
+        self._entries: deque = deque(maxlen=self._max_logs)
+        self._by_level: Dict[str, deque] = {}
+        self._by_job: "OrderedDict[str, deque]" = OrderedDict()
+        self._seq = 0
         self._logs_lock = threading.Lock()
-        self._max_logs = 1000
+        self._sink = _AsyncSink(LOG_SINK, LOG_SINK_PATH) if LOG_SINK in ("file", "sqlite") else None
         self._initialized = True
     
-    def add_log(self, message: str, level: str = "INFO"):
-        """Dodaj log"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_entry = f"[{timestamp}] [{level}] {message}"
+    def add_log(self, message: str, level: str = "INFO", job_id: Optional[str] = None) -> LogEntry:
+        """Dodaj log (zadanie domyślnie z kontekstu bieżącego etapu)"""
+        job_id = job_id or MetricsService.current_job_id()
         
         with self._logs_lock:
-            self._logs.append(log_entry)
-            # Ogranicz liczbę logów
-            if len(self._logs) > self._max_logs:
-                self._logs = self._logs[-self._max_logs:]
+            self._seq += 1
+            entry = LogEntry(self._seq, datetime.now(), level, message, job_id)
+            self._entries.append(entry)
+            
+            level_entries = self._by_level.get(level)
+            if level_entries is None:
+                level_entries = self._by_level[level] = deque(maxlen=self._max_logs)
+            level_entries.append(entry)
+            
+            if job_id:
+                job_entries = self._by_job.get(job_id)
+                if job_entries is None:
+                    job_entries = self._by_job[job_id] = deque(maxlen=LOG_JOB_BUFFER_SIZE)
+                    if len(self._by_job) > MAX_JOB_STREAMS:
+                        self._by_job.popitem(last=False)
+                else:
+                    self._by_job.move_to_end(job_id)
+                job_entries.append(entry)
         
-        return log_entry
+        if self._sink:
+            self._sink.put(entry)
+        return entry
+    
+    def read(self, after: int = 0, job_id: Optional[str] = None, level: Optional[str] = None,
+             limit: int = 200) -> Dict:
+        """
+        Wpisy nowsze niż kursor `after` (numer ostatnio odczytanego wpisu), najstarsze najpierw.
+        Zwraca {"entries", "next_cursor", "missed"} - missed=True, gdy część wpisów po kursorze
+        wypadła już z bufora (czytelnik nie nadążył).
+        """
+        with self._logs_lock:
+            if job_id:
+                source = self._by_job.get(job_id, ())
+            elif level:
+                source = self._by_level.get(level, ())
+            else:
+                source = self._entries
+            
+            # Od końca do kursora - przy śledzeniu logów na bieżąco tylko nowe wpisy
+            newer = []
+            for entry in reversed(source):
+                if entry.seq <= after:
+                    break
+                if level and entry.level != level:
+                    continue
+                newer.append(entry)
+            # Pełny bufor z najstarszym wpisem dalej niż kursor - część wpisów już wypadła
+            missed = bool(source) and len(source) == source.maxlen and source[0].seq > after + 1
+            last_seq = self._seq
+        
+        newer.reverse()
+        page = newer[:limit]
+        if len(newer) > limit:
+            next_cursor = page[-1].seq
+        else:
+            # Wszystko po kursorze przejrzane - kolejny odczyt zaczyna od bieżącego końca
+            next_cursor = max(after, last_seq)
+        return {
+            "entries": [entry.to_dict() for entry in page],
+            "next_cursor": next_cursor,
+            "missed": missed
+        }
     
     def get_logs(self) -> List[str]:
         """Pobierz wszystkie logi"""
         with self._logs_lock:
-            return self._logs.copy()
+            entries = list(self._entries)
+        return [entry.format() for entry in entries]
     
     def clear_logs(self):
-        """Wyczyść logi"""
+        """Wyczyść logi (numeracja kursorów jest kontynuowana)"""
         with self._logs_lock:
-            self._logs.clear()
+            self._entries.clear()
+            self._by_level.clear()
+            self._by_job.clear()
     
     def get_logs_by_level(self, level: str) -> List[str]:
         """Filtruj po poziomie"""
         with self._logs_lock:
-            return [log for log in self._logs if f"[{level}]" in log]
+            entries = list(self._by_level.get(level, ()))
+        return [entry.format() for entry in entries]
+    
+    def get_job_logs(self, job_id: str) -> List[str]:
+        """Logi jednego zadania (ostatnie LOG_JOB_BUFFER_SIZE wpisów)"""
+        with self._logs_lock:
+            entries = list(self._by_job.get(job_id, ()))
+        return [entry.format() for entry in entries]
+
+class _AsyncSink:
+    """Zapis logów w tle: plik JSONL lub tabela app_logs (partiami, poza wątkiem wywołującym)"""
+    
+    def __init__(self, kind: str, path: str):
+        self.kind = kind
+        self.path = path or os.path.join(
+            os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'logs', 'socialpure.jsonl'
+        )
+        self._queue: "queue.SimpleQueue[Optional[LogEntry]]" = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._run, name="log-sink", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+    
+    def put(self, entry: LogEntry) -> None:
+        self._queue.put(entry)
+    
+    def close(self) -> None:
+        """Dopisuje zaległe wpisy przy zamykaniu procesu"""
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+    
+    def _run(self):
+        write = self._open()
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < SINK_BATCH_SIZE:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            
+            closing = None in batch
+            entries = [entry for entry in batch if entry is not None]
+            if entries:
+                try:
+                    write(entries)
+                except Exception as e:
+                    # Logi w pamięci nadal działają - błąd zapisu nie może zatrzymać aplikacji
+                    print(f"Błąd zapisu logów ({self.kind}): {e}", file=sys.stderr)
+            if closing:
+                return
+    
+    def _open(self):
+        pid = os.getpid()
+        if self.kind == "sqlite":
+            from services.database_service import DatabaseService
+            db = DatabaseService()
+            with db.get_connection() as conn:
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS app_logs (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        created_at TEXT NOT NULL,
+                        level TEXT NOT NULL,
+                        job_id TEXT,
+                        message TEXT NOT NULL,
+                        pid INTEGER NOT NULL
+                    )
+                """)
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_app_logs_job ON app_logs(job_id, id)")
+            
+            def write_rows(entries: List[LogEntry]):
+                with db.get_connection() as conn:
+                    conn.executemany(
+                        "INSERT INTO app_logs (created_at, level, job_id, message, pid) VALUES (?, ?, ?, ?, ?)",
+                        [(e.timestamp.isoformat(), e.level, e.job_id, e.message, pid) for e in entries]
+                    )
+            return write_rows
+        
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        
+        def write_lines(entries: List[LogEntry]):
+            with open(self.path, 'a', encoding='utf-8') as f:
+                for entry in entries:
+                    f.write(json.dumps({**entry.to_dict(), "pid": pid}, ensure_ascii=False) + "\n")
+        return write_lines
@@ -0,0 +1,425 @@
+"""
+Metryki zadań - liczniki, histogramy i spany z etykietami zadania, etapu i usługi zewnętrznej
+
+Kontekst (job_id, etap, bieżący span) jest trzymany w contextvars: WorkflowOrchestrator
+otwiera metrics.stage() dla każdego etapu, a wszystko, co zostanie zmierzone w jego trakcie
+(wywołania Gemini i aktorów Apify są opakowane automatycznie), dostaje etykiety zadania.
+Wątki pomocnicze dziedziczą kontekst przez bind_context().
+
+Pomiary są agregowane w pamięci i co METRICS_FLUSH_SECONDS (oraz na końcu etapu) dopisywane
+do tabel job_metrics (agregaty per zadanie + etykiety) i job_spans (przebieg etapów i kroków).
+Zapis w bazie sprawia, że widać też pomiary workerów z osobnych procesów.
+"""
+import sys
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+import functools
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional, List, Dict
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import METRICS_ENABLED, METRICS_FLUSH_SECONDS
+from services.database_service import DatabaseService
+
+KIND_COUNTER = "counter"
+KIND_HISTOGRAM = "histogram"
+
+# Górne granice kubełków histogramów czasu (sekundy)
+BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0]
+
+PROMETHEUS_PREFIX = "socialpure_"
+MAX_SPANS_PER_JOB = 1000  # Dalsze spany są tylko agregowane w histogramie span_seconds
+
+_job_id = contextvars.ContextVar("metrics_job_id", default=None)
+_stage = contextvars.ContextVar("metrics_stage", default=None)
+_span = contextvars.ContextVar("metrics_span", default=None)  # (span_id, nazwa)
+
+def bind_context(func):
+    """Funkcja wykonywana w kopii bieżącego kontekstu (do ThreadPoolExecutor.submit / Thread)"""
+    return functools.partial(contextvars.copy_context().run, func)
+
+class MetricsService:
+    """Serwis metryk - agregaty w pamięci, zapis per zadanie w SQLite"""
+    _instance = None
+    _lock = threading.Lock()
+    
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        self.enabled = METRICS_ENABLED
+        self.db = DatabaseService()
+        self._init_schema()
+        
+        self._pending: Dict[tuple, Dict] = {}  # (job_id, metric, etykiety JSON) -> agregat od ostatniego zapisu
+        self._pending_spans: List[tuple] = []
+        self._span_counts: Dict[str, int] = {}
+        self._pending_lock = threading.Lock()
+        self._last_flush = time.monotonic()
+        
+        self._initialized = True
+    
+    def _init_schema(self):
+        """Inicjalizuje tabele metryk"""
+        with self.db.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_metrics (
+                    job_id TEXT NOT NULL,  -- '' = pomiary poza zadaniem
+                    metric TEXT NOT NULL,
+                    labels TEXT NOT NULL,  -- JSON z posortowanymi kluczami
+                    kind TEXT NOT NULL,  -- counter/histogram
+                    count INTEGER NOT NULL DEFAULT 0,
+                    total REAL NOT NULL DEFAULT 0,  -- suma wartości (licznik: suma przyrostów)
+                    max REAL,
+                    buckets TEXT,  -- JSON: liczby obserwacji per kubełek BUCKETS (+Inf na końcu)
+                    updated_at TEXT NOT NULL,
+                    PRIMARY KEY (job_id, metric, labels)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS job_spans (
+                    span_id TEXT PRIMARY KEY,
+                    job_id TEXT NOT NULL,
+                    parent_id TEXT,
+                    name TEXT NOT NULL,
+                    stage TEXT,
+                    status TEXT NOT NULL,  -- ok/error
+                    started_at TEXT NOT NULL,
+                    duration_seconds REAL NOT NULL,
+                    labels TEXT
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_job_spans_job ON job_spans(job_id, started_at)")
+    
+    # ========== Kontekst ==========
+    
+    @contextmanager
+    def stage(self, job_id: str, stage: str):
+        """Etap zadania: ustawia kontekst, mierzy czas (span + stage_seconds) i zapisuje pomiary"""
+        job_token = _job_id.set(job_id)
+        stage_token = _stage.set(stage)
+        try:
+            with self.span(stage, _metric="stage_seconds"):
+                yield
+        finally:
+            _stage.reset(stage_token)
+            _job_id.reset(job_token)
+            self.flush()
+    
+    @contextmanager
+    def span(self, name: str, _metric: str = "span_seconds", **labels):
+        """Krok wewnątrz etapu (np. wyszukiwanie, scraping grup, weryfikacja) - czas i status"""
+        if not self.enabled:
+            yield
+            return
+        
+        parent = _span.get()
+        span_id = uuid.uuid4().hex[:16]
+        token = _span.set((span_id, name))
+        started_at = datetime.now().isoformat()
+        started = time.perf_counter()
+        status = "ok"
+        try:
+            yield
+        except BaseException:
+            status = "error"
+            raise
+        finally:
+            _span.reset(token)
+            duration = time.perf_counter() - started
+            metric_labels = {"stage": _stage.get() or ""}
+            if _metric == "span_seconds":
+                metric_labels["span"] = name
+            self.observe(_metric, duration, status=status, **metric_labels)
+            self._record_span(span_id, parent[0] if parent else None, name, status, started_at, duration, labels)
+    
+    @contextmanager
+    def external_call(self, service: str, operation: str):
+        """Wywołanie usługi zewnętrznej (Gemini, Apify) - czas, status i krok, w którym nastąpiło"""
+        if not self.enabled:
+            yield {}
+            return
+        
+        call = {"status": "ok"}  # Wywołujący może nadpisać status (np. nieudany run aktora)
+        started = time.perf_counter()
+        try:
+            yield call
+        except BaseException:
+            call["status"] = "error"
+            raise
+        finally:
+            current = _span.get()
+            self.observe(
+                "external_call_seconds", time.perf_counter() - started,
+                service=service, operation=operation, status=call["status"],
+                stage=_stage.get() or "", step=current[1] if current else ""
+            )
+    
+    @staticmethod
+    def current_job_id() -> Optional[str]:
+        return _job_id.get()
+    
+    # ========== Pomiary ==========
+    
+    def inc(self, metric: str, value: float = 1, **labels) -> None:
+        """Licznik (np. elementy z Apify, odrzucone posty)"""
+        if not self.enabled:
+            return
+        labels.setdefault("stage", _stage.get() or "")
+        with self._pending_lock:
+            entry = self._entry(metric, labels, KIND_COUNTER)
+            entry["count"] += 1
+            entry["total"] += value
+        self._maybe_flush()
+    
+    def observe(self, metric: str, value: float, **labels) -> None:
+        """Histogram (czasy w sekundach)"""
+        if not self.enabled:
+            return
+        with self._pending_lock:
+            entry = self._entry(metric, labels, KIND_HISTOGRAM)
+            entry["count"] += 1
+            entry["total"] += value
+            entry["max"] = value if entry["max"] is None else max(entry["max"], value)
+            entry["buckets"][self._bucket_index(value)] += 1
+        self._maybe_flush()
+    
+    def _entry(self, metric: str, labels: Dict, kind: str) -> Dict:
+        key = (_job_id.get() or "", metric, json.dumps(labels, ensure_ascii=False, sort_keys=True))
+        entry = self._pending.get(key)
+        if entry is None:
+            entry = {"kind": kind, "count": 0, "total": 0.0, "max": None,
+                     "buckets": [0] * (len(BUCKETS) + 1) if kind == KIND_HISTOGRAM else None}
+            self._pending[key] = entry
+        return entry
+    
+    @staticmethod
+    def _bucket_index(value: float) -> int:
+        for i, bound in enumerate(BUCKETS):
+            if value <= bound:
+                return i
+        return len(BUCKETS)
+    
+    def _record_span(self, span_id, parent_id, name, status, started_at, duration, labels) -> None:
+        job_id = _job_id.get()
+        if not job_id:
+            return
+        with self._pending_lock:
+            count = self._span_counts.get(job_id, 0)
+            if count >= MAX_SPANS_PER_JOB:
+                return
+            self._span_counts[job_id] = count + 1
+            self._pending_spans.append((
+                span_id, job_id, parent_id, name, _stage.get(), status, started_at, duration,
+                json.dumps(labels, ensure_ascii=False) if labels else None
+            ))
+    
+    # ========== Zapis ==========
+    
+    def _maybe_flush(self) -> None:
+        if time.monotonic() - self._last_flush >= METRICS_FLUSH_SECONDS:
+            self.flush()
+    
+    def flush(self) -> None:
+        """Dopisuje zagregowane pomiary do bazy (przyrostowo - sumowane z zapisanymi)"""
+        with self._pending_lock:
+            pending, self._pending = self._pending, {}
+            spans, self._pending_spans = self._pending_spans, []
+            self._last_flush = time.monotonic()
+        if not pending and not spans:
+            return
+        
+        now = datetime.now().isoformat()
+        try:
+            with self.db.get_connection() as conn:
+                for (job_id, metric, labels), entry in pending.items():
+                    row = conn.execute(
+                        "SELECT count, total, max, buckets FROM job_metrics WHERE job_id = ? AND metric = ? AND labels = ?",
+                        (job_id, metric, labels)
+                    ).fetchone()
+                    if row:
+                        entry = self._merge(entry, row)
+                    conn.execute("""
+                        INSERT OR REPLACE INTO job_metrics
+                        (job_id, metric, labels, kind, count, total, max, buckets, updated_at)
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    """, (
+                        job_id, metric, labels, entry["kind"], entry["count"], entry["total"], entry["max"],
+                        json.dumps(entry["buckets"]) if entry["buckets"] is not None else None, now
+                    ))
+                conn.executemany("""
+                    INSERT OR REPLACE INTO job_spans
+                    (span_id, job_id, parent_id, name, stage, status, started_at, duration_seconds, labels)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """, spans)
+        except Exception:
+            # Metryki nie mogą przerwać zadania - pomiary wracają do kolejnego zapisu
+            with self._pending_lock:
+                for key, entry in pending.items():
+                    current = self._pending.get(key)
+                    self._pending[key] = entry if current is None else self._merge(current, (
+                        entry["count"], entry["total"], entry["max"],
+                        json.dumps(entry["buckets"]) if entry["buckets"] is not None else None
+                    ))
+                self._pending_spans = spans + self._pending_spans
+    
+    @staticmethod
+    def _merge(entry: Dict, row) -> Dict:
+        count, total, max_value, buckets = row[0], row[1], row[2], row[3]
+        merged = dict(entry)
+        merged["count"] = entry["count"] + count
+        merged["total"] = entry["total"] + total
+        if max_value is not None:
+            merged["max"] = max_value if entry["max"] is None else max(entry["max"], max_value)
+        if entry["buckets"] is not None and buckets:
+            merged["buckets"] = [a + b for a, b in zip(entry["buckets"], json.loads(buckets))]
+        return merged
+    
+    # ========== Odczyt ==========
+    
+    def get_job_metrics(self, job_id: str) -> Dict:
+        """Metryki zadania: spany (drzewo etapów i kroków), podsumowanie wywołań zewnętrznych, agregaty"""
+        self.flush()
+        rows = self.db.execute_query(
+            "SELECT * FROM job_metrics WHERE job_id = ? ORDER BY metric, labels", (job_id,)
+        )
+        metrics = [self._row_to_dict(row) for row in rows]
+        
+        external: Dict[str, Dict] = {}
+        for metric in metrics:
+            if metric["metric"] != "external_call_seconds":
+                continue
+            labels = metric["labels"]
+            service = external.setdefault(labels["service"], {"calls": 0, "errors": 0, "seconds": 0.0, "by_step": {}})
+            service["calls"] += metric["count"]
+            service["seconds"] += metric["sum"]
+            if labels.get("status") == "error":
+                service["errors"] += metric["count"]
+            step = labels.get("step") or labels.get("stage") or "-"
+            by_step = service["by_step"].setdefault(step, {"calls": 0, "seconds": 0.0})
+            by_step["calls"] += metric["count"]
+            by_step["seconds"] += metric["sum"]
+        for service in external.values():
+            service["seconds"] = round(service["seconds"], 3)
+            for step in service["by_step"].values():
+                step["seconds"] = round(step["seconds"], 3)
+        
+        spans = self.db.execute_query(
+            "SELECT * FROM job_spans WHERE job_id = ? ORDER BY started_at", (job_id,)
+        )
+        return {
+            "job_id": job_id,
+            "spans": [
+                {
+                    "span_id": span['span_id'],
+                    "parent_id": span['parent_id'],
+                    "name": span['name'],
+                    "stage": span['stage'],
+                    "status": span['status'],
+                    "started_at": span['started_at'],
+                    "duration_seconds": round(span['duration_seconds'], 3),
+                    "labels": json.loads(span['labels']) if span['labels'] else {}
+                }
+                for span in spans
+            ],
+            "external_calls": external,
+            "metrics": metrics
+        }
+    
+    def render_prometheus(self) -> str:
+        """Format tekstowy Prometheus - sumy ze wszystkich zadań (bez etykiety job_id)"""
+        self.flush()
+        rows = self.db.execute_query("""
+            SELECT metric, labels, kind, SUM(count) as count, SUM(total) as total, GROUP_CONCAT(buckets, '|') as buckets
+            FROM job_metrics
+            GROUP BY metric, labels, kind
+            ORDER BY metric, labels
+        """)
+        
+        lines = []
+        declared = set()
+        for row in rows:
+            labels = json.loads(row['labels'])
+            if row['kind'] == KIND_COUNTER:
+                name = f"{PROMETHEUS_PREFIX}{row['metric']}_total"
+                if name not in declared:
+                    lines.append(f"# TYPE {name} counter")
+                    declared.add(name)
+                lines.append(f"{name}{self._format_labels(labels)} {self._format_value(row['total'])}")
+                continue
+            
+            name = f"{PROMETHEUS_PREFIX}{row['metric']}"
+            if name not in declared:
+                lines.append(f"# TYPE {name} histogram")
+                declared.add(name)
+            buckets = [0] * (len(BUCKETS) + 1)
+            for chunk in (row['buckets'] or "").split('|'):
+                if chunk:
+                    buckets = [a + b for a, b in zip(buckets, json.loads(chunk))]
+            cumulative = 0
+            for bound, count in zip([*BUCKETS, "+Inf"], buckets):
+                cumulative += count
+                lines.append(f"{name}_bucket{self._format_labels({**labels, 'le': str(bound)})} {cumulative}")
+            lines.append(f"{name}_sum{self._format_labels(labels)} {self._format_value(row['total'])}")
+            lines.append(f"{name}_count{self._format_labels(labels)} {row['count']}")
+        return "\n".join(lines) + "\n"
+    
+    def _row_to_dict(self, row) -> Dict:
+        metric = {
+            "metric": row['metric'],
+            "kind": row['kind'],
+            "labels": json.loads(row['labels']),
+            "count": row['count'],
+            "sum": round(row['total'], 6),
+        }
+        if row['kind'] == KIND_HISTOGRAM:
+            buckets = json.loads(row['buckets']) if row['buckets'] else []
+            metric.update({
+                "max": round(row['max'], 6) if row['max'] is not None else None,
+                "avg": round(row['total'] / row['count'], 6) if row['count'] else None,
+                "p50": self._estimate_quantile(buckets, 0.50),
+                "p95": self._estimate_quantile(buckets, 0.95),
+            })
+        return metric
+    
+    @staticmethod
+    def _estimate_quantile(buckets: List[int], fraction: float) -> Optional[float]:
+        """Kwantyl z histogramu - górna granica kubełka, w którym wypada (jak histogram_quantile)"""
+        total = sum(buckets)
+        if not total:
+            return None
+        threshold = fraction * total
+        cumulative = 0
+        for bound, count in zip([*BUCKETS, None], buckets):
+            cumulative += count
+            if cumulative >= threshold:
+                return bound if bound is not None else BUCKETS[-1]
+        return BUCKETS[-1]
+    
+    @staticmethod
+    def _format_labels(labels: Dict) -> str:
+        if not labels:
+            return ""
+        escaped = (
+            f'{key}="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') + '"'
+            for key, value in labels.items()
+        )
+        return "{" + ",".join(escaped) + "}"
+    
+    @staticmethod
+    def _format_value(value: float) -> str:
+        return str(int(value)) if float(value).is_integer() else repr(round(value, 6))
@@ -0,0 +1,311 @@
+"""
+Magazyn surowych payloadów (elementy Apify) - kompresja + deduplikacja po hashu treści
+
+Każdy unikalny element (sha256 kanonicznego JSON) jest zapisywany raz, niezależnie od liczby
+zadań, które go zawierają. Kompresja: zstd (jeśli zainstalowany `zstandard`) lub zlib,
+w obu przypadkach ze wspólnym słownikiem z zapisanych elementów - trenowanym (zstd) lub
+z próbki elementów (zlib) - powtarzalne klucze i struktury JSON kompresują się wtedy
+wielokrotnie lepiej.
+Obiekty zstd (słownik, kompresor, dekompresor) są tworzone raz na id słownika - kompresor
+i dekompresor per wątek, bo instancje zstandard nie są bezpieczne wątkowo.
+
+Metody przyjmują kursor, aby działały w transakcji DatabaseService.
+"""
+import sys
+import os
+import json
+import zlib
+import hashlib
+import threading
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import PAYLOAD_CODEC
+
+# Opcjonalna kompresja zstd
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+CODEC_ZSTD = "zstd"
+CODEC_ZLIB = "zlib"
+
+class PayloadStore:
+    """Kompresowany, deduplikowany magazyn payloadów JSON (tabele raw_payloads + payload_dictionaries)"""
+    
+    def __init__(self):
+        if PAYLOAD_CODEC == CODEC_ZSTD and not ZSTD_AVAILABLE:
+            raise ImportError("PAYLOAD_CODEC=zstd wymaga pakietu zstandard. Zainstaluj: pip install zstandard")
+        if PAYLOAD_CODEC in (CODEC_ZSTD, CODEC_ZLIB):
+            self.codec = PAYLOAD_CODEC
+        else:
+            self.codec = CODEC_ZSTD if ZSTD_AVAILABLE else CODEC_ZLIB
+        
+        self.zstd_level = 10
+        self.zlib_level = 9
+        self.dictionary_size = 32 * 1024  # zlib i tak korzysta tylko z 32 KB (okno)
+        self.dictionary_samples = 500
+        self.auto_train_threshold = 200  # Trenuj słownik, gdy magazyn ma tyle payloadów
+        
+        self._dictionaries: Dict[int, Tuple[str, bytes]] = {}  # id -> (codec, dane)
+        self._active_dictionary_id: Optional[int] = None
+        self._active_loaded = False
+        self._zstd_dicts: Dict[int, "zstandard.ZstdCompressionDict"] = {}
+        self._zstd_local = threading.local()  # compressors/decompressors: {id słownika: obiekt}
+    
+    def init_schema(self, cursor) -> None:
+        """Tworzy tabele magazynu"""
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS raw_payloads (
+                hash TEXT PRIMARY KEY,  -- sha256 kanonicznego JSON
+                codec TEXT NOT NULL,  -- zstd/zlib
+                dictionary_id INTEGER,
+                payload BLOB NOT NULL,
+                size_raw INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS payload_dictionaries (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                codec TEXT NOT NULL,
+                data BLOB NOT NULL,
+                sample_count INTEGER NOT NULL,
+                created_at TEXT NOT NULL
+            )
+        """)
+    
+    # ========== Zapis / odczyt ==========
+    
+    def put_many(self, cursor, items: Iterable[dict]) -> List[str]:
+        """Zapisuje elementy (tylko nieobecne w magazynie) i zwraca ich hashe"""
+        encoded = [self._canonical(item) for item in items]
+        hashes = [hashlib.sha256(data).hexdigest() for data in encoded]
+        if not hashes:
+            return hashes
+        
+        existing = self._existing_hashes(cursor, set(hashes))
+        self._maybe_train_dictionary(cursor)
+        dictionary_id = self._get_active_dictionary_id(cursor)
+        
+        now = datetime.now().isoformat()
+        rows = []
+        for content_hash, data in zip(hashes, encoded):
+            if content_hash in existing:
+                continue
+            existing.add(content_hash)
+            rows.append((
+                content_hash,
+                self.codec,
+                dictionary_id,
+                self._compress(cursor, data, dictionary_id),
+                len(data),
+                now
+            ))
+        
+        if rows:
+            cursor.executemany("""
+                INSERT OR IGNORE INTO raw_payloads (hash, codec, dictionary_id, payload, size_raw, created_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, rows)
+        return hashes
+    
+    def put(self, cursor, item: dict) -> str:
+        """Zapisuje pojedynczy element i zwraca jego hash"""
+        return self.put_many(cursor, [item])[0]
+    
+    def get_many(self, cursor, hashes: Iterable[str]) -> Dict[str, dict]:
+        """Zwraca {hash: element} dla podanych hashy"""
+        result = {}
+        hashes = list(set(hashes))
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = cursor.execute(
+                f"SELECT hash, codec, dictionary_id, payload FROM raw_payloads WHERE hash IN ({placeholders})",
+                chunk
+            ).fetchall()
+            for row in rows:
+                data = self._decompress(cursor, row['codec'], row['dictionary_id'], row['payload'])
+                result[row['hash']] = json.loads(data.decode('utf-8'))
+        return result
+    
+    # ========== Słownik kompresji ==========
+    
+    def train_dictionary(self, cursor) -> Optional[int]:
+        """Trenuje słownik na ostatnio zapisanych payloadach; zwraca jego id (None - za mało danych)"""
+        rows = cursor.execute(
+            "SELECT hash, codec, dictionary_id, payload FROM raw_payloads ORDER BY created_at DESC LIMIT ?",
+            (self.dictionary_samples,)
+        ).fetchall()
+        samples = [
+            self._decompress(cursor, row['codec'], row['dictionary_id'], row['payload'])
+            for row in rows
+        ]
+        if len(samples) < 10:
+            return None
+        
+        data = self._build_dictionary(samples)
+        if not data:
+            return None
+        
+        cursor.execute("""
+            INSERT INTO payload_dictionaries (codec, data, sample_count, created_at)
+            VALUES (?, ?, ?, ?)
+        """, (self.codec, data, len(samples), datetime.now().isoformat()))
+        dictionary_id = cursor.lastrowid
+        
+        self._dictionaries[dictionary_id] = (self.codec, data)
+        self._active_dictionary_id = dictionary_id
+        self._active_loaded = True
+        return dictionary_id
+    
+    def recompress(self, cursor) -> int:
+        """Przepisuje payloady, które nie używają aktywnego słownika/kodeka; zwraca ich liczbę"""
+        dictionary_id = self._get_active_dictionary_id(cursor)
+        rows = cursor.execute("""
+            SELECT hash, codec, dictionary_id, payload FROM raw_payloads
+            WHERE codec != ? OR dictionary_id IS NOT ?
+        """, (self.codec, dictionary_id)).fetchall()
+        
+        for row in rows:
+            data = self._decompress(cursor, row['codec'], row['dictionary_id'], row['payload'])
+            cursor.execute("""
+                UPDATE raw_payloads SET codec = ?, dictionary_id = ?, payload = ? WHERE hash = ?
+            """, (self.codec, dictionary_id, self._compress(cursor, data, dictionary_id), row['hash']))
+        
+        # Nieużywane słowniki (poza aktywnym)
+        cursor.execute("""
+            DELETE FROM payload_dictionaries
+            WHERE id IS NOT ?
+              AND id NOT IN (SELECT DISTINCT dictionary_id FROM raw_payloads WHERE dictionary_id IS NOT NULL)
+        """, (dictionary_id,))
+        return len(rows)
+    
+    # ========== Utrzymanie ==========
+    
+    def purge_orphans(self, cursor, referencing_table: str, hash_column: str) -> int:
+        """Usuwa payloady, do których nie odwołuje się żaden wiersz podanej tabeli"""
+        cursor.execute(f"""
+            DELETE FROM raw_payloads
+            WHERE hash NOT IN (SELECT {hash_column} FROM {referencing_table} WHERE {hash_column} IS NOT NULL)
+        """)
+        return cursor.rowcount
+    
+    def get_stats(self, cursor) -> Dict:
+        """Liczba payloadów i rozmiary (surowy vs zapisany)"""
+        row = cursor.execute("""
+            SELECT COUNT(*) as cnt, COALESCE(SUM(size_raw), 0) as raw_bytes,
+                   COALESCE(SUM(LENGTH(payload)), 0) as stored_bytes
+            FROM raw_payloads
+        """).fetchone()
+        return {
+            "codec": self.codec,
+            "payloads": row['cnt'],
+            "raw_bytes": row['raw_bytes'],
+            "stored_bytes": row['stored_bytes'],
+            "ratio": round(row['raw_bytes'] / row['stored_bytes'], 2) if row['stored_bytes'] else None,
+            "dictionary_id": self._get_active_dictionary_id(cursor)
+        }
+    
+    # ========== Implementacja ==========
+    
+    @staticmethod
+    def _canonical(item: dict) -> bytes:
+        """Kanoniczny JSON (posortowane klucze) - identyczne elementy mają ten sam hash"""
+        return json.dumps(item, ensure_ascii=False, sort_keys=True, separators=(',', ':'), default=str).encode('utf-8')
+    
+    def _existing_hashes(self, cursor, hashes: set) -> set:
+        existing = set()
+        hashes = list(hashes)
+        for start in range(0, len(hashes), 500):
+            chunk = hashes[start:start + 500]
+            placeholders = ",".join("?" * len(chunk))
+            rows = cursor.execute(f"SELECT hash FROM raw_payloads WHERE hash IN ({placeholders})", chunk).fetchall()
+            existing.update(row['hash'] for row in rows)
+        return existing
+    
+    def _maybe_train_dictionary(self, cursor) -> None:
+        """Automatyczny trening pierwszego słownika, gdy w magazynie jest wystarczająco danych"""
+        if self._get_active_dictionary_id(cursor) is not None:
+            return
+        count = cursor.execute("SELECT COUNT(*) as cnt FROM raw_payloads").fetchone()['cnt']
+        if count >= self.auto_train_threshold:
+            self.train_dictionary(cursor)
+    
+    def _get_active_dictionary_id(self, cursor) -> Optional[int]:
+        if not self._active_loaded:
+            row = cursor.execute(
+                "SELECT id FROM payload_dictionaries WHERE codec = ? ORDER BY id DESC LIMIT 1", (self.codec,)
+            ).fetchone()
+            self._active_dictionary_id = row['id'] if row else None
+            self._active_loaded = True
+        return self._active_dictionary_id
+    
+    def _get_dictionary(self, cursor, dictionary_id: int) -> Tuple[str, bytes]:
+        if dictionary_id not in self._dictionaries:
+            row = cursor.execute(
+                "SELECT codec, data FROM payload_dictionaries WHERE id = ?", (dictionary_id,)
+            ).fetchone()
+            if not row:
+                raise ValueError(f"Brak słownika kompresji: {dictionary_id}")
+            self._dictionaries[dictionary_id] = (row['codec'], bytes(row['data']))
+        return self._dictionaries[dictionary_id]
+    
+    def _build_dictionary(self, samples: List[bytes]) -> Optional[bytes]:
+        if self.codec == CODEC_ZSTD:
+            try:
+                return zstandard.train_dictionary(self.dictionary_size, samples).as_bytes()
+            except zstandard.ZstdError:
+                return None
+        
+        # zlib nie ma trenera słowników: zdict to po prostu końcowe 32 KB połączonych próbek
+        # (całe, typowe elementy - klucze, struktura i słownictwo). Słownik z samych powtarzających
+        # się fragmentów JSON kompresował dane Apify gorzej, bo gubi kolejność pól w elemencie.
+        data = b"".join(samples)
+        return data[-self.dictionary_size:]
+    
+    def _compress(self, cursor, data: bytes, dictionary_id: Optional[int]) -> bytes:
+        if self.codec == CODEC_ZSTD:
+            return self._zstd_codec(cursor, dictionary_id, compressor=True).compress(data)
+        
+        dictionary = self._get_dictionary(cursor, dictionary_id)[1] if dictionary_id is not None else None
+        compressor = zlib.compressobj(self.zlib_level, zdict=dictionary) if dictionary else zlib.compressobj(self.zlib_level)
+        return compressor.compress(data) + compressor.flush()
+    
+    def _decompress(self, cursor, codec: str, dictionary_id: Optional[int], payload: bytes) -> bytes:
+        if codec == CODEC_ZSTD:
+            if not ZSTD_AVAILABLE:
+                raise ImportError("Payload skompresowany zstd - zainstaluj: pip install zstandard")
+            return self._zstd_codec(cursor, dictionary_id, compressor=False).decompress(payload)
+        
+        dictionary = self._get_dictionary(cursor, dictionary_id)[1] if dictionary_id is not None else None
+        decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+        return decompressor.decompress(payload) + decompressor.flush()
+    
+    def _zstd_codec(self, cursor, dictionary_id: Optional[int], compressor: bool):
+        """Kompresor/dekompresor zstd dla słownika - tworzony raz na wątek i id słownika"""
+        attr = 'compressors' if compressor else 'decompressors'
+        cache = getattr(self._zstd_local, attr, None)
+        if cache is None:
+            cache = {}
+            setattr(self._zstd_local, attr, cache)
+        
+        codec = cache.get(dictionary_id)
+        if codec is None:
+            dict_data = None
+            if dictionary_id is not None:
+                dict_data = self._zstd_dicts.get(dictionary_id)
+                if dict_data is None:
+                    dict_data = zstandard.ZstdCompressionDict(self._get_dictionary(cursor, dictionary_id)[1])
+                    self._zstd_dicts[dictionary_id] = dict_data
+            if compressor:
+                codec = zstandard.ZstdCompressor(level=self.zstd_level, dict_data=dict_data)
+            else:
+                codec = zstandard.ZstdDecompressor(dict_data=dict_data)
+            cache[dictionary_id] = codec
+        return codec
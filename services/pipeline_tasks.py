@@ -0,0 +1,97 @@
+"""
+Zadania pipeline'u wykonywane przez workery kolejki (scraping, klasyfikacja, raport, eksport DOCX)
+
+Funkcje nie zależą od Flask, więc mogą być uruchamiane zarówno przez pulę workerów
+wbudowaną w aplikację, jak i przez samodzielny proces (scripts/run_worker.py).
+Logika etapów znajduje się w WorkflowOrchestrator; handlery tylko wybierają etapy
+i (dla payload "workflow") kolejkują następny etap w odpowiedniej kolejce.
+"""
+import sys
+import os
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import STREAMING_CLASSIFICATION
+from services.job_storage import JobStorageService
+from services.job_queue import JobQueueService, QUEUE_CLASSIFICATION, QUEUE_REPORT, PRIORITY_NORMAL
+from services.workflow_orchestrator import (
+    WorkflowOrchestrator,
+    STAGE_SCRAPING, STAGE_CATEGORY_KEY, STAGE_CLASSIFICATION, STAGE_CHARTS, STAGE_REPORT
+)
+from services.logger import LoggerService
+
+# Typy zadań w kolejce
+TASK_SCRAPE_AND_KEY = "scrape_and_key"
+TASK_CLASSIFY = "classify"
+TASK_REPORT = "report"
+TASK_EXPORT_DOCX = "export_docx"
+
+class PipelineTasks:
+    """Handlery zadań kolejki - jeden handler na typ zadania"""
+    
+    def __init__(self):
+        self.job_storage = JobStorageService()
+        self.job_queue = JobQueueService()
+        self.workflow = WorkflowOrchestrator()
+        self.logger = LoggerService()
+    
+    def get_handlers(self) -> dict:
+        """Mapa: typ zadania -> handler(job_id, payload)"""
+        return {
+            TASK_SCRAPE_AND_KEY: self.run_scraping_and_generate_key,
+            TASK_CLASSIFY: self.run_classification,
+            TASK_REPORT: self.generate_report,
+            TASK_EXPORT_DOCX: self.export_docx,
+        }
+    
+    def run_scraping_and_generate_key(self, job_id: str, payload: dict):
+        """Zadanie w tle: scraping + generowanie klucza (opcjonalnie z klasyfikacją strumieniową)"""
+        streaming = payload.get('streaming', STREAMING_CLASSIFICATION)
+        job = self.workflow.run_stages(
+            job_id, [STAGE_SCRAPING, STAGE_CATEGORY_KEY],
+            force=payload.get('force', False), streaming=streaming
+        )
+        
+        # Pełny workflow / strumieniowo / przyrostowo: pozostałe komentarze od razu w kolejce klasyfikacji
+        if (payload.get('workflow') or streaming or (job and job.is_incremental())) \
+                and job and job.status == "completed":
+            self.job_queue.enqueue(QUEUE_CLASSIFICATION, TASK_CLASSIFY, job_id,
+                                   payload={"workflow": bool(payload.get('workflow'))}, priority=PRIORITY_NORMAL)
+    
+    def run_classification(self, job_id: str, payload: dict):
+        """Zadanie w tle: klasyfikacja (wznawialna) wszystkich komentarzy"""
+        job = self.workflow.run_stages(
+            job_id, [STAGE_CLASSIFICATION], reset_classification=payload.get('reset', False)
+        )
+        
+        # Pełny workflow: następny etap w kolejce raportów (pominięta klasyfikacja zostawia status "classifying")
+        if payload.get('workflow') and job and job.status == "completed" and job.has_classification():
+            self.job_queue.enqueue(QUEUE_REPORT, TASK_REPORT, job_id,
+                                   payload={"workflow": True}, priority=PRIORITY_NORMAL, max_attempts=2)
+    
+    def generate_report(self, job_id: str, payload: dict):
+        """Zadanie w tle: generuje wykresy i raport"""
+        job = self.job_storage.get(job_id)
+        
+        if not job:
+            self.logger.add_log(f"Nie można wygenerować raportu - zadanie {job_id} nie znalezione", "ERROR")
+            return
+        
+        if not job.has_classification():
+            self.logger.add_log(f"Nie można wygenerować raportu - brak klasyfikacji dla {job_id}", "WARNING")
+            return
+        
+        if not job.category_key:
+            self.logger.add_log(f"Nie można wygenerować raportu - brak klucza kategorii dla {job_id}", "WARNING")
+            return
+        
+        # Błąd etapu trafia do kolejki (ponowienie zadania)
+        self.workflow.run_stages(job_id, [STAGE_CHARTS, STAGE_REPORT], force=payload.get('force', False))
+    
+    def export_docx(self, job_id: str, payload: dict):
+        """Zadanie w tle: DOCX bieżącej wersji raportu (pobranie nie blokuje wątku żądania)"""
+        docx_path = self.workflow.report_service.build_docx(job_id)
+        if not docx_path:
+            self.logger.add_log(f"Nie można wyeksportować DOCX - brak raportu dla {job_id}", "WARNING")
+            return
+        self.logger.add_log(f"DOCX raportu gotowy dla {job_id}: {docx_path}")
@@ -1,11 +1,10 @@
 import json
 import sys
 import os
-import google.generativeai as genai
 
 # Dodaj ścieżkę do projektu
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from config import GEMINI_API_KEY
+from services.gemini_service import GeminiService
 from services.logger import LoggerService
 
 class QueryGeneratorService:
@@ -13,8 +12,7 @@ class QueryGeneratorService:
     
     def __init__(self):
         self.logger = LoggerService()
-        genai.configure(api_key=GEMINI_API_KEY)
-        self.gemini_model = genai.GenerativeModel('gemini-2.5-flash')
+        self.gemini_model = GeminiService().flash_model  # Ten sam (leniwie tworzony) klient co reszta aplikacji
     
     def generate_advanced_search_queries(self, brand_name: str) -> list[str]:
         """Generuje zaawansowane zapytania wyszukiwania używając Gemini"""
@@ -81,11 +79,11 @@ Każde zapytanie powinno być gotowe do użycia w wyszukiwaniu Facebook.
                 self.logger.add_log(f"Wygenerowano {len(all_queries)} zapytań wyszukiwania")
                 
                 return all_queries
-                
+            
             except json.JSONDecodeError:
                 self.logger.add_log("Błąd parsowania JSON, używam podstawowych zapytań", "WARNING")
                 return self.generate_fallback_queries(brand_name)
-                
+        
         except Exception as e:
             self.logger.add_log(f"Błąd generowania zapytań: {str(e)}", "ERROR")
             return self.generate_fallback_queries(brand_name)
@@ -0,0 +1,131 @@
+"""
+Workery kolejki zadań - osobne pule wątków dla scrapingu, klasyfikacji i raportów
+"""
+import sys
+import os
+import threading
+import traceback
+from typing import Callable, Dict, Optional
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import QUEUE_LEASE_SECONDS, QUEUE_POLL_INTERVAL
+from services.job_queue import JobQueueService, LeaseLostError, bind_lease, reset_lease
+from services.logger import LoggerService
+
+class QueueWorker(threading.Thread):
+    """Pojedynczy worker: pobiera zadania z jednej kolejki i wykonuje je z heartbeatem"""
+    
+    def __init__(self, queue: str, handlers: Dict[str, Callable], worker_id: str,
+                 lease_seconds: int = None, poll_interval: float = None):
+        super().__init__(name=worker_id, daemon=True)
+        self.queue = queue
+        self.handlers = handlers
+        self.worker_id = worker_id
+        self.lease_seconds = lease_seconds or QUEUE_LEASE_SECONDS
+        self.poll_interval = poll_interval or QUEUE_POLL_INTERVAL
+        self.job_queue = JobQueueService()
+        self.logger = LoggerService()
+        self._stop_event = threading.Event()
+    
+    def stop(self):
+        """Kończy pętlę po bieżącym zadaniu"""
+        self._stop_event.set()
+    
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                task = self.job_queue.claim(self.queue, self.worker_id, self.lease_seconds)
+            except Exception as e:
+                self.logger.add_log(f"Worker {self.worker_id}: błąd pobierania zadania: {str(e)}", "WARNING")
+                task = None
+            
+            if not task:
+                self._stop_event.wait(self.poll_interval)
+                continue
+            
+            self._execute(task)
+    
+    def _execute(self, task: dict):
+        """Wykonuje zadanie; w tle odnawia dzierżawę"""
+        handler = self.handlers.get(task['task_type'])
+        if not handler:
+            self.job_queue.fail(task['id'], self.worker_id, f"Brak handlera dla typu: {task['task_type']}")
+            return
+        
+        self.logger.add_log(
+            f"Worker {self.worker_id}: zadanie #{task['id']} {task['task_type']} "
+            f"(job {task['job_id']}, próba {task['attempts']})"
+        )
+        
+        done = threading.Event()
+        lease_lost = threading.Event()
+        heartbeat = threading.Thread(
+            target=self._heartbeat_loop, args=(task['id'], done, lease_lost), daemon=True
+        )
+        heartbeat.start()
+        
+        # Handler widzi flagę utraty dzierżawy przez check_lease() (także w wątkach z bind_context)
+        token = bind_lease(lease_lost)
+        try:
+            handler(task['job_id'], task['payload'])
+            if lease_lost.is_set():
+                raise LeaseLostError("Utracono dzierżawę zadania - przejął je inny worker")
+            self.job_queue.complete(task['id'], self.worker_id)
+        except LeaseLostError as e:
+            # Zadanie należy już do innego workera - nie zapisujemy ani wyniku, ani błędu
+            self.logger.add_log(f"Worker {self.worker_id}: zadanie #{task['id']} przerwane: {str(e)}", "WARNING")
+        except Exception as e:
+            self.logger.add_log(f"Worker {self.worker_id}: zadanie #{task['id']} nieudane: {str(e)}", "ERROR")
+            self.job_queue.fail(task['id'], self.worker_id, f"{str(e)}\n{traceback.format_exc()}")
+        finally:
+            reset_lease(token)
+            done.set()
+            heartbeat.join()
+    
+    def _heartbeat_loop(self, task_id: int, done: threading.Event, lease_lost: threading.Event):
+        interval = max(1.0, self.lease_seconds / 3)
+        while not done.wait(interval):
+            try:
+                if not self.job_queue.heartbeat(task_id, self.worker_id, self.lease_seconds):
+                    self.logger.add_log(
+                        f"Worker {self.worker_id}: utracono dzierżawę zadania #{task_id} - przerywanie", "WARNING"
+                    )
+                    lease_lost.set()
+                    return
+            except Exception as e:
+                self.logger.add_log(f"Worker {self.worker_id}: błąd heartbeat: {str(e)}", "WARNING")
+
+class WorkerPool:
+    """Pule workerów - osobna liczba wątków dla każdej kolejki"""
+    
+    def __init__(self, pool_sizes: Dict[str, int], handlers: Optional[Dict[str, Callable]] = None):
+        self.pool_sizes = pool_sizes
+        self._handlers = handlers
+        self.workers: list[QueueWorker] = []
+        self.logger = LoggerService()
+    
+    def start(self):
+        """Uruchamia workery (handlery tworzone leniwie przy starcie)"""
+        if self._handlers is None:
+            from services.pipeline_tasks import PipelineTasks
+            self._handlers = PipelineTasks().get_handlers()
+        
+        for queue, size in self.pool_sizes.items():
+            for index in range(size):
+                worker_id = JobQueueService.make_worker_id(queue, index)
+                worker = QueueWorker(queue, self._handlers, worker_id)
+                worker.start()
+                self.workers.append(worker)
+        
+        self.logger.add_log(
+            "Uruchomiono workery: " + ", ".join(f"{q}={n}" for q, n in self.pool_sizes.items())
+        )
+    
+    def stop(self, timeout: float = None):
+        """Zatrzymuje workery (czeka na zakończenie bieżących zadań)"""
+        for worker in self.workers:
+            worker.stop()
+        for worker in self.workers:
+            worker.join(timeout)
+        self.workers = []
@@ -3,27 +3,61 @@ Serwis generowania i eksportu raportów
 """
 import sys
 import os
+import re
+import html
 import base64
 import json
-from typing import List, Dict, Optional
+import glob
+import hashlib
+import threading
+import importlib.util
+from typing import Dict, Optional, Callable
 from datetime import datetime
-import markdown
-from io import BytesIO
+from concurrent.futures import ThreadPoolExecutor
 
 # Dodaj ścieżkę do projektu
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-from models.classification_result import ClassificationResult
+from config import CHART_FORMAT
+from models.classification_stats import ClassificationStats
 from models.category_key import CategoryKey
-from services.visualization_service import VisualizationService
+from services.visualization_service import VisualizationService, ChartInput, CHART_TITLES
 from services.gemini_service import GeminiService
+from services.report_stream import (
+    ReportStreamService, EVENT_STATISTICS, EVENT_CHARTS, EVENT_DONE, EVENT_ERROR
+)
 
-# Importy dla eksportu
-try:
-    from docx import Document
-    from docx.shared import Inches
-    DOCX_AVAILABLE = True
-except ImportError:
-    DOCX_AVAILABLE = False
+# Eksport DOCX - python-docx importowany dopiero przy eksporcie (tu tylko sprawdzenie, czy jest zainstalowany)
+DOCX_AVAILABLE = importlib.util.find_spec("docx") is not None
+
+# Tryb CHART_FORMAT=client: rysowanie <canvas data-chart> przez Chart.js (w aplikacji ładuje go base.html,
+# samodzielny plik raportu dociąga bibliotekę z CDN)
+CHARTJS_SCRIPT = """<script>
+(function() {
+    function renderCharts() {
+        document.querySelectorAll('canvas[data-chart]').forEach(function(canvas) {
+            if (canvas.dataset.rendered) return;
+            new Chart(canvas, JSON.parse(canvas.dataset.chart));
+            canvas.dataset.rendered = '1';
+        });
+    }
+    if (window.Chart) {
+        renderCharts();
+        return;
+    }
+    var script = document.createElement('script');
+    script.src = 'https://cdn.jsdelivr.net/npm/chart.js@4.4.0/dist/chart.umd.min.js';
+    script.onload = renderCharts;
+    document.head.appendChild(script);
+})();
+</script>"""
+
+# Wersja promptu raportu - zmiana unieważnia zapisane treści Gemini (fingerprint narracji)
+REPORT_PROMPT_VERSION = "1"
+
+# Obrazy wykresów w HTML wygenerowanym z Markdown (nazwa pliku = hash danych wykresu)
+CHART_IMG_PATTERN = re.compile(r'<img\b[^>]*\bsrc="/static/charts/(?P<name>[^"/]+)"[^>]*>')
+# Placeholdery wykresów w treści Gemini (podgląd strumieniowy pokazuje wykresy w osobnej sekcji)
+CHART_PLACEHOLDER_PATTERN = re.compile(r'\[WYKRES_[A-Z]*\]?')
 
 class ReportService:
     """Serwis generowania raportów analitycznych"""
@@ -33,47 +67,193 @@ class ReportService:
         os.makedirs(self.reports_dir, exist_ok=True)
         self.visualization_service = VisualizationService()
         self.gemini_service = GeminiService()
+        self.stream = ReportStreamService()
     
     def generate_report(
         self,
-        classification_results: List[ClassificationResult],
+        stats: ChartInput,
         category_key: CategoryKey,
         brand_name: str,
         job_id: str,
         start_date: str,
-        end_date: str
+        end_date: str,
+        refresh: bool = False
     ) -> Dict[str, str]:
         """
         Główna metoda generowania raportu
+        stats: agregaty (DatabaseService.get_classification_aggregates) lub lista ClassificationResult
+        refresh=True: nowa treść z Gemini nawet przy niezmienionym fingerprincie
         Zwraca dict z ścieżkami do plików: {"html": path, "markdown": content}
         """
-        # 1. Generuj wykresy
-        chart_paths = self.visualization_service.generate_all_charts(classification_results, job_id)
+        stats = ClassificationStats.coerce(stats)
         
-        # 2. Przygotuj statystyki
-        stats = self._calculate_statistics(classification_results, category_key)
+        # Niezmienione agregaty, klucz, marka, daty i wersja promptu - gotowy raport bez pracy
+        if not refresh:
+            cached = self.get_cached_report(job_id, self.report_fingerprint(stats, category_key, brand_name,
+                                                                             start_date, end_date))
+            if cached:
+                return cached
         
-        # 3. Generuj treść przez Gemini
-        report_markdown = self._generate_report_content_with_gemini(
-            classification_results, category_key, brand_name, stats, start_date, end_date
-        )
+        # 1. Generuj wykresy w tle - równolegle z (długim) wywołaniem Gemini
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            charts_future = executor.submit(
+                self.visualization_service.generate_all_charts, stats, job_id
+            )
+            
+            # 2-7. Treść (Gemini lub zapisana), tabele, wykresy, zapis
+            return self.build_report(stats, category_key, brand_name, job_id, start_date, end_date,
+                                     charts_future.result, refresh)
+    
+    def build_report(
+        self,
+        stats: ClassificationStats,
+        category_key: CategoryKey,
+        brand_name: str,
+        job_id: str,
+        start_date: str,
+        end_date: str,
+        get_chart_paths: Callable[[], Dict[str, str]],
+        refresh: bool = False
+    ) -> Dict[str, str]:
+        """
+        Składa raport: treść Gemini ponownie używana, dopóki nie zmieni się jej fingerprint
+        (klucz kategorii, marka, daty, wersja promptu); tabele statystyk i wykresy zawsze
+        z bieżących agregatów. get_chart_paths wywoływane po treści (wykresy mogą rysować się w tle).
         
-        # 4. Finalizuj raport - wstaw wykresy
-        final_markdown = self._embed_charts_in_markdown(report_markdown, chart_paths, job_id)
+        Postęp trafia do strumienia zdarzeń (ReportStreamService): najpierw tabele statystyk,
+        wykresy zaraz po narysowaniu, treść Gemini fragmentami w trakcie generowania.
+        """
+        self.stream.reset(job_id)
+        try:
+            self.stream.publish(job_id, EVENT_STATISTICS, {"html": self.render_statistics_html(stats)})
+            charts_thread = threading.Thread(
+                target=self._publish_charts, args=(job_id, get_chart_paths), name=f"report-charts-{job_id[:8]}", daemon=True
+            )
+            charts_thread.start()
+            
+            narrative_fingerprint = self.narrative_fingerprint(category_key, brand_name, start_date, end_date)
+            narrative = None if refresh else self._load_narrative(job_id, narrative_fingerprint)
+            narrative_generated_at = datetime.now().isoformat()
+            write_chunk = self.stream.narrative_writer(job_id)
+            if narrative is None:
+                narrative = self.generate_narrative(stats, category_key, brand_name, start_date, end_date,
+                                                    on_chunk=write_chunk if self.stream.enabled else None)
+                narrative_path = os.path.join(self.reports_dir, f'report_{job_id}.narrative.md')
+                with open(narrative_path, 'w', encoding='utf-8') as f:
+                    f.write(narrative)
+            else:
+                narrative, narrative_generated_at = narrative
+                write_chunk(narrative)
+            write_chunk.flush()
+            
+            report = self.finalize_report(
+                narrative, get_chart_paths(), job_id, stats=stats,
+                fingerprint=self.report_fingerprint(stats, category_key, brand_name, start_date, end_date),
+                narrative_fingerprint=narrative_fingerprint, narrative_generated_at=narrative_generated_at
+            )
+            charts_thread.join()
+        except Exception as e:
+            self.stream.publish(job_id, EVENT_ERROR, {"message": str(e)})
+            raise
         
-        # 5. Konwertuj do HTML
+        self.stream.publish(job_id, EVENT_DONE, {"report_url": f"/report/{job_id}"})
+        return report
+    
+    def _publish_charts(self, job_id: str, get_chart_paths: Callable[[], Dict[str, str]]) -> None:
+        """Zdarzenie charts, gdy tylko wykresy są gotowe (błąd rysowania zgłosi główny wątek)"""
+        try:
+            chart_paths = get_chart_paths()
+        except Exception:
+            return
+        self.stream.publish(job_id, EVENT_CHARTS, {"html": self.render_charts_html(chart_paths, job_id)})
+    
+    def narrative_fingerprint(self, category_key: CategoryKey, brand_name: str, start_date: str, end_date: str) -> str:
+        """Fingerprint wejścia treści Gemini (bez liczb - te trafiają do tabel)"""
+        categories = category_key.categories if category_key else []
+        return self._fingerprint(REPORT_PROMPT_VERSION, brand_name, start_date, end_date, categories)
+    
+    def report_fingerprint(self, stats: ClassificationStats, category_key: CategoryKey, brand_name: str,
+                           start_date: str, end_date: str) -> str:
+        """Fingerprint całego raportu: treść + agregaty klasyfikacji + format wykresów"""
+        return self._fingerprint(
+            self.narrative_fingerprint(category_key, brand_name, start_date, end_date),
+            ClassificationStats.coerce(stats).to_dict(), CHART_FORMAT
+        )
+    
+    def get_cached_report(self, job_id: str, fingerprint: str) -> Optional[Dict[str, str]]:
+        """Zapisany raport, jeśli powstał z tego samego fingerprintu i jego pliki istnieją"""
+        manifest = self._load_manifest(job_id)
+        html_path = os.path.join(self.reports_dir, f'report_{job_id}.html')
+        markdown_path = os.path.join(self.reports_dir, f'report_{job_id}.md')
+        if manifest.get('fingerprint') != fingerprint or not os.path.exists(html_path) \
+                or not os.path.exists(markdown_path):
+            return None
+        chart_paths = self.get_chart_paths(job_id)
+        if not all(os.path.exists(path) for path in chart_paths.values()):
+            return None
+        return {"html": html_path, "markdown": markdown_path, "charts": chart_paths, "cached": True}
+    
+    def generate_narrative(
+        self,
+        stats: ChartInput,
+        category_key: CategoryKey,
+        brand_name: str,
+        start_date: str,
+        end_date: str,
+        on_chunk: Optional[Callable[[str], None]] = None
+    ) -> str:
+        """
+        Generuje treść raportu (Markdown z placeholderami wykresów)
+        on_chunk: odpowiedź Gemini strumieniowo - wywoływane z każdym kolejnym fragmentem tekstu
+        """
+        aggregates = ClassificationStats.coerce(stats)
+        report_stats = self._calculate_statistics(aggregates, category_key)
+        return self._generate_report_content_with_gemini(
+            aggregates, category_key, brand_name, report_stats, start_date, end_date, on_chunk
+        )
+    
+    def finalize_report(
+        self,
+        report_markdown: str,
+        chart_paths: Dict[str, str],
+        job_id: str,
+        stats: Optional[ClassificationStats] = None,
+        fingerprint: Optional[str] = None,
+        narrative_fingerprint: Optional[str] = None,
+        narrative_generated_at: Optional[str] = None
+    ) -> Dict[str, str]:
+        """Wstawia wykresy (i tabele statystyk z agregatów) do treści, konwertuje do HTML i zapisuje pliki raportu"""
+        final_markdown = self._embed_charts_in_markdown(report_markdown, chart_paths, job_id)
+        if stats is not None:
+            final_markdown += "\n\n" + self._statistics_tables(stats)
         html_content = self._convert_markdown_to_html(final_markdown, chart_paths, job_id)
         
-        # 6. Zapisz HTML
+        # Zapisz HTML
         html_path = os.path.join(self.reports_dir, f'report_{job_id}.html')
         with open(html_path, 'w', encoding='utf-8') as f:
             f.write(html_content)
         
-        # 7. Zapisz Markdown (dla eksportu DOCX)
+        # Zapisz Markdown (dla eksportu DOCX)
         markdown_path = os.path.join(self.reports_dir, f'report_{job_id}.md')
         with open(markdown_path, 'w', encoding='utf-8') as f:
             f.write(final_markdown)
         
+        # Manifest: wykresy raportu (nazwy plików to hash danych, nie job_id) i fingerprinty cache
+        self._save_manifest(job_id, chart_paths, {
+            "prompt_version": REPORT_PROMPT_VERSION,
+            "fingerprint": fingerprint,
+            "narrative_fingerprint": narrative_fingerprint,
+            "narrative_generated_at": narrative_generated_at
+        })
+        self._remove_stale_charts()
+        
+        # Wersje do pobrania (HTML z wbudowanymi wykresami, DOCX) powstaną ponownie przy pierwszym eksporcie
+        standalone_path = os.path.join(self.reports_dir, f'report_{job_id}.standalone.html')
+        if os.path.exists(standalone_path):
+            os.remove(standalone_path)
+        for stale_docx in glob.glob(os.path.join(self.reports_dir, f'report_{glob.escape(job_id)}*.docx')):
+            os.remove(stale_docx)
+        
         return {
             "html": html_path,
             "markdown": markdown_path,
@@ -81,12 +261,165 @@ class ReportService:
             "charts": chart_paths
         }
     
+    def export_to_html(self, job_id: str) -> Optional[str]:
+        """
+        Samowystarczalny HTML raportu (wykresy wbudowane: SVG, PNG jako base64) - tylko do pobrania.
+        Budowany przy pierwszym żądaniu po wygenerowaniu raportu, potem brany z dysku.
+        """
+        markdown_path = os.path.join(self.reports_dir, f'report_{job_id}.md')
+        if not os.path.exists(markdown_path):
+            return None
+        
+        standalone_path = os.path.join(self.reports_dir, f'report_{job_id}.standalone.html')
+        if os.path.exists(standalone_path) and os.path.getmtime(standalone_path) >= os.path.getmtime(markdown_path):
+            return standalone_path
+        
+        with open(markdown_path, 'r', encoding='utf-8') as f:
+            markdown_content = f.read()
+        html_content = self._convert_markdown_to_html(markdown_content, self.get_chart_paths(job_id), job_id, inline=True)
+        
+        tmp_path = f'{standalone_path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+        os.replace(tmp_path, standalone_path)
+        return standalone_path
+    
+    def render_statistics_html(self, stats: ClassificationStats) -> str:
+        """Sekcja tabel statystyk (HTML) - dostępna przed wykresami i treścią Gemini"""
+        return self._markdown_body(self._statistics_tables(ClassificationStats.coerce(stats)), {})[0]
+    
+    def render_charts_html(self, chart_paths: Dict[str, str], job_id: str) -> str:
+        """Sekcja wykresów (HTML): <img> z /static/charts albo <canvas data-chart> (CHART_FORMAT=client)"""
+        charts_markdown = "\n\n".join(
+            f"![{CHART_TITLES.get(chart_type, chart_type)}](/static/charts/{os.path.basename(path)})"
+            for chart_type, path in chart_paths.items() if path
+        )
+        return self._markdown_body(charts_markdown, chart_paths)[0]
+    
+    def render_narrative_html(self, narrative_markdown: str) -> str:
+        """Częściowa treść Gemini (HTML) bez placeholderów wykresów - także niedokończony fragment"""
+        return self._markdown_body(CHART_PLACEHOLDER_PATTERN.sub('', narrative_markdown), {})[0]
+    
+    def get_chart_paths(self, job_id: str) -> Dict[str, str]:
+        """Ścieżki wykresów raportu zadania z manifestu (pusty dict, gdy raportu nie ma)"""
+        return {
+            chart_type: os.path.join(self.visualization_service.charts_dir, filename)
+            for chart_type, filename in self._load_manifest(job_id).get('charts', {}).items() if filename
+        }
+    
+    def _load_manifest(self, job_id: str) -> Dict:
+        manifest_path = os.path.join(self.reports_dir, f'report_{job_id}.json')
+        if not os.path.exists(manifest_path):
+            return {}
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def _save_manifest(self, job_id: str, chart_paths: Dict[str, str], extra: Optional[Dict] = None) -> None:
+        manifest = {
+            "job_id": job_id,
+            "generated_at": datetime.now().isoformat(),
+            "charts": {chart_type: os.path.basename(path) if path else None for chart_type, path in chart_paths.items()},
+            **(extra or {})
+        }
+        manifest_path = os.path.join(self.reports_dir, f'report_{job_id}.json')
+        with open(manifest_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+    
+    def _remove_stale_charts(self) -> None:
+        """Usuwa z katalogu wykresów pliki, których nie wskazuje już żaden manifest raportu"""
+        referenced = set()
+        for manifest_path in glob.glob(os.path.join(self.reports_dir, 'report_*.json')):
+            try:
+                with open(manifest_path, 'r', encoding='utf-8') as f:
+                    referenced.update(name for name in json.load(f).get('charts', {}).values() if name)
+            except (OSError, ValueError):
+                return  # Manifest w trakcie zapisu - jego wykresów nie znamy, sprzątanie przy następnym raporcie
+        self.visualization_service.remove_unreferenced(referenced)
+    
+    def _load_narrative(self, job_id: str, narrative_fingerprint: str) -> Optional[tuple]:
+        """Zapisana treść Gemini (i czas jej powstania), jeśli powstała z tego samego fingerprintu"""
+        manifest = self._load_manifest(job_id)
+        narrative_path = os.path.join(self.reports_dir, f'report_{job_id}.narrative.md')
+        if manifest.get('narrative_fingerprint') != narrative_fingerprint or not os.path.exists(narrative_path):
+            return None
+        with open(narrative_path, 'r', encoding='utf-8') as f:
+            return f.read(), manifest.get('narrative_generated_at')
+    
+    @staticmethod
+    def _fingerprint(*parts) -> str:
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def _statistics_tables(self, stats: ClassificationStats) -> str:
+        """Tabele statystyk (Markdown) liczone z bieżących agregatów - aktualne także przy zapisanej treści"""
+        total = stats.total
+        
+        def share(count: int) -> str:
+            return f"{count / total * 100:.1f}%" if total else "0%"
+        
+        lines = [
+            "## Zestawienie statystyk",
+            "",
+            f"Łączna liczba komentarzy: **{total}**",
+            "",
+            "| Sentyment | Liczba | Udział |",
+            "|---|---:|---:|",
+        ]
+        lines += [f"| {sentiment.capitalize()} | {count} | {share(count)} |"
+                  for sentiment, count in stats.sentiment_counts.items()]
+        lines += [
+            "",
+            "| Kategoria | Liczba | Udział | Pozytywne | Neutralne | Negatywne |",
+            "|---|---:|---:|---:|---:|---:|",
+        ]
+        for category, count in sorted(stats.category_counts.items(), key=lambda item: item[1], reverse=True):
+            sentiments = stats.category_sentiment.get(category, {})
+            lines.append(
+                f"| {category} | {count} | {share(count)} | {sentiments.get('pozytywny', 0)} "
+                f"| {sentiments.get('neutralny', 0)} | {sentiments.get('negatywny', 0)} |"
+            )
+        return "\n".join(lines)
+    
+    def docx_path(self, job_id: str) -> str:
+        """Ścieżka DOCX raportu - nazwa z fingerprintu raportu (inny raport = inny plik)"""
+        fingerprint = self._load_manifest(job_id).get('fingerprint')
+        suffix = f'.{fingerprint[:16]}' if fingerprint else ''
+        return os.path.join(self.reports_dir, f'report_{job_id}{suffix}.docx')
+    
+    def get_cached_docx(self, job_id: str) -> Optional[str]:
+        """Gotowy DOCX bieżącej wersji raportu (None - trzeba go wygenerować)"""
+        docx_path = self.docx_path(job_id)
+        markdown_path = os.path.join(self.reports_dir, f'report_{job_id}.md')
+        if os.path.exists(docx_path) and os.path.exists(markdown_path) \
+                and os.path.getmtime(docx_path) >= os.path.getmtime(markdown_path):
+            return docx_path
+        return None
+    
+    def build_docx(self, job_id: str) -> Optional[str]:
+        """DOCX raportu z cache albo wygenerowany z zapisanego Markdown (zadanie w tle workera)"""
+        cached = self.get_cached_docx(job_id)
+        if cached:
+            return cached
+        
+        markdown_path = os.path.join(self.reports_dir, f'report_{job_id}.md')
+        if not os.path.exists(markdown_path):
+            return None
+        with open(markdown_path, 'r', encoding='utf-8') as f:
+            markdown_content = f.read()
+        return self.export_to_docx(markdown_content, self.get_chart_paths(job_id), job_id)
+    
     def export_to_docx(self, markdown_content: str, chart_paths: Dict[str, str], job_id: str) -> Optional[str]:
-        """Eksportuje raport Markdown do DOCX"""
+        """Eksportuje raport Markdown do DOCX (każdy wykres raz: w treści albo w sekcji „Wykresy”)"""
         if not DOCX_AVAILABLE:
             raise ImportError("python-docx nie jest zainstalowany. Zainstaluj: pip install python-docx")
         
-        docx_path = os.path.join(self.reports_dir, f'report_{job_id}.docx')
+        from docx import Document
+        from docx.shared import Inches
+        
+        docx_path = self.docx_path(job_id)
+        
+        # DOCX wymaga rastrów - PNG powstają dopiero teraz (raport HTML używa SVG/Chart.js)
+        rasters = self.visualization_service.get_rasters(chart_paths)
         
         # Utwórz dokument DOCX
         doc = Document()
@@ -107,6 +440,10 @@ class ReportService:
                         # Nieparzyste indeksy = tekst do pogrubienia
                         para.add_run(part).bold = True
         
+        # Wykresy wg nazwy pliku z Markdown (/static/charts/<hash>.<ext>)
+        chart_types_by_name = {os.path.basename(path): chart_type for chart_type, path in chart_paths.items() if path}
+        embedded = set()
+        
         # Parsuj Markdown linia po linii
         lines = markdown_content.split('\n')
         i = 0
@@ -152,13 +489,10 @@ class ReportService:
                     img_path = line_stripped[path_start:path_end]
                     # Sprawdź czy to ścieżka do wykresu
                     if img_path.startswith('/static/charts/'):
-                        chart_filename = os.path.basename(img_path)
-                        # Znajdź odpowiedni wykres w chart_paths
-                        for chart_type, chart_path in chart_paths.items():
-                            if chart_filename.endswith(os.path.basename(chart_path)):
-                                if os.path.exists(chart_path):
-                                    doc.add_picture(chart_path, width=Inches(6))
-                                    break
+                        chart_type = chart_types_by_name.get(os.path.basename(img_path))
+                        if chart_type in rasters and chart_type not in embedded:
+                            doc.add_picture(rasters[chart_type], width=Inches(6))
+                            embedded.add(chart_type)
             # Zwykły tekst z formatowaniem
             else:
                 para = doc.add_paragraph()
@@ -167,34 +501,26 @@ class ReportService:
             i += 1
         
         # Dodaj wykresy na końcu jeśli nie zostały dodane w treści
-        doc.add_page_break()
-        doc.add_heading('Wykresy', level=2)
-        for chart_type, chart_path in chart_paths.items():
-            if chart_path and os.path.exists(chart_path):
-                chart_names = {
-                    'bar': 'Rozkład kategorii i sentymentu',
-                    'sentiment_pie': 'Rozkład sentymentu',
-                    'categories_pie': 'Rozkład kategorii'
-                }
-                doc.add_heading(chart_names.get(chart_type, chart_type), level=3)
+        remaining = {chart_type: chart_path for chart_type, chart_path in rasters.items()
+                     if chart_type not in embedded and os.path.exists(chart_path)}
+        if remaining:
+            doc.add_page_break()
+            doc.add_heading('Wykresy', level=2)
+            for chart_type, chart_path in remaining.items():
+                doc.add_heading(CHART_TITLES.get(chart_type, chart_type), level=3)
                 doc.add_picture(chart_path, width=Inches(6))
         
-        doc.save(docx_path)
+        # Zapis przez plik tymczasowy - równoległe pobranie nie dostanie niepełnego dokumentu
+        tmp_path = f'{docx_path}.tmp'
+        doc.save(tmp_path)
+        os.replace(tmp_path, docx_path)
         return docx_path
     
-    def _calculate_statistics(self, classification_results: List[ClassificationResult], category_key: CategoryKey) -> Dict:
-        """Oblicza statystyki z wyników klasyfikacji"""
-        total = len(classification_results)
-        
-        # Sentiment
-        sentiment_counts = {'pozytywny': 0, 'neutralny': 0, 'negatywny': 0}
-        for result in classification_results:
-            sentiment_counts[result.sentiment] += 1
-        
-        # Kategorie
-        category_counts = {}
-        for result in classification_results:
-            category_counts[result.category] = category_counts.get(result.category, 0) + 1
+    def _calculate_statistics(self, aggregates: ClassificationStats, category_key: CategoryKey) -> Dict:
+        """Oblicza statystyki raportu z agregatów klasyfikacji"""
+        total = aggregates.total
+        sentiment_counts = dict(aggregates.sentiment_counts)
+        category_counts = dict(aggregates.category_counts)
         
         # Top kategorie
         top_categories = sorted(category_counts.items(), key=lambda x: x[1], reverse=True)[:5]
@@ -213,12 +539,13 @@ class ReportService:
     
     def _generate_report_content_with_gemini(
         self,
-        classification_results: List[ClassificationResult],
+        aggregates: ClassificationStats,
         category_key: CategoryKey,
         brand_name: str,
         stats: Dict,
         start_date: str,
-        end_date: str
+        end_date: str,
+        on_chunk: Optional[Callable[[str], None]] = None
     ) -> str:
         """Generuje treść raportu przez Gemini"""
         
@@ -229,13 +556,8 @@ class ReportService:
             count = stats['category_counts'].get(cat_name, 0)
             categories_summary.append(f"- {cat_name}: {count} komentarzy")
         
-        # Przykładowe komentarze (top 3 z każdej kategorii)
-        examples_by_category = {}
-        for result in classification_results:
-            if result.category not in examples_by_category:
-                examples_by_category[result.category] = []
-            if len(examples_by_category[result.category]) < 3:
-                examples_by_category[result.category].append(result.comment_text[:200])
+        # Przykładowe komentarze (pierwsze z każdej kategorii - wybrane w SQL)
+        examples_by_category = aggregates.examples
         
         examples_text = "\n".join([
             f"**{cat}**:\n" + "\n".join([f"- {ex}" for ex in examples[:2]])
@@ -289,12 +611,24 @@ Wygeneruj profesjonalny raport analityczny w formacie Markdown zawierający:
 - Raport powinien mieć około 800-1200 słów
 
 Zacznij od tytułu: # Raport Analizy Komentarzy - {brand_name}"""
-
+        
         # Wywołaj Gemini
-        response = self.gemini_service.flash_model.generate_content(prompt)
-        report_text = response.text.strip()
+        if on_chunk is None:
+            response = self.gemini_service.flash_model.generate_content(prompt)
+            return response.text.strip()
         
-        return report_text
+        # Strumieniowo: fragmenty przekazywane dalej w miarę generowania
+        parts = []
+        for chunk in self.gemini_service.flash_model.generate_content(prompt, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                # Fragment bez tekstu (np. sam finish_reason / safety ratings)
+                continue
+            if text:
+                parts.append(text)
+                on_chunk(text)
+        return "".join(parts).strip()
     
     def _embed_charts_in_markdown(self, markdown_content: str, chart_paths: Dict[str, str], job_id: str) -> str:
         """Wstawia wykresy do Markdown"""
@@ -302,15 +636,15 @@ Zacznij od tytułu: # Raport Analizy Komentarzy - {brand_name}"""
         
         # Zamień placeholdery na obrazy
         if chart_paths.get('sentiment_pie') and os.path.exists(chart_paths['sentiment_pie']):
-            chart_url = f"/static/charts/sentiment_pie_{job_id}.png"
+            chart_url = f"/static/charts/{os.path.basename(chart_paths['sentiment_pie'])}"
             content = content.replace('[WYKRES_SENTIMENT]', f'![Rozkład sentymentu]({chart_url})')
         
         if chart_paths.get('categories_pie') and os.path.exists(chart_paths['categories_pie']):
-            chart_url = f"/static/charts/categories_pie_{job_id}.png"
+            chart_url = f"/static/charts/{os.path.basename(chart_paths['categories_pie'])}"
             content = content.replace('[WYKRES_KATEGORIE]', f'![Rozkład kategorii]({chart_url})')
         
         if chart_paths.get('bar') and os.path.exists(chart_paths['bar']):
-            chart_url = f"/static/charts/bar_chart_{job_id}.png"
+            chart_url = f"/static/charts/{os.path.basename(chart_paths['bar'])}"
             # Jeśli nie ma placeholder, dodaj na końcu sekcji statystycznej
             if '[WYKRES_BAR]' in content:
                 content = content.replace('[WYKRES_BAR]', f'![Rozkład kategorii i sentymentu]({chart_url})')
@@ -322,30 +656,16 @@ Zacznij od tytułu: # Raport Analizy Komentarzy - {brand_name}"""
         
         return content
     
-    def _convert_markdown_to_html(self, markdown_content: str, chart_paths: Dict[str, str], job_id: str) -> str:
-        """Konwertuje Markdown do HTML z osadzonymi wykresami"""
-        # Konwertuj Markdown do HTML
-        html_body = markdown.markdown(markdown_content, extensions=['extra', 'codehilite'])
-        
-        # Konwertuj ścieżki wykresów na base64 dla PDF
-        for chart_type, chart_path in chart_paths.items():
-            if chart_path and os.path.exists(chart_path):
-                # Wczytaj obraz i konwertuj na base64
-                with open(chart_path, 'rb') as img_file:
-                    img_data = base64.b64encode(img_file.read()).decode('utf-8')
-                    img_ext = os.path.splitext(chart_path)[1][1:]  # png, jpg, etc.
-                    img_base64 = f"data:image/{img_ext};base64,{img_data}"
-                    
-                    # Zamień ścieżki na base64 w HTML
-                    chart_filename = os.path.basename(chart_path)
-                    html_body = html_body.replace(
-                        f'src="/static/charts/{chart_filename}"',
-                        f'src="{img_base64}"'
-                    )
-                    html_body = html_body.replace(
-                        f'![',
-                        f'<img src="{img_base64}" alt="'
-                    )
+    def _convert_markdown_to_html(self, markdown_content: str, chart_paths: Dict[str, str], job_id: str,
+                                  inline: bool = False) -> str:
+        """
+        Konwertuje Markdown do HTML z wykresami
+        inline=False: wykresy jako <img> z adresami /static/charts/<hash> (cache przeglądarki) - widok w aplikacji
+        inline=True: SVG wstawiony w treść, PNG jako base64 - plik do pobrania bez zależności
+        Specyfikacje JSON (CHART_FORMAT=client) w obu wersjach trafiają do <canvas> rysowanego przez Chart.js.
+        """
+        html_body, uses_client_charts = self._markdown_body(markdown_content, chart_paths, inline)
+        chart_script = CHARTJS_SCRIPT if uses_client_charts else ""
         
         # Pełny HTML z CSS
         html_template = f"""<!DOCTYPE html>
@@ -378,6 +698,13 @@ Zacznij od tytułu: # Raport Analizy Komentarzy - {brand_name}"""
             color: #7f8c8d;
             margin-top: 20px;
         }}
+        .report-chart {{
+            margin: 20px 0;
+        }}
+        .report-chart svg {{
+            max-width: 100%;
+            height: auto;
+        }}
         img {{
             max-width: 100%;
             height: auto;
@@ -385,6 +712,14 @@ Zacznij od tytułu: # Raport Analizy Komentarzy - {brand_name}"""
             border: 1px solid #ddd;
             border-radius: 4px;
         }}
+        table {{
+            border-collapse: collapse;
+            margin: 15px 0;
+        }}
+        th, td {{
+            border: 1px solid #ddd;
+            padding: 6px 12px;
+        }}
         ul, ol {{
             margin: 10px 0;
             padding-left: 30px;
@@ -402,17 +737,46 @@ Zacznij od tytułu: # Raport Analizy Komentarzy - {brand_name}"""
 </head>
 <body>
     {html_body}
+    {chart_script}
 </body>
 </html>"""
         
         return html_template
     
-    def _convert_chart_to_base64(self, chart_path: str) -> str:
-        """Konwertuje wykres PNG do base64"""
-        if not os.path.exists(chart_path):
-            return ""
-        
-        with open(chart_path, 'rb') as img_file:
-            img_data = base64.b64encode(img_file.read()).decode('utf-8')
-            img_ext = os.path.splitext(chart_path)[1][1:]
-            return f"data:image/{img_ext};base64,{img_data}"
+    def _markdown_body(self, markdown_content: str, chart_paths: Dict[str, str], inline: bool = False) -> tuple:
+        """Fragment HTML z Markdown z podmienionymi wykresami; zwraca (html, czy są wykresy Chart.js)"""
+        import markdown
+        
+        html_body = markdown.markdown(markdown_content, extensions=['extra', 'codehilite'])
+        
+        charts_by_name = {os.path.basename(path): path for path in chart_paths.values() if path}
+        uses_client_charts = False
+        
+        def replace_chart(match) -> str:
+            # Jedno przejście po HTML; każdy plik wykresu czytany co najwyżej raz
+            nonlocal uses_client_charts
+            chart_path = charts_by_name.get(match.group('name'))
+            if not chart_path or not os.path.exists(chart_path):
+                return match.group(0)
+            
+            if chart_path.endswith('.json'):
+                spec = self.visualization_service.load_spec(chart_path)
+                config = json.dumps(self.visualization_service.chartjs_config(spec['kind'], spec['data']), ensure_ascii=False)
+                uses_client_charts = True
+                return f'<div class="report-chart"><canvas data-chart="{html.escape(config, quote=True)}"></canvas></div>'
+            if not inline:
+                return match.group(0)
+            if chart_path.endswith('.svg'):
+                with open(chart_path, 'r', encoding='utf-8') as f:
+                    svg_markup = f.read()
+                # Bez prologu XML/DOCTYPE - sam element <svg>
+                return f'<div class="report-chart">{svg_markup[svg_markup.find("<svg"):]}</div>'
+            
+            with open(chart_path, 'rb') as img_file:
+                img_data = base64.b64encode(img_file.read()).decode('utf-8')
+            img_ext = os.path.splitext(chart_path)[1][1:]  # png, jpg, etc.
+            alt = re.search(r'alt="([^"]*)"', match.group(0))
+            return f'<img alt="{alt.group(1) if alt else ""}" src="data:image/{img_ext};base64,{img_data}" />'
+        
+        html_body = CHART_IMG_PATTERN.sub(replace_chart, html_body)
+        return html_body, uses_client_charts
@@ -0,0 +1,117 @@
+"""
+Strumień zdarzeń generowania raportu (SSE)
+
+ReportService publikuje zdarzenia w trakcie składania raportu: statistics i charts (liczone
+lokalnie, dostępne od razu), narrative (kolejne fragmenty treści Gemini), done/error.
+Zdarzenia trafiają do tabeli report_events - raport może powstawać w workerze w osobnym
+procesie, a trasa SSE w procesie Flask czyta je kursorem (id ostatniego zdarzenia).
+
+Fragmenty treści są łączone i zapisywane co NARRATIVE_FLUSH_SECONDS, żeby szybki strumień
+Gemini nie zamieniał się w setki pojedynczych zapisów do bazy.
+"""
+import sys
+import os
+import json
+import time
+import threading
+from datetime import datetime
+from typing import List, Dict, Optional
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import REPORT_STREAMING
+from services.database_service import DatabaseService
+
+EVENT_STATISTICS = "statistics"
+EVENT_CHARTS = "charts"
+EVENT_NARRATIVE = "narrative"
+EVENT_DONE = "done"
+EVENT_ERROR = "error"
+FINAL_EVENTS = (EVENT_DONE, EVENT_ERROR)
+
+NARRATIVE_FLUSH_SECONDS = 0.25
+
+class ReportStreamService:
+    """Zdarzenia generowania raportów - zapis przez generator raportu, odczyt kursorem przez SSE"""
+    _instance = None
+    _lock = threading.Lock()
+    
+    def __new__(cls):
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = super().__new__(cls)
+                    cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        self.enabled = REPORT_STREAMING
+        self.db = DatabaseService()
+        self._init_schema()
+        self._initialized = True
+    
+    def _init_schema(self):
+        """Inicjalizuje tabelę zdarzeń raportów"""
+        with self.db.get_connection() as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS report_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    job_id TEXT NOT NULL,
+                    event TEXT NOT NULL,  -- statistics/charts/narrative/done/error
+                    data TEXT NOT NULL,  -- JSON
+                    created_at TEXT NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_report_events_job ON report_events(job_id, id)")
+    
+    def reset(self, job_id: str) -> None:
+        """Usuwa zdarzenia poprzedniego generowania (początek nowego raportu)"""
+        if self.enabled:
+            self.db.execute_update("DELETE FROM report_events WHERE job_id = ?", (job_id,))
+    
+    def publish(self, job_id: str, event: str, data: Dict) -> None:
+        """Dopisuje zdarzenie raportu zadania"""
+        if not self.enabled:
+            return
+        self.db.execute_update(
+            "INSERT INTO report_events (job_id, event, data, created_at) VALUES (?, ?, ?, ?)",
+            (job_id, event, json.dumps(data, ensure_ascii=False), datetime.now().isoformat())
+        )
+    
+    def read(self, job_id: str, after: int = 0) -> List[Dict]:
+        """Zdarzenia nowsze niż kursor `after` (id ostatnio odczytanego zdarzenia), najstarsze najpierw"""
+        rows = self.db.execute_query(
+            "SELECT id, event, data FROM report_events WHERE job_id = ? AND id > ? ORDER BY id",
+            (job_id, after)
+        )
+        return [{"id": row['id'], "event": row['event'], "data": json.loads(row['data'])} for row in rows]
+    
+    def narrative_writer(self, job_id: str) -> "NarrativeWriter":
+        """Bufor fragmentów treści Gemini zapisywany partiami (flush() na końcu)"""
+        return NarrativeWriter(self, job_id)
+
+class NarrativeWriter:
+    """Łączy fragmenty treści i publikuje je najczęściej co NARRATIVE_FLUSH_SECONDS"""
+    
+    def __init__(self, stream: ReportStreamService, job_id: str):
+        self.stream = stream
+        self.job_id = job_id
+        self._pending: List[str] = []
+        self._last_flush = time.monotonic()
+    
+    def __call__(self, text: str) -> None:
+        self._pending.append(text)
+        if time.monotonic() - self._last_flush >= NARRATIVE_FLUSH_SECONDS:
+            self.flush()
+    
+    def flush(self) -> Optional[str]:
+        if not self._pending:
+            return None
+        delta = "".join(self._pending)
+        self._pending = []
+        self._last_flush = time.monotonic()
+        self.stream.publish(self.job_id, EVENT_NARRATIVE, {"delta": delta})
+        return delta
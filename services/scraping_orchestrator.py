@@ -1,7 +1,8 @@
 import sys
 import os
-from datetime import datetime
-from typing import Optional
+import math
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Tuple
 
 # Dodaj ścieżkę do projektu
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -9,9 +10,16 @@ from services.query_generator import QueryGeneratorService
 from services.facebook_search import FacebookSearchService
 from services.facebook_scraper import FacebookScraperService
 from services.gemini_service import GeminiService
+from services.brand_sources import BrandSourcesService
+from services.job_queue import check_lease
+from services.metrics import MetricsService
 from services.logger import LoggerService
 from models.scraping_result import ScrapingResult
 
+# Źródła odpytywane w trybie przyrostowym (rodzaj -> typ URL-a). Wzmianki to pojedyncze posty,
+# które są już w zbiorze marki - nowe wzmianki wymagałyby ponownego wyszukiwania.
+INCREMENTAL_SOURCES = [("groups", "group"), ("events", "event"), ("pages", "page")]
+
 class ScrapingOrchestrator:
     """Orchestrator scrapingu - koordynuje proces scrapingu Facebook"""
     
@@ -20,13 +28,15 @@ class ScrapingOrchestrator:
         self.facebook_search = FacebookSearchService()
         self.facebook_scraper = FacebookScraperService()
         self.gemini_service = GeminiService()
+        self.brand_sources = BrandSourcesService()
+        self.metrics = MetricsService()
         self.logger = LoggerService()
         
         # Parametry dla iteracyjnego pobierania
         self.target_posts = 20  # Docelowa liczba postów
-        self.initial_limit = 20  # Początkowy limit dla Apify
-        self.max_limit = 100  # Maksymalny limit (zabezpieczenie)
-        self.limit_multiplier = 2.0  # Mnożnik przy zwiększaniu limitu
+        self.initial_limit = 20  # Początkowy limit dla Apify (pierwsza strona per URL)
+        self.max_limit = 100  # Maksymalna liczba postów pobranych z jednego URL-a (zabezpieczenie)
+        self.min_accepted_ratio = 0.2  # Dolna granica szacowanego uzysku (rozmiar kolejnej strony)
         
         # Parametry weryfikacji Gemini
         self.enable_gemini_verification = True  # Włącz/wyłącz weryfikację
@@ -36,27 +46,40 @@ class ScrapingOrchestrator:
         brand_name: str, 
         start_date: Optional[str] = None,
         end_date: Optional[str] = None,
-        progress_callback=None
+        progress_callback=None,
+        batch_callback=None,
+        job_id: str = ""
     ) -> list[ScrapingResult]:
-        """Główna funkcja scrapingu"""
+        """
+        Główna funkcja scrapingu
+        batch_callback(list[ScrapingResult]) - wywoływany dla każdej zaakceptowanej partii postów
+        (np. klasyfikacja strumieniowa); ostateczna lista wyników jest zwracana na końcu.
+        Znalezione URL-e trafiają do rejestru źródeł marki (job_id - zadanie, które je odkryło).
+        """
         try:
             # Krok 1: Generuj zapytania
             if progress_callback:
                 progress_callback("Generowanie zapytań wyszukiwania...", 0.1)
             
-            queries = self.query_generator.generate_advanced_search_queries(brand_name)
+            with self.metrics.span("queries"):
+                queries = self.query_generator.generate_advanced_search_queries(brand_name)
             self.logger.add_log(f"Wygenerowano {len(queries)} zapytań")
             
             # Krok 2: Wyszukaj URL-e
             if progress_callback:
                 progress_callback("Wyszukiwanie URL-i Facebook...", 0.2)
             
-            urls_dict = self.facebook_search.find_facebook_mentions(brand_name, queries)
+            with self.metrics.span("search"):
+                urls_dict = self.facebook_search.find_facebook_mentions(brand_name, queries)
             self.logger.add_log(f"Znaleziono: {len(urls_dict['pages'])} stron, "
                               f"{len(urls_dict['groups'])} grup, "
                               f"{len(urls_dict['events'])} wydarzeń, "
                               f"{len(urls_dict['mentions'])} wzmianek")
             
+            # Rejestr źródeł: znane URL-e marki dołączone, martwe pominięte, najlepszy uzysk najpierw
+            self.brand_sources.register_urls(brand_name, urls_dict, job_id)
+            urls_dict = self.brand_sources.prioritize(brand_name, urls_dict)
+            
             if not any(urls_dict.values()):
                 self.logger.add_log("Nie znaleziono żadnych URL-i", "WARNING")
                 return []
@@ -81,7 +104,8 @@ class ScrapingOrchestrator:
                     current_count=len(all_results),
                     max_posts_per_url=1,
                     progress_callback=progress_callback,
-                    brand_name=brand_name
+                    brand_name=brand_name,
+                    batch_callback=batch_callback
                 )
                 all_results = self._merge_without_duplicates(all_results, results)
             
@@ -98,7 +122,8 @@ class ScrapingOrchestrator:
                     current_count=len(all_results),
                     max_posts_per_url=15,
                     progress_callback=progress_callback,
-                    brand_name=brand_name
+                    brand_name=brand_name,
+                    batch_callback=batch_callback
                 )
                 all_results = self._merge_without_duplicates(all_results, results)
             
@@ -115,7 +140,8 @@ class ScrapingOrchestrator:
                     current_count=len(all_results),
                     max_posts_per_url=10,
                     progress_callback=progress_callback,
-                    brand_name=brand_name
+                    brand_name=brand_name,
+                    batch_callback=batch_callback
                 )
                 all_results = self._merge_without_duplicates(all_results, results)
             
@@ -132,7 +158,8 @@ class ScrapingOrchestrator:
                     current_count=len(all_results),
                     max_posts_per_url=10,
                     progress_callback=progress_callback,
-                    brand_name=brand_name
+                    brand_name=brand_name,
+                    batch_callback=batch_callback
                 )
                 all_results = self._merge_without_duplicates(all_results, results)
             
@@ -155,11 +182,87 @@ class ScrapingOrchestrator:
                 )
             
             return final_results
-            
+        
         except Exception as e:
             self.logger.add_log(f"Błąd scrapingu: {str(e)}", "ERROR")
             raise
     
+    def execute_incremental_job(
+        self,
+        brand_name: str,
+        sources: Dict[str, List[Dict]],
+        known_urls: set,
+        since: Optional[str] = None,
+        start_date: Optional[str] = None,
+        end_date: Optional[str] = None,
+        progress_callback=None,
+        batch_callback=None
+    ) -> Tuple[list[ScrapingResult], Dict[str, str]]:
+        """
+        Scraping przyrostowy: bez generowania zapytań i wyszukiwania - tylko zarejestrowane URL-e,
+        każdy od własnego high-water marka (URL bez marka: od `since`, np. najnowszego posta
+        zadania bazowego). Posty już znane (known_urls) są pomijane.
+        Zwraca (nowe posty, {url: data najnowszego pobranego posta}).
+        """
+        try:
+            start_dt = self._parse_date(start_date) if start_date else None
+            end_dt = self._parse_date(end_date) if end_date else None
+            
+            plan = [(kind, url_type) for kind, url_type in INCREMENTAL_SOURCES if sources.get(kind)]
+            new_results = []
+            marks = {}
+            source_stats = {}
+            seen_urls = set(known_urls)
+            
+            for step, (kind, url_type) in enumerate(plan):
+                check_lease()
+                if progress_callback:
+                    progress_callback(f"Pobieranie nowych postów ({kind})...", 0.1 + 0.2 * step / len(plan))
+                
+                # Data graniczna per URL (dzień - posty z tego samego dnia odrzuca deduplikacja)
+                requests = []
+                for source in sources[kind]:
+                    bounds = [value[:10] for value in (source.get("high_water") or since, start_date) if value]
+                    requests.append({"url": source["url"], "newer_than": max(bounds) if bounds else None})
+                
+                with self.metrics.span(f"scrape:{url_type}", urls=len(requests)):
+                    results_by_url = self.facebook_scraper.scrape_sources(
+                        requests, url_type, max_posts_per_url=self.max_limit,
+                        older_than=self._day_after(end_dt) if end_dt else None
+                    )
+                source_of = self._count_source_run(source_stats, results_by_url)
+                
+                batch = []
+                for url, items in results_by_url.items():
+                    converted = self._convert_to_results(items)
+                    dates = [result.date.isoformat() for result in converted if result.date]
+                    if dates:
+                        marks[url] = max(dates)
+                    for result in converted:
+                        if result.url and result.url not in seen_urls:
+                            seen_urls.add(result.url)
+                            batch.append(result)
+                
+                filtered = self._filter_by_date_range(batch, start_dt, end_dt)
+                if self.enable_gemini_verification and filtered and brand_name:
+                    filtered = self._verify_posts_with_gemini(filtered, brand_name, start_date, end_date)
+                self._count_accepted(source_stats, source_of, filtered)
+                
+                new_results.extend(filtered)
+                if batch_callback and filtered:
+                    batch_callback(filtered)
+            
+            self.brand_sources.record_runs(brand_name, source_stats)
+            self.logger.add_log(
+                f"Scraping przyrostowy: {len(new_results)} nowych postów z "
+                f"{sum(len(sources[kind]) for kind, _ in plan)} URL-i"
+            )
+            return new_results, marks
+        
+        except Exception as e:
+            self.logger.add_log(f"Błąd scrapingu przyrostowego: {str(e)}", "ERROR")
+            raise
+    
     def _parse_date(self, date_str: str) -> Optional[datetime]:
         """Parsuje string daty (YYYY-MM-DD) do datetime"""
         if not date_str:
@@ -215,7 +318,8 @@ class ScrapingOrchestrator:
         current_count: int,
         max_posts_per_url: int,
         progress_callback=None,
-        brand_name: str = ""
+        brand_name: str = "",
+        batch_callback=None
     ) -> list[ScrapingResult]:
         """
         Pobiera posty z filtrowaniem po dacie, zwiększając limit jeśli potrzeba
@@ -224,39 +328,98 @@ class ScrapingOrchestrator:
         if not urls:
             return []
         
-        limit = self.initial_limit
-        all_filtered = []
-        seen_urls = set()  # Do śledzenia duplikatów
-        
         needed_count = target_count - current_count
         if needed_count <= 0:
             return []
         
-        while len(all_filtered) < needed_count and limit <= self.max_limit:
-            # Pobierz z Apify
+        source_stats = {}  # Uzysk per URL (rejestr źródeł marki)
+        try:
+            with self.metrics.span(f"scrape:{url_type}", urls=len(urls), needed=needed_count):
+                return self._scrape_until_target(
+                    urls, url_type, start_date, end_date, needed_count, max_posts_per_url,
+                    brand_name, batch_callback, source_stats
+                )
+        finally:
+            if brand_name and source_stats:
+                self.brand_sources.record_runs(brand_name, source_stats)
+    
+    def _scrape_until_target(
+        self,
+        urls: list[str],
+        url_type: str,
+        start_date: Optional[datetime],
+        end_date: Optional[datetime],
+        needed_count: int,
+        max_posts_per_url: int,
+        brand_name: str,
+        batch_callback,
+        source_stats: Dict[str, Dict[str, int]]
+    ) -> list[ScrapingResult]:
+        """
+        Pętla _scrape_with_date_filter: kolejne strony per URL zaczynają się tam, gdzie skończyła
+        poprzednia (onlyPostsOlderThan = dzień najstarszego pobranego posta), więc pobrane posty
+        nie są ściągane ponownie. Rozmiar kolejnej strony wynika z brakującej liczby postów
+        i dotychczasowego odsetka zaakceptowanych (zakres dat + weryfikacja).
+        """
+        all_filtered = []
+        seen_urls = set()  # Do śledzenia duplikatów
+        
+        # Zakres dat przekazywany do aktora; kursor per URL przesuwa górną granicę wstecz
+        newer_than = start_date.strftime("%Y-%m-%d") if start_date else None
+        cursors = {url: self._day_after(end_date) if end_date else None for url in urls}
+        overlap = {url: 0 for url in urls}  # Posty z dnia kursora pobrane już wcześniej (wrócą ponownie)
+        fetched = {url: 0 for url in urls}
+        paginate = url_type != "post"  # Wzmianka to pojedynczy post - nie ma kolejnych stron
+        
+        active = list(urls)
+        page_size = min(self.initial_limit, max_posts_per_url)
+        fetched_new = 0
+        
+        while active and len(all_filtered) < needed_count:
+            check_lease()  # Worker utracił dzierżawę - nie pobieraj kolejnych stron równolegle z nowym
+            
+            # Pobierz z Apify (wyniki per URL - kursory i statystyki uzysku źródeł)
             try:
-                results = self.facebook_scraper.scrape_urls_parallel(
-                    urls, url_type, max_posts_per_url=min(limit, max_posts_per_url)
+                requested = {url: page_size + overlap[url] for url in active}
+                raw_counts = {}  # Elementy aktora przed filtrowaniem (o wyczerpaniu decyduje pełność strony)
+                results_by_url = self.facebook_scraper.scrape_sources(
+                    [
+                        {"url": url, "newer_than": newer_than, "older_than": cursors[url], "max_posts": requested[url]}
+                        for url in active
+                    ],
+                    url_type, max_posts_per_url=page_size, raw_counts=raw_counts
                 )
             except Exception as e:
                 self.logger.add_log(f"Błąd podczas pobierania: {str(e)}", "WARNING")
                 break
             
-            if not results:
-                # Brak wyników - prawdopodobnie nie ma więcej danych
-                break
-            
-            # Konwertuj do ScrapingResult
-            converted = self._convert_to_results(results)
+            source_of = self._count_source_run(source_stats, results_by_url)
             
-            # Usuń duplikaty (po URL) - tylko nowe, których jeszcze nie widzieliśmy
+            # Nowe posty (po URL) i przesunięcie kursorów; URL bez kolejnej strony jest zamykany
             unique_converted = []
-            for result in converted:
-                if result.url and result.url not in seen_urls:
-                    seen_urls.add(result.url)
-                    unique_converted.append(result)
+            exhausted = set()
+            for url in active:
+                items = results_by_url.get(url, [])
+                raw_count = raw_counts.get(url, len(items))
+                fetched[url] += raw_count
+                converted = self._convert_to_results(items)
+                new = [result for result in converted if result.url and result.url not in seen_urls]
+                seen_urls.update(result.url for result in new)
+                unique_converted.extend(new)
+                
+                days = [result.date.date() for result in converted if result.date]
+                if (not paginate or raw_count < requested[url] or not new or not days
+                        or fetched[url] >= self.max_limit
+                        or (start_date and min(days) < start_date.date())):
+                    exhausted.add(url)
+                else:
+                    # Kursor z dokładnością do dnia - najstarszy dzień może nie być pobrany w całości
+                    oldest = min(days)
+                    cursors[url] = (oldest + timedelta(days=1)).isoformat()
+                    overlap[url] = sum(1 for day in days if day == oldest)
+            fetched_new += len(unique_converted)
             
-            # Filtruj po dacie
+            # Filtruj po dacie (aktor filtruje z dokładnością do dnia, posty bez daty przechodzą)
             filtered = self._filter_by_date_range(unique_converted, start_date, end_date)
             
             # Weryfikacja przez Gemini (jeśli włączona)
@@ -268,38 +431,53 @@ class ScrapingOrchestrator:
                     end_date.strftime("%Y-%m-%d") if end_date else None
                 )
                 filtered = verified
+            self._count_accepted(source_stats, source_of, filtered)
             
             # Dodaj do zbioru (już są bez duplikatów, bo seen_urls jest wspólne)
             all_filtered.extend(filtered)
+            if batch_callback and filtered:
+                batch_callback(filtered)
             
-            # Jeśli mamy wystarczająco, zwróć
-            if len(all_filtered) >= needed_count:
-                return all_filtered[:needed_count]
-            
-            # Jeśli wszystkie pobrane posty były poza zakresem daty
-            if len(filtered) == 0 and len(unique_converted) > 0:
-                # Wszystkie posty były poza zakresem - prawdopodobnie nie ma więcej w zakresie
-                self.logger.add_log(
-                    f"Wszystkie {len(unique_converted)} pobrane posty były poza zakresem daty. "
-                    f"Przerywam pobieranie dla {url_type}.",
-                    "INFO"
-                )
+            active = [url for url in active if url not in exhausted]
+            missing = needed_count - len(all_filtered)
+            if missing <= 0 or not active:
                 break
             
-            # Jeśli pobraliśmy mniej niż limit, prawdopodobnie nie ma więcej danych
-            if len(results) < limit:
-                break
-            
-            # Zwiększ limit i spróbuj ponownie
-            old_limit = limit
-            limit = min(int(limit * self.limit_multiplier), self.max_limit)
+            # Następna strona: tyle postów, ile przy obserwowanym uzysku powinno wystarczyć
+            accepted_ratio = max(len(all_filtered) / max(fetched_new, 1), self.min_accepted_ratio)
+            page_size = min(self.max_limit, max(1, math.ceil(missing / accepted_ratio / len(active))))
             self.logger.add_log(
-                f"Po filtrowaniu zostało {len(all_filtered)}/{needed_count} postów. "
-                f"Zwiększam limit z {old_limit} do {limit}.",
+                f"Po filtrowaniu zostało {len(all_filtered)}/{needed_count} postów "
+                f"(uzysk {accepted_ratio:.0%}). Kolejna strona: {page_size} starszych postów z {len(active)} URL-i.",
                 "INFO"
             )
         
-        return all_filtered
+        return all_filtered[:needed_count]
+    
+    @staticmethod
+    def _day_after(date: datetime) -> str:
+        """Granica onlyPostsOlderThan obejmująca cały podany dzień"""
+        return (date.date() + timedelta(days=1)).isoformat()
+    
+    def _count_source_run(self, stats: Dict[str, Dict[str, int]], results_by_url: Dict[str, list]) -> Dict[str, str]:
+        """Dolicza uruchomienie aktora per URL źródła; zwraca mapę URL posta -> URL źródła"""
+        source_of = {}
+        for url, items in results_by_url.items():
+            entry = stats.setdefault(url, {"runs": 0, "returned": 0, "accepted": 0, "empty": 0})
+            entry["runs"] += 1
+            entry["returned"] += len(items)
+            entry["empty"] += 0 if items else 1
+            for item in items:
+                source_of.setdefault(item.get("url") or item.get("postUrl") or "", url)
+        return source_of
+    
+    def _count_accepted(self, stats: Dict[str, Dict[str, int]], source_of: Dict[str, str],
+                        accepted: list[ScrapingResult]) -> None:
+        """Dolicza posty zaakceptowane (zakres dat + weryfikacja) do ich źródeł"""
+        for result in accepted:
+            source = source_of.get(result.url)
+            if source:
+                stats[source]["accepted"] += 1
     
     def _merge_without_duplicates(
         self, 
@@ -353,40 +531,43 @@ class ScrapingOrchestrator:
         
         self.logger.add_log(f"Weryfikacja {len(results)} postów przez Gemini...")
         
-        for result in results:
-            try:
-                # Przygotuj datę do weryfikacji
-                post_date_str = result.date.strftime("%Y-%m-%d") if result.date else "nieznana"
-                
-                # Wywołaj Gemini
-                verification = self.gemini_service.verify_post(
-                    post_text=result.text,
-                    post_date=post_date_str,
-                    brand_name=brand_name,
-                    start_date=start_date or "brak",
-                    end_date=end_date or "brak"
-                )
+        with self.metrics.span("verify", posts=len(results)):
+            for result in results:
+                try:
+                    # Przygotuj datę do weryfikacji
+                    post_date_str = result.date.strftime("%Y-%m-%d") if result.date else "nieznana"
+                    
+                    # Wywołaj Gemini
+                    verification = self.gemini_service.verify_post(
+                        post_text=result.text,
+                        post_date=post_date_str,
+                        brand_name=brand_name,
+                        start_date=start_date or "brak",
+                        end_date=end_date or "brak"
+                    )
+                    
+                    if verification.get("valid", False):
+                        verified_results.append(result)
+                    else:
+                        rejected_count += 1
+                        self.logger.add_log(
+                            f"Odrzucono post (Gemini): {verification.get('reason', 'Brak powodu')}",
+                            "INFO"
+                        )
                 
-                if verification.get("valid", False):
-                    verified_results.append(result)
-                else:
-                    rejected_count += 1
+                except Exception as e:
+                    # W przypadku błędu, zaakceptuj post (fail-safe)
                     self.logger.add_log(
-                        f"Odrzucono post (Gemini): {verification.get('reason', 'Brak powodu')}",
-                        "INFO"
+                        f"Błąd weryfikacji posta (zaakceptowano): {str(e)}",
+                        "WARNING"
                     )
-                    
-            except Exception as e:
-                # W przypadku błędu, zaakceptuj post (fail-safe)
-                self.logger.add_log(
-                    f"Błąd weryfikacji posta (zaakceptowano): {str(e)}",
-                    "WARNING"
-                )
-                verified_results.append(result)
+                    verified_results.append(result)
         
         self.logger.add_log(
             f"Weryfikacja zakończona: {len(verified_results)}/{len(results)} postów zaakceptowanych, "
             f"{rejected_count} odrzuconych"
         )
+        self.metrics.inc("verified_posts", len(verified_results), result="accepted")
+        self.metrics.inc("verified_posts", rejected_count, result="rejected")
         
         return verified_results
@@ -1,89 +1,116 @@
 """
 Serwis generowania wizualizacji - wykresy matplotlib
+
+Wykresy rysowane są przez obiektowe API (Figure + FigureCanvasAgg), bez globalnego
+stanu pyplot, w puli procesów - równoległe zadania raportów nie współdzielą figur.
+Nazwa pliku to hash danych wykresu (np. bar_chart_<hash>.png): niezmienione agregaty
+używają istniejącego PNG bez ponownego rysowania, a zadania z tymi samymi danymi
+dzielą plik. Przypisanie wykresów do zadania trzyma manifest raportu (ReportService), który po
+każdym zapisie usuwa pliki niewskazywane już przez żaden manifest (remove_unreferenced).
+
+Format wyjścia (CHART_FORMAT): png, svg (wektorowy, tekst jako <text> - kilka razy mniejszy
+od PNG) lub client - bez matplotlib, tylko specyfikacja JSON rysowana w przeglądarce przez
+Chart.js. Specyfikacja (rodzaj + dane) jest zapisywana zawsze, więc rastry PNG dla eksportu
+DOCX powstają dopiero na żądanie (get_rasters).
 """
 import sys
 import os
-import matplotlib
-matplotlib.use('Agg')  # Backend bez GUI
-import matplotlib.pyplot as plt
-from typing import List, Dict
-from collections import Counter
+import json
+import hashlib
+import time
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import Iterable, List, Dict, Union, Optional
 
 # Dodaj ścieżkę do projektu
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import CHART_RENDER_WORKERS, CHART_FORMAT
 from models.classification_result import ClassificationResult
+from models.classification_stats import ClassificationStats
 
-class VisualizationService:
-    """Serwis generowania wykresów dla raportów"""
-    
-    def __init__(self):
-        self.charts_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'charts')
-        os.makedirs(self.charts_dir, exist_ok=True)
+# Wejście wykresów: agregaty z DatabaseService.get_classification_aggregates (lub lista wyników)
+ChartInput = Union[ClassificationStats, List[ClassificationResult]]
+
+CHART_STYLE_VERSION = "1"  # Zmiana wyglądu wykresów = nowe nazwy plików (stare PNG nie są używane)
+CHART_DPI = 150
+CHART_ORPHAN_GRACE_SECONDS = 3600  # Wykres użyty niedawno może należeć do raportu w toku (bez manifestu)
+SENTIMENT_COLORS = {'pozytywny': '#4CAF50', 'neutralny': '#9E9E9E', 'negatywny': '#F44336'}
+CHART_FILE_PREFIXES = {'bar': 'bar_chart', 'sentiment_pie': 'sentiment_pie', 'categories_pie': 'categories_pie'}
+CHART_TITLES = {
+    'bar': 'Rozkład sentymentu w kategoriach',
+    'sentiment_pie': 'Rozkład sentymentu',
+    'categories_pie': 'Rozkład kategorii'
+}
+CHART_FORMATS = ('png', 'svg', 'client')
+# Paleta Set3 (jak w matplotlib) dla wykresu kategorii rysowanego w przeglądarce
+SET3_COLORS = ['#8dd3c7', '#ffffb3', '#bebada', '#fb8072', '#80b1d3', '#fdb462',
+               '#b3de69', '#fccde5', '#d9d9d9', '#bc80bd', '#ccebc5', '#ffed6f']
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    """Wspólna pula procesów renderujących (tworzona przy pierwszym użyciu)"""
+    global _executor
+    if CHART_RENDER_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # spawn: fork wielowątkowego procesu Flask/workera mógłby skopiować zajęte blokady
+            # Więcej procesów niż rdzeni nie przyspieszy rysowania (matplotlib liczy na CPU)
+            _executor = ProcessPoolExecutor(
+                max_workers=min(CHART_RENDER_WORKERS, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _executor
+
+def _reset_executor() -> None:
+    """Porzuca uszkodzoną pulę (np. proces potomny zabity) - kolejne wywołanie utworzy nową"""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+def render_chart(kind: str, data, filepath: str) -> str:
+    """
+    Rysuje wykres `kind` z przygotowanych danych do pliku PNG lub SVG - format z rozszerzenia
+    (funkcja modułu - wywoływana w procesie puli). Zapis przez plik tymczasowy i os.replace:
+    równoległe zadania z tymi samymi danymi nie zobaczą niepełnego pliku.
+    """
+    import matplotlib
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib import colormaps
     
-    def generate_bar_chart(self, classification_results: List[ClassificationResult], job_id: str) -> str:
-        """
-        Generuje wykres słupkowy: kategorie × sentiment
-        Zwraca ścieżkę do pliku PNG
-        """
-        # Przygotuj dane
-        data = self._prepare_category_sentiment_data(classification_results)
-        
-        if not data:
-            return None
-        
-        # Przygotuj dane do wykresu
+    if kind == 'bar':
         categories = list(data.keys())
-        sentiments = ['pozytywny', 'neutralny', 'negatywny']
-        colors = {'pozytywny': '#4CAF50', 'neutralny': '#9E9E9E', 'negatywny': '#F44336'}
-        
-        # Pozycje na osi X
         x = range(len(categories))
         width = 0.25
         
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        for i, sentiment in enumerate(sentiments):
+        fig = Figure(figsize=(12, 6))
+        ax = fig.add_subplot()
+        for i, sentiment in enumerate(SENTIMENT_COLORS):
             values = [data[cat].get(sentiment, 0) for cat in categories]
             offset = (i - 1) * width
-            ax.bar([xi + offset for xi in x], values, width, 
-                   label=sentiment.capitalize(), color=colors[sentiment])
+            ax.bar([xi + offset for xi in x], values, width,
+                   label=sentiment.capitalize(), color=SENTIMENT_COLORS[sentiment])
         
         ax.set_xlabel('Kategorie', fontsize=12)
         ax.set_ylabel('Liczba komentarzy', fontsize=12)
-        ax.set_title('Rozkład sentymentu w kategoriach', fontsize=14, fontweight='bold')
-        ax.set_xticks(x)
+        ax.set_title(CHART_TITLES[kind], fontsize=14, fontweight='bold')
+        ax.set_xticks(list(x))
         ax.set_xticklabels(categories, rotation=45, ha='right')
         ax.legend()
         ax.grid(axis='y', alpha=0.3)
-        
-        plt.tight_layout()
-        
-        # Zapisz
-        filepath = os.path.join(self.charts_dir, f'bar_chart_{job_id}.png')
-        plt.savefig(filepath, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return filepath
-    
-    def generate_pie_chart_sentiment(self, classification_results: List[ClassificationResult], job_id: str) -> str:
-        """
-        Generuje wykres kołowy rozkładu sentymentu
-        Zwraca ścieżkę do pliku PNG
-        """
-        data = self._prepare_sentiment_data(classification_results)
-        
-        if not data or sum(data.values()) == 0:
-            return None
-        
-        # Kolory
-        colors = {'pozytywny': '#4CAF50', 'neutralny': '#9E9E9E', 'negatywny': '#F44336'}
-        labels = [sent.capitalize() for sent in data.keys()]
-        sizes = list(data.values())
-        chart_colors = [colors[sent] for sent in data.keys()]
-        
-        fig, ax = plt.subplots(figsize=(8, 8))
-        
-        wedges, texts, autotexts = ax.pie(sizes, labels=labels, colors=chart_colors,
+    elif kind == 'sentiment_pie':
+        fig = Figure(figsize=(8, 8))
+        ax = fig.add_subplot()
+        wedges, texts, autotexts = ax.pie(list(data.values()),
+                                          labels=[sent.capitalize() for sent in data.keys()],
+                                          colors=[SENTIMENT_COLORS[sent] for sent in data.keys()],
                                           autopct='%1.1f%%', startangle=90,
                                           textprops={'fontsize': 12})
         
@@ -92,109 +119,284 @@ class VisualizationService:
             wedges[0].set_edgecolor('white')
             wedges[0].set_linewidth(2)
         
-        ax.set_title('Rozkład sentymentu', fontsize=14, fontweight='bold', pad=20)
-        
-        plt.tight_layout()
-        
-        # Zapisz
-        filepath = os.path.join(self.charts_dir, f'sentiment_pie_{job_id}.png')
-        plt.savefig(filepath, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return filepath
+        ax.set_title(CHART_TITLES[kind], fontsize=14, fontweight='bold', pad=20)
+    elif kind == 'categories_pie':
+        fig = Figure(figsize=(10, 10))
+        ax = fig.add_subplot()
+        ax.pie(list(data.values()), labels=list(data.keys()),
+               colors=colormaps['Set3'](range(len(data))),
+               autopct='%1.1f%%', startangle=90,
+               textprops={'fontsize': 10})
+        ax.set_title(CHART_TITLES[kind], fontsize=14, fontweight='bold', pad=20)
+    else:
+        raise ValueError(f"Nieznany typ wykresu: {kind}")
+    
+    fig.tight_layout()
+    FigureCanvasAgg(fig)
     
-    def generate_pie_chart_categories(self, classification_results: List[ClassificationResult], job_id: str) -> str:
+    image_format = os.path.splitext(filepath)[1][1:]
+    save_options = {}
+    rc_overrides = {}
+    if image_format == 'svg':
+        # Tekst jako <text> zamiast ścieżek glifów, stałe identyfikatory i brak daty - mały, powtarzalny plik
+        rc_overrides = {'svg.fonttype': 'none', 'svg.hashsalt': 'socialpure'}
+        save_options['metadata'] = {'Date': None}
+    
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(filepath), suffix=f'.{image_format}.tmp')
+    try:
+        # rc_context - ustawienia SVG tylko na czas zapisu (bez zmiany globalnego rcParams procesu)
+        with os.fdopen(fd, 'wb') as f, matplotlib.rc_context(rc_overrides):
+            fig.savefig(f, format=image_format, dpi=CHART_DPI, bbox_inches='tight', **save_options)
+        os.replace(tmp_path, filepath)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return filepath
+
+class VisualizationService:
+    """Serwis generowania wykresów dla raportów"""
+    
+    def __init__(self):
+        self.charts_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'static', 'charts')
+        os.makedirs(self.charts_dir, exist_ok=True)
+    
+    def generate_bar_chart(self, stats: ChartInput, job_id: str, image_format: str = 'png') -> Optional[str]:
         """
-        Generuje wykres kołowy rozkładu kategorii
-        Zwraca ścieżkę do pliku PNG
+        Generuje wykres słupkowy: kategorie × sentiment (w bieżącym procesie)
+        Zwraca ścieżkę do pliku PNG lub SVG (image_format), None bez danych
         """
-        data = self._prepare_category_data(classification_results)
-        
-        if not data or sum(data.values()) == 0:
-            return None
-        
-        # Sortuj według wartości (malejąco)
-        sorted_data = dict(sorted(data.items(), key=lambda x: x[1], reverse=True))
-        
-        # Ogranicz do top 8 kategorii, reszta jako "Inne"
-        if len(sorted_data) > 8:
-            top_8 = dict(list(sorted_data.items())[:8])
-            others_count = sum(list(sorted_data.values())[8:])
-            top_8['Inne'] = others_count
-            sorted_data = top_8
-        
-        labels = list(sorted_data.keys())
-        sizes = list(sorted_data.values())
-        
-        fig, ax = plt.subplots(figsize=(10, 10))
-        
-        # Kolory - użyj palety matplotlib
-        colors = plt.cm.Set3(range(len(labels)))
-        
-        wedges, texts, autotexts = ax.pie(sizes, labels=labels, colors=colors,
-                                          autopct='%1.1f%%', startangle=90,
-                                          textprops={'fontsize': 10})
-        
-        ax.set_title('Rozkład kategorii', fontsize=14, fontweight='bold', pad=20)
-        
-        plt.tight_layout()
-        
-        # Zapisz
-        filepath = os.path.join(self.charts_dir, f'categories_pie_{job_id}.png')
-        plt.savefig(filepath, dpi=150, bbox_inches='tight')
-        plt.close()
-        
-        return filepath
+        return self._render_now('bar', self._chart_data('bar', stats), image_format)
+    
+    def generate_pie_chart_sentiment(self, stats: ChartInput, job_id: str, image_format: str = 'png') -> Optional[str]:
+        """
+        Generuje wykres kołowy rozkładu sentymentu (w bieżącym procesie)
+        Zwraca ścieżkę do pliku PNG lub SVG (image_format), None bez danych
+        """
+        return self._render_now('sentiment_pie', self._chart_data('sentiment_pie', stats), image_format)
+    
+    def generate_pie_chart_categories(self, stats: ChartInput, job_id: str, image_format: str = 'png') -> Optional[str]:
+        """
+        Generuje wykres kołowy rozkładu kategorii (w bieżącym procesie)
+        Zwraca ścieżkę do pliku PNG lub SVG (image_format), None bez danych
+        """
+        return self._render_now('categories_pie', self._chart_data('categories_pie', stats), image_format)
     
-    def generate_all_charts(self, classification_results: List[ClassificationResult], job_id: str) -> Dict[str, str]:
+    def generate_all_charts(self, stats: ChartInput, job_id: str, chart_format: str = None) -> Dict[str, str]:
         """
-        Generuje wszystkie wykresy
+        Generuje wszystkie wykresy (brakujące równolegle w puli procesów, istniejące bez rysowania)
+        chart_format: png | svg | client (specyfikacja JSON dla Chart.js); domyślnie CHART_FORMAT
         Zwraca dict: {"bar": path, "sentiment_pie": path, "categories_pie": path}
         """
-        charts = {}
-        
-        try:
-            charts['bar'] = self.generate_bar_chart(classification_results, job_id)
-        except Exception as e:
-            print(f"Błąd generowania wykresu słupkowego: {e}")
-            charts['bar'] = None
-        
-        try:
-            charts['sentiment_pie'] = self.generate_pie_chart_sentiment(classification_results, job_id)
-        except Exception as e:
-            print(f"Błąd generowania wykresu kołowego sentymentu: {e}")
-            charts['sentiment_pie'] = None
-        
-        try:
-            charts['categories_pie'] = self.generate_pie_chart_categories(classification_results, job_id)
-        except Exception as e:
-            print(f"Błąd generowania wykresu kołowego kategorii: {e}")
-            charts['categories_pie'] = None
+        chart_format = chart_format or CHART_FORMAT
+        if chart_format not in CHART_FORMATS:
+            raise ValueError(f"Nieznany format wykresów: {chart_format} (dostępne: {', '.join(CHART_FORMATS)})")
         
+        stats = ClassificationStats.coerce(stats)
+        charts = {}
+        pending = {}
+        
+        for kind in CHART_FILE_PREFIXES:
+            data = self._chart_data(kind, stats)
+            if not data:
+                charts[kind] = None
+                continue
+            spec_path = self._write_spec(kind, data)
+            if chart_format == 'client':
+                charts[kind] = spec_path
+                continue
+            filepath = self.chart_path(kind, data, chart_format)
+            charts[kind] = filepath
+            if not self._touch(filepath):
+                pending[kind] = (data, filepath)
+        
+        for kind in self._render_pending(pending):
+            charts[kind] = None
         return charts
     
-    def _prepare_sentiment_data(self, classification_results: List[ClassificationResult]) -> Dict[str, int]:
-        """Przygotowuje dane do wykresu sentymentu"""
-        sentiment_counts = Counter()
-        for result in classification_results:
-            sentiment_counts[result.sentiment] += 1
-        
-        return dict(sentiment_counts)
+    def get_rasters(self, chart_paths: Dict[str, str]) -> Dict[str, str]:
+        """
+        Wersje PNG wykresów (np. do DOCX) - renderowane ze specyfikacji dopiero przy pierwszym
+        żądaniu, potem brane z dysku. Wykres bez PNG i bez specyfikacji jest pomijany.
+        """
+        rasters = {}
+        pending = {}
+        for kind, chart_path in chart_paths.items():
+            if not chart_path:
+                continue
+            base = os.path.splitext(chart_path)[0]
+            png_path = base + '.png'
+            if self._touch(png_path):
+                rasters[kind] = png_path
+                continue
+            spec = self.load_spec(chart_path)
+            if spec:
+                rasters[kind] = png_path
+                pending[kind] = (spec['data'], png_path)
+        
+        for kind in self._render_pending(pending):
+            rasters.pop(kind, None)
+        return rasters
+    
+    def load_spec(self, chart_path: str) -> Optional[Dict]:
+        """Specyfikacja wykresu ({"kind", "data"}) zapisana obok pliku wykresu"""
+        spec_path = os.path.splitext(chart_path)[0] + '.json'
+        if not os.path.exists(spec_path):
+            return None
+        with open(spec_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    
+    def chartjs_config(self, kind: str, data) -> Dict:
+        """Konfiguracja Chart.js odpowiadająca wykresowi matplotlib (tryb client)"""
+        title = {"display": True, "text": CHART_TITLES[kind], "font": {"size": 16, "weight": "bold"}}
+        if kind == 'bar':
+            categories = list(data.keys())
+            return {
+                "type": "bar",
+                "data": {
+                    "labels": categories,
+                    "datasets": [
+                        {"label": sentiment.capitalize(), "backgroundColor": color,
+                         "data": [data[cat].get(sentiment, 0) for cat in categories]}
+                        for sentiment, color in SENTIMENT_COLORS.items()
+                    ]
+                },
+                "options": {"plugins": {"title": title},
+                            "scales": {"y": {"title": {"display": True, "text": "Liczba komentarzy"}}}}
+            }
+        if kind == 'sentiment_pie':
+            colors = [SENTIMENT_COLORS[sent] for sent in data.keys()]
+            labels = [sent.capitalize() for sent in data.keys()]
+        else:
+            colors = [SET3_COLORS[i % len(SET3_COLORS)] for i in range(len(data))]
+            labels = list(data.keys())
+        return {
+            "type": "pie",
+            "data": {"labels": labels, "datasets": [{"data": list(data.values()), "backgroundColor": colors}]},
+            "options": {"plugins": {"title": title, "legend": {"position": "bottom"}}}
+        }
+    
+    def chart_path(self, kind: str, data, chart_format: str = 'png') -> str:
+        """Ścieżka wykresu wyznaczona przez hash jego danych (i wersji stylu); rozszerzenie = format"""
+        payload = json.dumps([CHART_STYLE_VERSION, kind, data], ensure_ascii=False, default=str)
+        digest = hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+        extension = 'json' if chart_format == 'client' else chart_format
+        return os.path.join(self.charts_dir, f'{CHART_FILE_PREFIXES[kind]}_{digest}.{extension}')
+    
+    def _write_spec(self, kind: str, data) -> str:
+        """Zapisuje specyfikację wykresu (jeśli jej nie ma) - źródło dla trybu client i rastrów na żądanie"""
+        spec_path = self.chart_path(kind, data, 'client')
+        if not self._touch(spec_path):
+            fd, tmp_path = tempfile.mkstemp(dir=self.charts_dir, suffix='.json.tmp')
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump({"kind": kind, "data": data}, f, ensure_ascii=False)
+            os.replace(tmp_path, spec_path)
+        return spec_path
+    
+    def remove_unreferenced(self, referenced: Iterable[str], grace_seconds: float = CHART_ORPHAN_GRACE_SECONDS) -> int:
+        """
+        Usuwa pliki wykresów (obraz, specyfikacja JSON, raster PNG), których nazwy nie ma w referenced
+        (nazwy plików z manifestów raportów). Pliki użyte w ostatnich grace_seconds zostają.
+        Zwraca liczbę usuniętych plików.
+        """
+        keep = {os.path.splitext(name)[0] for name in referenced if name}
+        prefixes = tuple(f'{prefix}_' for prefix in CHART_FILE_PREFIXES.values())
+        cutoff = time.time() - grace_seconds
+        removed = 0
+        for entry in os.scandir(self.charts_dir):
+            base = entry.name.split('.', 1)[0]
+            if not entry.name.startswith(prefixes) or base in keep:
+                continue
+            try:
+                if entry.stat().st_mtime > cutoff:
+                    continue
+                os.remove(entry.path)
+                removed += 1
+            except OSError:
+                pass  # Usunięty równolegle przez inny proces
+        return removed
+    
+    @staticmethod
+    def _touch(path: str) -> bool:
+        """Odświeża czas modyfikacji istniejącego pliku (ochrona przed remove_unreferenced); False = brak pliku"""
+        try:
+            os.utime(path)
+            return True
+        except OSError:
+            return False
+    
+    def _render_pending(self, pending: Dict[str, tuple]) -> List[str]:
+        """
+        Rysuje wykresy {kind: (dane, ścieżka)} - kilka naraz w puli procesów, pojedynczy lokalnie.
+        Zwraca rodzaje wykresów, których nie udało się narysować.
+        """
+        executor = _get_executor() if len(pending) > 1 else None
+        futures = {}
+        if executor:
+            try:
+                futures = {kind: executor.submit(render_chart, kind, data, filepath)
+                           for kind, (data, filepath) in pending.items()}
+            except Exception as e:
+                print(f"Pula renderowania wykresów niedostępna, rysowanie w bieżącym procesie: {e}")
+                _reset_executor()
+                futures = {}
+        
+        failed = []
+        for kind, (data, filepath) in pending.items():
+            try:
+                if kind in futures:
+                    try:
+                        futures[kind].result()
+                    except Exception as e:
+                        # Proces potomny padł lub pula jest zamknięta - jedna próba lokalnie
+                        print(f"Błąd renderowania wykresu {kind} w puli procesów: {e}")
+                        _reset_executor()
+                        render_chart(kind, data, filepath)
+                else:
+                    render_chart(kind, data, filepath)
+            except Exception as e:
+                print(f"Błąd generowania wykresu {kind}: {e}")
+                failed.append(kind)
+        return failed
     
-    def _prepare_category_data(self, classification_results: List[ClassificationResult]) -> Dict[str, int]:
+    def _render_now(self, kind: str, data, image_format: str = 'png') -> Optional[str]:
+        """Pojedynczy wykres w bieżącym procesie (istniejący plik bez rysowania)"""
+        if not data:
+            return None
+        if image_format not in ('png', 'svg'):
+            raise ValueError(f"Nieobsługiwany format pliku wykresu: {image_format} (png lub svg)")
+        filepath = self.chart_path(kind, data, image_format)
+        if not self._touch(filepath):
+            render_chart(kind, data, filepath)
+        return filepath
+    
+    def _chart_data(self, kind: str, stats: ChartInput):
+        """Dane konkretnego wykresu (puste = wykresu nie ma)"""
+        if kind == 'bar':
+            return self._prepare_category_sentiment_data(stats)
+        if kind == 'sentiment_pie':
+            data = self._prepare_sentiment_data(stats)
+            return data if sum(data.values()) else {}
+        
+        data = self._prepare_category_data(stats)
+        if not data or sum(data.values()) == 0:
+            return {}
+        # Sortuj według wartości (malejąco), top 8 kategorii, reszta jako "Inne"
+        sorted_data = dict(sorted(data.items(), key=lambda x: x[1], reverse=True))
+        if len(sorted_data) > 8:
+            top_8 = dict(list(sorted_data.items())[:8])
+            top_8['Inne'] = sum(list(sorted_data.values())[8:])
+            sorted_data = top_8
+        return sorted_data
+    
+    def _prepare_sentiment_data(self, stats: ChartInput) -> Dict[str, int]:
+        """Przygotowuje dane do wykresu sentymentu (tylko występujące sentymenty)"""
+        return {sent: count for sent, count in ClassificationStats.coerce(stats).sentiment_counts.items() if count > 0}
+    
+    def _prepare_category_data(self, stats: ChartInput) -> Dict[str, int]:
         """Przygotowuje dane do wykresu kategorii"""
-        category_counts = Counter()
-        for result in classification_results:
-            category_counts[result.category] += 1
-        
-        return dict(category_counts)
+        return dict(ClassificationStats.coerce(stats).category_counts)
     
-    def _prepare_category_sentiment_data(self, classification_results: List[ClassificationResult]) -> Dict[str, Dict[str, int]]:
+    def _prepare_category_sentiment_data(self, stats: ChartInput) -> Dict[str, Dict[str, int]]:
         """Przygotowuje dane do wykresu słupkowego"""
-        data = {}
-        for result in classification_results:
-            if result.category not in data:
-                data[result.category] = {'pozytywny': 0, 'neutralny': 0, 'negatywny': 0}
-            data[result.category][result.sentiment] += 1
-        
-        return data
+        return {cat: dict(counts) for cat, counts in ClassificationStats.coerce(stats).category_sentiment.items()}
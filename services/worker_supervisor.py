@@ -0,0 +1,86 @@
+"""
+Tryb wieloprocesowy workerów - osobne procesy dla scrapingu, klasyfikacji i raportów
+
+Każdy proces uruchamia własną pulę wątków (WorkerPool) dla jednej kolejki. Procesy
+nie współdzielą pamięci - koordynują się wyłącznie przez SQLite (task_queue + jobs),
+więc GIL i pamięć (matplotlib, DOCX, odpowiedzi Gemini) nie obciążają serwera Flask.
+"""
+import sys
+import os
+import signal
+import time
+import threading
+import multiprocessing
+from typing import Dict, List
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def _run_worker_process(queue: str, threads: int, stop_event) -> None:
+    """Punkt wejścia procesu potomnego: pula wątków dla jednej kolejki"""
+    # Ctrl+C obsługuje supervisor (stop_event); SIGTERM zatrzymuje tylko ten proces
+    terminated = threading.Event()
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, lambda signum, frame: terminated.set())
+    
+    from services.queue_worker import WorkerPool
+    
+    pool = WorkerPool({queue: threads})
+    pool.start()
+    try:
+        while not stop_event.wait(1.0) and not terminated.is_set():
+            pass
+    finally:
+        pool.stop()
+
+class WorkerSupervisor:
+    """Uruchamia i pilnuje procesów workerów (restart po awarii procesu)"""
+    
+    def __init__(self, process_counts: Dict[str, int], threads_per_process: int = 1):
+        self.process_counts = {queue: count for queue, count in process_counts.items() if count > 0}
+        self.threads_per_process = max(1, threads_per_process)
+        # spawn: czysty interpreter w każdym procesie (bez odziedziczonych połączeń i wątków)
+        self._context = multiprocessing.get_context("spawn")
+        self._stop_event = self._context.Event()
+        self.processes: Dict[str, List[multiprocessing.Process]] = {}
+    
+    def start(self):
+        """Uruchamia procesy dla wszystkich kolejek"""
+        for queue, count in self.process_counts.items():
+            self.processes[queue] = [self._spawn(queue, index) for index in range(count)]
+    
+    def _spawn(self, queue: str, index: int) -> multiprocessing.Process:
+        process = self._context.Process(
+            target=_run_worker_process,
+            args=(queue, self.threads_per_process, self._stop_event),
+            name=f"worker-{queue}-{index}",
+            daemon=False
+        )
+        process.start()
+        return process
+    
+    def restart_dead(self) -> int:
+        """Ponownie uruchamia procesy, które zakończyły się nieoczekiwanie; zwraca ich liczbę"""
+        if self._stop_event.is_set():
+            return 0
+        
+        restarted = 0
+        for queue, processes in self.processes.items():
+            for index, process in enumerate(processes):
+                if not process.is_alive():
+                    print(f"Proces {process.name} zakończony (kod {process.exitcode}) - restart")
+                    processes[index] = self._spawn(queue, index)
+                    restarted += 1
+        return restarted
+    
+    def stop(self, timeout: float = None):
+        """Zatrzymuje procesy (czeka na dokończenie bieżących zadań)"""
+        self._stop_event.set()
+        deadline = time.monotonic() + timeout if timeout else None
+        for processes in self.processes.values():
+            for process in processes:
+                remaining = max(0.0, deadline - time.monotonic()) if deadline else None
+                process.join(remaining)
+                if process.is_alive():
+                    process.terminate()
+        self.processes = {}
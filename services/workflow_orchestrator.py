@@ -1,52 +1,537 @@
 """
-Główny orchestrator workflow - koordynuje cały proces: Scraping → Klasyfikacja → Raport
+Główny orchestrator workflow - koordynuje cały proces jako jawne etapy:
+Scraping → Klucz kategorii → Klasyfikacja → Wykresy → Raport
 
-TODO:
-- [ ] Utwórz klasę WorkflowOrchestrator
-- [ ] W __init__:
-    - ScrapingOrchestrator
-    - ClassificationOrchestrator
-    - VisualizationService
-    - ReportService
-    - JobStorageService
-    - LoggerService
-- [ ] Metoda execute_full_pipeline(job: ScrapingJob) -> ScrapingJob:
-    - Główna funkcja całego workflow
-    - Krok 1: Scraping (Agent 1)
-        - job.status = "scraping"
-        - job.progress = 0.1
-        - Wywołaj ScrapingOrchestrator.execute_scraping_job()
-        - Zapisz wyniki do job.scraping_results
-        - job.progress = 0.3
-    - Krok 2-4: Klasyfikacja
-        - job.status = "classifying"
-        - job.current_step = "generating_key"
-        - job.progress = 0.4
-        - Wywołaj ClassificationOrchestrator.execute_classification_pipeline()
-        - Zapisz wyniki do job (category_key, classification_results, report)
-        - job.progress = 0.8
-    - Krok 5: Wizualizacje
-        - job.current_step = "generating_visualizations"
-        - Wywołaj VisualizationService.generate_all_charts()
-        - Zapisz ścieżki do wykresów w job
-        - job.progress = 0.9
-    - Krok 6: Finalizacja raportu
-        - job.current_step = "finalizing_report"
-        - Wywołaj ReportService.finalize_report()
-        - Wstaw wykresy do raportu
-        - Zapisz finalny raport do job.report
-    - Finalizacja:
-        - job.status = "completed"
-        - job.progress = 1.0
-        - Zapisz job przez JobStorageService
-    - Obsłuż błędy:
-        - job.status = "failed"
-        - job.error_message = str(e)
-        - Zapisz job
-    - Zwraca zaktualizowany job
-- [ ] Metoda _update_job_progress(job: ScrapingJob, step: str, progress: float):
-    - Aktualizuje job.progress i job.current_step
-    - Zapisuje job przez JobStorageService
-- [ ] Dodaj logowanie przez LoggerService
+Wynik, hash wejścia i czas trwania każdego etapu są zapisywane w tabeli workflow_stages.
+Etap, którego wejście się nie zmieniło (a wynik nadal istnieje), jest pomijany.
+Wykresy są renderowane równolegle z generowaniem treści raportu przez Gemini.
+
+Tryb strumieniowy (streaming=True): klucz kategorii powstaje z próbki pierwszych postów,
+a kolejne partie są klasyfikowane w trakcie scrapingu; po scrapingu klucz jest doprecyzowany
+na pełnych danych, a wyniki uzgadniane z ostateczną listą postów.
+
+Tryb przyrostowy (job.mode == "incremental"): scraping odpytuje tylko zarejestrowane URL-e marki
+od ich high-water marków, posty zadania bazowego są przejmowane razem z kluczem kategorii
+i klasyfikacjami - klasyfikowane są tylko nowe posty.
 """
+import sys
+import os
+import json
+import time
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+# Dodaj ścieżkę do projektu
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from config import STREAMING_REFINE_KEY, CHART_FORMAT
+from models.scraping_job import ScrapingJob
+from models.category_key import CategoryKey
+from models.classification_stats import ClassificationStats
+from services.scraping_orchestrator import ScrapingOrchestrator
+from services.classification_orchestrator import ClassificationOrchestrator, StreamingClassifier
+from services.gemini_service import GeminiService
+from services.report_service import ReportService
+from services.job_storage import JobStorageService
+from services.database_service import DatabaseService
+from services.brand_analytics import BrandAnalyticsService
+from services.brand_sources import BrandSourcesService
+from services.job_queue import LeaseLostError, check_lease
+from services.metrics import MetricsService, bind_context
+from services.logger import LoggerService
+
+# Etapy workflow (w kolejności wykonania)
+STAGE_SCRAPING = "scraping"
+STAGE_CATEGORY_KEY = "category_key"
+STAGE_CLASSIFICATION = "classification"
+STAGE_CHARTS = "charts"
+STAGE_REPORT = "report"
+STAGES = [STAGE_SCRAPING, STAGE_CATEGORY_KEY, STAGE_CLASSIFICATION, STAGE_CHARTS, STAGE_REPORT]
+
+class StageSkipped(Exception):
+    """Etap nie został wykonany, bo tę samą pracę wykonuje właśnie inny wątek - bez zapisu wyniku"""
 
+class WorkflowOrchestrator:
+    """Orchestrator całego pipeline'u - etapy z zapisanymi wynikami i czasami"""
+    _instance = None
+    
+    def __new__(cls):
+        if cls._instance is None:
+            cls._instance = super().__new__(cls)
+            cls._instance._initialized = False
+        return cls._instance
+    
+    def __init__(self):
+        if self._initialized:
+            return
+        
+        self.scraping_orchestrator = ScrapingOrchestrator()
+        self.classification_orchestrator = ClassificationOrchestrator()
+        self.gemini_service = GeminiService()
+        self.report_service = ReportService()
+        self.visualization_service = self.report_service.visualization_service
+        self.job_storage = JobStorageService()
+        self.db = DatabaseService()
+        self.brand_analytics = BrandAnalyticsService()
+        self.brand_sources = BrandSourcesService()
+        self.metrics = MetricsService()
+        self.logger = LoggerService()
+        
+        self._initialized = True
+    
+    def execute_full_pipeline(self, job_id: str, force: bool = False) -> Optional[ScrapingJob]:
+        """Uruchamia wszystkie etapy (pomijając te z niezmienionym wejściem)"""
+        return self.run_stages(job_id, STAGES, force=force)
+    
+    def run_stages(
+        self,
+        job_id: str,
+        stages: List[str],
+        force: bool = False,
+        reset_classification: bool = False,
+        streaming: bool = False
+    ) -> Optional[ScrapingJob]:
+        """
+        Uruchamia wybrane etapy w kolejności pipeline'u.
+        force=True wykonuje etapy ponownie nawet przy niezmienionym wejściu.
+        streaming=True klasyfikuje posty już w trakcie scrapingu (wymaga etapów scraping + category_key).
+        Błąd etapu jest zapisywany w workflow_stages i przekazywany dalej (ponowienie w kolejce).
+        """
+        job = self.job_storage.get(job_id)
+        if not job:
+            self.logger.add_log(f"Workflow: zadanie {job_id} nie znalezione", "ERROR")
+            return None
+        
+        wanted = set(stages)
+        
+        # Zadanie przyrostowe ma klucz z zadania bazowego - nowe posty klasyfikuje zwykły etap
+        streaming_classifier = None
+        if streaming and not job.is_incremental() and STAGE_SCRAPING in wanted and STAGE_CATEGORY_KEY in wanted:
+            streaming_classifier = self.classification_orchestrator.create_streaming_classifier(job.brand_name)
+        
+        if STAGE_SCRAPING in wanted:
+            if not self._stage_scraping(job, force, streaming_classifier):
+                return job
+        
+        if STAGE_CATEGORY_KEY in wanted:
+            if not self._stage_category_key(job, force, streaming_classifier):
+                return job
+        
+        if STAGE_CLASSIFICATION in wanted:
+            classified = self._stage_classification(job, force or reset_classification)
+            # Orchestrator klasyfikacji zapisuje zadanie sam - pobierz aktualną wersję
+            job = self.job_storage.get(job_id) or job
+            if not classified:
+                return job
+        
+        if STAGE_CHARTS in wanted or STAGE_REPORT in wanted:
+            self._stage_charts_and_report(job, force, include_report=STAGE_REPORT in wanted)
+        
+        return job
+    
+    def get_stages(self, job_id: str) -> List[Dict]:
+        """Zapisane etapy zadania (status, czasy, wynik) w kolejności pipeline'u"""
+        stages = {stage['stage']: stage for stage in self.db.get_workflow_stages(job_id)}
+        return [stages[name] for name in STAGES if name in stages]
+    
+    def is_report_current(self, job: ScrapingJob) -> bool:
+        """Czy istniejący raport odpowiada aktualnym wynikom klasyfikacji"""
+        record = self.db.get_workflow_stage(job.job_id, STAGE_REPORT)
+        if record is None:
+            # Raport sprzed workflow (brak zapisu etapu) - wystarczy, że plik istnieje
+            return os.path.exists(self._report_html_path(job.job_id))
+        
+        stats = self.db.get_classification_aggregates(job.job_id)
+        input_hash = self._report_input_hash(job, stats, self._charts_input_hash(stats))
+        return self._is_current(record, input_hash, self._is_report_output_valid)
+    
+    # ========== Etapy ==========
+    
+    def _stage_scraping(self, job: ScrapingJob, force: bool,
+                        streaming_classifier: Optional[StreamingClassifier] = None) -> bool:
+        """Etap 1: scraping (Agent 1). Zwraca False, jeśli pipeline ma się zatrzymać."""
+        hash_parts = [job.brand_name, job.start_date, job.end_date]
+        if job.is_incremental():
+            hash_parts += [job.mode, job.base_job_id]
+        input_hash = self._hash(*hash_parts)
+        
+        def progress_callback(step: str, progress: float):
+            job.update_progress(step, progress)
+            self.job_storage.update_state(job)
+        
+        def run_full() -> Dict:
+            job.status = "scraping"
+            job.update_progress("Scraping Facebook...", 0.1)
+            self.job_storage.update_state(job)
+            
+            if streaming_classifier:
+                streaming_classifier.start()
+            try:
+                job.scraping_results = self.scraping_orchestrator.execute_scraping_job(
+                    job.brand_name,
+                    start_date=job.start_date,
+                    end_date=job.end_date,
+                    progress_callback=progress_callback,
+                    batch_callback=streaming_classifier.add_batch if streaming_classifier else None,
+                    job_id=job.job_id
+                )
+            finally:
+                if streaming_classifier:
+                    streaming_classifier.finish()
+            job.update_progress("Scraping zakończony", 0.3)
+            self.job_storage.update(job)
+            return {"results_count": len(job.scraping_results)}
+        
+        def run_incremental() -> Dict:
+            base = self._load_base_job(job)
+            job.status = "scraping"
+            job.update_progress("Scraping przyrostowy (tylko nowe posty)...", 0.1)
+            self.job_storage.update_state(job)
+            
+            # Posty zadania bazowego z zakresu dat tego zadania + nowe posty z zarejestrowanych URL-i
+            carried = self.scraping_orchestrator._filter_by_date_range(
+                base.scraping_results,
+                self.scraping_orchestrator._parse_date(job.start_date),
+                self.scraping_orchestrator._parse_date(job.end_date)
+            )
+            new_results, marks = self.scraping_orchestrator.execute_incremental_job(
+                job.brand_name,
+                self.brand_sources.get_sources(job.brand_name),
+                known_urls={r.url for r in base.scraping_results if r.url},
+                since=max((r.date.isoformat() for r in base.scraping_results if r.date), default=None),
+                start_date=job.start_date,
+                end_date=job.end_date,
+                progress_callback=progress_callback
+            )
+            job.scraping_results = carried + new_results
+            job.update_progress("Scraping zakończony", 0.3)
+            self.job_storage.update(job)
+            
+            self.db.copy_raw_items(base.job_id, job.job_id)
+            self.brand_sources.update_high_water(job.brand_name, marks, job.job_id)
+            return {
+                "results_count": len(job.scraping_results),
+                "incremental": True,
+                "base_job_id": base.job_id,
+                "carried_count": len(carried),
+                "new_count": len(new_results)
+            }
+        
+        runner = run_incremental if job.is_incremental() else run_full
+        
+        try:
+            self._run_stage(job, STAGE_SCRAPING, input_hash, runner, force,
+                            lambda output: bool(job.scraping_results))
+        except LeaseLostError:
+            raise  # Zadanie przejął inny worker - status zadania należy do niego
+        except Exception as e:
+            self._fail_job(job, str(e))
+            raise
+        
+        if not job.scraping_results:
+            self._fail_job(job, "Nie znaleziono żadnych wyników")
+            return False
+        return True
+    
+    def _stage_category_key(self, job: ScrapingJob, force: bool,
+                            streaming_classifier: Optional[StreamingClassifier] = None) -> bool:
+        """Etap 2: generowanie klucza kategorii (Agent 2). Zwraca False, jeśli pipeline ma się zatrzymać."""
+        comments = [r.text for r in job.scraping_results if r.text.strip()]
+        if not comments:
+            self._fail_job(job, "Brak komentarzy do analizy")
+            return False
+        
+        input_hash = self._hash(job.brand_name, comments)
+        if job.is_incremental():
+            input_hash = self._hash(job.brand_name, comments, job.base_job_id)
+        
+        def run_full() -> Dict:
+            job.status = "classifying"
+            job.update_progress("Generowanie klucza kategorii...", 0.5)
+            self.job_storage.update_state(job)
+            
+            category_data = self.gemini_service.generate_category_key(comments, job.brand_name)
+            job.category_key = CategoryKey(
+                job_id=job.job_id,
+                categories=category_data if isinstance(category_data, list) else [],
+                prompt_type="ABSA"
+            )
+            job.update_progress("Klucz kategorii wygenerowany", 0.8)
+            
+            job.status = "completed"
+            job.update_progress("Zakończono", 1.0)
+            self.job_storage.update(job)
+            self.logger.add_log(f"Zapisano zadanie {job.job_id}")
+            return {"categories_count": len(job.category_key.categories)}
+        
+        def run_streamed() -> Dict:
+            # Klucz z próbki jest gotowy, a część postów już sklasyfikowana w trakcie scrapingu
+            job.status = "classifying"
+            job.update_progress("Uzgadnianie klasyfikacji strumieniowej...", 0.5)
+            self.job_storage.update_state(job)
+            
+            categories = streaming_classifier.categories
+            refined = False
+            if STREAMING_REFINE_KEY:
+                category_data = self.gemini_service.generate_category_key(comments, job.brand_name)
+                if isinstance(category_data, list) and category_data:
+                    categories = category_data
+                    refined = True
+            
+            job.category_key = CategoryKey(job_id=job.job_id, categories=categories, prompt_type="ABSA")
+            
+            # Wyniki z kategorią spoza doprecyzowanego klucza trafią do zwykłej klasyfikacji
+            job.classification_results = streaming_classifier.reconcile(job.scraping_results, categories)
+            
+            job.status = "completed"
+            job.update_progress("Zakończono", 1.0)
+            self.job_storage.update(job)
+            self.logger.add_log(
+                f"Klasyfikacja strumieniowa zadania {job.job_id}: zachowano {len(job.classification_results)} "
+                f"z {len(streaming_classifier.results_by_url)} wyników (klucz doprecyzowany: {refined})"
+            )
+            return {
+                "categories_count": len(categories),
+                "streaming": True,
+                "sample_size": streaming_classifier.sample_count,
+                "refined": refined,
+                "streamed_classifications": len(streaming_classifier.results_by_url),
+                "kept_classifications": len(job.classification_results)
+            }
+        
+        def run_incremental() -> Dict:
+            # Klucz i klasyfikacje postów znanych z zadania bazowego - bez wywołań Gemini
+            base = self._load_base_job(job)
+            job.status = "classifying"
+            job.update_progress("Przejmowanie klucza kategorii i klasyfikacji...", 0.5)
+            self.job_storage.update_state(job)
+            
+            job.category_key = CategoryKey(
+                job_id=job.job_id,
+                categories=base.category_key.categories if base.category_key else [],
+                prompt_type=base.category_key.prompt_type if base.category_key else "ABSA"
+            )
+            job.classification_results = self._carry_classifications(base, job)
+            
+            job.status = "completed"
+            job.update_progress("Zakończono", 1.0)
+            self.job_storage.update(job)
+            self.logger.add_log(
+                f"Zadanie przyrostowe {job.job_id}: przejęto {len(job.classification_results)} klasyfikacji "
+                f"z {base.job_id}, do klasyfikacji {len(job.scraping_results) - len(job.classification_results)}"
+            )
+            return {
+                "categories_count": len(job.category_key.categories),
+                "incremental": True,
+                "base_job_id": base.job_id,
+                "reused_classifications": len(job.classification_results)
+            }
+        
+        if streaming_classifier and streaming_classifier.categories:
+            runner = run_streamed
+        elif job.is_incremental():
+            runner = run_incremental
+        else:
+            runner = run_full
+        
+        try:
+            self._run_stage(job, STAGE_CATEGORY_KEY, input_hash, runner, force,
+                            lambda output: bool(job.category_key and job.category_key.categories))
+        except LeaseLostError:
+            raise  # Zadanie przejął inny worker - status zadania należy do niego
+        except Exception as e:
+            self._fail_job(job, str(e))
+            raise
+        return True
+    
+    def _stage_classification(self, job: ScrapingJob, force: bool) -> bool:
+        """
+        Etap 3: klasyfikacja komentarzy (Agent 3) - wznawialna, checkpointy per komentarz.
+        Zwraca False, jeśli klasyfikację zadania wykonuje właśnie inny wątek (kolejne etapy są pomijane).
+        """
+        if not job.category_key or not job.scraping_results:
+            self.logger.add_log(f"Workflow: brak klucza kategorii lub wyników dla {job.job_id}", "WARNING")
+            return True
+        
+        input_hash = self._hash(job.category_key.categories, [r.text for r in job.scraping_results])
+        
+        # Zmieniony klucz lub komentarze - stare wyniki są nieaktualne (pełna reklasyfikacja)
+        previous = self.db.get_workflow_stage(job.job_id, STAGE_CLASSIFICATION)
+        reset = force or bool(previous and previous['input_hash'] != input_hash)
+        
+        def run() -> Dict:
+            if not self.classification_orchestrator.run_classification(job.job_id, reset=reset):
+                raise StageSkipped("Klasyfikacja zadania trwa w innym wątku")
+            current = self.job_storage.get(job.job_id)
+            if current and current.status == "failed":
+                raise RuntimeError(current.error_message or "Klasyfikacja nieudana")
+            self._refresh_brand_rollups(job.job_id)
+            return self.db.get_classification_task_counts(job.job_id)
+        
+        def is_valid(output: Dict) -> bool:
+            # Wszystkie komentarze zamknięte (done lub failed z wyczerpanym limitem prób)
+            return not self.db.get_unfinished_classification_indices(
+                job.job_id, self.classification_orchestrator.max_attempts
+            )
+        
+        try:
+            self._run_stage(job, STAGE_CLASSIFICATION, input_hash, run, reset, is_valid)
+        except StageSkipped as e:
+            # Wynik etapu (z kompletem klasyfikacji) zapisze trwający przebieg
+            self.logger.add_log(f"Etap '{STAGE_CLASSIFICATION}' zadania {job.job_id} pominięty: {e}")
+            return False
+        return True
+    
+    def _stage_charts_and_report(self, job: ScrapingJob, force: bool, include_report: bool) -> None:
+        """
+        Etapy 4-5: wykresy i raport. Wykresy renderują się w tle, równolegle
+        z generowaniem treści raportu przez Gemini.
+        """
+        # Agregaty z SQL (GROUP BY) - posty nie są wczytywane do pamięci
+        stats = self.db.get_classification_aggregates(job.job_id)
+        if not stats.total:
+            self.logger.add_log(f"Brak wyników klasyfikacji do raportu dla {job.job_id}", "WARNING")
+            return
+        
+        charts_hash = self._charts_input_hash(stats)
+        
+        def run_charts() -> Dict:
+            # Figure API w puli procesów - równoległe zadania nie czekają na siebie
+            return self.visualization_service.generate_all_charts(stats, job.job_id)
+        
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            # Kopia kontekstu: metryki etapu i check_lease() workera działają także w wątku wykresów
+            charts_future = executor.submit(
+                bind_context(self._run_stage), job, STAGE_CHARTS, charts_hash, run_charts, force,
+                self._is_charts_output_valid
+            )
+            
+            if include_report:
+                def run_report() -> Dict:
+                    self.logger.add_log(f"Rozpoczęto generowanie raportu dla {job.job_id}")
+                    # Treść Gemini z cache, dopóki nie zmieni się klucz/marka/daty/prompt (force = nowa treść)
+                    report_data = self.report_service.build_report(
+                        stats, job.category_key, job.brand_name, job.job_id, job.start_date, job.end_date,
+                        charts_future.result, refresh=force
+                    )
+                    self.logger.add_log(f"Raport wygenerowany dla {job.job_id}: {report_data['html']}")
+                    return {"html": report_data['html'], "markdown": report_data['markdown'], "charts": report_data['charts']}
+                
+                try:
+                    self._run_stage(job, STAGE_REPORT, self._report_input_hash(job, stats, charts_hash),
+                                    run_report, force, self._is_report_output_valid)
+                except Exception as e:
+                    self.logger.add_log(f"Błąd generowania raportu dla {job.job_id}: {str(e)}", "ERROR")
+                    raise
+            
+            charts_future.result()
+    
+    # ========== Infrastruktura etapów ==========
+    
+    def _run_stage(
+        self,
+        job: ScrapingJob,
+        stage: str,
+        input_hash: str,
+        runner: Callable[[], Dict],
+        force: bool,
+        is_valid: Callable[[Dict], bool]
+    ) -> Dict:
+        """Wykonuje etap (lub zwraca zapisany wynik, jeśli wejście się nie zmieniło) i mierzy czas"""
+        record = self.db.get_workflow_stage(job.job_id, stage)
+        if not force and self._is_current(record, input_hash, is_valid):
+            self.logger.add_log(f"Etap '{stage}' zadania {job.job_id} pominięty - wejście bez zmian")
+            return record['output']
+        
+        check_lease()
+        self.db.start_workflow_stage(job.job_id, stage, input_hash)
+        started = time.perf_counter()
+        try:
+            # Kontekst metryk: wywołania Gemini/Apify i kroki etapu dostają etykiety zadania i etapu
+            with self.metrics.stage(job.job_id, stage):
+                output = runner()
+        except LeaseLostError:
+            raise  # Etap wykona ponownie nowy właściciel dzierżawy
+        except StageSkipped:
+            raise  # Wynik zapisze przebieg, który wykonuje etap
+        except Exception as e:
+            self.db.fail_workflow_stage(job.job_id, stage, str(e), time.perf_counter() - started)
+            raise
+        
+        # Wynik zapisuje tylko właściciel dzierżawy (handler po jej utracie nie wie, że działa równolegle)
+        check_lease()
+        duration = time.perf_counter() - started
+        self.db.finish_workflow_stage(job.job_id, stage, output, duration)
+        self.logger.add_log(f"Etap '{stage}' zadania {job.job_id} zakończony w {duration:.1f}s")
+        return output
+    
+    def _is_current(self, record: Optional[Dict], input_hash: str, is_valid: Callable[[Dict], bool]) -> bool:
+        """Etap aktualny: zakończony, z tym samym wejściem i z istniejącym wynikiem"""
+        return bool(
+            record
+            and record['status'] == 'done'
+            and record['input_hash'] == input_hash
+            and is_valid(record['output'] or {})
+        )
+    
+    def _refresh_brand_rollups(self, job_id: str) -> None:
+        """Przelicza dzienne rollupy marki (błąd analityki nie przerywa pipeline'u)"""
+        try:
+            days = self.brand_analytics.refresh_job(job_id)
+            self.logger.add_log(f"Rollupy marki zaktualizowane dla {job_id} ({days} dni)")
+        except Exception as e:
+            self.logger.add_log(f"Błąd aktualizacji rollupów marki dla {job_id}: {str(e)}", "ERROR")
+    
+    def _load_base_job(self, job: ScrapingJob) -> ScrapingJob:
+        """Zadanie bazowe trybu przyrostowego (błąd, jeśli zostało usunięte)"""
+        base = self.job_storage.get(job.base_job_id)
+        if not base or not base.scraping_results:
+            raise RuntimeError(f"Zadanie bazowe {job.base_job_id} nie istnieje lub nie ma wyników")
+        return base
+    
+    @staticmethod
+    def _carry_classifications(base: ScrapingJob, job: ScrapingJob) -> Dict[int, dict]:
+        """Klasyfikacje zadania bazowego przeniesione na pozycje tych samych postów (po URL)"""
+        by_url = {
+            result.url: base.classification_results[idx]
+            for idx, result in enumerate(base.scraping_results)
+            if result.url and idx in base.classification_results
+        }
+        return {
+            idx: dict(by_url[result.url])
+            for idx, result in enumerate(job.scraping_results)
+            if result.url in by_url
+        }
+    
+    def _fail_job(self, job: ScrapingJob, message: str) -> None:
+        job.status = "failed"
+        job.error_message = message
+        self.job_storage.update_state(job)
+        self.logger.add_log(f"Błąd w zadaniu {job.job_id}: {message}", "ERROR")
+    
+    def _charts_input_hash(self, stats: ClassificationStats) -> str:
+        # Wykresy zależą tylko od macierzy kategoria × sentyment (i formatu wyjścia)
+        return self._hash(stats.category_sentiment, CHART_FORMAT)
+    
+    def _report_input_hash(self, job: ScrapingJob, stats: ClassificationStats, charts_hash: str) -> str:
+        # Fingerprint raportu obejmuje wersję promptu - jej zmiana unieważnia zapisany raport
+        return self._hash(charts_hash, self.report_service.report_fingerprint(
+            stats, job.category_key, job.brand_name, job.start_date, job.end_date
+        ))
+    
+    def _is_charts_output_valid(self, output: Dict) -> bool:
+        paths = [path for path in output.values() if path]
+        return bool(paths) and all(os.path.exists(path) for path in paths)
+    
+    def _is_report_output_valid(self, output: Dict) -> bool:
+        return bool(output.get('html')) and os.path.exists(output['html']) \
+            and bool(output.get('markdown')) and os.path.exists(output['markdown'])
+    
+    def _report_html_path(self, job_id: str) -> str:
+        return os.path.join(self.report_service.reports_dir, f'report_{job_id}.html')
+    
+    @staticmethod
+    def _hash(*parts) -> str:
+        """Stabilny hash wejścia etapu"""
+        payload = json.dumps(parts, ensure_ascii=False, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
@@ -1,7 +1,11 @@
 // Zmienne globalne
 let globalCategories = [];
 
-// Klasyfikacja komentarzy - GLOBALNA ZMIENNA
+// Lista komentarzy doładowywana stronami (PagedList z paged_list.js)
+let commentList = null;
+let classificationPollInterval = null;
+
+// Statystyki klasyfikacji (rozkłady liczone w SQL - /api/classification-status?results=0)
 let classificationData = {
     results: {},
     stats: {
@@ -15,60 +19,99 @@ let sentimentChartInstance = null;
 let categoriesChartInstance = null;
 
 // Funkcja inicjalizacji danych (wywoływana z HTML)
-function initializeClassificationData(existingClassifications, categoriesList) {
-    console.log('initializeClassificationData wywołana');
-    console.log('existingClassifications:', existingClassifications);
-    console.log('categoriesList:', categoriesList);
-    
+function initializeClassificationData(stats, categoriesList) {
     // Zapisz kategorie globalnie
     globalCategories = categoriesList || [];
-    console.log('globalCategories ustawione na:', globalCategories);
+    applyStats(stats);
+}
+
+// Ustaw statystyki z serwera - wszystkie kategorie klucza mają wpis (nawet z 0)
+function applyStats(stats) {
+    const categoriesStats = {};
+    globalCategories.forEach((cat) => {
+        const categoryName = typeof cat === 'string' ? cat : (cat && cat.aspekt) || '';
+        if (categoryName) {
+            categoriesStats[categoryName] = 0;
+        }
+    });
     
-    // Wczytaj istniejące wyniki klasyfikacji
-    if (existingClassifications && Object.keys(existingClassifications).length > 0) {
-        Object.keys(existingClassifications).forEach(index => {
-            const result = existingClassifications[index];
-            const idx = parseInt(index);
-            classificationData.results[idx] = result;
-            
-            // Aktualizuj statystyki
-            if (result && result.category) {
-                classificationData.stats.categories[result.category] = 
-                    (classificationData.stats.categories[result.category] || 0) + 1;
-            }
-            if (result && result.sentiment) {
-                classificationData.stats.sentiment[result.sentiment] = 
-                    (classificationData.stats.sentiment[result.sentiment] || 0) + 1;
-            }
-        });
-    }
+    classificationData.stats = {
+        categories: Object.assign(categoriesStats, (stats && stats.categories) || {}),
+        sentiment: Object.assign(
+            { pozytywny: 0, neutralny: 0, negatywny: 0 },
+            (stats && stats.sentiment) || {}
+        )
+    };
+}
+
+// Element listy komentarzy
+function renderCommentItem(item) {
+    const element = document.createElement('div');
+    element.className = 'comment-item-classification';
+    element.dataset.commentId = item.position;
     
-    // Inicjalizacja statystyk kategorii - upewnij się, że wszystkie kategorie mają wpis (nawet z 0)
-    if (categoriesList && categoriesList.length > 0) {
-        categoriesList.forEach((cat) => {
-            // Obsługa różnych formatów danych kategorii
-            let categoryName = '';
-            if (typeof cat === 'string') {
-                categoryName = cat;
-            } else if (cat && typeof cat === 'object') {
-                categoryName = cat.aspekt || cat['aspekt'] || '';
-            }
-            
-            if (categoryName) {
-                // Zainicjalizuj kategorię z 0 jeśli jeszcze nie istnieje
-                if (!(categoryName in classificationData.stats.categories)) {
-                    classificationData.stats.categories[categoryName] = 0;
-                }
-            }
-        });
+    const header = document.createElement('div');
+    header.className = 'comment-header';
+    const number = document.createElement('span');
+    number.className = 'comment-number';
+    number.textContent = `#${item.position + 1}`;
+    const source = document.createElement('span');
+    source.className = 'comment-source';
+    source.textContent = item.source_type;
+    header.append(number, source);
+    
+    const text = document.createElement('div');
+    text.className = 'comment-text-classification';
+    text.textContent = item.text;
+    
+    const footer = document.createElement('div');
+    footer.className = 'comment-footer';
+    const author = document.createElement('span');
+    author.className = 'comment-author';
+    author.textContent = `👤 ${item.author || 'Nieznany'}`;
+    footer.appendChild(author);
+    if (item.url) {
+        const link = document.createElement('a');
+        link.href = item.url;
+        link.target = '_blank';
+        link.className = 'comment-link';
+        link.textContent = '🔗 Link';
+        link.addEventListener('click', event => event.stopPropagation());
+        footer.appendChild(link);
     }
     
-    console.log('Po inicjalizacji - classificationData.stats:', classificationData.stats);
+    const result = document.createElement('div');
+    result.className = 'classification-result';
+    result.id = `result-${item.position}`;
+    
+    element.append(header, text, footer, result);
+    updateCommentItem(element, item);
+    
+    // Kliknięcie w komentarz - klasyfikuj (tylko jeśli jeszcze nie sklasyfikowany)
+    element.addEventListener('click', () => {
+        const current = commentList.items.get(item.position);
+        if (current && !current.category) {
+            classifyComment(item.position);
+        }
+    });
+    return element;
+}
+
+// Odśwież wynik klasyfikacji w istniejącym elemencie
+function updateCommentItem(element, item) {
+    if (item.category) {
+        classificationData.results[item.position] = { category: item.category, sentiment: item.sentiment };
+        displayClassificationResult(item.position, item);
+        element.classList.add('classified');
+    } else {
+        const resultElement = element.querySelector('.classification-result');
+        resultElement.innerHTML = '<em>Klasyfikowanie...</em>';
+    }
 }
 
 // Funkcja klasyfikacji pojedynczego komentarza
 async function classifyComment(commentIndex) {
-    const comment = comments[commentIndex];
+    const comment = commentList.items.get(commentIndex);
     const commentElement = document.querySelector(`[data-comment-id="${commentIndex}"]`);
     const resultElement = document.getElementById(`result-${commentIndex}`);
     
@@ -87,7 +130,7 @@ async function classifyComment(commentIndex) {
             body: JSON.stringify({
                 job_id: jobId,
                 comment_index: commentIndex,
-                comment_text: comment.text || comment.comment_text || '',
+                comment_text: comment.text || '',
                 categories: categories
             })
         });
@@ -101,6 +144,8 @@ async function classifyComment(commentIndex) {
         
         // Zapisz wynik
         classificationData.results[commentIndex] = data;
+        comment.category = data.category;
+        comment.sentiment = data.sentiment;
         
         // Aktualizuj statystyki
         if (data.category) {
@@ -127,20 +172,22 @@ async function classifyComment(commentIndex) {
     }
 }
 
-// Wyświetl wynik klasyfikacji
+// Wyświetl wynik klasyfikacji (element może nie być w DOM - lista jest stronicowana)
 function displayClassificationResult(commentIndex, data) {
     const resultElement = document.getElementById(`result-${commentIndex}`);
+    if (!resultElement) return;
     
-    const categoryClass = 'category';
-    const sentimentClass = `sentiment sentiment-${data.sentiment || 'neutralny'}`;
     const sentimentText = data.sentiment === 'pozytywny' ? '😊 Pozytywny' : 
                          data.sentiment === 'negatywny' ? '😞 Negatywny' : 
                          '😐 Neutralny';
     
-    resultElement.innerHTML = `
-        <span class="${categoryClass}">${data.category || 'Nieznana'}</span>
-        <span class="${sentimentClass}">${sentimentText}</span>
-    `;
+    const category = document.createElement('span');
+    category.className = 'category';
+    category.textContent = data.category || 'Nieznana';
+    const sentiment = document.createElement('span');
+    sentiment.className = `sentiment sentiment-${data.sentiment || 'neutralny'}`;
+    sentiment.textContent = sentimentText;
+    resultElement.replaceChildren(category, sentiment);
 }
 
 // Aktualizuj wykresy
@@ -322,24 +369,6 @@ function updateCategoriesChart() {
     }
 }
 
-// Klasyfikuj wszystkie komentarze
-async function classifyAll() {
-    const btn = document.getElementById('classifyAllBtn');
-    if (btn.disabled) return;
-    
-    btn.disabled = true;
-    btn.textContent = 'Klasyfikowanie...';
-    
-    for (let i = 0; i < comments.length; i++) {
-        await classifyComment(i);
-        // Małe opóźnienie między requestami
-        await new Promise(resolve => setTimeout(resolve, 500));
-    }
-    
-    btn.disabled = false;
-    btn.textContent = '✅ Wszystkie sklasyfikowane';
-}
-
 // Resetuj klasyfikację
 async function resetClassification() {
     if (!confirm('Czy na pewno chcesz zresetować klasyfikację i uruchomić ją ponownie?')) {
@@ -356,33 +385,6 @@ async function resetClassification() {
             return;
         }
         
-        // Wyczyść lokalne dane
-        classificationData = {
-            results: {},
-            stats: {
-                categories: {},
-                sentiment: { pozytywny: 0, neutralny: 0, negatywny: 0 }
-            }
-        };
-        
-        categories.forEach((cat) => {
-            classificationData.stats.categories[cat.aspekt] = 0;
-        });
-        
-        // Wyczyść wyniki w UI
-        comments.forEach((_, index) => {
-            const resultElement = document.getElementById(`result-${index}`);
-            if (resultElement) {
-                resultElement.innerHTML = '<em>Klasyfikowanie...</em>';
-            }
-            const commentElement = document.querySelector(`[data-comment-id="${index}"]`);
-            if (commentElement) {
-                commentElement.classList.remove('classified', 'classifying');
-            }
-        });
-        
-        updateCharts();
-        
         // Uruchom ponownie klasyfikację wszystkich
         const classifyResponse = await fetch(`/api/classify-all/${jobId}`, { method: 'POST' });
         if (classifyResponse.ok) {
@@ -395,120 +397,79 @@ async function resetClassification() {
     }
 }
 
-// Auto-refresh dla klasyfikacji w toku
+// Auto-refresh dla klasyfikacji w toku: statystyki z serwera + odświeżenie widocznych komentarzy
+let lastClassificationCount = null;
+
 function checkClassificationStatus() {
-    fetch(`/api/classification-status/${jobId}`)
+    fetch(`/api/classification-status/${jobId}?results=0`)
         .then(response => response.json())
         .then(data => {
             if (data.error) return;
             
-            // Jeśli klasyfikacja się zakończyła, zaktualizuj wyniki
-            if (data.has_classification && data.status === 'completed') {
-                // Zaktualizuj wyniki które jeszcze nie są wyświetlone
-                Object.keys(data.classification_results).forEach(index => {
-                    const idx = parseInt(index);
-                    if (!classificationData.results[idx]) {
-                        const result = data.classification_results[index];
-                        classificationData.results[idx] = result;
-                        displayClassificationResult(idx, result);
-                        
-                        // Aktualizuj statystyki
-                        if (result.category) {
-                            classificationData.stats.categories[result.category] = 
-                                (classificationData.stats.categories[result.category] || 0) + 1;
-                        }
-                        if (result.sentiment) {
-                            classificationData.stats.sentiment[result.sentiment] += 1;
-                        }
-                    }
-                });
-                
+            if (data.classification_count !== lastClassificationCount) {
+                lastClassificationCount = data.classification_count;
+                applyStats(data.stats);
                 updateCharts();
+                if (commentList) {
+                    commentList.refreshVisible();
+                }
+            }
+            
+            // Wszystkie sklasyfikowane - koniec odpytywania
+            if (data.classification_count === data.total_comments && data.status === 'completed') {
+                clearInterval(classificationPollInterval);
+                classificationPollInterval = null;
             }
         })
         .catch(error => console.error('Błąd sprawdzania statusu:', error));
 }
 
-// Funkcja inicjalizacji UI (wywoływana po załadowaniu danych)
-function initializeUI(existingClassificationsData, commentsData) {
-    // Wyświetl istniejące wyniki klasyfikacji
-    if (existingClassificationsData && Object.keys(existingClassificationsData).length > 0) {
-        Object.keys(existingClassificationsData).forEach(index => {
-            const idx = parseInt(index);
-            const result = existingClassificationsData[index];
-            if (result && typeof displayClassificationResult === 'function') {
-                displayClassificationResult(idx, result);
-                const commentElement = document.querySelector(`[data-comment-id="${idx}"]`);
-                if (commentElement) {
-                    commentElement.classList.add('classified');
-                }
-            }
-        });
-    }
+// Bieżące filtry listy (sentyment, kategoria, źródło, status klasyfikacji)
+function readFilters() {
+    const filters = {};
+    document.querySelectorAll('[data-filter]').forEach(select => {
+        filters[select.dataset.filter] = select.value;
+    });
+    return filters;
+}
+
+// Inicjalizacja strony klasyfikacji (wywoływana z HTML)
+function initializeClassificationPage(stats, categoriesList, totalComments) {
+    initializeClassificationData(stats, categoriesList);
+    lastClassificationCount = Object.values(classificationData.stats.sentiment).reduce((a, b) => a + b, 0);
+    
+    commentList = new PagedList({
+        container: document.getElementById('commentsList'),
+        url: `/api/classifications/${jobId}`,
+        renderItem: renderCommentItem,
+        updateItem: updateCommentItem,
+        onTotal: total => {
+            const totalElement = document.getElementById('commentsTotal');
+            if (totalElement) totalElement.textContent = total;
+        },
+        emptyText: 'Brak komentarzy dla wybranych filtrów'
+    });
+    commentList.loadNext();
+    
+    document.querySelectorAll('[data-filter]').forEach(select => {
+        select.addEventListener('change', () => commentList.setFilters(readFilters()));
+    });
     
     // Zaktualizuj wykresy na początku
-    if (typeof updateCharts === 'function') {
-        updateCharts();
-    }
+    updateCharts();
     
     // Auto-refresh jeśli klasyfikacja w toku
-    const totalComments = commentsData ? commentsData.length : 0;
-    const classifiedCount = existingClassificationsData ? Object.keys(existingClassificationsData).length : 0;
-    const hasAllClassifications = classifiedCount === totalComments && totalComments > 0;
-    
-    if (!hasAllClassifications && typeof jobId !== 'undefined') {
-        const refreshInterval = setInterval(() => {
-            if (typeof checkClassificationStatus === 'function') {
-                checkClassificationStatus();
-            }
-            // Sprawdź czy wszystkie są sklasyfikowane
-            fetch(`/api/classification-status/${jobId}`)
-                .then(r => r.json())
-                .then(data => {
-                    if (data.classification_count === data.total_comments && data.status === 'completed') {
-                        clearInterval(refreshInterval);
-                        location.reload(); // Odśwież stronę gdy zakończone
-                    }
-                })
-                .catch(err => console.error('Błąd sprawdzania statusu:', err));
-        }, 3000); // Co 3 sekundy
+    if (lastClassificationCount < totalComments) {
+        classificationPollInterval = setInterval(checkClassificationStatus, 3000);
     }
     
-    // Kliknięcie w komentarz - klasyfikuj (tylko jeśli jeszcze nie sklasyfikowany)
-    document.querySelectorAll('.comment-item-classification').forEach((element, index) => {
-        element.addEventListener('click', () => {
-            if (!classificationData.results[index] && typeof classifyComment === 'function') {
-                classifyComment(index);
-            }
-        });
-    });
-    
     // Przyciski reset
     const resetBtn = document.getElementById('resetBtn');
     const resetBtnBottom = document.getElementById('resetBtnBottom');
-    if (resetBtn && typeof resetClassification === 'function') {
+    if (resetBtn) {
         resetBtn.addEventListener('click', resetClassification);
     }
-    if (resetBtnBottom && typeof resetClassification === 'function') {
+    if (resetBtnBottom) {
         resetBtnBottom.addEventListener('click', resetClassification);
     }
 }
-
-// Auto-inicjalizacja gdy classification.js się załaduje
-console.log('classification.js załadowany');
-if (typeof window !== 'undefined') {
-    window.addEventListener('load', function() {
-        console.log('window load event - sprawdzam czy można zainicjalizować');
-        // Sprawdź czy zmienne globalne są dostępne
-        if (typeof existingClassifications !== 'undefined' && typeof categories !== 'undefined') {
-            console.log('Zmienne globalne dostępne - inicjalizuję');
-            if (typeof initializeClassificationData === 'function') {
-                initializeClassificationData(existingClassifications, categories);
-            }
-            if (typeof initializeUI === 'function') {
-                initializeUI(existingClassifications, comments);
-            }
-        }
-    });
-}
-
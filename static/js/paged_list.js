@@ -0,0 +1,184 @@
+// Lista doładowywana stronami z API (keyset: after/before = position)
+// W DOM utrzymywane jest najwyżej maxItems elementów - przy przewijaniu w dół usuwane są
+// elementy z góry (i odwrotnie), więc czas renderowania nie zależy od liczby komentarzy.
+class PagedList {
+    constructor(options) {
+        this.container = options.container;      // Przewijany element
+        this.url = options.url;                  // Endpoint API zwracający {items, next_cursor, prev_cursor, total}
+        this.renderItem = options.renderItem;    // (item) => HTMLElement
+        this.updateItem = options.updateItem || null;  // (element, item) => void - odświeżenie w miejscu
+        this.onTotal = options.onTotal || null;  // (total) => void - liczba pasujących (pierwsza strona)
+        this.emptyText = options.emptyText || 'Brak wyników';
+        this.pageSize = options.pageSize || 50;
+        this.maxItems = options.maxItems || 300;
+        this.filters = {};
+
+        this.topSentinel = document.createElement('div');
+        this.list = document.createElement('div');
+        this.bottomSentinel = document.createElement('div');
+        this.status = document.createElement('div');
+        this.status.className = 'paged-list-status';
+        this.container.replaceChildren(this.topSentinel, this.list, this.status, this.bottomSentinel);
+
+        this.observer = new IntersectionObserver((entries) => {
+            entries.forEach(entry => {
+                if (!entry.isIntersecting) return;
+                if (entry.target === this.bottomSentinel) this.loadNext();
+                if (entry.target === this.topSentinel) this.loadPrev();
+            });
+        }, { root: this.container, rootMargin: '400px 0px' });
+
+        this.reset();
+        this.observer.observe(this.topSentinel);
+        this.observer.observe(this.bottomSentinel);
+    }
+
+    reset() {
+        this.generation = (this.generation || 0) + 1;  // Odrzuca odpowiedzi sprzed zmiany filtrów
+        this.items = new Map();  // position -> item (tylko elementy w DOM)
+        this.firstPosition = null;
+        this.lastPosition = null;
+        this.hasPrev = false;
+        this.hasNext = true;
+        this.loading = false;
+        this.list.replaceChildren();
+        this.status.textContent = '';
+        this.container.scrollTop = 0;
+    }
+
+    setFilters(filters) {
+        this.filters = filters || {};
+        this.reset();
+        this.loadNext();
+    }
+
+    buildUrl(params) {
+        const query = new URLSearchParams({ limit: this.pageSize });
+        Object.entries({ ...this.filters, ...params }).forEach(([key, value]) => {
+            if (value !== null && value !== undefined && value !== '') query.set(key, value);
+        });
+        return `${this.url}?${query.toString()}`;
+    }
+
+    async fetchPage(params) {
+        const generation = this.generation;
+        const response = await fetch(this.buildUrl(params));
+        const page = await response.json();
+        if (generation !== this.generation) return null;
+        if (page.error) throw new Error(page.error);
+        return page;
+    }
+
+    async loadNext() {
+        if (this.loading || !this.hasNext) return;
+        this.loading = true;
+        this.status.textContent = 'Ładowanie...';
+
+        try {
+            const page = await this.fetchPage(this.lastPosition === null ? {} : { after: this.lastPosition });
+            if (!page) return;
+
+            if (page.total !== undefined && this.onTotal) this.onTotal(page.total);
+            page.items.forEach(item => this.list.appendChild(this.createElement(item)));
+            if (page.items.length) {
+                if (this.firstPosition === null) this.firstPosition = page.items[0].position;
+                this.lastPosition = page.items[page.items.length - 1].position;
+            }
+            this.hasNext = page.next_cursor !== null;
+            this.trimTop();
+            this.status.textContent = this.items.size === 0 ? this.emptyText : '';
+        } catch (error) {
+            this.status.textContent = `Błąd ładowania: ${error.message}`;
+        } finally {
+            this.loading = false;
+        }
+
+        // Strona nie wypełniła widoku - doładuj kolejną
+        if (this.hasNext && this.isVisible(this.bottomSentinel)) this.loadNext();
+    }
+
+    async loadPrev() {
+        if (this.loading || !this.hasPrev) return;
+        this.loading = true;
+
+        try {
+            const page = await this.fetchPage({ before: this.firstPosition });
+            if (!page) return;
+
+            // Zachowaj pozycję przewijania po wstawieniu elementów nad widokiem
+            const heightBefore = this.list.scrollHeight;
+            const fragment = document.createDocumentFragment();
+            page.items.forEach(item => fragment.appendChild(this.createElement(item)));
+            this.list.insertBefore(fragment, this.list.firstChild);
+            this.container.scrollTop += this.list.scrollHeight - heightBefore;
+
+            if (page.items.length) this.firstPosition = page.items[0].position;
+            this.hasPrev = page.prev_cursor !== null;
+            this.trimBottom();
+        } catch (error) {
+            this.status.textContent = `Błąd ładowania: ${error.message}`;
+        } finally {
+            this.loading = false;
+        }
+    }
+
+    // Odświeża wyrenderowane elementy (np. nowe wyniki klasyfikacji) bez zmiany przewijania
+    async refreshVisible() {
+        if (this.loading || this.firstPosition === null || !this.updateItem) return;
+
+        const page = await this.fetchPage({
+            after: this.firstPosition - 1,
+            limit: Math.min(this.items.size, 200)
+        });
+        if (!page) return;
+
+        page.items.forEach(item => {
+            const element = this.list.querySelector(`[data-position="${item.position}"]`);
+            if (element) {
+                this.items.set(item.position, item);
+                this.updateItem(element, item);
+            }
+        });
+    }
+
+    createElement(item) {
+        const element = this.renderItem(item);
+        element.dataset.position = item.position;
+        this.items.set(item.position, item);
+        return element;
+    }
+
+    trimTop() {
+        const excess = this.list.children.length - this.maxItems;
+        if (excess <= 0) return;
+
+        const heightBefore = this.list.scrollHeight;
+        for (let i = 0; i < excess; i++) {
+            const element = this.list.firstElementChild;
+            this.items.delete(parseInt(element.dataset.position));
+            element.remove();
+        }
+        this.container.scrollTop -= heightBefore - this.list.scrollHeight;
+        this.firstPosition = parseInt(this.list.firstElementChild.dataset.position);
+        this.hasPrev = true;
+    }
+
+    trimBottom() {
+        const excess = this.list.children.length - this.maxItems;
+        if (excess <= 0) return;
+
+        for (let i = 0; i < excess; i++) {
+            const element = this.list.lastElementChild;
+            this.items.delete(parseInt(element.dataset.position));
+            element.remove();
+        }
+        this.lastPosition = parseInt(this.list.lastElementChild.dataset.position);
+        this.hasNext = true;
+    }
+
+    isVisible(element) {
+        const containerRect = this.container.getBoundingClientRect();
+        const rect = element.getBoundingClientRect();
+        return rect.top <= containerRect.bottom + 400;
+    }
+}
@@ -0,0 +1,65 @@
+"""
+Wspólna konfiguracja testów - izolowana baza SQLite i atrapy Apify/Gemini
+
+Zmienne środowiskowe muszą być ustawione przed pierwszym importem config/services
+(serwisy są singletonami tworzonymi z wartości config przy imporcie).
+"""
+import os
+import sys
+import uuid
+import tempfile
+
+_TMP_DIR = tempfile.mkdtemp(prefix="socialpure-tests-")
+os.environ["DATABASE_PATH"] = os.path.join(_TMP_DIR, "test.db")
+os.environ["APIFY_CACHE_DIR"] = os.path.join(_TMP_DIR, "apify_cache")
+os.environ["APIFY_BACKEND"] = "fake"
+os.environ["GEMINI_BACKEND"] = "fake"
+os.environ["APIFY_CACHE_ENABLED"] = "False"
+os.environ["FAKE_ANCHOR_DATE"] = "2024-12-31"
+os.environ["EMBEDDED_WORKERS"] = "False"
+os.environ["LOG_SINK"] = ""
+os.environ["CHART_RENDER_WORKERS"] = "0"  # Wykresy w bieżącym procesie (bez puli procesów)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from models.scraping_job import ScrapingJob
+from models.scraping_result import ScrapingResult
+from models.category_key import CategoryKey
+from services.database_service import DatabaseService
+from services.job_storage import JobStorageService
+
+CATEGORIES = [
+    {"aspekt": "Cena", "definicja": "Opinie o cenie"},
+    {"aspekt": "Jakość", "definicja": "Opinie o jakości"},
+]
+
+@pytest.fixture
+def db():
+    return DatabaseService()
+
+@pytest.fixture
+def job_storage():
+    return JobStorageService()
+
+@pytest.fixture
+def make_job(job_storage):
+    """Zapisuje zadanie z postami (opcjonalnie z kluczem kategorii) i zwraca je"""
+    def factory(texts=(), status="pending", brand_name="Marka Testowa", with_key=False):
+        job_id = uuid.uuid4().hex
+        job = ScrapingJob(
+            job_id=job_id,
+            brand_name=brand_name,
+            start_date="2024-12-01",
+            end_date="2024-12-31",
+            status=status,
+            scraping_results=[
+                ScrapingResult(text=text, url=f"https://facebook.com/{job_id}/posts/{idx}")
+                for idx, text in enumerate(texts)
+            ],
+            category_key=CategoryKey(job_id=job_id, categories=list(CATEGORIES)) if with_key else None
+        )
+        job_storage.save(job)
+        return job
+    return factory
@@ -0,0 +1,49 @@
+"""Cache wyników Apify: wpisy rozdzielone per backend (atrapy nie obsługują uruchomień live)"""
+import pytest
+
+import services.apify_service as apify_service_module
+from services.apify_service import ApifyService
+
+URL = "https://facebook.com/marka-testowa"
+
+@pytest.fixture
+def apify(tmp_path, monkeypatch):
+    """ApifyService z włączonym cache w katalogu tymczasowym; licznik uruchomień aktora"""
+    service = ApifyService()
+    monkeypatch.setattr(service.cache, "enabled", True)
+    monkeypatch.setattr(service.cache, "cache_dir", str(tmp_path / "apify_cache"))
+    
+    service.actor_runs = 0
+    run_actor = service.run_actor
+    
+    def counting_run_actor(*args, **kwargs):
+        service.actor_runs += 1
+        return run_actor(*args, **kwargs)
+    
+    monkeypatch.setattr(service, "run_actor", counting_run_actor)
+    return service
+
+def scrape(service):
+    return service.run_facebook_scraper([URL], max_posts=5, newer_than="2024-12-01", older_than="2024-12-31")
+
+def test_same_backend_is_served_from_cache(apify):
+    first = scrape(apify)
+    second = scrape(apify)
+    
+    assert first and second == first
+    assert apify.actor_runs == 1
+
+def test_fake_backend_entry_does_not_serve_live_lookup(apify, monkeypatch):
+    scrape(apify)  # APIFY_BACKEND=fake (conftest)
+    run_input = {
+        "startUrls": [{"url": URL}], "maxPosts": 5,
+        "onlyPostsNewerThan": "2024-12-01", "onlyPostsOlderThan": "2024-12-31"
+    }
+    
+    assert apify.cache.get(apify.cache.make_key(apify.FACEBOOK_POSTS_ACTOR, run_input, "fake")) is not None
+    assert apify.cache.get(apify.cache.make_key(apify.FACEBOOK_POSTS_ACTOR, run_input, "live")) is None
+    
+    monkeypatch.setattr(apify_service_module, "APIFY_BACKEND", "live")
+    scrape(apify)
+    
+    assert apify.actor_runs == 2  # Uruchomienie live nie dostało wyników atrapy z cache
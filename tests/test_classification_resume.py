@@ -0,0 +1,140 @@
+"""Wznawianie klasyfikacji po przerwaniu procesu (checkpointy per komentarz)"""
+import threading
+import time
+
+import pytest
+
+from app import app
+from services.classification_orchestrator import ClassificationOrchestrator
+from services.job_queue import JobQueueService, QUEUE_CLASSIFICATION
+from services.workflow_orchestrator import WorkflowOrchestrator, STAGE_CLASSIFICATION
+
+TEXTS = [
+    "Świetna jakość, polecam każdemu",
+    "Za drogo jak na to, co oferują",
+    "Obsługa klienta bardzo pomocna",
+    "Produkt zepsuł się po tygodniu",
+]
+
+@pytest.fixture
+def orchestrator():
+    return ClassificationOrchestrator()
+
+@pytest.fixture
+def running_elsewhere(orchestrator):
+    """Oznacza zadanie jako klasyfikowane przez inny wątek tego procesu (na podany czas)"""
+    threads = []
+    
+    def hold(job_id, seconds):
+        with orchestrator._active_changed:
+            orchestrator._active_jobs.add(job_id)
+        
+        def release():
+            time.sleep(seconds)
+            with orchestrator._active_changed:
+                orchestrator._active_jobs.discard(job_id)
+                orchestrator._active_changed.notify_all()
+        
+        thread = threading.Thread(target=release)
+        thread.start()
+        threads.append(thread)
+    
+    yield hold
+    for thread in threads:
+        thread.join()
+
+def set_task_updated_at(db, job_id, comment_index, value):
+    db.execute_update(
+        "UPDATE classification_tasks SET updated_at = ? WHERE job_id = ? AND comment_index = ?",
+        (value, job_id, comment_index)
+    )
+
+def crash_midway(db, job):
+    """Stan po awarii: komentarz 0 gotowy, komentarz 1 przerwany w trakcie (in_flight)"""
+    db.init_classification_tasks(job.job_id, list(range(len(TEXTS))))
+    db.save_classification_result(job.job_id, 0, "Jakość", "pozytywny")
+    db.mark_classification_task_in_flight(job.job_id, 1)
+
+def test_resume_classifies_only_unfinished_comments(orchestrator, make_job, db):
+    job = make_job(TEXTS, status="classifying", with_key=True)
+    crash_midway(db, job)
+    set_task_updated_at(db, job.job_id, 1, "2000-01-01T00:00:00")  # Martwy proces
+    saved_before = db.execute_query(
+        "SELECT classified_at FROM classification_results WHERE job_id = ? AND comment_index = 0", (job.job_id,)
+    )[0]['classified_at']
+    
+    orchestrator.run_classification(job.job_id)
+    
+    counts = db.get_classification_task_counts(job.job_id)
+    assert counts == {'pending': 0, 'in_flight': 0, 'done': len(TEXTS), 'failed': 0}
+    resumed = db.load_job(job.job_id)  # Stan z bazy (jak po restarcie procesu)
+    assert resumed.status == "completed"
+    assert len(resumed.classification_results) == len(TEXTS)
+    # Wynik sprzed awarii nie został sklasyfikowany ani zapisany ponownie
+    assert resumed.classification_results[0]['category'] == "Jakość"
+    assert db.execute_query(
+        "SELECT classified_at FROM classification_results WHERE job_id = ? AND comment_index = 0", (job.job_id,)
+    )[0]['classified_at'] == saved_before
+    assert db.execute_query(
+        "SELECT attempts FROM classification_tasks WHERE job_id = ? AND comment_index = 1", (job.job_id,)
+    )[0]['attempts'] == 2
+
+def test_fresh_in_flight_comment_is_left_to_its_process(orchestrator, make_job, job_storage, db):
+    job = make_job(TEXTS, status="classifying", with_key=True)
+    crash_midway(db, job)  # Komentarz 1 klasyfikuje właśnie inny proces
+    
+    orchestrator.run_classification(job.job_id)
+    
+    counts = db.get_classification_task_counts(job.job_id)
+    assert counts['in_flight'] == 1
+    assert counts['done'] == len(TEXTS) - 1
+    # Zadanie zamknie proces, który klasyfikuje ostatni komentarz
+    assert job_storage.get(job.job_id).status == "classifying"
+
+def test_startup_sweep_skips_jobs_owned_by_queue(orchestrator, make_job, job_storage, db):
+    resumable = make_job(TEXTS, status="classifying", with_key=True)
+    key_interrupted = make_job(TEXTS, status="classifying")
+    key_in_progress = make_job(TEXTS, status="classifying")
+    JobQueueService().enqueue(QUEUE_CLASSIFICATION, "scrape_and_key", key_in_progress.job_id)
+    
+    found = orchestrator.find_interrupted_jobs()
+    
+    assert resumable.job_id in found
+    assert key_interrupted.job_id not in found
+    assert key_in_progress.job_id not in found
+    assert job_storage.get(key_interrupted.job_id).status == "failed"
+    assert job_storage.get(key_in_progress.job_id).status == "classifying"
+
+def test_reset_waits_for_running_classification(orchestrator, running_elsewhere, make_job, db):
+    job = make_job(TEXTS, status="classifying", with_key=True)
+    crash_midway(db, job)
+    running_elsewhere(job.job_id, 0.5)
+    
+    started = time.monotonic()
+    assert orchestrator.run_classification(job.job_id, reset=True) is True
+    
+    assert time.monotonic() - started >= 0.5
+    assert db.get_classification_task_counts(job.job_id)['done'] == len(TEXTS)
+    # Reset wykonany - wynik sprzed awarii sklasyfikowany ponownie (atrapa Gemini)
+    assert db.execute_query(
+        "SELECT attempts FROM classification_tasks WHERE job_id = ? AND comment_index = 0", (job.job_id,)
+    )[0]['attempts'] == 1
+
+def test_skipped_classification_is_not_recorded_as_done(running_elsewhere, make_job, db):
+    job = make_job(TEXTS, status="classifying", with_key=True)
+    running_elsewhere(job.job_id, 0.2)
+    
+    WorkflowOrchestrator().run_stages(job.job_id, [STAGE_CLASSIFICATION])
+    
+    stage = db.get_workflow_stage(job.job_id, STAGE_CLASSIFICATION)
+    assert stage['status'] != "done"
+    assert db.get_classification_task_counts(job.job_id)['done'] == 0
+
+def test_reset_is_rejected_while_classification_is_queued(make_job):
+    job = make_job(TEXTS, status="classifying", with_key=True)
+    JobQueueService().enqueue(QUEUE_CLASSIFICATION, "classify", job.job_id)
+    client = app.test_client()
+    
+    assert client.post(f"/api/classify-all/{job.job_id}?reset=true").status_code == 409
+    assert client.post(f"/api/reset-classification/{job.job_id}").status_code == 409
+    assert client.post(f"/api/classify-all/{job.job_id}").status_code == 200  # Wznowienie jest dozwolone
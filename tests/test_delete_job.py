@@ -0,0 +1,27 @@
+"""Usuwanie zadania: wszystkie rekordy powiązane z zadaniem znikają razem z nim"""
+from services.database_service import _JOB_TABLES
+from services.job_queue import JobQueueService, QUEUE_REPORT
+from services.metrics import MetricsService
+from services.report_stream import ReportStreamService
+from services.workflow_orchestrator import WorkflowOrchestrator, STAGE_CLASSIFICATION
+
+def count_rows(db, table, job_id):
+    return db.execute_query(f"SELECT COUNT(*) AS cnt FROM {table} WHERE job_id = ?", (job_id,))[0]['cnt']
+
+def test_delete_job_removes_all_job_rows(db, make_job):
+    job = make_job(["Cena za wysoka", "Jakość bardzo dobra"], status="classifying", with_key=True)
+    other = make_job(["Inne zadanie zostaje"], with_key=True)
+    db.execute_update("UPDATE scraping_results SET date = '2024-12-10' WHERE job_id = ?", (job.job_id,))
+    WorkflowOrchestrator().run_stages(job.job_id, [STAGE_CLASSIFICATION])  # Wyniki, checkpointy, etap, rollupy
+    MetricsService().flush()
+    JobQueueService().enqueue(QUEUE_REPORT, "report", job.job_id)
+    ReportStreamService().publish(job.job_id, "statistics", {"total": 2})
+    populated = [table for table in _JOB_TABLES if count_rows(db, table, job.job_id)]
+    assert {'classification_tasks', 'workflow_stages', 'task_queue', 'report_events',
+            'job_metrics', 'job_spans', 'brand_daily_rollups'} <= set(populated)
+    
+    assert db.delete_job(job.job_id) is True
+    
+    for table in _JOB_TABLES + ('jobs', 'scraping_results', 'scraping_raw_items'):
+        assert count_rows(db, table, job.job_id) == 0, table
+    assert db.load_job(other.job_id).category_key is not None
@@ -0,0 +1,119 @@
+"""Kolejka zadań: pobieranie z dzierżawą, przejmowanie po wygaśnięciu, ponowienia"""
+import threading
+import time
+
+import pytest
+
+from services.job_queue import (
+    JobQueueService, QUEUE_CLASSIFICATION, QUEUE_REPORT, QUEUE_SCRAPING,
+    PRIORITY_HIGH, PRIORITY_LOW, LeaseLostError, check_lease
+)
+from services.queue_worker import QueueWorker
+
+@pytest.fixture
+def job_queue(db):
+    queue = JobQueueService()
+    db.execute_update("DELETE FROM task_queue")
+    return queue
+
+def expire_lease(db, task_id):
+    db.execute_update("UPDATE task_queue SET lease_expires_at = '2000-01-01T00:00:00' WHERE id = ?", (task_id,))
+
+def test_claim_orders_by_priority_then_fifo(job_queue):
+    low = job_queue.enqueue(QUEUE_REPORT, "report", "a", priority=PRIORITY_LOW)
+    first = job_queue.enqueue(QUEUE_REPORT, "report", "b", priority=PRIORITY_HIGH)
+    second = job_queue.enqueue(QUEUE_REPORT, "report", "c", priority=PRIORITY_HIGH)
+    
+    claimed = [job_queue.claim(QUEUE_REPORT, "w1", 60)['id'] for _ in range(3)]
+    
+    assert claimed == [first, second, low]
+    assert job_queue.claim(QUEUE_REPORT, "w1", 60) is None
+
+def test_enqueue_deduplicates_waiting_task(job_queue):
+    task_id = job_queue.enqueue(QUEUE_CLASSIFICATION, "classify", "job-1")
+    
+    assert job_queue.enqueue(QUEUE_CLASSIFICATION, "classify", "job-1") == task_id
+    assert job_queue.enqueue(QUEUE_CLASSIFICATION, "classify", "job-1", dedupe=False) != task_id
+
+def test_leased_task_is_not_claimed_twice(job_queue):
+    job_queue.enqueue(QUEUE_CLASSIFICATION, "classify", "job-1")
+    
+    assert job_queue.claim(QUEUE_CLASSIFICATION, "w1", 60) is not None
+    assert job_queue.claim(QUEUE_CLASSIFICATION, "w2", 60) is None
+
+def test_expired_lease_is_taken_over(job_queue, db):
+    task_id = job_queue.enqueue(QUEUE_CLASSIFICATION, "classify", "job-1")
+    job_queue.claim(QUEUE_CLASSIFICATION, "w1", 60)
+    expire_lease(db, task_id)
+    
+    task = job_queue.claim(QUEUE_CLASSIFICATION, "w2", 60)
+    
+    assert task['id'] == task_id
+    assert task['attempts'] == 2
+    assert task['lease_owner'] == "w2"
+    # Poprzedni właściciel nie może już przedłużyć ani zamknąć zadania
+    assert job_queue.heartbeat(task_id, "w1", 60) is False
+    job_queue.complete(task_id, "w1")
+    assert job_queue.get_task(task_id)['status'] == "running"
+
+def test_failed_task_is_retried_until_attempts_run_out(job_queue, make_job, job_storage):
+    job = make_job(status="classifying")
+    task_id = job_queue.enqueue(QUEUE_CLASSIFICATION, "classify", job.job_id, max_attempts=2)
+    job_queue.retry_delay_seconds = 0
+    
+    job_queue.claim(QUEUE_CLASSIFICATION, "w1", 60)
+    job_queue.fail(task_id, "w1", "pierwszy błąd")
+    task = job_queue.get_task(task_id)
+    assert task['status'] == "queued"
+    assert task['last_error'] == "pierwszy błąd"
+    assert job_storage.get(job.job_id).status == "classifying"
+    
+    job_queue.claim(QUEUE_CLASSIFICATION, "w1", 60)
+    job_queue.fail(task_id, "w1", "drugi błąd")
+    
+    assert job_queue.get_task(task_id)['status'] == "failed"
+    failed_job = job_storage.get(job.job_id)
+    assert failed_job.status == "failed"
+    assert "drugi błąd" in failed_job.error_message
+
+def test_expired_lease_without_attempts_left_fails_job(job_queue, make_job, job_storage, db):
+    job = make_job(status="scraping")
+    task_id = job_queue.enqueue(QUEUE_SCRAPING, "scrape_and_key", job.job_id, max_attempts=1)
+    job_queue.claim(QUEUE_SCRAPING, "w1", 60)
+    expire_lease(db, task_id)
+    
+    assert job_queue.claim(QUEUE_SCRAPING, "w2", 60) is None
+    assert job_queue.get_task(task_id)['status'] == "failed"
+    assert job_storage.get(job.job_id).status == "failed"
+    assert not job_queue.has_active_tasks(job.job_id)
+
+def test_check_lease_is_noop_outside_worker():
+    check_lease()
+
+def test_worker_aborts_handler_after_losing_lease(job_queue, db):
+    task_id = job_queue.enqueue(QUEUE_REPORT, "slow", None, max_attempts=3)
+    worker = QueueWorker(QUEUE_REPORT, {}, "w1", lease_seconds=3)
+    task = job_queue.claim(QUEUE_REPORT, "w1", 3)
+    aborted = threading.Event()
+    
+    def handler(job_id, payload):
+        # Inny worker przejmuje zadanie - heartbeat (co 1 s) wykrywa utratę dzierżawy
+        db.execute_update("UPDATE task_queue SET lease_owner = 'w2' WHERE id = ?", (task_id,))
+        deadline = time.monotonic() + 10
+        while time.monotonic() < deadline:
+            try:
+                check_lease()
+            except LeaseLostError:
+                aborted.set()
+                raise
+            time.sleep(0.05)
+    
+    worker.handlers = {"slow": handler}
+    worker._execute(task)
+    
+    assert aborted.is_set()
+    # Zadanie należy do nowego właściciela - worker nie zapisał ani wyniku, ani błędu
+    stored = job_queue.get_task(task_id)
+    assert stored['status'] == "running"
+    assert stored['lease_owner'] == "w2"
+    assert stored['last_error'] is None
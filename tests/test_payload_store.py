@@ -0,0 +1,73 @@
+"""Magazyn payloadów: kompresja ze słownikiem, round-trip i deduplikacja"""
+import sqlite3
+
+import pytest
+
+from services import payload_store
+from services.fake_backends import FakeApifyClient
+from services.payload_store import PayloadStore, CODEC_ZLIB, CODEC_ZSTD, ZSTD_AVAILABLE
+
+CODECS = [CODEC_ZLIB, pytest.param(CODEC_ZSTD, marks=pytest.mark.skipif(not ZSTD_AVAILABLE, reason="brak zstandard"))]
+
+@pytest.fixture
+def cursor():
+    conn = sqlite3.connect(":memory:")
+    conn.row_factory = sqlite3.Row
+    yield conn.cursor()
+    conn.close()
+
+def make_store(monkeypatch, cursor, codec):
+    monkeypatch.setattr(payload_store, "PAYLOAD_CODEC", codec)
+    store = PayloadStore()
+    store.init_schema(cursor)
+    return store
+
+def apify_items(count, page="page"):
+    return FakeApifyClient().generate_posts(f"https://facebook.com/{page}", count)
+
+def count_rows(cursor):
+    return cursor.execute("SELECT COUNT(*) AS cnt FROM raw_payloads").fetchone()['cnt']
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_round_trip_without_dictionary(monkeypatch, cursor, codec):
+    store = make_store(monkeypatch, cursor, codec)
+    items = apify_items(20)
+    
+    hashes = store.put_many(cursor, items)
+    loaded = store.get_many(cursor, hashes)
+    
+    assert [loaded[h] for h in hashes] == items
+    assert store.get_stats(cursor)['dictionary_id'] is None
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_identical_items_are_stored_once(monkeypatch, cursor, codec):
+    store = make_store(monkeypatch, cursor, codec)
+    items = apify_items(10)
+    
+    first = store.put_many(cursor, items)
+    # Te same elementy w innej kolejności kluczy (inne zadanie) - ten sam hash, bez nowych wierszy
+    second = store.put_many(cursor, [dict(reversed(list(item.items()))) for item in items] + items[:3])
+    
+    assert second == first + first[:3]
+    assert count_rows(cursor) == len(items)
+
+@pytest.mark.parametrize("codec", CODECS)
+def test_dictionary_training_and_recompress_keep_payloads_readable(monkeypatch, cursor, codec):
+    store = make_store(monkeypatch, cursor, codec)
+    old_hashes = store.put_many(cursor, apify_items(60))
+    stored_before = store.get_stats(cursor)['stored_bytes']
+    
+    dictionary_id = store.train_dictionary(cursor)
+    assert dictionary_id is not None
+    assert store.recompress(cursor) == len(old_hashes)
+    assert store.get_stats(cursor)['stored_bytes'] < stored_before
+    
+    new_items = apify_items(30, page="other")
+    new_hashes = store.put_many(cursor, new_items)
+    loaded = store.get_many(cursor, old_hashes + new_hashes)
+    
+    assert store.get_stats(cursor)['dictionary_id'] == dictionary_id
+    assert len(loaded) == len(old_hashes) + len(new_hashes)
+    assert [loaded[h] for h in new_hashes] == new_items
+    # Nowa instancja (inny proces) wczytuje słownik z bazy
+    assert PayloadStore().get_many(cursor, new_hashes) == {h: loaded[h] for h in new_hashes}
@@ -0,0 +1,116 @@
+"""Cache raportów: fingerprint raportu (gotowy raport) i fingerprint treści Gemini (narracja)"""
+import os
+
+import pytest
+
+from models.category_key import CategoryKey
+from models.classification_stats import ClassificationStats
+from services.report_service import ReportService
+from tests.conftest import CATEGORIES
+
+@pytest.fixture
+def report_service(tmp_path, monkeypatch):
+    """ReportService z plikami raportów i wykresów w katalogu tymczasowym; licznik wywołań Gemini"""
+    service = ReportService()
+    service.reports_dir = str(tmp_path / "reports")
+    service.visualization_service.charts_dir = str(tmp_path / "charts")
+    os.makedirs(service.reports_dir)
+    os.makedirs(service.visualization_service.charts_dir)
+    
+    service.narrative_calls = 0
+    generate_narrative = service.generate_narrative
+    
+    def counting_generate_narrative(*args, **kwargs):
+        service.narrative_calls += 1
+        return generate_narrative(*args, **kwargs)
+    
+    monkeypatch.setattr(service, "generate_narrative", counting_generate_narrative)
+    return service
+
+def make_stats(negative=2):
+    return ClassificationStats.from_matrix(
+        [("Cena", "pozytywny", 5), ("Cena", "negatywny", negative), ("Jakość", "neutralny", 3)],
+        examples={"Cena": ["Tanio i dobrze"], "Jakość": ["Przeciętnie"]}
+    )
+
+def generate(service, stats, job_id="job-report", categories=CATEGORIES, refresh=False):
+    return service.generate_report(
+        stats, CategoryKey(job_id=job_id, categories=list(categories)), "Marka Testowa", job_id,
+        "2024-12-01", "2024-12-31", refresh=refresh
+    )
+
+def test_unchanged_inputs_return_cached_report(report_service):
+    first = generate(report_service, make_stats())
+    second = generate(report_service, make_stats())
+    
+    assert "cached" not in first
+    assert second["cached"] is True
+    assert second["html"] == first["html"]
+    assert report_service.narrative_calls == 1
+
+def test_changed_aggregates_rebuild_report_but_reuse_narrative(report_service):
+    generate(report_service, make_stats(negative=2))
+    
+    rebuilt = generate(report_service, make_stats(negative=7))
+    
+    assert "cached" not in rebuilt
+    assert report_service.narrative_calls == 1
+    with open(rebuilt["markdown"], encoding="utf-8") as f:
+        assert "| 7 |" in f.read()  # Tabele statystyk z nowych agregatów
+
+def test_changed_category_key_regenerates_narrative(report_service):
+    generate(report_service, make_stats())
+    
+    generate(report_service, make_stats(), categories=CATEGORIES + [{"aspekt": "Obsługa", "definicja": "Kontakt"}])
+    
+    assert report_service.narrative_calls == 2
+
+def test_refresh_bypasses_cache(report_service):
+    generate(report_service, make_stats())
+    
+    refreshed = generate(report_service, make_stats(), refresh=True)
+    
+    assert "cached" not in refreshed
+    assert report_service.narrative_calls == 2
+
+def test_missing_chart_file_invalidates_cached_report(report_service):
+    first = generate(report_service, make_stats())
+    os.remove(first["charts"]["bar"])
+    
+    rebuilt = generate(report_service, make_stats())
+    
+    assert "cached" not in rebuilt
+    assert os.path.exists(rebuilt["charts"]["bar"])
+    assert report_service.narrative_calls == 1
+
+def chart_files(service):
+    return set(os.listdir(service.visualization_service.charts_dir))
+
+def age_files(service, seconds=7200):
+    charts_dir = service.visualization_service.charts_dir
+    for name in os.listdir(charts_dir):
+        stat = os.stat(os.path.join(charts_dir, name))
+        os.utime(os.path.join(charts_dir, name), (stat.st_atime - seconds, stat.st_mtime - seconds))
+
+def test_rewritten_manifest_removes_unreferenced_charts(report_service):
+    old = generate(report_service, make_stats(negative=2))
+    shared = generate(report_service, make_stats(negative=2), job_id="job-shared")  # Te same dane - te same pliki
+    age_files(report_service)
+    
+    new = generate(report_service, make_stats(negative=7))
+    assert old["charts"]["bar"] != new["charts"]["bar"]
+    assert os.path.exists(old["charts"]["bar"])  # Nadal wskazuje go raport job-shared
+    
+    generate(report_service, make_stats(negative=7), job_id="job-shared")
+    
+    old_base = os.path.basename(old["charts"]["bar"]).split('.')[0]
+    assert not os.path.exists(shared["charts"]["bar"])
+    assert not any(name.startswith(old_base) for name in chart_files(report_service))  # Także specyfikacja JSON
+    assert all(os.path.exists(path) for path in new["charts"].values())
+
+def test_recently_used_unreferenced_charts_are_kept(report_service):
+    old = generate(report_service, make_stats(negative=2))
+    
+    generate(report_service, make_stats(negative=7))
+    
+    assert os.path.exists(old["charts"]["bar"])  # Mógł go właśnie wybrać raport w toku
@@ -0,0 +1,60 @@
+"""Wyszukiwanie pełnotekstowe: synchronizacja indeksu FTS triggerami i filtry search_posts"""
+import uuid
+
+import pytest
+
+@pytest.fixture(autouse=True)
+def require_fts(db):
+    if not db.fts_available:
+        pytest.skip("SQLite bez FTS5")
+
+def found_positions(db, query, **filters):
+    return sorted(result['position'] for result in db.search_posts(query, limit=100, **filters)['results'])
+
+def test_saved_posts_are_indexed_with_diacritics_folding(db, make_job):
+    job = make_job(["Żółty autobus spóźnił się do Łodzi", "Obsługa w sklepie była miła"])
+    
+    assert found_positions(db, "zolty", job_id=job.job_id) == [0]
+    assert found_positions(db, "lodzi", job_id=job.job_id) == [0]
+    assert found_positions(db, "obsluga mila", job_id=job.job_id) == [1]
+    assert found_positions(db, "obsł", job_id=job.job_id) == [1]  # Dopasowanie prefiksowe
+    
+    result = db.search_posts("autobus", job_id=job.job_id)['results'][0]
+    assert "<mark>autobus</mark>" in result['snippet']
+
+def test_index_follows_updates_and_deletes(db, make_job):
+    job = make_job(["Pierwsza wersja posta", "Drugi post zostaje"])
+    
+    db.execute_update(
+        "UPDATE scraping_results SET text = ? WHERE job_id = ? AND position = 0",
+        ("Poprawiona treść posta", job.job_id)
+    )
+    assert found_positions(db, "pierwsza", job_id=job.job_id) == []
+    assert found_positions(db, "poprawiona", job_id=job.job_id) == [0]
+    
+    db.delete_job(job.job_id)
+    assert found_positions(db, "post", job_id=job.job_id) == []
+
+def test_resaving_job_does_not_duplicate_index_entries(db, make_job, job_storage):
+    job = make_job(["Unikalny tekst do zliczenia"])
+    job_storage.update(job)
+    job_storage.update(job)
+    
+    assert db.search_posts("unikalny zliczenia", job_id=job.job_id)['total'] == 1
+
+def test_brand_filter_uses_normalized_brand_key(db, make_job):
+    brand = f"Marka {uuid.uuid4().hex[:8]}"
+    job = make_job(["Kawa smakuje wyśmienicie"], brand_name=brand)
+    make_job(["Kawa smakuje wyśmienicie"], brand_name="Inna marka")
+    
+    results = db.search_posts("kawa", brand=f"  {brand.upper()}  ")['results']
+    
+    assert [result['job_id'] for result in results] == [job.job_id]
+
+def test_category_and_sentiment_filters(db, make_job):
+    job = make_job(["Cena za wysoka", "Cena w porządku"], with_key=True)
+    db.save_classification_result(job.job_id, 0, "Cena", "negatywny")
+    db.save_classification_result(job.job_id, 1, "Cena", "pozytywny")
+    
+    assert found_positions(db, "cena", job_id=job.job_id, category="Cena") == [0, 1]
+    assert found_positions(db, "cena", job_id=job.job_id, sentiment="negatywny") == [0]
@@ -1,3 +1,4 @@
+import re
 import uuid
 from datetime import datetime
 
@@ -5,6 +6,10 @@ def generate_job_id() -> str:
     """Generuje UUID dla zadania"""
     return str(uuid.uuid4())
 
+def normalize_brand_key(brand_name: str) -> str:
+    """Klucz marki łączący zadania tej samej marki (małe litery, pojedyncze spacje)"""
+    return re.sub(r"\s+", " ", (brand_name or "").strip()).lower()
+
 def format_datetime(dt: datetime) -> str:
     """Formatuje datetime do czytelnego stringa"""
     return dt.strftime("%Y-%m-%d %H:%M:%S")